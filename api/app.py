@@ -247,5 +247,38 @@ def pool_stat():
     }
 
 
+@app.route('/vector-store-pool-stat')
+def vector_store_pool_stat():
+    from core.vector_store.client_pool import get_client_pool_stats
+
+    return {
+        'pools': get_client_pool_stats()
+    }
+
+
+@app.route('/retrieval-stat')
+def retrieval_stat():
+    from controllers.console.admin import admin_required
+    from core.helper.retrieval_executor import retrieval_executor
+
+    # the latencies are per dataset, they are only served with the admin API key
+    return admin_required(retrieval_executor.stats)()
+
+
+@app.route('/cache-stat')
+def cache_stat():
+    from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
+    from core.helper.model_provider_cache import decrypted_credentials_local_cache
+    from core.helper.provider_configurations_cache import provider_configurations_cache
+    from libs.rsa import decrypt_decoding_cache
+
+    return {
+        'provider_configurations': provider_configurations_cache.stats(),
+        'provider_credentials': decrypted_credentials_local_cache.stats(),
+        'decrypt_decoding': decrypt_decoding_cache.stats(),
+        'dataset_retrieval': dataset_retrieval_cache.stats()
+    }
+
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001)
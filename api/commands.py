@@ -7,6 +7,7 @@ from flask import current_app
 from werkzeug.exceptions import NotFound
 
 from core.embedding.cached_embedding import CacheEmbedding
+from core.helper.provider_configurations_cache import provider_configurations_cache
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from extensions.ext_database import db
@@ -120,6 +121,8 @@ def reset_encrypt_key_pair():
     db.session.query(ProviderModel).delete()
     db.session.commit()
 
+    provider_configurations_cache.invalidate(tenant.id)
+
     click.echo(click.style('Congratulations! '
                            'the asymmetric key pair of workspace {} has been reset.'.format(tenant.id), fg='green'))
 
@@ -192,8 +195,107 @@ def create_qdrant_indexes():
     click.echo(click.style('Congratulations! Create {} dataset indexes.'.format(create_count), fg='green'))
 
 
+@click.command('evaluate-dataset-router', help='Compare the routing accuracy and latency of the embedding dataset '
+                                               'router and the LLM router of an app on labelled queries.')
+@click.option('--app-id', required=True, help='The id of the app whose datasets are routed.')
+@click.option('--cases', 'cases_file', required=True, type=click.File('r'),
+              help='JSON lines file of {"query": ..., "dataset_id": ...}, dataset_id null when no dataset matches.')
+@click.option('--skip-llm', is_flag=True, default=False, help='Only evaluate the embedding router.')
+def evaluate_dataset_router(app_id: str, cases_file, skip_llm: bool):
+    """
+    Offline evaluation of the dataset routers of the single retrieve strategy, no dataset is retrieved.
+    """
+    import time
+
+    from langchain.schema import AgentAction
+
+    from core.agent.agent_executor import AgentConfiguration, AgentExecutor
+    from core.application_manager import ApplicationManager
+    from core.features.dataset_retrieval import DatasetRetrievalFeature
+    from core.features.dataset_router import EmbeddingDatasetRouter
+    from core.tools.tool.dataset_retriever.dataset_retriever_tool import DatasetRetrieverTool
+    from models.model import App
+
+    app = db.session.query(App).filter(App.id == app_id).first()
+    if not app or not app.app_model_config:
+        click.echo(click.style('App {} not found.'.format(app_id), fg='red'))
+        return
+
+    app_orchestration_config = ApplicationManager()._convert_from_app_model_config_dict(
+        tenant_id=app.tenant_id,
+        app_model_config_dict=app.app_model_config.to_dict()
+    )
+    if not app_orchestration_config.dataset:
+        click.echo(click.style('App {} has no datasets.'.format(app_id), fg='red'))
+        return
+
+    datasets = db.session.query(Dataset).filter(
+        Dataset.tenant_id == app.tenant_id,
+        Dataset.id.in_(app_orchestration_config.dataset.dataset_ids)
+    ).all()
+    tools = [DatasetRetrieverTool.from_dataset(dataset=dataset, return_resource=False, retriever_from='dev')
+             for dataset in datasets]
+    tool_dataset_ids = {tool.name: tool.dataset_id for tool in tools}
+
+    agent_executor = None
+    if not skip_llm:
+        model_config = app_orchestration_config.model_config
+        agent_executor = AgentExecutor(AgentConfiguration(
+            strategy=DatasetRetrievalFeature().get_planning_strategy(model_config),
+            model_config=model_config,
+            tools=tools,
+            max_iterations=10,
+            max_execution_time=400.0,
+            early_stopping_method="generate"
+        ))
+
+    router = EmbeddingDatasetRouter(app.tenant_id)
+    results = {'embedding': [], 'embedding_top': [], 'llm': [], 'fast_with_fallback': []}
+    cases = [json.loads(line) for line in cases_file if line.strip()]
+    for case in cases:
+        expected = case.get('dataset_id')
+
+        start_at = time.perf_counter()
+        scores = router.score(tools, case['query'])
+        tool = router.decide(scores)
+        embedding_latency = time.perf_counter() - start_at
+        results['embedding_top'].append((bool(scores) and scores[0][0].dataset_id == expected, embedding_latency))
+        if tool:
+            results['embedding'].append((tool.dataset_id == expected, embedding_latency))
+            results['fast_with_fallback'].append((tool.dataset_id == expected, embedding_latency))
+
+        if agent_executor:
+            start_at = time.perf_counter()
+            try:
+                decision = agent_executor.agent.plan([], input=case['query'])
+                dataset_id = tool_dataset_ids.get(decision.tool) if isinstance(decision, AgentAction) else None
+                correct = dataset_id == expected
+            except Exception as e:
+                click.echo(click.style('LLM router error: {} {}'.format(e.__class__.__name__, str(e)), fg='red'))
+                correct = False
+            llm_latency = time.perf_counter() - start_at
+            results['llm'].append((correct, llm_latency))
+            if not tool:
+                results['fast_with_fallback'].append((correct, embedding_latency + llm_latency))
+
+    click.echo('{} cases, {} datasets'.format(len(cases), len(tools)))
+    for name, outcomes in results.items():
+        if not outcomes:
+            continue
+
+        latencies = sorted(latency for _, latency in outcomes)
+        click.echo('{:<20} routed: {:>5} accuracy: {:.2%} latency p50: {:.3f}s p95: {:.3f}s'.format(
+            name,
+            len(outcomes),
+            sum(1 for correct, _ in outcomes if correct) / len(outcomes),
+            latencies[len(latencies) // 2],
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        ))
+
+
 def register_commands(app):
     app.cli.add_command(reset_password)
     app.cli.add_command(reset_email)
     app.cli.add_command(reset_encrypt_key_pair)
     app.cli.add_command(create_qdrant_indexes)
+    app.cli.add_command(evaluate_dataset_router)
@@ -34,6 +34,9 @@ DEFAULTS = {
     'WEAVIATE_GRPC_ENABLED': 'True',
     'WEAVIATE_BATCH_SIZE': 100,
     'QDRANT_CLIENT_TIMEOUT': 20,
+    'VECTOR_STORE_CLIENT_IDLE_TIMEOUT': 600,
+    'VECTOR_STORE_CLIENT_HEALTH_CHECK_INTERVAL': 30,
+    'VECTOR_STORE_CLIENT_MAX_CLIENTS': 16,
     'CELERY_BACKEND': 'database',
     'LOG_LEVEL': 'INFO',
     'HOSTED_OPENAI_QUOTA_LIMIT': 200,
@@ -45,16 +48,56 @@ DEFAULTS = {
     'HOSTED_ANTHROPIC_TRIAL_ENABLED': 'False',
     'HOSTED_ANTHROPIC_PAID_ENABLED': 'False',
     'HOSTED_MODERATION_ENABLED': 'False',
+    'PROVIDER_CONFIGURATIONS_CACHE_ENABLED': 'True',
+    'PROVIDER_CONFIGURATIONS_CACHE_MAX_TENANTS': 1000,
+    'PROVIDER_CONFIGURATIONS_CACHE_TTL': 300,
+    'PROVIDER_CREDENTIALS_LOCAL_CACHE_MAX_SIZE': 5000,
+    'PROVIDER_CREDENTIALS_LOCAL_CACHE_TTL': 600,
+    'DECRYPT_DECODING_CACHE_MAX_TENANTS': 1000,
+    'DECRYPT_DECODING_CACHE_TTL': 60,
     'HOSTED_MODERATION_PROVIDERS': '',
     'CLEAN_DAY_SETTING': 30,
+    'INDEXING_PIPELINE_BATCH_SIZE': 100,
+    'INDEXING_PIPELINE_QUEUE_SIZE': 4,
+    'INDEXING_PIPELINE_TOKENIZE_CONCURRENCY': 1,
+    'INDEXING_PIPELINE_EMBEDDING_CONCURRENCY': 2,
+    'INDEXING_PIPELINE_VECTOR_CONCURRENCY': 1,
+    'INDEXING_PIPELINE_KEYWORD_CONCURRENCY': 1,
+    'TEXT_SPLITTER_TOKEN_OFFSETS': 'False',
+    'APPLICATION_QUEUE_TRANSPORT': 'memory',
+    'APPLICATION_GENERATE_IN_WORKER': 'False',
     'UPLOAD_FILE_SIZE_LIMIT': 15,
     'UPLOAD_FILE_BATCH_LIMIT': 5,
     'UPLOAD_IMAGE_FILE_SIZE_LIMIT': 10,
     'OUTPUT_MODERATION_BUFFER_SIZE': 300,
+    'DIRECT_OUTPUT_CHUNK_UNIT': 'word',
+    'DIRECT_OUTPUT_PACING': 'rate',
+    'DIRECT_OUTPUT_INTERVAL': 0.05,
+    'DIRECT_OUTPUT_CHARS_PER_SECOND': 1000,
     'MULTIMODAL_SEND_IMAGE_FORMAT': 'base64',
     'INVITE_EXPIRY_HOURS': 72,
+    'CONSOLE_PRINCIPAL_CACHE_TTL': 60,
     'BILLING_ENABLED': 'False',
     'CAN_REPLACE_LOGO': 'False',
+    'FEATURES_CACHE_TTL': 60,
+    'API_TOKEN_CACHE_TTL': 60,
+    'USAGE_LEDGER_ENABLED': 'True',
+    'USAGE_LEDGER_FLUSH_INTERVAL': 10,
+    'USAGE_LEDGER_STRICT_MODE': 'False',
+    'USAGE_LEDGER_STRICT_SLACK': 0,
+    'USAGE_LEDGER_RESERVATION_TTL': 600,
+    'USAGE_LEDGER_TOKENS_RESERVATION': 1024,
+    'BACKGROUND_GENERATION_ENABLED': 'True',
+    'BACKGROUND_GENERATION_WAIT_TIMEOUT': 10,
+    'DATASET_RETRIEVAL_CACHE_ENABLED': 'True',
+    'DATASET_RETRIEVAL_CACHE_TTL': 600,
+    'RETRIEVAL_EXECUTOR_MAX_WORKERS': 32,
+    'RETRIEVAL_EXECUTOR_MAX_CONCURRENCY': 4,
+    'RETRIEVAL_EXECUTOR_TIMEOUT': 10,
+    'RETRIEVAL_EXECUTOR_MAX_ABANDONED': 2,
+    'DATASET_EMBEDDING_ROUTER_ENABLED': 'False',
+    'DATASET_EMBEDDING_ROUTER_MIN_SCORE': 0.5,
+    'DATASET_EMBEDDING_ROUTER_MIN_MARGIN': 0.05,
     'ETL_TYPE': 'dify',
 }
 
@@ -201,6 +244,11 @@ class Config:
         self.WEAVIATE_GRPC_ENABLED = get_bool_env('WEAVIATE_GRPC_ENABLED')
         self.WEAVIATE_BATCH_SIZE = int(get_env('WEAVIATE_BATCH_SIZE'))
 
+        # shared vector store clients: seconds unused before closed, seconds between health checks, clients per backend
+        self.VECTOR_STORE_CLIENT_IDLE_TIMEOUT = float(get_env('VECTOR_STORE_CLIENT_IDLE_TIMEOUT'))
+        self.VECTOR_STORE_CLIENT_HEALTH_CHECK_INTERVAL = float(get_env('VECTOR_STORE_CLIENT_HEALTH_CHECK_INTERVAL'))
+        self.VECTOR_STORE_CLIENT_MAX_CLIENTS = int(get_env('VECTOR_STORE_CLIENT_MAX_CLIENTS'))
+
         # ------------------------
         # Mail Configurations.
         # ------------------------
@@ -220,6 +268,10 @@ class Config:
         # ------------------------
         self.INVITE_EXPIRY_HOURS = int(get_env('INVITE_EXPIRY_HOURS'))
 
+        # seconds the status, current workspace and role of a console user are cached,
+        # changes through the services invalidate it at once
+        self.CONSOLE_PRINCIPAL_CACHE_TTL = int(get_env('CONSOLE_PRINCIPAL_CACHE_TTL'))
+
         # ------------------------
         # Sentry Configurations.
         # ------------------------
@@ -237,14 +289,40 @@ class Config:
         # Dataset Configurations.
         self.CLEAN_DAY_SETTING = get_env('CLEAN_DAY_SETTING')
 
+        # Dataset indexing pipeline: chunks per batch, batches buffered between stages, workers per stage
+        self.INDEXING_PIPELINE_BATCH_SIZE = int(get_env('INDEXING_PIPELINE_BATCH_SIZE'))
+        self.INDEXING_PIPELINE_QUEUE_SIZE = int(get_env('INDEXING_PIPELINE_QUEUE_SIZE'))
+        self.INDEXING_PIPELINE_TOKENIZE_CONCURRENCY = int(get_env('INDEXING_PIPELINE_TOKENIZE_CONCURRENCY'))
+        self.INDEXING_PIPELINE_EMBEDDING_CONCURRENCY = int(get_env('INDEXING_PIPELINE_EMBEDDING_CONCURRENCY'))
+        self.INDEXING_PIPELINE_VECTOR_CONCURRENCY = int(get_env('INDEXING_PIPELINE_VECTOR_CONCURRENCY'))
+        self.INDEXING_PIPELINE_KEYWORD_CONCURRENCY = int(get_env('INDEXING_PIPELINE_KEYWORD_CONCURRENCY'))
+
+        # split documents by the token offsets of one tokenizer pass per document,
+        # for embedding models with a local tokenizer, off by default until proven on production documents
+        self.TEXT_SPLITTER_TOKEN_OFFSETS = get_bool_env('TEXT_SPLITTER_TOKEN_OFFSETS')
+
         # File upload Configurations.
         self.UPLOAD_FILE_SIZE_LIMIT = int(get_env('UPLOAD_FILE_SIZE_LIMIT'))
         self.UPLOAD_FILE_BATCH_LIMIT = int(get_env('UPLOAD_FILE_BATCH_LIMIT'))
         self.UPLOAD_IMAGE_FILE_SIZE_LIMIT = int(get_env('UPLOAD_IMAGE_FILE_SIZE_LIMIT'))
 
+        # Transport of the generate task events to the response stream: memory, redis_stream.
+        # redis_stream lets the application runner publish the events from another process,
+        # and the clients of stream responses resume by the id of the last event they got
+        self.APPLICATION_QUEUE_TRANSPORT = get_env('APPLICATION_QUEUE_TRANSPORT')
+        # run the application runners in the celery `generation` queue, the API workers only relay their events
+        self.APPLICATION_GENERATE_IN_WORKER = get_bool_env('APPLICATION_GENERATE_IN_WORKER')
+
         # Moderation in app Configurations.
         self.OUTPUT_MODERATION_BUFFER_SIZE = int(get_env('OUTPUT_MODERATION_BUFFER_SIZE'))
 
+        # Streaming of preset texts, e.g. annotation replies and moderation preset responses.
+        # chunk unit: word, sentence, text. pacing: none, interval (seconds per chunk), rate (characters per second)
+        self.DIRECT_OUTPUT_CHUNK_UNIT = get_env('DIRECT_OUTPUT_CHUNK_UNIT')
+        self.DIRECT_OUTPUT_PACING = get_env('DIRECT_OUTPUT_PACING')
+        self.DIRECT_OUTPUT_INTERVAL = float(get_env('DIRECT_OUTPUT_INTERVAL'))
+        self.DIRECT_OUTPUT_CHARS_PER_SECOND = float(get_env('DIRECT_OUTPUT_CHARS_PER_SECOND'))
+
         # Notion integration setting
         self.NOTION_CLIENT_ID = get_env('NOTION_CLIENT_ID')
         self.NOTION_CLIENT_SECRET = get_env('NOTION_CLIENT_SECRET')
@@ -280,11 +358,73 @@ class Config:
         self.HOSTED_MODERATION_ENABLED = get_bool_env('HOSTED_MODERATION_ENABLED')
         self.HOSTED_MODERATION_PROVIDERS = get_env('HOSTED_MODERATION_PROVIDERS')
 
+        # per process cache of the provider configurations of workspaces, invalidated through a redis version stamp
+        self.PROVIDER_CONFIGURATIONS_CACHE_ENABLED = get_bool_env('PROVIDER_CONFIGURATIONS_CACHE_ENABLED')
+        self.PROVIDER_CONFIGURATIONS_CACHE_MAX_TENANTS = int(get_env('PROVIDER_CONFIGURATIONS_CACHE_MAX_TENANTS'))
+        self.PROVIDER_CONFIGURATIONS_CACHE_TTL = float(get_env('PROVIDER_CONFIGURATIONS_CACHE_TTL'))
+
+        # per process cache of decrypted provider credentials, keyed by the credentials record and its updated_at
+        self.PROVIDER_CREDENTIALS_LOCAL_CACHE_MAX_SIZE = int(get_env('PROVIDER_CREDENTIALS_LOCAL_CACHE_MAX_SIZE'))
+        self.PROVIDER_CREDENTIALS_LOCAL_CACHE_TTL = float(get_env('PROVIDER_CREDENTIALS_LOCAL_CACHE_TTL'))
+
+        # per process cache of the imported private keys of workspaces,
+        # seconds after which a key pair reset in another process is noticed
+        self.DECRYPT_DECODING_CACHE_MAX_TENANTS = int(get_env('DECRYPT_DECODING_CACHE_MAX_TENANTS'))
+        self.DECRYPT_DECODING_CACHE_TTL = float(get_env('DECRYPT_DECODING_CACHE_TTL'))
+
         self.ETL_TYPE = get_env('ETL_TYPE')
         self.UNSTRUCTURED_API_URL = get_env('UNSTRUCTURED_API_URL')
         self.BILLING_ENABLED = get_bool_env('BILLING_ENABLED')
         self.CAN_REPLACE_LOGO = get_bool_env('CAN_REPLACE_LOGO')
 
+        # seconds the billing features of a tenant are cached for the service api
+        self.FEATURES_CACHE_TTL = int(get_env('FEATURES_CACHE_TTL'))
+
+        # seconds a service api token is cached, deleted tokens are dropped from the cache at once
+        self.API_TOKEN_CACHE_TTL = int(get_env('API_TOKEN_CACHE_TTL'))
+
+        # ------------------------
+        # Usage Ledger Configurations.
+        # ------------------------
+        # record the quota usage of hosted providers in redis, written to the database in batches
+        self.USAGE_LEDGER_ENABLED = get_bool_env('USAGE_LEDGER_ENABLED')
+        # seconds between two writes of the recorded usage to the database
+        self.USAGE_LEDGER_FLUSH_INTERVAL = int(get_env('USAGE_LEDGER_FLUSH_INTERVAL'))
+        # reserve the estimated usage of a generation before it starts, so that concurrent generations
+        # can not exceed a quota by more than USAGE_LEDGER_STRICT_SLACK
+        self.USAGE_LEDGER_STRICT_MODE = get_bool_env('USAGE_LEDGER_STRICT_MODE')
+        self.USAGE_LEDGER_STRICT_SLACK = int(get_env('USAGE_LEDGER_STRICT_SLACK'))
+        # seconds a reservation is held when its message is never created
+        self.USAGE_LEDGER_RESERVATION_TTL = int(get_env('USAGE_LEDGER_RESERVATION_TTL'))
+        # tokens reserved for models without max_tokens in their parameters
+        self.USAGE_LEDGER_TOKENS_RESERVATION = int(get_env('USAGE_LEDGER_TOKENS_RESERVATION'))
+
+        # generate conversation names and suggested questions in celery workers, off the response path
+        self.BACKGROUND_GENERATION_ENABLED = get_bool_env('BACKGROUND_GENERATION_ENABLED')
+        # seconds a request waits for a pending background generation before generating the result itself
+        self.BACKGROUND_GENERATION_WAIT_TIMEOUT = float(get_env('BACKGROUND_GENERATION_WAIT_TIMEOUT'))
+
+        # cache the documents retrieved from a dataset for a query until the index of the dataset changes
+        self.DATASET_RETRIEVAL_CACHE_ENABLED = get_bool_env('DATASET_RETRIEVAL_CACHE_ENABLED')
+        # seconds a cached retrieval is kept
+        self.DATASET_RETRIEVAL_CACHE_TTL = int(get_env('DATASET_RETRIEVAL_CACHE_TTL'))
+
+        # threads of the process shared by the searches of all retrievals over several datasets or search methods
+        self.RETRIEVAL_EXECUTOR_MAX_WORKERS = int(get_env('RETRIEVAL_EXECUTOR_MAX_WORKERS'))
+        # searches a retrieval runs at a time
+        self.RETRIEVAL_EXECUTOR_MAX_CONCURRENCY = int(get_env('RETRIEVAL_EXECUTOR_MAX_CONCURRENCY'))
+        # seconds a retrieval waits for a search, the documents of the searches finished by then are used
+        self.RETRIEVAL_EXECUTOR_TIMEOUT = float(get_env('RETRIEVAL_EXECUTOR_TIMEOUT'))
+        # searches of a dataset and backend still running after their deadline, the next ones fail until they finish
+        self.RETRIEVAL_EXECUTOR_MAX_ABANDONED = int(get_env('RETRIEVAL_EXECUTOR_MAX_ABANDONED'))
+
+        # choose the dataset of the single retrieve strategy by embeddings, the LLM router only decides
+        # when the best dataset scores under DATASET_EMBEDDING_ROUTER_MIN_SCORE
+        # or leads the second one by less than DATASET_EMBEDDING_ROUTER_MIN_MARGIN
+        self.DATASET_EMBEDDING_ROUTER_ENABLED = get_bool_env('DATASET_EMBEDDING_ROUTER_ENABLED')
+        self.DATASET_EMBEDDING_ROUTER_MIN_SCORE = float(get_env('DATASET_EMBEDDING_ROUTER_MIN_SCORE'))
+        self.DATASET_EMBEDDING_ROUTER_MIN_MARGIN = float(get_env('DATASET_EMBEDDING_ROUTER_MIN_MARGIN'))
+
 
 class CloudEditionConfig(Config):
 
@@ -8,6 +8,7 @@ from libs.helper import TimestampField
 from libs.login import login_required
 from models.dataset import Dataset
 from models.model import ApiToken, App
+from services.api_token_service import ApiTokenService
 
 from . import api
 from .setup import setup_required
@@ -114,6 +115,8 @@ class BaseApiKeyResource(Resource):
         db.session.query(ApiToken).filter(ApiToken.id == api_key_id).delete()
         db.session.commit()
 
+        ApiTokenService.delete_token_cache(key.type, key.token)
+
         return {'result': 'success'}, 204
 
 
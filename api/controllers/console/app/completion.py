@@ -4,7 +4,7 @@ from collections.abc import Generator
 from typing import Union
 
 import flask_login
-from flask import Response, stream_with_context
+from flask import Response, request, stream_with_context
 from flask_restful import Resource, reqparse
 from werkzeug.exceptions import InternalServerError, NotFound
 
@@ -27,6 +27,7 @@ from core.errors.error import ModelCurrentlyNotSupportError, ProviderTokenNotIni
 from core.model_runtime.errors.invoke import InvokeError
 from libs.helper import uuid_value
 from libs.login import login_required
+from models.account import Account
 from services.completion_service import CompletionService
 
 
@@ -106,6 +107,21 @@ class CompletionMessageStopApi(Resource):
         return {'result': 'success'}, 200
 
 
+class CompletionMessageResumeApi(Resource):
+    @setup_required
+    @login_required
+    @account_initialization_required
+    def get(self, app_id, task_id):
+        app_id = str(app_id)
+
+        # get app info
+        _get_app(app_id, 'completion')
+
+        account = flask_login.current_user
+
+        return resume_response(task_id, account, InvokeFrom.DEBUGGER)
+
+
 class ChatMessageApi(Resource):
     @setup_required
     @login_required
@@ -175,6 +191,27 @@ def compact_response(response: Union[dict, Generator]) -> Response:
                         mimetype='text/event-stream')
 
 
+def resume_response(task_id: str, user: Account, invoke_from: InvokeFrom) -> Response:
+    parser = reqparse.RequestParser()
+    parser.add_argument('last_event_id', type=str, required=False, location='args')
+    args = parser.parse_args()
+
+    # EventSource sends the id of the last event it got when reconnecting
+    last_event_id = request.headers.get('Last-Event-ID') or args['last_event_id']
+
+    try:
+        response = CompletionService.resume(
+            task_id=task_id,
+            user=user,
+            invoke_from=invoke_from,
+            last_event_id=last_event_id
+        )
+    except services.errors.completion.CompletionNotResumableError:
+        raise NotFound("Task Not Exists.")
+
+    return compact_response(response)
+
+
 class ChatMessageStopApi(Resource):
     @setup_required
     @login_required
@@ -192,7 +229,24 @@ class ChatMessageStopApi(Resource):
         return {'result': 'success'}, 200
 
 
+class ChatMessageResumeApi(Resource):
+    @setup_required
+    @login_required
+    @account_initialization_required
+    def get(self, app_id, task_id):
+        app_id = str(app_id)
+
+        # get app info
+        _get_app(app_id, 'chat')
+
+        account = flask_login.current_user
+
+        return resume_response(task_id, account, InvokeFrom.DEBUGGER)
+
+
 api.add_resource(CompletionMessageApi, '/apps/<uuid:app_id>/completion-messages')
 api.add_resource(CompletionMessageStopApi, '/apps/<uuid:app_id>/completion-messages/<string:task_id>/stop')
+api.add_resource(CompletionMessageResumeApi, '/apps/<uuid:app_id>/completion-messages/<string:task_id>/resume')
 api.add_resource(ChatMessageApi, '/apps/<uuid:app_id>/chat-messages')
 api.add_resource(ChatMessageStopApi, '/apps/<uuid:app_id>/chat-messages/<string:task_id>/stop')
+api.add_resource(ChatMessageResumeApi, '/apps/<uuid:app_id>/chat-messages/<string:task_id>/resume')
@@ -22,6 +22,7 @@ from fields.document_fields import document_status_fields
 from libs.login import login_required
 from models.dataset import Dataset, Document, DocumentSegment
 from models.model import ApiToken, UploadFile
+from services.api_token_service import ApiTokenService
 from services.dataset_service import DatasetService, DocumentService
 
 
@@ -439,6 +440,8 @@ class DatasetApiDeleteApi(Resource):
         db.session.query(ApiToken).filter(ApiToken.id == api_key_id).delete()
         db.session.commit()
 
+        ApiTokenService.delete_token_cache(key.type, key.token)
+
         return {'result': 'success'}, 204
 
 
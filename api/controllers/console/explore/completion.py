@@ -4,7 +4,7 @@ from collections.abc import Generator
 from datetime import datetime
 from typing import Union
 
-from flask import Response, stream_with_context
+from flask import Response, request, stream_with_context
 from flask_login import current_user
 from flask_restful import reqparse
 from werkzeug.exceptions import InternalServerError, NotFound
@@ -27,6 +27,7 @@ from core.errors.error import ModelCurrentlyNotSupportError, ProviderTokenNotIni
 from core.model_runtime.errors.invoke import InvokeError
 from extensions.ext_database import db
 from libs.helper import uuid_value
+from models.account import Account
 from services.completion_service import CompletionService
 
 
@@ -95,6 +96,15 @@ class CompletionStopApi(InstalledAppResource):
         return {'result': 'success'}, 200
 
 
+class CompletionResumeApi(InstalledAppResource):
+    def get(self, installed_app, task_id):
+        app_model = installed_app.app
+        if app_model.mode != 'completion':
+            raise NotCompletionAppError()
+
+        return resume_response(task_id, current_user, InvokeFrom.EXPLORE)
+
+
 class ChatApi(InstalledAppResource):
     def post(self, installed_app):
         app_model = installed_app.app
@@ -159,6 +169,15 @@ class ChatStopApi(InstalledAppResource):
         return {'result': 'success'}, 200
 
 
+class ChatResumeApi(InstalledAppResource):
+    def get(self, installed_app, task_id):
+        app_model = installed_app.app
+        if app_model.mode != 'chat':
+            raise NotChatAppError()
+
+        return resume_response(task_id, current_user, InvokeFrom.EXPLORE)
+
+
 def compact_response(response: Union[dict, Generator]) -> Response:
     if isinstance(response, dict):
         return Response(response=json.dumps(response), status=200, mimetype='application/json')
@@ -170,7 +189,30 @@ def compact_response(response: Union[dict, Generator]) -> Response:
                         mimetype='text/event-stream')
 
 
+def resume_response(task_id: str, user: Account, invoke_from: InvokeFrom) -> Response:
+    parser = reqparse.RequestParser()
+    parser.add_argument('last_event_id', type=str, required=False, location='args')
+    args = parser.parse_args()
+
+    # EventSource sends the id of the last event it got when reconnecting
+    last_event_id = request.headers.get('Last-Event-ID') or args['last_event_id']
+
+    try:
+        response = CompletionService.resume(
+            task_id=task_id,
+            user=user,
+            invoke_from=invoke_from,
+            last_event_id=last_event_id
+        )
+    except services.errors.completion.CompletionNotResumableError:
+        raise NotFound("Task Not Exists.")
+
+    return compact_response(response)
+
+
 api.add_resource(CompletionApi, '/installed-apps/<uuid:installed_app_id>/completion-messages', endpoint='installed_app_completion')
 api.add_resource(CompletionStopApi, '/installed-apps/<uuid:installed_app_id>/completion-messages/<string:task_id>/stop', endpoint='installed_app_stop_completion')
+api.add_resource(CompletionResumeApi, '/installed-apps/<uuid:installed_app_id>/completion-messages/<string:task_id>/resume', endpoint='installed_app_resume_completion')
 api.add_resource(ChatApi, '/installed-apps/<uuid:installed_app_id>/chat-messages', endpoint='installed_app_chat_completion')
 api.add_resource(ChatStopApi, '/installed-apps/<uuid:installed_app_id>/chat-messages/<string:task_id>/stop', endpoint='installed_app_stop_chat_completion')
+api.add_resource(ChatResumeApi, '/installed-apps/<uuid:installed_app_id>/chat-messages/<string:task_id>/resume', endpoint='installed_app_resume_chat_completion')
@@ -1,4 +1,3 @@
-from datetime import datetime
 from functools import wraps
 
 from flask import current_app, request
@@ -9,7 +8,8 @@ from werkzeug.exceptions import NotFound, Unauthorized
 from extensions.ext_database import db
 from libs.login import _get_user
 from models.account import Account, Tenant, TenantAccountJoin
-from models.model import ApiToken, App
+from models.model import App
+from services.api_token_service import ApiTokenService
 from services.feature_service import FeatureService
 
 
@@ -46,7 +46,7 @@ def cloud_edition_billing_resource_check(resource: str,
     def interceptor(view):
         def decorated(*args, **kwargs):
             api_token = validate_and_get_api_token(api_token_type)
-            features = FeatureService.get_features(api_token.tenant_id)
+            features = FeatureService.get_features(api_token.tenant_id, cached=True)
 
             if features.billing.enabled:
                 members = features.members
@@ -114,16 +114,13 @@ def validate_and_get_api_token(scope=None):
     if auth_scheme != 'bearer':
         raise Unauthorized("Authorization scheme must be 'Bearer'")
 
-    api_token = db.session.query(ApiToken).filter(
-        ApiToken.token == auth_token,
-        ApiToken.type == scope,
-    ).first()
+    api_token = ApiTokenService.get_api_token(scope, auth_token)
 
     if not api_token:
         raise Unauthorized("Access token is invalid")
 
-    api_token.last_used_at = datetime.utcnow()
-    db.session.commit()
+    # last_used_at is written to the database in batches by a schedule
+    ApiTokenService.record_last_used_at(api_token.id)
 
     return api_token
 
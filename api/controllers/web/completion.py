@@ -3,7 +3,7 @@ import logging
 from collections.abc import Generator
 from typing import Union
 
-from flask import Response, stream_with_context
+from flask import Response, request, stream_with_context
 from flask_restful import reqparse
 from werkzeug.exceptions import InternalServerError, NotFound
 
@@ -25,6 +25,7 @@ from core.entities.application_entities import InvokeFrom
 from core.errors.error import ModelCurrentlyNotSupportError, ProviderTokenNotInitError, QuotaExceededError
 from core.model_runtime.errors.invoke import InvokeError
 from libs.helper import uuid_value
+from models.model import EndUser
 from services.completion_service import CompletionService
 
 
@@ -89,6 +90,14 @@ class CompletionStopApi(WebApiResource):
         return {'result': 'success'}, 200
 
 
+class CompletionResumeApi(WebApiResource):
+    def get(self, app_model, end_user, task_id):
+        if app_model.mode != 'completion':
+            raise NotCompletionAppError()
+
+        return resume_response(task_id, end_user, InvokeFrom.WEB_APP)
+
+
 class ChatApi(WebApiResource):
     def post(self, app_model, end_user):
         if app_model.mode != 'chat':
@@ -149,6 +158,14 @@ class ChatStopApi(WebApiResource):
         return {'result': 'success'}, 200
 
 
+class ChatResumeApi(WebApiResource):
+    def get(self, app_model, end_user, task_id):
+        if app_model.mode != 'chat':
+            raise NotChatAppError()
+
+        return resume_response(task_id, end_user, InvokeFrom.WEB_APP)
+
+
 def compact_response(response: Union[dict, Generator]) -> Response:
     if isinstance(response, dict):
         return Response(response=json.dumps(response), status=200, mimetype='application/json')
@@ -160,7 +177,30 @@ def compact_response(response: Union[dict, Generator]) -> Response:
                         mimetype='text/event-stream')
 
 
+def resume_response(task_id: str, user: EndUser, invoke_from: InvokeFrom) -> Response:
+    parser = reqparse.RequestParser()
+    parser.add_argument('last_event_id', type=str, required=False, location='args')
+    args = parser.parse_args()
+
+    # EventSource sends the id of the last event it got when reconnecting
+    last_event_id = request.headers.get('Last-Event-ID') or args['last_event_id']
+
+    try:
+        response = CompletionService.resume(
+            task_id=task_id,
+            user=user,
+            invoke_from=invoke_from,
+            last_event_id=last_event_id
+        )
+    except services.errors.completion.CompletionNotResumableError:
+        raise NotFound("Task Not Exists.")
+
+    return compact_response(response)
+
+
 api.add_resource(CompletionApi, '/completion-messages')
 api.add_resource(CompletionStopApi, '/completion-messages/<string:task_id>/stop')
+api.add_resource(CompletionResumeApi, '/completion-messages/<string:task_id>/resume')
 api.add_resource(ChatApi, '/chat-messages')
 api.add_resource(ChatStopApi, '/chat-messages/<string:task_id>/stop')
+api.add_resource(ChatResumeApi, '/chat-messages/<string:task_id>/resume')
@@ -22,6 +22,9 @@ from core.model_runtime.errors.invoke import InvokeError
 from core.tools.tool.dataset_retriever.dataset_multi_retriever_tool import DatasetMultiRetrieverTool
 from core.tools.tool.dataset_retriever.dataset_retriever_tool import DatasetRetrieverTool
 
+# output of the agent when the query is flagged by the hosted moderation
+MODERATION_OUTPUT = "I apologize for any confusion, but I'm an AI assistant to be helpful, harmless, and honest."
+
 
 class PlanningStrategy(str, enum.Enum):
     ROUTER = 'router'
@@ -120,7 +123,7 @@ class AgentExecutor:
 
         if moderation_result:
             return AgentExecuteResult(
-                output="I apologize for any confusion, but I'm an AI assistant to be helpful, harmless, and honest.",
+                output=MODERATION_OUTPUT,
                 strategy=self.configuration.strategy,
                 configuration=self.configuration
             )
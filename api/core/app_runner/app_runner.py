@@ -1,7 +1,7 @@
-import time
 from collections.abc import Generator
 from typing import Optional, Union, cast
 
+from core.app_runner.direct_output import DirectOutputPolicy, publish_direct_output
 from core.application_queue_manager import ApplicationQueueManager, PublishFrom
 from core.entities.application_entities import (
     ApplicationGenerateEntity,
@@ -17,7 +17,7 @@ from core.features.hosting_moderation import HostingModerationFeature
 from core.features.moderation import ModerationFeature
 from core.file.file_obj import FileObj
 from core.memory.token_buffer_memory import TokenBufferMemory
-from core.model_runtime.entities.llm_entities import LLMResult, LLMResultChunk, LLMResultChunkDelta, LLMUsage
+from core.model_runtime.entities.llm_entities import LLMResult, LLMUsage
 from core.model_runtime.entities.message_entities import AssistantPromptMessage, PromptMessage
 from core.model_runtime.entities.model_entities import ModelPropertyKey
 from core.model_runtime.errors.invoke import InvokeBadRequestError
@@ -186,18 +186,14 @@ class AppRunner:
         :return:
         """
         if stream:
-            index = 0
-            for token in text:
-                queue_manager.publish_chunk_message(LLMResultChunk(
-                    model=app_orchestration_config.model_config.model,
-                    prompt_messages=prompt_messages,
-                    delta=LLMResultChunkDelta(
-                        index=index,
-                        message=AssistantPromptMessage(content=token)
-                    )
-                ), PublishFrom.APPLICATION_MANAGER)
-                index += 1
-                time.sleep(0.01)
+            publish_direct_output(
+                queue_manager=queue_manager,
+                model=app_orchestration_config.model_config.model,
+                prompt_messages=prompt_messages,
+                text=text,
+                pub_from=PublishFrom.APPLICATION_MANAGER,
+                policy=DirectOutputPolicy.from_config()
+            )
 
         queue_manager.publish_message_end(
             llm_result=LLMResult(
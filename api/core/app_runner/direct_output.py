@@ -0,0 +1,141 @@
+import re
+import time
+from enum import Enum
+
+from flask import current_app, has_app_context
+from pydantic import BaseModel
+
+from core.application_queue_manager import ApplicationQueueManager, PublishFrom
+from core.model_runtime.entities.llm_entities import LLMResultChunk, LLMResultChunkDelta
+from core.model_runtime.entities.message_entities import AssistantPromptMessage, PromptMessage
+
+# CJK and full width characters are words on their own, their text has no spaces to split at
+_CJK = r'\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef'
+_WORD_PATTERN = re.compile(rf'[{_CJK}]\s*|[^\s{_CJK}]+\s*|\s+')
+_SENTENCE_PATTERN = re.compile(r'.*?(?:[.!?;。！？；]+\s*|\n+|$)', re.DOTALL)
+
+
+class DirectOutputChunkUnit(Enum):
+    """
+    Size of the chunks of a direct output.
+    """
+    WORD = 'word'
+    SENTENCE = 'sentence'
+    # the whole text in one chunk
+    TEXT = 'text'
+
+    @classmethod
+    def value_of(cls, value: str) -> 'DirectOutputChunkUnit':
+        for unit in cls:
+            if unit.value == value:
+                return unit
+        raise ValueError(f'invalid direct output chunk unit value {value}')
+
+
+class DirectOutputPacing(Enum):
+    """
+    Pacing of the chunks of a direct output.
+    """
+    # publish every chunk at once
+    NONE = 'none'
+    # wait a fixed interval after every chunk
+    INTERVAL = 'interval'
+    # publish at a fixed rate of characters per second, whatever the size of the chunks
+    RATE = 'rate'
+
+    @classmethod
+    def value_of(cls, value: str) -> 'DirectOutputPacing':
+        for pacing in cls:
+            if pacing.value == value:
+                return pacing
+        raise ValueError(f'invalid direct output pacing value {value}')
+
+
+class DirectOutputPolicy(BaseModel):
+    """
+    How a preset text, e.g. an annotation reply or a moderation preset response, is streamed.
+    """
+    chunk_unit: DirectOutputChunkUnit = DirectOutputChunkUnit.WORD
+    pacing: DirectOutputPacing = DirectOutputPacing.RATE
+    interval: float = 0.05
+    chars_per_second: float = 1000
+
+    @classmethod
+    def from_config(cls) -> 'DirectOutputPolicy':
+        """
+        Policy of the DIRECT_OUTPUT_* configurations.
+        """
+        if not has_app_context():
+            return cls()
+
+        config = current_app.config
+        default = cls()
+        return cls(
+            chunk_unit=DirectOutputChunkUnit.value_of(
+                config.get('DIRECT_OUTPUT_CHUNK_UNIT', default.chunk_unit.value)
+            ),
+            pacing=DirectOutputPacing.value_of(config.get('DIRECT_OUTPUT_PACING', default.pacing.value)),
+            interval=float(config.get('DIRECT_OUTPUT_INTERVAL', default.interval)),
+            chars_per_second=float(config.get('DIRECT_OUTPUT_CHARS_PER_SECOND', default.chars_per_second))
+        )
+
+
+def split_direct_output(text: str, chunk_unit: DirectOutputChunkUnit) -> list[str]:
+    """
+    Split a text into chunks, which join back into the text.
+
+    :param text: text
+    :param chunk_unit: size of the chunks
+    :return: chunks
+    """
+    if not text:
+        return []
+
+    if chunk_unit == DirectOutputChunkUnit.WORD:
+        return _WORD_PATTERN.findall(text)
+    elif chunk_unit == DirectOutputChunkUnit.SENTENCE:
+        return [sentence for sentence in _SENTENCE_PATTERN.findall(text) if sentence]
+    else:
+        return [text]
+
+
+def publish_direct_output(queue_manager: ApplicationQueueManager,
+                          model: str,
+                          prompt_messages: list[PromptMessage],
+                          text: str,
+                          pub_from: PublishFrom,
+                          policy: DirectOutputPolicy) -> None:
+    """
+    Publish a preset text as the chunks of a stream.
+    Only the first chunk carries the prompt messages, the following ones are delta messages.
+
+    :param queue_manager: application queue manager
+    :param model: model name
+    :param prompt_messages: prompt messages
+    :param text: text
+    :param pub_from: publish from
+    :param policy: direct output policy
+    """
+    start_at = time.perf_counter()
+    published_chars = 0
+    for index, chunk in enumerate(split_direct_output(text, policy.chunk_unit)):
+        if index == 0:
+            queue_manager.publish_chunk_message(LLMResultChunk(
+                model=model,
+                prompt_messages=prompt_messages,
+                delta=LLMResultChunkDelta(
+                    index=index,
+                    message=AssistantPromptMessage(content=chunk)
+                )
+            ), pub_from)
+        else:
+            queue_manager.publish_delta_message(chunk, pub_from)
+
+        if policy.pacing == DirectOutputPacing.INTERVAL and policy.interval > 0:
+            time.sleep(policy.interval)
+        elif policy.pacing == DirectOutputPacing.RATE and policy.chars_per_second > 0:
+            # sleep until the time of the published characters, so that the rate does not drift
+            published_chars += len(chunk)
+            delay = start_at + published_chars / policy.chars_per_second - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
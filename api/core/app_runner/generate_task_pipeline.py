@@ -2,10 +2,17 @@ import json
 import logging
 import time
 from collections.abc import Generator
+from json.encoder import encode_basestring_ascii
 from typing import Optional, Union, cast
 
 from pydantic import BaseModel
 
+from core.app_runner.direct_output import (
+    DirectOutputChunkUnit,
+    DirectOutputPacing,
+    DirectOutputPolicy,
+    publish_direct_output,
+)
 from core.app_runner.moderation_handler import ModerationRule, OutputModerationHandler
 from core.application_queue_manager import ApplicationQueueManager, PublishFrom
 from core.entities.application_entities import ApplicationGenerateEntity, InvokeFrom
@@ -14,6 +21,7 @@ from core.entities.queue_entities import (
     QueueAgentMessageEvent,
     QueueAgentThoughtEvent,
     QueueErrorEvent,
+    QueueMessageDeltaEvent,
     QueueMessageEndEvent,
     QueueMessageEvent,
     QueueMessageFileEvent,
@@ -23,7 +31,7 @@ from core.entities.queue_entities import (
     QueueStopEvent,
 )
 from core.errors.error import ModelCurrentlyNotSupportError, ProviderTokenNotInitError, QuotaExceededError
-from core.model_runtime.entities.llm_entities import LLMResult, LLMResultChunk, LLMResultChunkDelta, LLMUsage
+from core.model_runtime.entities.llm_entities import LLMResult, LLMUsage
 from core.model_runtime.entities.message_entities import (
     AssistantPromptMessage,
     ImagePromptMessageContent,
@@ -53,6 +61,24 @@ class TaskState(BaseModel):
     metadata: dict = {}
 
 
+class ChunkResponseSerializer:
+    """
+    Serialize the stream responses of chunks, which only differ in their answer.
+    The fields around the answer are encoded once, the output is the same as json.dumps of the response.
+    """
+    _ANSWER_PLACEHOLDER = '\x00answer\x00'
+
+    def __init__(self, response: dict) -> None:
+        """
+        :param response: chunk response, its answer is replaced by the text of each chunk
+        """
+        encoded = "data: " + json.dumps({**response, 'answer': self._ANSWER_PLACEHOLDER}) + "\n\n"
+        self._prefix, self._suffix = encoded.split(json.dumps(self._ANSWER_PLACEHOLDER), 1)
+
+    def serialize(self, text: str) -> str:
+        return self._prefix + encode_basestring_ascii(text) + self._suffix
+
+
 class GenerateTaskPipeline:
     """
     GenerateTaskPipeline is a class that generate stream output and state management for Application.
@@ -83,6 +109,7 @@ class GenerateTaskPipeline:
         )
         self._start_at = time.perf_counter()
         self._output_moderation_handler = self._init_output_moderation()
+        self._chunk_response_serializers: dict[bool, ChunkResponseSerializer] = {}
 
     def process(self, stream: bool) -> Union[dict, Generator]:
         """
@@ -354,27 +381,36 @@ class GenerateTaskPipeline:
 
                     yield self._yield_response(response)
 
-            elif isinstance(event, QueueMessageEvent | QueueAgentMessageEvent):
-                chunk = event.chunk
-                delta_text = chunk.delta.message.content
-                if delta_text is None:
-                    continue
+            elif isinstance(event, QueueMessageEvent | QueueAgentMessageEvent | QueueMessageDeltaEvent):
+                if isinstance(event, QueueMessageDeltaEvent):
+                    delta_text = event.text
+                    agent = event.agent
+                else:
+                    chunk = event.chunk
+                    delta_text = chunk.delta.message.content
+                    agent = isinstance(event, QueueAgentMessageEvent)
+                    if delta_text is None:
+                        continue
 
-                if not self._task_state.llm_result.prompt_messages:
-                    self._task_state.llm_result.prompt_messages = chunk.prompt_messages
+                    if not self._task_state.llm_result.prompt_messages:
+                        self._task_state.llm_result.prompt_messages = chunk.prompt_messages
 
                 if self._output_moderation_handler:
                     if self._output_moderation_handler.should_direct_output():
                         # stop subscribe new token when output moderation should direct output
                         self._task_state.llm_result.message.content = self._output_moderation_handler.get_final_output()
-                        self._queue_manager.publish_chunk_message(LLMResultChunk(
+                        # in one chunk without pacing, the pipeline reads the chunk back from its own queue
+                        publish_direct_output(
+                            queue_manager=self._queue_manager,
                             model=self._task_state.llm_result.model,
                             prompt_messages=self._task_state.llm_result.prompt_messages,
-                            delta=LLMResultChunkDelta(
-                                index=0,
-                                message=AssistantPromptMessage(content=self._task_state.llm_result.message.content)
+                            text=self._task_state.llm_result.message.content,
+                            pub_from=PublishFrom.TASK_PIPELINE,
+                            policy=DirectOutputPolicy(
+                                chunk_unit=DirectOutputChunkUnit.TEXT,
+                                pacing=DirectOutputPacing.NONE
                             )
-                        ), PublishFrom.TASK_PIPELINE)
+                        )
                         self._queue_manager.publish(
                             QueueStopEvent(stopped_by=QueueStopEvent.StopBy.OUTPUT_MODERATION),
                             PublishFrom.TASK_PIPELINE
@@ -384,8 +420,7 @@ class GenerateTaskPipeline:
                         self._output_moderation_handler.append_new_token(delta_text)
 
                 self._task_state.llm_result.message.content += delta_text
-                response = self._handle_chunk(delta_text, agent=isinstance(event, QueueAgentMessageEvent))
-                yield self._yield_response(response)
+                yield self._yield_chunk_response(delta_text, agent=agent)
             elif isinstance(event, QueueMessageReplaceEvent):
                 response = {
                     'event': 'message_replace',
@@ -554,6 +589,20 @@ class GenerateTaskPipeline:
         """
         return "data: " + json.dumps(response) + "\n\n"
 
+    def _yield_chunk_response(self, text: str, agent: bool = False) -> str:
+        """
+        Yield chunk response, same as _yield_response of _handle_chunk.
+        :param text: text
+        :param agent: whether the chunk is an agent message
+        :return:
+        """
+        serializer = self._chunk_response_serializers.get(agent)
+        if not serializer:
+            serializer = ChunkResponseSerializer(self._handle_chunk('', agent=agent))
+            self._chunk_response_serializers[agent] = serializer
+
+        return serializer.serialize(text)
+
     def _prompt_messages_to_prompt_for_saving(self, prompt_messages: list[PromptMessage]) -> list[dict]:
         """
         Prompt messages to prompt for saving.
@@ -1,13 +1,12 @@
 import logging
 import threading
-import time
 from typing import Any, Optional
 
 from flask import Flask, current_app
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from core.application_queue_manager import PublishFrom
-from core.moderation.base import ModerationAction, ModerationOutputsResult
+from core.moderation.base import ModerationAction, ModerationOutputsResult, ModerationOutputsStream
 from core.moderation.factory import ModerationFactory
 
 logger = logging.getLogger(__name__)
@@ -29,6 +28,8 @@ class OutputModerationHandler(BaseModel):
 
     thread: Optional[threading.Thread] = None
     thread_running: bool = True
+    # notified when the buffer grows or the thread is stopped
+    buffer_condition: threading.Condition = Field(default_factory=threading.Condition)
     buffer: str = ''
     is_final_chunk: bool = False
     final_output: Optional[str] = None
@@ -43,7 +44,9 @@ class OutputModerationHandler(BaseModel):
         return self.final_output
 
     def append_new_token(self, token: str):
-        self.buffer += token
+        with self.buffer_condition:
+            self.buffer += token
+            self.buffer_condition.notify()
 
         if not self.thread:
             self.thread = self.start_thread()
@@ -84,27 +87,39 @@ class OutputModerationHandler(BaseModel):
 
     def stop_thread(self):
         if self.thread and self.thread.is_alive():
-            self.thread_running = False
+            with self.buffer_condition:
+                self.thread_running = False
+                self.buffer_condition.notify()
 
     def worker(self, flask_app: Flask, buffer_size: int):
         with flask_app.app_context():
+            # stream moderations only review the new chunks, so every new chunk is reviewed at once
+            outputs_stream = self.outputs_stream(tenant_id=self.tenant_id, app_id=self.app_id)
+            if outputs_stream:
+                buffer_size = 1
+
             current_length = 0
-            while self.thread_running:
-                moderation_buffer = self.buffer
-                buffer_length = len(moderation_buffer)
-                if not self.is_final_chunk:
-                    chunk_length = buffer_length - current_length
-                    if 0 <= chunk_length < buffer_size:
-                        time.sleep(1)
-                        continue
-
-                current_length = buffer_length
-
-                result = self.moderation(
-                    tenant_id=self.tenant_id,
-                    app_id=self.app_id,
-                    moderation_buffer=moderation_buffer
-                )
+            while True:
+                with self.buffer_condition:
+                    while self.thread_running \
+                            and len(self.buffer) - current_length < (1 if self.is_final_chunk else buffer_size):
+                        self.buffer_condition.wait()
+
+                    if not self.thread_running:
+                        break
+
+                    moderation_buffer = self.buffer
+
+                if outputs_stream:
+                    result = self.moderation_chunk(outputs_stream, moderation_buffer[current_length:])
+                else:
+                    result = self.moderation(
+                        tenant_id=self.tenant_id,
+                        app_id=self.app_id,
+                        moderation_buffer=moderation_buffer
+                    )
+
+                current_length = len(moderation_buffer)
 
                 if not result or not result.flagged:
                     continue
@@ -137,3 +152,27 @@ class OutputModerationHandler(BaseModel):
             logger.error("Moderation Output error: %s", e)
 
         return None
+
+    def outputs_stream(self, tenant_id: str, app_id: str) -> Optional[ModerationOutputsStream]:
+        try:
+            moderation_factory = ModerationFactory(
+                name=self.rule.type,
+                app_id=app_id,
+                tenant_id=tenant_id,
+                config=self.rule.config
+            )
+
+            return moderation_factory.outputs_stream()
+        except Exception as e:
+            logger.error("Moderation Output error: %s", e)
+
+        return None
+
+    def moderation_chunk(self, outputs_stream: ModerationOutputsStream, chunk: str) \
+            -> Optional[ModerationOutputsResult]:
+        try:
+            return outputs_stream.moderation_for_outputs(chunk)
+        except Exception as e:
+            logger.error("Moderation Output error: %s", e)
+
+        return None
@@ -12,6 +12,7 @@ from core.app_runner.assistant_app_runner import AssistantApplicationRunner
 from core.app_runner.basic_app_runner import BasicApplicationRunner
 from core.app_runner.generate_task_pipeline import GenerateTaskPipeline
 from core.application_queue_manager import ApplicationQueueManager, ConversationTaskStoppedException, PublishFrom
+from core.application_queue_transport import RedisStreamQueueTransport, TaskResponseStream, create_transport
 from core.entities.application_entities import (
     AdvancedChatPromptTemplateEntity,
     AdvancedCompletionPromptTemplateEntity,
@@ -33,6 +34,7 @@ from core.entities.application_entities import (
 from core.entities.model_entities import ModelStatus
 from core.errors.error import ModelCurrentlyNotSupportError, ProviderTokenNotInitError, QuotaExceededError
 from core.file.file_obj import FileObj
+from core.helper.usage_ledger import usage_ledger
 from core.model_runtime.entities.message_entities import PromptMessageRole
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.errors.invoke import InvokeAuthorizationError, InvokeError
@@ -111,12 +113,23 @@ class ApplicationManager:
         if not stream and application_generate_entity.app_orchestration_config_entity.agent:
             raise ValueError("Agent app is not supported in blocking mode.")
 
+        # check and reserve the quota of hosted providers
+        application_generate_entity.quota_reservation = usage_ledger.reserve(application_generate_entity)
+
         # init generate records
         (
             conversation,
             message
         ) = self._init_generate_records(application_generate_entity)
 
+        # generate in a celery worker of the generation queue, this worker only relays its events
+        generate_in_worker = current_app.config.get('APPLICATION_GENERATE_IN_WORKER', False)
+
+        if generate_in_worker:
+            transport = RedisStreamQueueTransport(application_generate_entity.task_id)
+        else:
+            transport = create_transport(application_generate_entity.task_id)
+
         # init queue manager
         queue_manager = ApplicationQueueManager(
             task_id=application_generate_entity.task_id,
@@ -124,19 +137,32 @@ class ApplicationManager:
             invoke_from=application_generate_entity.invoke_from,
             conversation_id=conversation.id,
             app_mode=conversation.mode,
-            message_id=message.id
+            message_id=message.id,
+            transport=transport
         )
 
-        # new thread
-        worker_thread = threading.Thread(target=self._generate_worker, kwargs={
-            'flask_app': current_app._get_current_object(),
-            'application_generate_entity': application_generate_entity,
-            'queue_manager': queue_manager,
-            'conversation_id': conversation.id,
-            'message_id': message.id,
-        })
+        if generate_in_worker:
+            from tasks.generate_task import generate_task
 
-        worker_thread.start()
+            # the orchestration config entity holds model instances, the worker converts it again
+            generate_task.delay(
+                application_generate_entity=json.loads(
+                    application_generate_entity.json(exclude={'app_orchestration_config_entity'})
+                ),
+                conversation_id=conversation.id,
+                message_id=message.id
+            )
+        else:
+            # new thread
+            worker_thread = threading.Thread(target=self._generate_worker, kwargs={
+                'flask_app': current_app._get_current_object(),
+                'application_generate_entity': application_generate_entity,
+                'queue_manager': queue_manager,
+                'conversation_id': conversation.id,
+                'message_id': message.id,
+            })
+
+            worker_thread.start()
 
         # return response or stream generator
         return self._handle_response(
@@ -144,7 +170,75 @@ class ApplicationManager:
             queue_manager=queue_manager,
             conversation=conversation,
             message=message,
-            stream=stream
+            stream=stream,
+            resumable=isinstance(transport, RedisStreamQueueTransport)
+        )
+
+    def resume(self, task_id: str, user_id: str, invoke_from: InvokeFrom,
+               last_event_id: Optional[str] = None) -> Optional[Generator]:
+        """
+        Resume the stream of a generate task after the last event its client got.
+
+        :param task_id: task ID
+        :param user_id: ID of the account or end user of the task
+        :param invoke_from: invoke from source
+        :param last_event_id: id of the last event the client got, from the first event when None
+        :return: stream generator, None when the task is not one of the user or its stream is not resumable
+        """
+        if not ApplicationQueueManager.is_task_of_user(task_id, invoke_from, user_id):
+            return None
+
+        response_stream = TaskResponseStream(task_id)
+        if not response_stream.exists():
+            return None
+
+        return response_stream.relay(last_event_id=last_event_id, resumed=True)
+
+    def run_generate_task(self, flask_app: Flask,
+                          application_generate_entity: dict,
+                          conversation_id: str,
+                          message_id: str) -> None:
+        """
+        Run a generate task dispatched to the generation queue,
+        publishing its events to the redis stream the API worker relays them from.
+        :param flask_app: Flask app
+        :param application_generate_entity: application generate entity, without its orchestration config entity
+        :param conversation_id: conversation ID
+        :param message_id: message ID
+        :return:
+        """
+        with flask_app.app_context():
+            queue_manager = ApplicationQueueManager(
+                task_id=application_generate_entity['task_id'],
+                user_id=application_generate_entity['user_id'],
+                invoke_from=InvokeFrom.value_of(application_generate_entity['invoke_from']),
+                conversation_id=conversation_id,
+                app_mode=self._get_conversation(conversation_id).mode,
+                message_id=message_id,
+                transport=RedisStreamQueueTransport(application_generate_entity['task_id'])
+            )
+
+            try:
+                application_generate_entity = ApplicationGenerateEntity(
+                    **application_generate_entity,
+                    app_orchestration_config_entity=self._convert_from_app_model_config_dict(
+                        tenant_id=application_generate_entity['tenant_id'],
+                        app_model_config_dict=application_generate_entity['app_model_config_dict']
+                    )
+                )
+            except Exception as e:
+                logger.exception("Error when restoring generate task")
+                queue_manager.publish_error(e, PublishFrom.APPLICATION_MANAGER)
+                return
+            finally:
+                db.session.remove()
+
+        self._generate_worker(
+            flask_app=flask_app,
+            application_generate_entity=application_generate_entity,
+            queue_manager=queue_manager,
+            conversation_id=conversation_id,
+            message_id=message_id
         )
 
     def _generate_worker(self, flask_app: Flask,
@@ -207,7 +301,8 @@ class ApplicationManager:
                          queue_manager: ApplicationQueueManager,
                          conversation: Conversation,
                          message: Message,
-                         stream: bool = False) -> Union[dict, Generator]:
+                         stream: bool = False,
+                         resumable: bool = False) -> Union[dict, Generator]:
         """
         Handle response.
         :param application_generate_entity: application generate entity
@@ -215,6 +310,7 @@ class ApplicationManager:
         :param conversation: conversation
         :param message: message
         :param stream: is stream
+        :param resumable: whether the events of the task are in a redis stream, a stream response is then resumable
         :return:
         """
         # init generate task pipeline
@@ -225,6 +321,20 @@ class ApplicationManager:
             message=message
         )
 
+        if stream and resumable:
+            # the pipeline runs to the end in a thread of its own, the client relays its responses
+            response_stream = TaskResponseStream(application_generate_entity.task_id)
+            pipeline_thread = threading.Thread(target=self._stream_response_worker, kwargs={
+                'flask_app': current_app._get_current_object(),
+                'generate_task_pipeline': generate_task_pipeline,
+                'response_stream': response_stream
+            })
+
+            pipeline_thread.start()
+            db.session.remove()
+
+            return response_stream.relay()
+
         try:
             return generate_task_pipeline.process(stream=stream)
         except ValueError as e:
@@ -236,6 +346,26 @@ class ApplicationManager:
         finally:
             db.session.remove()
 
+    def _stream_response_worker(self, flask_app: Flask,
+                                generate_task_pipeline: GenerateTaskPipeline,
+                                response_stream: TaskResponseStream) -> None:
+        """
+        Publish the stream responses of a generate task pipeline to the response stream of its task.
+        :param flask_app: Flask app
+        :param generate_task_pipeline: generate task pipeline
+        :param response_stream: response stream of the task
+        :return:
+        """
+        with flask_app.app_context():
+            try:
+                for response in generate_task_pipeline.process(stream=True):
+                    response_stream.publish(response)
+            except Exception:
+                logger.exception("Error when processing the stream response of generate task")
+            finally:
+                response_stream.end()
+                db.session.remove()
+
     def _convert_from_app_model_config_dict(self, tenant_id: str, app_model_config_dict: dict) \
             -> AppOrchestrationConfigEntity:
         """
@@ -2,10 +2,15 @@ import queue
 import time
 from collections.abc import Generator
 from enum import Enum
-from typing import Any
+from typing import Any, Optional
 
 from sqlalchemy.orm import DeclarativeMeta
 
+from core.application_queue_transport import (
+    ApplicationQueueTransport,
+    create_transport,
+    task_stop_signals,
+)
 from core.entities.application_entities import InvokeFrom
 from core.entities.queue_entities import (
     AnnotationReplyEvent,
@@ -14,6 +19,7 @@ from core.entities.queue_entities import (
     QueueAgentThoughtEvent,
     QueueErrorEvent,
     QueueMessage,
+    QueueMessageDeltaEvent,
     QueueMessageEndEvent,
     QueueMessageEvent,
     QueueMessageFileEvent,
@@ -38,7 +44,11 @@ class ApplicationQueueManager:
                  invoke_from: InvokeFrom,
                  conversation_id: str,
                  app_mode: str,
-                 message_id: str) -> None:
+                 message_id: str,
+                 transport: Optional[ApplicationQueueTransport] = None) -> None:
+        """
+        :param transport: transport of the queue messages, created from APPLICATION_QUEUE_TRANSPORT when None
+        """
         if not user_id:
             raise ValueError("user is required")
 
@@ -52,9 +62,14 @@ class ApplicationQueueManager:
         user_prefix = 'account' if self._invoke_from in [InvokeFrom.EXPLORE, InvokeFrom.DEBUGGER] else 'end-user'
         redis_client.setex(ApplicationQueueManager._generate_task_belong_cache_key(self._task_id), 1800, f"{user_prefix}-{self._user_id}")
 
-        q = queue.Queue()
-
-        self._q = q
+        self._transport = transport or create_transport(self._task_id)
+        # set by the stop signal of the task, instead of reading the stop flag from redis per event
+        self._stopped = task_stop_signals.register(
+            self._task_id,
+            ApplicationQueueManager._generate_stopped_cache_key(self._task_id)
+        )
+        # the prompt messages of a stream are only published with its first chunk
+        self._prompt_messages_published = False
 
     def listen(self) -> Generator:
         """
@@ -68,7 +83,7 @@ class ApplicationQueueManager:
 
         while True:
             try:
-                message = self._q.get(timeout=1)
+                message = self._transport.get(timeout=1)
                 if message is None:
                     break
 
@@ -95,7 +110,7 @@ class ApplicationQueueManager:
         Stop listen to queue
         :return:
         """
-        self._q.put(None)
+        self._transport.put(None)
 
     def publish_chunk_message(self, chunk: LLMResultChunk, pub_from: PublishFrom) -> None:
         """
@@ -105,9 +120,7 @@ class ApplicationQueueManager:
         :param pub_from: publish from
         :return:
         """
-        self.publish(QueueMessageEvent(
-            chunk=chunk
-        ), pub_from)
+        self._publish_chunk(chunk, pub_from, agent=False)
 
     def publish_agent_chunk_message(self, chunk: LLMResultChunk, pub_from: PublishFrom) -> None:
         """
@@ -117,9 +130,54 @@ class ApplicationQueueManager:
         :param pub_from: publish from
         :return:
         """
-        self.publish(QueueAgentMessageEvent(
-            chunk=chunk
-        ), pub_from)
+        self._publish_chunk(chunk, pub_from, agent=True)
+
+    def _publish_chunk(self, chunk: LLMResultChunk, pub_from: PublishFrom, agent: bool) -> None:
+        """
+        Publish the first chunk of a stream with its prompt messages, and only the text of the following ones.
+        The first chunk is validated and checked, the delta events only carry a str,
+        so that the cost per token does not grow with the prompt.
+
+        :param chunk: chunk
+        :param pub_from: publish from
+        :param agent: whether the chunk is an agent chunk
+        :return:
+        """
+        text = chunk.delta.message.content
+        if self._prompt_messages_published and isinstance(text, str):
+            self.publish_delta_message(text, pub_from, agent=agent)
+            return
+
+        if chunk.prompt_messages:
+            self._prompt_messages_published = True
+
+        if agent:
+            self.publish(QueueAgentMessageEvent(chunk=chunk), pub_from)
+        else:
+            self.publish(QueueMessageEvent(chunk=chunk), pub_from)
+
+    def publish_delta_message(self, text: str, pub_from: PublishFrom, agent: bool = False) -> None:
+        """
+        Publish the text of a chunk without its prompt messages,
+        once the prompt messages were published with the first chunk of the stream, if there are any
+
+        :param text: text
+        :param pub_from: publish from
+        :param agent: whether the chunk is an agent chunk
+        :return:
+        """
+        message = QueueMessage.construct(
+            task_id=self._task_id,
+            message_id=self._message_id,
+            conversation_id=self._conversation_id,
+            app_mode=self._app_mode,
+            event=QueueMessageDeltaEvent.construct(text=text, agent=agent)
+        )
+
+        self._transport.put(message)
+
+        if pub_from == PublishFrom.APPLICATION_MANAGER and self._is_stopped():
+            raise ConversationTaskStoppedException()
 
     def publish_message_replace(self, text: str, pub_from: PublishFrom) -> None:
         """
@@ -209,7 +267,7 @@ class ApplicationQueueManager:
             event=event
         )
 
-        self._q.put(message)
+        self._transport.put(message)
 
         if isinstance(event, QueueStopEvent):
             self.stop_listen()
@@ -218,33 +276,37 @@ class ApplicationQueueManager:
             raise ConversationTaskStoppedException()
 
     @classmethod
-    def set_stop_flag(cls, task_id: str, invoke_from: InvokeFrom, user_id: str) -> None:
+    def is_task_of_user(cls, task_id: str, invoke_from: InvokeFrom, user_id: str) -> bool:
         """
-        Set task stop flag
+        Check if a task belongs to the user
         :return:
         """
         result = redis_client.get(cls._generate_task_belong_cache_key(task_id))
         if result is None:
-            return
+            return False
 
         user_prefix = 'account' if invoke_from in [InvokeFrom.EXPLORE, InvokeFrom.DEBUGGER] else 'end-user'
-        if result.decode('utf-8') != f"{user_prefix}-{user_id}":
+        return result.decode('utf-8') == f"{user_prefix}-{user_id}"
+
+    @classmethod
+    def set_stop_flag(cls, task_id: str, invoke_from: InvokeFrom, user_id: str) -> None:
+        """
+        Set task stop flag
+        :return:
+        """
+        if not cls.is_task_of_user(task_id, invoke_from, user_id):
             return
 
         stopped_cache_key = cls._generate_stopped_cache_key(task_id)
         redis_client.setex(stopped_cache_key, 600, 1)
+        task_stop_signals.publish(task_id)
 
     def _is_stopped(self) -> bool:
         """
         Check if task is stopped
         :return:
         """
-        stopped_cache_key = ApplicationQueueManager._generate_stopped_cache_key(self._task_id)
-        result = redis_client.get(stopped_cache_key)
-        if result is not None:
-            return True
-
-        return False
+        return self._stopped.is_set()
 
     @classmethod
     def _generate_task_belong_cache_key(cls, task_id: str) -> str:
@@ -0,0 +1,490 @@
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Generator
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Optional
+
+from flask import current_app, has_app_context
+
+from core.entities.queue_entities import (
+    AnnotationReplyEvent,
+    AppQueueEvent,
+    QueueAgentMessageEvent,
+    QueueAgentThoughtEvent,
+    QueueErrorEvent,
+    QueueMessage,
+    QueueMessageDeltaEvent,
+    QueueMessageEndEvent,
+    QueueMessageEvent,
+    QueueMessageFileEvent,
+    QueueMessageReplaceEvent,
+    QueuePingEvent,
+    QueueRetrieverResourcesEvent,
+    QueueStopEvent,
+)
+from core.errors.error import ModelCurrentlyNotSupportError, ProviderTokenNotInitError, QuotaExceededError
+from core.model_runtime.entities.message_entities import (
+    AssistantPromptMessage,
+    ImagePromptMessageContent,
+    PromptMessage,
+    PromptMessageContentType,
+    PromptMessageRole,
+    SystemPromptMessage,
+    TextPromptMessageContent,
+    ToolPromptMessage,
+    UserPromptMessage,
+)
+from core.model_runtime.errors.invoke import (
+    InvokeAuthorizationError,
+    InvokeBadRequestError,
+    InvokeConnectionError,
+    InvokeError,
+    InvokeRateLimitError,
+    InvokeServerUnavailableError,
+)
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+# events kept per stream, and seconds a stream is kept after its last event, for resuming listeners
+STREAM_MAXLEN = 10000
+STREAM_TTL = 1800
+STREAM_ENDED_TTL = 600
+
+_END_FIELD = b'end'
+_MESSAGE_FIELD = b'message'
+_RESPONSE_FIELD = b'response'
+
+# seconds a relay waits for the next response before sending a ping
+RELAY_PING_INTERVAL = 10
+
+_EVENT_ID_PATTERN = re.compile(r'^\d+-\d+$')
+
+# events and errors decoded from a stream, by class name, nothing else is instantiated from its content
+_QUEUE_EVENT_TYPES: dict[str, type[AppQueueEvent]] = {
+    event_type.__name__: event_type for event_type in [
+        AnnotationReplyEvent,
+        QueueAgentMessageEvent,
+        QueueAgentThoughtEvent,
+        QueueErrorEvent,
+        QueueMessageDeltaEvent,
+        QueueMessageEndEvent,
+        QueueMessageEvent,
+        QueueMessageFileEvent,
+        QueueMessageReplaceEvent,
+        QueuePingEvent,
+        QueueRetrieverResourcesEvent,
+        QueueStopEvent,
+    ]
+}
+_ERROR_TYPES: dict[str, type[Exception]] = {
+    error_type.__name__: error_type for error_type in [
+        ValueError,
+        InvokeError,
+        InvokeAuthorizationError,
+        InvokeBadRequestError,
+        InvokeConnectionError,
+        InvokeRateLimitError,
+        InvokeServerUnavailableError,
+        ModelCurrentlyNotSupportError,
+        ProviderTokenNotInitError,
+        QuotaExceededError,
+    ]
+}
+_PROMPT_MESSAGE_TYPES: dict[PromptMessageRole, type[PromptMessage]] = {
+    PromptMessageRole.SYSTEM: SystemPromptMessage,
+    PromptMessageRole.USER: UserPromptMessage,
+    PromptMessageRole.ASSISTANT: AssistantPromptMessage,
+    PromptMessageRole.TOOL: ToolPromptMessage,
+}
+
+
+class ApplicationQueueTransport(ABC):
+    """
+    Transport of the queue messages of a generate task, from the application runner to the task pipeline.
+    """
+
+    @abstractmethod
+    def put(self, message: Optional[QueueMessage]) -> None:
+        """
+        Put a message, None ends the stream of the task.
+
+        :param message: queue message
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, timeout: float) -> Optional[QueueMessage]:
+        """
+        Get the next message, None once the stream of the task ended.
+
+        :param timeout: seconds to wait for a message
+        :raises queue.Empty: when no message arrived within the timeout
+        """
+        raise NotImplementedError
+
+
+class InMemoryQueueTransport(ApplicationQueueTransport):
+    """
+    Transport within one process, the application runner runs in a thread of the API worker.
+    """
+
+    def __init__(self) -> None:
+        self._q = queue.Queue()
+
+    def put(self, message: Optional[QueueMessage]) -> None:
+        self._q.put(message)
+
+    def get(self, timeout: float) -> Optional[QueueMessage]:
+        return self._q.get(timeout=timeout)
+
+
+class RedisStreamQueueTransport(ApplicationQueueTransport):
+    """
+    Transport through a redis stream per task, so that the application runner can run in another process,
+    e.g. a celery worker of the `generation` queue, while the API worker only relays the events.
+
+    Every event is an entry of the stream, the listener reads the entries after the last one it got.
+    Messages are encoded as JSON tagged with the class name of their event, errors are reduced to
+    their type and message, so that the content of the stream is never executed.
+    """
+
+    def __init__(self, task_id: str) -> None:
+        self._stream_key = self.stream_key(task_id)
+        self._last_event_id = '0-0'
+        self._buffer = deque()
+
+    @classmethod
+    def stream_key(cls, task_id: str) -> str:
+        return f"generate_task_stream:{task_id}"
+
+    def put(self, message: Optional[QueueMessage]) -> None:
+        if message is None:
+            fields = {_END_FIELD: b'1'}
+            ttl = STREAM_ENDED_TTL
+        else:
+            fields = {_MESSAGE_FIELD: self._dumps(message)}
+            ttl = STREAM_TTL
+
+        pipeline = redis_client.pipeline(transaction=False)
+        pipeline.xadd(self._stream_key, fields, maxlen=STREAM_MAXLEN, approximate=True)
+        pipeline.expire(self._stream_key, ttl)
+        pipeline.execute()
+
+    def get(self, timeout: float) -> Optional[QueueMessage]:
+        if not self._buffer:
+            result = redis_client.xread({self._stream_key: self._last_event_id},
+                                        count=100,
+                                        block=max(int(timeout * 1000), 1))
+            for _, entries in result or []:
+                self._buffer.extend(entries)
+
+            if not self._buffer:
+                raise queue.Empty()
+
+        event_id, fields = self._buffer.popleft()
+        self._last_event_id = event_id.decode('utf-8') if isinstance(event_id, bytes) else event_id
+
+        if _END_FIELD in fields:
+            return None
+
+        return self._loads(fields[_MESSAGE_FIELD])
+
+    @staticmethod
+    def _dumps(message: QueueMessage) -> bytes:
+        event = message.event
+        event_dict = event.dict()
+        if isinstance(event, QueueErrorEvent):
+            event_dict['error'] = _error_to_dict(event.error)
+
+        return json.dumps({
+            'task_id': message.task_id,
+            'message_id': message.message_id,
+            'conversation_id': message.conversation_id,
+            'app_mode': message.app_mode,
+            'event_type': type(event).__name__,
+            'event': event_dict
+        }, default=_json_default).encode('utf-8')
+
+    @staticmethod
+    def _loads(data: bytes) -> QueueMessage:
+        message = json.loads(data)
+        event_type = _QUEUE_EVENT_TYPES.get(message.pop('event_type'))
+        if not event_type:
+            raise ValueError('Unknown queue event type')
+
+        event_dict = message.pop('event')
+        if event_type is QueueErrorEvent:
+            event_dict['error'] = _error_from_dict(event_dict['error'])
+
+        # the prompt messages are restored to their subclasses, the model fields only declare the base class
+        for result_field in ['chunk', 'llm_result']:
+            if event_dict.get(result_field):
+                event_dict[result_field]['prompt_messages'] = [
+                    _prompt_message_from_dict(prompt_message)
+                    for prompt_message in event_dict[result_field]['prompt_messages']
+                ]
+
+        return QueueMessage(**message, event=event_type(**event_dict))
+
+
+class TaskResponseStream:
+    """
+    Redis stream of the responses of a generate task, as the server-sent events sent to its client.
+
+    The task pipeline publishes to it from a thread of its own, so that it runs to the end and saves
+    the message whether or not a client is connected, and the clients relay the stream with the id
+    of each entry as the id of the event.
+    A client resumes after a disconnect by relaying the stream again from the last event id it got.
+    """
+
+    def __init__(self, task_id: str) -> None:
+        self._stream_key = f"generate_task_response_stream:{task_id}"
+
+    def publish(self, response: str) -> None:
+        """
+        Publish a response.
+
+        :param response: server-sent event, without its id
+        """
+        self._add({_RESPONSE_FIELD: response.encode('utf-8')}, STREAM_TTL)
+
+    def end(self) -> None:
+        """End the stream, once the task pipeline finished."""
+        self._add({_END_FIELD: b'1'}, STREAM_ENDED_TTL)
+
+    def exists(self) -> bool:
+        return bool(redis_client.exists(self._stream_key))
+
+    def relay(self, last_event_id: Optional[str] = None, resumed: bool = False) -> Generator[str, None, None]:
+        """
+        Relay the responses after the last event id, until the stream ended.
+
+        :param last_event_id: id of the last event the client got, from the first event when None
+        :param resumed: whether the client resumes, it then also stops once the stream expired,
+            e.g. when the process of the task pipeline died
+        :return: server-sent events with their ids
+        """
+        if last_event_id is None:
+            last_event_id = '0-0'
+        elif not _EVENT_ID_PATTERN.match(last_event_id):
+            raise ValueError('Invalid last event id')
+
+        return self._relay(last_event_id, resumed)
+
+    def _relay(self, last_event_id: str, resumed: bool) -> Generator[str, None, None]:
+        while True:
+            result = redis_client.xread({self._stream_key: last_event_id},
+                                        count=100,
+                                        block=RELAY_PING_INTERVAL * 1000)
+            entries = [entry for _, stream_entries in result or [] for entry in stream_entries]
+            if not entries:
+                if resumed and not self.exists():
+                    return
+
+                yield "event: ping\n\n"
+                continue
+
+            for event_id, fields in entries:
+                last_event_id = event_id.decode('utf-8') if isinstance(event_id, bytes) else event_id
+                if _END_FIELD in fields:
+                    return
+
+                yield f"id: {last_event_id}\n" + fields[_RESPONSE_FIELD].decode('utf-8')
+
+    def _add(self, fields: dict, ttl: int) -> None:
+        pipeline = redis_client.pipeline(transaction=False)
+        pipeline.xadd(self._stream_key, fields, maxlen=STREAM_MAXLEN, approximate=True)
+        pipeline.expire(self._stream_key, ttl)
+        pipeline.execute()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    elif isinstance(value, Decimal):
+        return str(value)
+
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _error_to_dict(error: Any) -> dict:
+    """
+    Reduce an error to its message, and its closest type the task pipeline tells apart.
+    """
+    error_type = next((cls.__name__ for cls in type(error).__mro__ if _ERROR_TYPES.get(cls.__name__) is cls),
+                      None) if isinstance(error, Exception) else None
+
+    return {
+        'type': error_type,
+        'message': str(error),
+        'description': getattr(error, 'description', None)
+    }
+
+
+def _error_from_dict(error_dict: dict) -> Exception:
+    error = _ERROR_TYPES.get(error_dict['type'], Exception)(error_dict['message'])
+    if error_dict['description'] is not None:
+        error.description = error_dict['description']
+
+    return error
+
+
+def _prompt_message_from_dict(prompt_message: dict) -> PromptMessage:
+    if isinstance(prompt_message['content'], list):
+        prompt_message['content'] = [
+            ImagePromptMessageContent(**content)
+            if content['type'] == PromptMessageContentType.IMAGE.value else TextPromptMessageContent(**content)
+            for content in prompt_message['content']
+        ]
+
+    role = PromptMessageRole.value_of(prompt_message['role'])
+    return _PROMPT_MESSAGE_TYPES[role](**prompt_message)
+
+
+def create_transport(task_id: str) -> ApplicationQueueTransport:
+    """
+    Create the transport configured by APPLICATION_QUEUE_TRANSPORT.
+
+    :param task_id: task id
+    :return: transport
+    """
+    transport_type = 'memory'
+    if has_app_context():
+        transport_type = current_app.config.get('APPLICATION_QUEUE_TRANSPORT', transport_type)
+
+    if transport_type == 'redis_stream':
+        return RedisStreamQueueTransport(task_id)
+    elif transport_type == 'memory':
+        return InMemoryQueueTransport()
+    else:
+        raise ValueError(f"Unsupported application queue transport: {transport_type}")
+
+
+class TaskStopSignals:
+    """
+    Process-wide subscriber of the stop signals of generate tasks.
+
+    Stopping a task publishes on its stop channel, a single pattern subscription per process
+    sets the local event of the task, so that the queue managers check a threading event per chunk
+    instead of sending a redis GET.
+    The stop key is still set, it is read once when a task is registered, and again for every
+    registered task when the subscription reconnects, so that no stop is missed while it was down.
+    """
+
+    CHANNEL_PREFIX = 'generate_task_stop:'
+
+    def __init__(self, registration_ttl: float = STREAM_TTL) -> None:
+        self._events: dict[str, tuple[threading.Event, float, str]] = {}
+        self._lock = threading.Lock()
+        self._registration_ttl = registration_ttl
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, task_id: str, stopped_cache_key: str) -> threading.Event:
+        """
+        Register a task, the returned event is set once the task is stopped.
+
+        :param task_id: task id
+        :param stopped_cache_key: key of the stop flag of the task
+        :return: stop event of the task
+        """
+        self._ensure_subscriber()
+
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            registration = self._events.get(task_id)
+            event = registration[0] if registration else threading.Event()
+            self._events[task_id] = (event, now, stopped_cache_key)
+
+        if redis_client.get(stopped_cache_key) is not None:
+            event.set()
+
+        return event
+
+    def publish(self, task_id: str) -> None:
+        """Signal every process the task is registered in to stop it."""
+        redis_client.publish(self.channel(task_id), b'1')
+
+    def stop(self, task_id: str) -> None:
+        with self._lock:
+            registration = self._events.get(task_id)
+
+        if registration:
+            registration[0].set()
+
+    @classmethod
+    def channel(cls, task_id: str) -> str:
+        return f"{cls.CHANNEL_PREFIX}{task_id}"
+
+    def _prune(self, now: float) -> None:
+        expired_at = now - self._registration_ttl
+        for task_id in [task_id for task_id, (_, registered_at, _) in self._events.items()
+                        if registered_at < expired_at]:
+            del self._events[task_id]
+
+    def _ensure_subscriber(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+
+            self._thread = threading.Thread(target=self._subscribe, name='task-stop-signals', daemon=True)
+            self._thread.start()
+
+    def _subscribe(self) -> None:
+        retry_interval = 1
+        while True:
+            pubsub = None
+            try:
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f"{self.CHANNEL_PREFIX}*")
+                self._recheck_stop_flags()
+                retry_interval = 1
+
+                while True:
+                    message = pubsub.get_message(timeout=10)
+                    if not message or message['type'] != 'pmessage':
+                        continue
+
+                    channel = message['channel']
+                    if isinstance(channel, bytes):
+                        channel = channel.decode('utf-8')
+
+                    self.stop(channel[len(self.CHANNEL_PREFIX):])
+            except Exception:
+                logger.warning('Task stop signal subscription failed, reconnecting in %ss', retry_interval,
+                               exc_info=True)
+                time.sleep(retry_interval)
+                retry_interval = min(retry_interval * 2, 30)
+            finally:
+                if pubsub:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def _recheck_stop_flags(self) -> None:
+        with self._lock:
+            registrations = [(task_id, stopped_cache_key)
+                             for task_id, (_, _, stopped_cache_key) in self._events.items()]
+
+        if not registrations:
+            return
+
+        results = redis_client.mget([stopped_cache_key for _, stopped_cache_key in registrations])
+        for (task_id, _), result in zip(registrations, results):
+            if result is not None:
+                self.stop(task_id)
+
+
+task_stop_signals = TaskStopSignals()
@@ -1,3 +1,4 @@
+from collections import defaultdict
 
 from langchain.schema import Document
 
@@ -41,14 +42,18 @@ class DatasetIndexToolCallbackHandler:
 
     def on_tool_end(self, documents: list[Document]) -> None:
         """Handle tool end."""
+        # group the index node ids by dataset, to add hit counts with one update per dataset
+        dataset_index_node_ids = defaultdict(list)
         for document in documents:
+            dataset_index_node_ids[document.metadata.get('dataset_id')].append(document.metadata['doc_id'])
+
+        for dataset_id, index_node_ids in dataset_index_node_ids.items():
             query = db.session.query(DocumentSegment).filter(
-                DocumentSegment.index_node_id == document.metadata['doc_id']
+                DocumentSegment.index_node_id.in_(index_node_ids)
             )
 
-            # if 'dataset_id' in document.metadata:
-            if 'dataset_id' in document.metadata:
-                query = query.filter(DocumentSegment.dataset_id == document.metadata['dataset_id'])
+            if dataset_id:
+                query = query.filter(DocumentSegment.dataset_id == dataset_id)
 
             # add hit count to document segment
             query.update(
@@ -56,7 +61,7 @@ class DatasetIndexToolCallbackHandler:
                 synchronize_session=False
             )
 
-            db.session.commit()
+        db.session.commit()
 
     def return_retriever_resource_info(self, resource: list):
         """Handle return_retriever_resource_info."""
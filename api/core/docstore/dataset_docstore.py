@@ -84,6 +84,20 @@ class DatasetDocumentStore:
             if not isinstance(doc, Document):
                 raise ValueError("doc must be a Document")
 
+        # calc embedding use tokens
+        if embedding_model:
+            model_type_instance = embedding_model.model_type_instance
+            model_type_instance = cast(TextEmbeddingModel, model_type_instance)
+            doc_tokens = model_type_instance.get_num_tokens_batch(
+                model=embedding_model.model,
+                credentials=embedding_model.credentials,
+                texts=[doc.page_content for doc in docs]
+            )
+        else:
+            doc_tokens = [0] * len(docs)
+
+        for doc, tokens in zip(docs, doc_tokens):
+
             segment_document = self.get_document(doc_id=doc.metadata['doc_id'], raise_error=False)
 
             # NOTE: doc could already exist in the store, but we overwrite it
@@ -93,18 +107,6 @@ class DatasetDocumentStore:
                     "Set allow_update to True to overwrite."
                 )
 
-            # calc embedding use tokens
-            if embedding_model:
-                model_type_instance = embedding_model.model_type_instance
-                model_type_instance = cast(TextEmbeddingModel, model_type_instance)
-                tokens = model_type_instance.get_num_tokens(
-                    model=embedding_model.model,
-                    credentials=embedding_model.credentials,
-                    texts=[doc.page_content]
-                )
-            else:
-                tokens = 0
-
             if not segment_document:
                 max_position += 1
 
@@ -0,0 +1,126 @@
+from typing import Optional
+
+from langchain.schema import Document
+from pydantic import BaseModel
+
+from extensions.ext_database import db
+from models.dataset import Dataset, DocumentSegment
+from models.dataset import Document as DatasetDocument
+
+
+class HydratedSegment(BaseModel):
+    """Segment of a retrieved index node, with its document and dataset when loaded."""
+    segment: DocumentSegment
+    document: Optional[DatasetDocument] = None
+    dataset: Optional[Dataset] = None
+    score: Optional[float] = None
+
+    class Config:
+        """Configuration for this pydantic object."""
+
+        arbitrary_types_allowed = True
+
+
+class SegmentHydrator:
+    """
+    Resolve retrieved index node ids into segments, documents and datasets,
+    with one IN query per table instead of one query per index node.
+    """
+
+    @classmethod
+    def hydrate_documents(cls, dataset_ids: list[str],
+                          documents: list[Document],
+                          available_only: bool = True,
+                          with_documents: bool = False) -> list[HydratedSegment]:
+        """
+        Hydrate retrieved documents, keeping the order of the documents (which are sorted by score)
+        and carrying over the score in their metadata.
+
+        :param dataset_ids: ids of datasets the documents were retrieved from
+        :param documents: retrieved documents, with the index node id in metadata `doc_id`
+        :param available_only: only return enabled and completed segments
+        :param with_documents: load the dataset documents and datasets of the segments,
+            disabled or archived dataset documents are left as None
+        :return: hydrated segments
+        """
+        scores = {}
+        for document in documents:
+            if document.metadata.get('score'):
+                scores[document.metadata['doc_id']] = document.metadata['score']
+
+        hydrated_segments = cls.hydrate(
+            dataset_ids=dataset_ids,
+            index_node_ids=[document.metadata['doc_id'] for document in documents],
+            available_only=available_only,
+            with_documents=with_documents
+        )
+
+        for hydrated_segment in hydrated_segments:
+            hydrated_segment.score = scores.get(hydrated_segment.segment.index_node_id)
+
+        return hydrated_segments
+
+    @classmethod
+    def hydrate(cls, dataset_ids: list[str],
+                index_node_ids: list[str],
+                available_only: bool = True,
+                with_documents: bool = False) -> list[HydratedSegment]:
+        """
+        Hydrate index node ids, keeping the order of index_node_ids.
+
+        :param dataset_ids: ids of datasets the index nodes belong to
+        :param index_node_ids: index node ids
+        :param available_only: only return enabled and completed segments
+        :param with_documents: load the dataset documents and datasets of the segments,
+            disabled or archived dataset documents are left as None
+        :return: hydrated segments
+        """
+        if not dataset_ids or not index_node_ids:
+            return []
+
+        query = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id.in_(dataset_ids),
+            DocumentSegment.index_node_id.in_(index_node_ids)
+        )
+
+        if available_only:
+            query = query.filter(
+                DocumentSegment.completed_at.isnot(None),
+                DocumentSegment.status == 'completed',
+                DocumentSegment.enabled == True
+            )
+
+        segments = query.all()
+        if not segments:
+            return []
+
+        index_node_id_to_position = {}
+        for position, index_node_id in enumerate(index_node_ids):
+            index_node_id_to_position.setdefault(index_node_id, position)
+
+        segments = sorted(segments,
+                          key=lambda segment: index_node_id_to_position.get(segment.index_node_id, float('inf')))
+
+        if not with_documents:
+            return [HydratedSegment(segment=segment) for segment in segments]
+
+        document_ids = list({segment.document_id for segment in segments})
+        documents = db.session.query(DatasetDocument).filter(
+            DatasetDocument.id.in_(document_ids),
+            DatasetDocument.enabled == True,
+            DatasetDocument.archived == False
+        ).all()
+        documents = {document.id: document for document in documents}
+
+        segment_dataset_ids = list({segment.dataset_id for segment in segments})
+        datasets = db.session.query(Dataset).filter(Dataset.id.in_(segment_dataset_ids)).all()
+        datasets = {dataset.id: dataset for dataset in datasets}
+
+        return [
+            HydratedSegment(
+                segment=segment,
+                document=documents.get(segment.document_id),
+                dataset=datasets.get(segment.dataset_id)
+            )
+            for segment in segments
+        ]
@@ -4,6 +4,7 @@ from typing import Optional, cast
 
 import numpy as np
 from langchain.embeddings.base import Embeddings
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 
 from core.model_manager import ModelInstance
@@ -12,9 +13,13 @@ from core.model_runtime.model_providers.__base.text_embedding_model import TextE
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
 from libs import helper
+from models.dataset import Embedding
 
 logger = logging.getLogger(__name__)
 
+# seconds an embedding stays in the redis tier of the cache
+EMBEDDING_CACHE_REDIS_TTL = 600
+
 
 class CacheEmbedding(Embeddings):
     def __init__(self, model_instance: ModelInstance, user: Optional[str] = None) -> None:
@@ -22,35 +27,29 @@ class CacheEmbedding(Embeddings):
         self._user = user
 
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        """Embed search docs in batches of 10."""
-        text_embeddings = []
-        try:
-            model_type_instance = cast(TextEmbeddingModel, self._model_instance.model_type_instance)
-            model_schema = model_type_instance.get_model_schema(self._model_instance.model, self._model_instance.credentials)
-            max_chunks = model_schema.model_properties[ModelPropertyKey.MAX_CHUNKS] \
-                if model_schema and ModelPropertyKey.MAX_CHUNKS in model_schema.model_properties else 1
-            for i in range(0, len(texts), max_chunks):
-                batch_texts = texts[i:i + max_chunks]
-
-                embedding_result = self._model_instance.invoke_text_embedding(
-                    texts=batch_texts,
-                    user=self._user
-                )
-
-                for vector in embedding_result.embeddings:
-                    try:
-                        normalized_embedding = (vector / np.linalg.norm(vector)).tolist()
-                        text_embeddings.append(normalized_embedding)
-                    except IntegrityError:
-                        db.session.rollback()
-                    except Exception as e:
-                        logging.exception('Failed to add embedding to redis')
-
-        except Exception as ex:
-            logger.error('Failed to embed documents: ', ex)
-            raise ex
-
-        return text_embeddings
+        """
+        Embed search docs.
+
+        Embeddings are looked up by text hash in redis first, then in the embeddings table,
+        only the texts missing from both are sent to the model (in batches of max chunks),
+        and the new embeddings are written back to both tiers.
+        """
+        text_hashes = [helper.generate_text_hash(text) for text in texts]
+        cached_embeddings = self._get_cached_embeddings(set(text_hashes))
+
+        # embed each distinct text only once
+        embedding_queue = {}
+        for text, text_hash in zip(texts, text_hashes):
+            if text_hash not in cached_embeddings and text_hash not in embedding_queue:
+                embedding_queue[text_hash] = text
+
+        if embedding_queue:
+            new_embeddings = self._invoke_text_embedding(list(embedding_queue.keys()),
+                                                         list(embedding_queue.values()))
+            cached_embeddings.update(new_embeddings)
+            self._save_embeddings(new_embeddings)
+
+        return [cached_embeddings[text_hash] for text_hash in text_hashes]
 
     def embed_query(self, text: str) -> list[float]:
         """Embed query text."""
@@ -90,3 +89,120 @@ class CacheEmbedding(Embeddings):
             logging.exception('Failed to add embedding to redis')
 
         return embedding_results
+
+    def _document_cache_key(self, text_hash: str) -> str:
+        return f'document_embedding:{self._model_instance.provider}:{self._model_instance.model}:{text_hash}'
+
+    def _get_cached_embeddings(self, text_hashes: set[str]) -> dict[str, list[float]]:
+        """
+        Bulk lookup of cached embeddings, redis first, then the embeddings table.
+
+        :param text_hashes: text hashes to look up
+        :return: embeddings found, keyed by text hash
+        """
+        cached_embeddings = {}
+        if not text_hashes:
+            return cached_embeddings
+
+        text_hashes = list(text_hashes)
+        try:
+            values = redis_client.mget([self._document_cache_key(text_hash) for text_hash in text_hashes])
+            for text_hash, value in zip(text_hashes, values):
+                if value:
+                    cached_embeddings[text_hash] = Embedding.decode_embedding(value)
+        except Exception:
+            logger.exception('Failed to get embeddings from redis')
+
+        missed_hashes = [text_hash for text_hash in text_hashes if text_hash not in cached_embeddings]
+        if not missed_hashes:
+            return cached_embeddings
+
+        try:
+            rows = db.session.query(Embedding.hash, Embedding.embedding).filter(
+                Embedding.provider_name == self._model_instance.provider,
+                Embedding.model_name == self._model_instance.model,
+                Embedding.hash.in_(missed_hashes)
+            ).all()
+        except Exception:
+            logger.exception('Failed to get embeddings from db')
+            db.session.rollback()
+            return cached_embeddings
+
+        db_embeddings = {row.hash: bytes(row.embedding) for row in rows}
+        for text_hash, embedding_bytes in db_embeddings.items():
+            cached_embeddings[text_hash] = Embedding.decode_embedding(embedding_bytes)
+
+        # warm up redis with the embeddings found in db
+        self._set_redis_embeddings(db_embeddings)
+
+        return cached_embeddings
+
+    def _invoke_text_embedding(self, text_hashes: list[str], texts: list[str]) -> dict[str, list[float]]:
+        """
+        Embed texts in batches of the model max chunks.
+
+        :param text_hashes: hashes of texts
+        :param texts: texts to embed
+        :return: normalized embeddings, keyed by text hash
+        """
+        embeddings = {}
+        try:
+            model_type_instance = cast(TextEmbeddingModel, self._model_instance.model_type_instance)
+            model_schema = model_type_instance.get_model_schema(self._model_instance.model, self._model_instance.credentials)
+            max_chunks = model_schema.model_properties[ModelPropertyKey.MAX_CHUNKS] \
+                if model_schema and ModelPropertyKey.MAX_CHUNKS in model_schema.model_properties else 1
+            for i in range(0, len(texts), max_chunks):
+                batch_texts = texts[i:i + max_chunks]
+
+                embedding_result = self._model_instance.invoke_text_embedding(
+                    texts=batch_texts,
+                    user=self._user
+                )
+
+                for text_hash, vector in zip(text_hashes[i:i + max_chunks], embedding_result.embeddings):
+                    embeddings[text_hash] = (vector / np.linalg.norm(vector)).tolist()
+        except Exception as ex:
+            logger.error('Failed to embed documents: ', ex)
+            raise ex
+
+        return embeddings
+
+    def _save_embeddings(self, embeddings: dict[str, list[float]]) -> None:
+        """
+        Bulk insert new embeddings into the embeddings table and redis.
+
+        :param embeddings: embeddings keyed by text hash
+        """
+        encoded_embeddings = {text_hash: Embedding.encode_embedding(embedding)
+                              for text_hash, embedding in embeddings.items()}
+
+        try:
+            db.session.execute(
+                insert(Embedding).values([
+                    {
+                        'provider_name': self._model_instance.provider,
+                        'model_name': self._model_instance.model,
+                        'hash': text_hash,
+                        'embedding': embedding_bytes
+                    }
+                    for text_hash, embedding_bytes in encoded_embeddings.items()
+                ]).on_conflict_do_nothing(index_elements=['model_name', 'hash', 'provider_name'])
+            )
+            db.session.commit()
+        except Exception:
+            logger.exception('Failed to add embeddings to db')
+            db.session.rollback()
+
+        self._set_redis_embeddings(encoded_embeddings)
+
+    def _set_redis_embeddings(self, encoded_embeddings: dict[str, bytes]) -> None:
+        if not encoded_embeddings:
+            return
+
+        try:
+            pipeline = redis_client.pipeline(transaction=False)
+            for text_hash, embedding_bytes in encoded_embeddings.items():
+                pipeline.setex(self._document_cache_key(text_hash), EMBEDDING_CACHE_REDIS_TTL, embedding_bytes)
+            pipeline.execute()
+        except Exception:
+            logger.exception('Failed to add embeddings to redis')
@@ -0,0 +1,46 @@
+from langchain.embeddings.base import Embeddings
+from langchain.schema import Document
+
+
+class EmbeddedDocuments(list):
+    """
+    Batch of documents with their embeddings, passed from the embedding stage of the indexing pipeline
+    to the vector upsert.
+    """
+
+    def __init__(self, documents: list[Document], embeddings: list[list[float]]) -> None:
+        """
+        :param documents: documents
+        :param embeddings: embedding of each document
+        """
+        super().__init__(documents)
+        self.embeddings = embeddings
+
+
+class PrecomputedEmbedding(Embeddings):
+    """
+    Embeddings that serves the embeddings set for the current batch of documents,
+    the texts without one, e.g. of a recreated index, are embedded by the fallback embeddings.
+    """
+
+    def __init__(self, fallback: Embeddings) -> None:
+        self._fallback = fallback
+        self._embeddings: dict[str, list[float]] = {}
+
+    def set_embeddings(self, texts: list[str], embeddings: list[list[float]]) -> None:
+        """
+        Set the embeddings of the current batch, replacing those of the previous one.
+
+        :param texts: texts
+        :param embeddings: embedding of each text
+        """
+        self._embeddings = dict(zip(texts, embeddings))
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        missing_texts = list(dict.fromkeys(text for text in texts if text not in self._embeddings))
+        embeddings = dict(zip(missing_texts, self._fallback.embed_documents(missing_texts))) if missing_texts else {}
+
+        return [self._embeddings[text] if text in self._embeddings else embeddings[text] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._fallback.embed_query(text)
@@ -307,3 +307,6 @@ class ApplicationGenerateEntity(BaseModel):
 
     # extra parameters, like: auto_generate_conversation_name
     extras: dict[str, Any] = {}
+
+    # quota reserved in the usage ledger, released when the message is created
+    quota_reservation: Optional[str] = None
@@ -11,6 +11,7 @@ from core.entities.model_entities import ModelStatus, ModelWithProviderEntity, S
 from core.entities.provider_entities import CustomConfiguration, SystemConfiguration, SystemConfigurationStatus
 from core.helper import encrypter
 from core.helper.model_provider_cache import ProviderCredentialsCache, ProviderCredentialsCacheType
+from core.helper.provider_configurations_cache import provider_configurations_cache
 from core.model_runtime.entities.model_entities import FetchFrom, ModelType
 from core.model_runtime.entities.provider_entities import (
     ConfigurateMethod,
@@ -80,13 +81,14 @@ class ProviderConfiguration(BaseModel):
 
             return copy_credentials
         else:
+            # copies, the configurations are cached and shared, while model runtimes may normalize credentials
             if self.custom_configuration.models:
                 for model_configuration in self.custom_configuration.models:
                     if model_configuration.model_type == model_type and model_configuration.model == model:
-                        return model_configuration.credentials
+                        return model_configuration.credentials.copy()
 
             if self.custom_configuration.provider:
-                return self.custom_configuration.provider.credentials
+                return self.custom_configuration.provider.credentials.copy()
             else:
                 return None
 
@@ -127,7 +129,7 @@ class ProviderConfiguration(BaseModel):
 
         credentials = self.custom_configuration.provider.credentials
         if not obfuscated:
-            return credentials
+            return credentials.copy()
 
         # Obfuscate credentials
         return self._obfuscated_credentials(
@@ -223,6 +225,7 @@ class ProviderConfiguration(BaseModel):
         )
 
         provider_model_credentials_cache.delete()
+        provider_configurations_cache.invalidate(self.tenant_id)
 
         self.switch_preferred_provider_type(ProviderType.CUSTOM)
 
@@ -253,6 +256,7 @@ class ProviderConfiguration(BaseModel):
             )
 
             provider_model_credentials_cache.delete()
+            provider_configurations_cache.invalidate(self.tenant_id)
 
     def get_custom_model_credentials(self, model_type: ModelType, model: str, obfuscated: bool = False) \
             -> Optional[dict]:
@@ -271,7 +275,7 @@ class ProviderConfiguration(BaseModel):
             if model_configuration.model_type == model_type and model_configuration.model == model:
                 credentials = model_configuration.credentials
                 if not obfuscated:
-                    return credentials
+                    return credentials.copy()
 
                 # Obfuscate credentials
                 return self._obfuscated_credentials(
@@ -372,6 +376,7 @@ class ProviderConfiguration(BaseModel):
         )
 
         provider_model_credentials_cache.delete()
+        provider_configurations_cache.invalidate(self.tenant_id)
 
     def delete_custom_model_credentials(self, model_type: ModelType, model: str) -> None:
         """
@@ -401,6 +406,7 @@ class ProviderConfiguration(BaseModel):
             )
 
             provider_model_credentials_cache.delete()
+            provider_configurations_cache.invalidate(self.tenant_id)
 
     def get_provider_instance(self) -> ModelProvider:
         """
@@ -452,6 +458,7 @@ class ProviderConfiguration(BaseModel):
             db.session.add(preferred_model_provider)
 
         db.session.commit()
+        provider_configurations_cache.invalidate(self.tenant_id)
 
     def _extract_secret_variables(self, credential_form_schemas: list[CredentialFormSchema]) -> list[str]:
         """
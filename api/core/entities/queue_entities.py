@@ -12,6 +12,7 @@ class QueueEvent(Enum):
     """
     MESSAGE = "message"
     AGENT_MESSAGE = "agent_message"
+    MESSAGE_DELTA = "message-delta"
     MESSAGE_REPLACE = "message-replace"
     MESSAGE_END = "message-end"
     RETRIEVER_RESOURCES = "retriever-resources"
@@ -44,7 +45,17 @@ class QueueAgentMessageEvent(AppQueueEvent):
     event = QueueEvent.AGENT_MESSAGE
     chunk: LLMResultChunk
 
-    
+
+class QueueMessageDeltaEvent(AppQueueEvent):
+    """
+    QueueMessageDeltaEvent entity, the text of a chunk following the first chunk of a stream,
+    which carries the prompt messages of the stream
+    """
+    event = QueueEvent.MESSAGE_DELTA
+    text: str
+    agent: bool = False
+
+
 class QueueMessageReplaceEvent(AppQueueEvent):
     """
     QueueMessageReplaceEvent entity
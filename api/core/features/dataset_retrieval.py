@@ -1,10 +1,13 @@
 from typing import Optional, cast
 
+from flask import current_app
 from langchain.tools import BaseTool
 
-from core.agent.agent_executor import AgentConfiguration, AgentExecutor, PlanningStrategy
+from core.agent.agent_executor import MODERATION_OUTPUT, AgentConfiguration, AgentExecutor, PlanningStrategy
 from core.callback_handler.index_tool_callback_handler import DatasetIndexToolCallbackHandler
 from core.entities.application_entities import DatasetEntity, DatasetRetrieveConfigEntity, InvokeFrom, ModelConfigEntity
+from core.features.dataset_router import EmbeddingDatasetRouter
+from core.helper import moderation
 from core.memory.token_buffer_memory import TokenBufferMemory
 from core.model_runtime.entities.model_entities import ModelFeature
 from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
@@ -38,26 +41,10 @@ class DatasetRetrievalFeature:
         dataset_ids = config.dataset_ids
         retrieve_config = config.retrieve_config
 
-        # check model is support tool calling
-        model_type_instance = model_config.provider_model_bundle.model_type_instance
-        model_type_instance = cast(LargeLanguageModel, model_type_instance)
-
-        # get model schema
-        model_schema = model_type_instance.get_model_schema(
-            model=model_config.model,
-            credentials=model_config.credentials
-        )
-
-        if not model_schema:
+        planning_strategy = self.get_planning_strategy(model_config)
+        if not planning_strategy:
             return None
 
-        planning_strategy = PlanningStrategy.REACT_ROUTER
-        features = model_schema.features
-        if features:
-            if ModelFeature.TOOL_CALL in features \
-                    or ModelFeature.MULTI_TOOL_CALL in features:
-                planning_strategy = PlanningStrategy.ROUTER
-
         dataset_retriever_tools = self.to_dataset_retriever_tool(
             tenant_id=tenant_id,
             dataset_ids=dataset_ids,
@@ -70,6 +57,17 @@ class DatasetRetrievalFeature:
         if len(dataset_retriever_tools) == 0:
             return None
 
+        # choose the dataset by embeddings when the query clearly matches one, skipping the LLM router
+        if retrieve_config.retrieve_strategy == DatasetRetrieveConfigEntity.RetrieveStrategy.SINGLE \
+                and len(dataset_retriever_tools) > 1 \
+                and current_app.config.get('DATASET_EMBEDDING_ROUTER_ENABLED'):
+            dataset_retriever_tool = EmbeddingDatasetRouter(tenant_id).route(dataset_retriever_tools, query)
+            if dataset_retriever_tool:
+                if moderation.check_moderation(model_config, query):
+                    return MODERATION_OUTPUT
+
+                return dataset_retriever_tool.run(tool_input={'query': query})
+
         agent_configuration = AgentConfiguration(
             strategy=planning_strategy,
             model_config=model_config,
@@ -90,6 +88,34 @@ class DatasetRetrievalFeature:
 
         return result.output
 
+    def get_planning_strategy(self, model_config: ModelConfigEntity) -> Optional[PlanningStrategy]:
+        """
+        Get the strategy of the LLM router of a model.
+        :param model_config: model config
+        :return: ROUTER when the model supports tool calling, REACT_ROUTER otherwise, None without model schema
+        """
+        # check model is support tool calling
+        model_type_instance = model_config.provider_model_bundle.model_type_instance
+        model_type_instance = cast(LargeLanguageModel, model_type_instance)
+
+        # get model schema
+        model_schema = model_type_instance.get_model_schema(
+            model=model_config.model,
+            credentials=model_config.credentials
+        )
+
+        if not model_schema:
+            return None
+
+        planning_strategy = PlanningStrategy.REACT_ROUTER
+        features = model_schema.features
+        if features:
+            if ModelFeature.TOOL_CALL in features \
+                    or ModelFeature.MULTI_TOOL_CALL in features:
+                planning_strategy = PlanningStrategy.ROUTER
+
+        return planning_strategy
+
     def to_dataset_retriever_tool(self, tenant_id: str,
                                   dataset_ids: list[str],
                                   retrieve_config: DatasetRetrieveConfigEntity,
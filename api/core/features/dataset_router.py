@@ -0,0 +1,176 @@
+import logging
+import threading
+from typing import Optional
+
+import numpy as np
+from flask import current_app, has_app_context
+
+from core.embedding.cached_embedding import CacheEmbedding
+from core.helper.lru_cache import LRUCache
+from core.model_manager import ModelInstance, ModelManager
+from core.model_runtime.entities.model_entities import ModelType
+from core.tools.tool.dataset_retriever.dataset_retriever_tool import DatasetRetrieverTool
+from extensions.ext_database import db
+from libs import helper
+from models.dataset import Dataset
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_SCORE = 0.5
+DEFAULT_MIN_MARGIN = 0.05
+
+# count of dataset embeddings cached in process
+DATASET_EMBEDDING_CACHE_CAPACITY = 10000
+
+_dataset_embedding_cache = LRUCache(DATASET_EMBEDDING_CACHE_CAPACITY)
+_dataset_embedding_cache_lock = threading.Lock()
+
+
+class EmbeddingDatasetRouter:
+    """
+    Local router of the single retrieve strategy, choosing the dataset of a query without an LLM call.
+
+    Datasets are scored by the cosine similarity of the query embedding and the embedding of their name
+    and description, embedded once and cached in process.
+    A route is only taken when the best score is at least DATASET_EMBEDDING_ROUTER_MIN_SCORE and
+    leads the second best by DATASET_EMBEDDING_ROUTER_MIN_MARGIN, otherwise the LLM router decides.
+    The chat history is not taken into account.
+    """
+
+    def __init__(self, tenant_id: str) -> None:
+        self.tenant_id = tenant_id
+
+    def route(self, tools: list[DatasetRetrieverTool], query: str) -> Optional[DatasetRetrieverTool]:
+        """
+        Choose the dataset tool of a query.
+
+        :param tools: dataset tools
+        :param query: query
+        :return: tool of the chosen dataset, None when the scores are ambiguous or can not be computed
+        """
+        try:
+            scores = self.score(tools, query)
+        except Exception:
+            logger.warning('Failed to route query by embeddings, falling back to the LLM router', exc_info=True)
+            return None
+
+        return self.decide(scores)
+
+    def score(self, tools: list[DatasetRetrieverTool], query: str) -> list[tuple[DatasetRetrieverTool, float]]:
+        """
+        Score the dataset tools for a query.
+
+        :param tools: dataset tools
+        :param query: query
+        :return: tools and their scores, best first
+        """
+        if not tools or not query.strip():
+            return []
+
+        datasets = {
+            dataset.id: dataset
+            for dataset in db.session.query(Dataset).filter(
+                Dataset.tenant_id == self.tenant_id,
+                Dataset.id.in_([tool.dataset_id for tool in tools])
+            ).all()
+        }
+
+        tools = [tool for tool in tools if tool.dataset_id in datasets]
+        if not tools:
+            return []
+
+        model_instance = self._get_embedding_model(list(datasets.values()))
+        embeddings = CacheEmbedding(model_instance)
+        dataset_vectors = self._embed_datasets(model_instance, embeddings,
+                                               [datasets[tool.dataset_id] for tool in tools])
+        query_vector = self._normalize(embeddings.embed_query(query))
+
+        scores = (dataset_vectors @ query_vector).tolist()
+        return sorted(zip(tools, scores), key=lambda tool_score: tool_score[1], reverse=True)
+
+    @classmethod
+    def decide(cls, scores: list[tuple[DatasetRetrieverTool, float]]) -> Optional[DatasetRetrieverTool]:
+        """
+        Choose the best scored tool when its lead is clear.
+
+        :param scores: tools and their scores, best first
+        :return: tool, None when ambiguous
+        """
+        if not scores:
+            return None
+
+        min_score, min_margin = cls._get_settings()
+        best_tool, best_score = scores[0]
+        second_score = scores[1][1] if len(scores) > 1 else None
+        if best_score < min_score or (second_score is not None and best_score - second_score < min_margin):
+            return None
+
+        return best_tool
+
+    @staticmethod
+    def dataset_text(dataset: Dataset) -> str:
+        """Text of a dataset embedded for routing."""
+        if dataset.description:
+            return f'{dataset.name}\n{dataset.description}'
+
+        return dataset.name
+
+    def _get_embedding_model(self, datasets: list[Dataset]) -> ModelInstance:
+        """
+        Use the embedding model shared by the datasets, the query embedding is then reused by the retrieval,
+        and the default embedding model of the workspace otherwise.
+        """
+        model_manager = ModelManager()
+        embedding_models = {(dataset.embedding_model_provider, dataset.embedding_model)
+                            for dataset in datasets if dataset.embedding_model}
+        if len(embedding_models) == 1:
+            provider, model = embedding_models.pop()
+            return model_manager.get_model_instance(
+                tenant_id=self.tenant_id,
+                provider=provider,
+                model_type=ModelType.TEXT_EMBEDDING,
+                model=model
+            )
+
+        return model_manager.get_default_model_instance(
+            tenant_id=self.tenant_id,
+            model_type=ModelType.TEXT_EMBEDDING
+        )
+
+    def _embed_datasets(self, model_instance: ModelInstance, embeddings: CacheEmbedding,
+                        datasets: list[Dataset]) -> np.ndarray:
+        keys = [
+            (model_instance.provider, model_instance.model, helper.generate_text_hash(self.dataset_text(dataset)))
+            for dataset in datasets
+        ]
+
+        with _dataset_embedding_cache_lock:
+            vectors = [_dataset_embedding_cache.get(key) for key in keys]
+
+        missed = [index for index, vector in enumerate(vectors) if vector is None]
+        if missed:
+            # the embeddings of the texts are also cached in redis and the embeddings table
+            new_vectors = embeddings.embed_documents([self.dataset_text(datasets[index]) for index in missed])
+            with _dataset_embedding_cache_lock:
+                for index, vector in zip(missed, new_vectors):
+                    vectors[index] = self._normalize(vector)
+                    _dataset_embedding_cache.put(keys[index], vectors[index])
+
+        return np.stack(vectors)
+
+    @staticmethod
+    def _normalize(vector: list[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float64)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _get_settings() -> tuple[float, float]:
+        if not has_app_context():
+            return DEFAULT_MIN_SCORE, DEFAULT_MIN_MARGIN
+
+        config = current_app.config
+        return (
+            float(config.get('DATASET_EMBEDDING_ROUTER_MIN_SCORE', DEFAULT_MIN_SCORE)),
+            float(config.get('DATASET_EMBEDDING_ROUTER_MIN_MARGIN', DEFAULT_MIN_MARGIN))
+        )
@@ -0,0 +1,84 @@
+import json
+import time
+from collections.abc import Callable
+from typing import Any, Optional
+
+from extensions.ext_redis import redis_client
+
+PENDING = b'__pending__'
+
+# deletes a set result when reading it, a pending one is kept
+_POP_SCRIPT = redis_client.register_script("""
+local result = redis.call('get', KEYS[1])
+if result and result ~= ARGV[1] then
+    redis.call('del', KEYS[1])
+end
+return result
+""")
+
+
+class BackgroundResult:
+    """
+    Result of a generation run by a background task, shared through redis with the request that reads it.
+
+    The dispatcher marks the result pending, the task sets it, and a reader waits for a pending result
+    instead of running the generation a second time. A result meant for a single reader is popped.
+    """
+
+    def __init__(self, name: str, identity_id: str) -> None:
+        self.cache_key = f"background_result:{name}:{identity_id}"
+
+    def mark_pending(self, ttl: int) -> bool:
+        """
+        Mark the result pending, unless it is already pending or set.
+
+        :param ttl: seconds the mark is kept, a reader stops waiting for the result afterwards
+        :return: True when marked, the background task should be dispatched then
+        """
+        return bool(redis_client.set(self.cache_key, PENDING, nx=True, ex=ttl))
+
+    def set(self, result: Any, ttl: int) -> None:
+        redis_client.setex(self.cache_key, ttl, json.dumps(result))
+
+    def delete(self) -> None:
+        redis_client.delete(self.cache_key)
+
+    def get(self, timeout: float = 0, interval: float = 0.2) -> Optional[Any]:
+        """
+        Get the result, waiting up to timeout seconds while it is pending.
+
+        :param timeout: seconds to wait for a pending result
+        :param interval: seconds between two reads
+        :return: result, None when there is no result or it is still pending after the timeout
+        """
+        return self._wait(lambda: redis_client.get(self.cache_key), timeout, interval)
+
+    def pop(self, timeout: float = 0, interval: float = 0.2) -> Optional[Any]:
+        """
+        Get the result and delete it, so that only the first reader gets it, waiting up to timeout seconds
+        while it is pending.
+
+        :param timeout: seconds to wait for a pending result
+        :param interval: seconds between two reads
+        :return: result, None when there is no result or it is still pending after the timeout
+        """
+        return self._wait(lambda: _POP_SCRIPT(keys=[self.cache_key], args=[PENDING]), timeout, interval)
+
+    @staticmethod
+    def _wait(read: Callable[[], Optional[bytes]], timeout: float, interval: float) -> Optional[Any]:
+        deadline = time.monotonic() + timeout
+        while True:
+            cached_result = read()
+            if cached_result is None:
+                return None
+
+            if cached_result != PENDING:
+                try:
+                    return json.loads(cached_result.decode('utf-8'))
+                except ValueError:
+                    return None
+
+            if time.monotonic() >= deadline:
+                return None
+
+            time.sleep(interval)
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+from typing import Optional
+
+from flask import current_app, has_app_context
+from langchain.schema import Document
+
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 600
+
+
+class DatasetRetrievalCache:
+    """
+    Redis cache of the documents retrieved from a dataset for a query, after reranking.
+
+    Entries are keyed by the dataset, its index version, a hash of the retrieval parameters and the normalised query.
+    The tasks that add, update, disable or delete segments or documents bump the index version of their dataset,
+    so that the entries of the previous index are never read again and expire after DATASET_RETRIEVAL_CACHE_TTL.
+    The version is read before retrieving, so an index change during a retrieval invalidates its result.
+    The reranked documents of a multi-dataset retrieval are keyed by the index versions of all its datasets,
+    so that a change of any of them invalidates the result.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._multiple_hits = 0
+        self._multiple_misses = 0
+        self._invalidations = 0
+
+    def get_version(self, dataset_id: str) -> Optional[bytes]:
+        """
+        Get the index version of the dataset, read it before retrieving documents to cache.
+
+        :param dataset_id: dataset id
+        :return: index version, None when it can not be read or the cache is disabled, nothing is cached then
+        """
+        if not self._enabled():
+            return None
+
+        try:
+            return redis_client.get(self._version_key(dataset_id)) or b'0'
+        except Exception:
+            logger.warning('Failed to get index version of dataset %s', dataset_id, exc_info=True)
+            return None
+
+    def get_versions(self, dataset_ids: list[str]) -> Optional[dict[str, bytes]]:
+        """
+        Get the index versions of the datasets with a single request, read them before retrieving documents to cache.
+
+        :param dataset_ids: dataset ids
+        :return: index version by dataset id, None when they can not be read or the cache is disabled
+        """
+        if not self._enabled() or not dataset_ids:
+            return None
+
+        try:
+            versions = redis_client.mget([self._version_key(dataset_id) for dataset_id in dataset_ids])
+        except Exception:
+            logger.warning('Failed to get index versions of datasets %s', dataset_ids, exc_info=True)
+            return None
+
+        return {dataset_id: version or b'0' for dataset_id, version in zip(dataset_ids, versions)}
+
+    def get(self, dataset_id: str, version: Optional[bytes], retrieval_params: dict,
+            query: str) -> Optional[list[Document]]:
+        """
+        Get the cached documents of a retrieval.
+
+        :param dataset_id: dataset id
+        :param version: index version of the dataset
+        :param retrieval_params: retrieval model and every other parameter of the retrieval, e.g. top k
+        :param query: query
+        :return: documents, None when not cached
+        """
+        if version is None:
+            return None
+
+        documents = self._get(self._cache_key(dataset_id, version, retrieval_params, query), f'dataset {dataset_id}')
+        with self._lock:
+            if documents is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+
+        return documents
+
+    def get_multiple(self, versions: Optional[dict[str, bytes]], retrieval_params: dict,
+                     query: str) -> Optional[list[Document]]:
+        """
+        Get the cached documents of a multi-dataset retrieval, after reranking the documents of all datasets.
+
+        :param versions: index version by dataset id, as returned by get_versions
+        :param retrieval_params: retrieval model of each dataset, rerank model and every other parameter, e.g. top k
+        :param query: query
+        :return: documents, None when not cached
+        """
+        if versions is None:
+            return None
+
+        documents = self._get(self._multiple_cache_key(versions, retrieval_params, query),
+                              f'datasets {list(versions)}')
+        with self._lock:
+            if documents is None:
+                self._multiple_misses += 1
+            else:
+                self._multiple_hits += 1
+
+        return documents
+
+    def set(self, dataset_id: str, version: Optional[bytes], retrieval_params: dict, query: str,
+            documents: list[Document]) -> None:
+        """
+        Cache the documents of a retrieval.
+
+        :param dataset_id: dataset id
+        :param version: index version read before the retrieval
+        :param retrieval_params: retrieval model and every other parameter of the retrieval, e.g. top k
+        :param query: query
+        :param documents: retrieved documents
+        """
+        if version is None:
+            return
+
+        self._set(self._cache_key(dataset_id, version, retrieval_params, query), f'dataset {dataset_id}', documents)
+
+    def set_multiple(self, versions: Optional[dict[str, bytes]], retrieval_params: dict, query: str,
+                     documents: list[Document]) -> None:
+        """
+        Cache the reranked documents of a multi-dataset retrieval.
+
+        :param versions: index version by dataset id read before the retrieval, as returned by get_versions
+        :param retrieval_params: retrieval model of each dataset, rerank model and every other parameter, e.g. top k
+        :param query: query
+        :param documents: reranked documents of all datasets
+        """
+        if versions is None:
+            return
+
+        self._set(self._multiple_cache_key(versions, retrieval_params, query), f'datasets {list(versions)}',
+                  documents)
+
+    def invalidate(self, dataset_id: str) -> None:
+        """
+        Invalidate the cached retrievals of the dataset in every process, when its index changes.
+
+        :param dataset_id: dataset id
+        """
+        with self._lock:
+            self._invalidations += 1
+
+        try:
+            redis_client.incr(self._version_key(dataset_id))
+        except Exception:
+            logger.warning('Failed to bump index version of dataset %s', dataset_id, exc_info=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._hits + self._misses
+            multiple_total = self._multiple_hits + self._multiple_misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / total, 4) if total else 0.0,
+                'multiple': {
+                    'hits': self._multiple_hits,
+                    'misses': self._multiple_misses,
+                    'hit_ratio': round(self._multiple_hits / multiple_total, 4) if multiple_total else 0.0
+                },
+                'invalidations': self._invalidations
+            }
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return re.sub(r'\s+', ' ', query).strip().casefold()
+
+    @staticmethod
+    def _get(key: str, description: str) -> Optional[list[Document]]:
+        try:
+            cached_documents = redis_client.get(key)
+        except Exception:
+            logger.warning('Failed to get retrieval cache of %s', description, exc_info=True)
+            return None
+
+        if cached_documents is None:
+            return None
+
+        return [Document(page_content=document['page_content'], metadata=document['metadata'])
+                for document in json.loads(cached_documents.decode('utf-8'))]
+
+    def _set(self, key: str, description: str, documents: list[Document]) -> None:
+        # empty results are not cached, a failed search of a vector store returns none either
+        if not documents:
+            return
+
+        try:
+            redis_client.setex(
+                key,
+                self._get_ttl(),
+                json.dumps([{'page_content': document.page_content, 'metadata': document.metadata}
+                            for document in documents])
+            )
+        except Exception:
+            logger.warning('Failed to set retrieval cache of %s', description, exc_info=True)
+
+    def _cache_key(self, dataset_id: str, version: bytes, retrieval_params: dict, query: str) -> str:
+        params_hash = hashlib.sha256(json.dumps(retrieval_params, sort_keys=True).encode()).hexdigest()
+        query_hash = hashlib.sha256(self.normalize_query(query).encode()).hexdigest()
+        return f"dataset_retrieval:{dataset_id}:{version.decode()}:{params_hash}:{query_hash}"
+
+    def _multiple_cache_key(self, versions: dict[str, bytes], retrieval_params: dict, query: str) -> str:
+        versions_hash = hashlib.sha256(json.dumps(
+            {dataset_id: version.decode() for dataset_id, version in versions.items()}, sort_keys=True
+        ).encode()).hexdigest()
+        params_hash = hashlib.sha256(json.dumps(retrieval_params, sort_keys=True).encode()).hexdigest()
+        query_hash = hashlib.sha256(self.normalize_query(query).encode()).hexdigest()
+        return f"dataset_retrieval:multiple:{versions_hash}:{params_hash}:{query_hash}"
+
+    @staticmethod
+    def _version_key(dataset_id: str) -> str:
+        return f"dataset_index_version:{dataset_id}"
+
+    @staticmethod
+    def _enabled() -> bool:
+        if not has_app_context():
+            return True
+
+        return current_app.config.get('DATASET_RETRIEVAL_CACHE_ENABLED', True)
+
+    @staticmethod
+    def _get_ttl() -> int:
+        if not has_app_context():
+            return DEFAULT_TTL
+
+        return int(current_app.config.get('DATASET_RETRIEVAL_CACHE_TTL', DEFAULT_TTL))
+
+
+dataset_retrieval_cache = DatasetRetrievalCache()
@@ -1,19 +1,103 @@
 import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
 from enum import Enum
 from json import JSONDecodeError
 from typing import Optional
 
+from flask import current_app, has_app_context
+
 from extensions.ext_redis import redis_client
 
+DEFAULT_LOCAL_CACHE_MAX_SIZE = 5000
+DEFAULT_LOCAL_CACHE_TTL = 600
+
 
 class ProviderCredentialsCacheType(Enum):
     PROVIDER = "provider"
     MODEL = "provider_model"
 
 
+class DecryptedCredentialsLocalCache:
+    """
+    Process-wide LRU of decrypted credentials, in front of the redis cache of ProviderCredentialsCache.
+
+    Entries are keyed by the credentials record and its updated_at,
+    an update of the record in any process makes the entries of the previous version miss.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, tuple[datetime, dict, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, cache_key: str, updated_at: datetime) -> Optional[dict]:
+        _, ttl = self._get_settings()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry and entry[0] == updated_at and time.monotonic() - entry[2] < ttl:
+                self._entries.move_to_end(cache_key)
+                self._hits += 1
+                return dict(entry[1])
+
+            self._misses += 1
+            return None
+
+    def set(self, cache_key: str, updated_at: datetime, credentials: dict) -> None:
+        max_size, _ = self._get_settings()
+        with self._lock:
+            self._entries[cache_key] = (updated_at, dict(credentials), time.monotonic())
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, cache_key: str) -> None:
+        with self._lock:
+            self._entries.pop(cache_key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / total, 4) if total else 0.0
+            }
+
+    @staticmethod
+    def _get_settings() -> tuple[int, float]:
+        if not has_app_context():
+            return DEFAULT_LOCAL_CACHE_MAX_SIZE, DEFAULT_LOCAL_CACHE_TTL
+
+        config = current_app.config
+        return (
+            int(config.get('PROVIDER_CREDENTIALS_LOCAL_CACHE_MAX_SIZE', DEFAULT_LOCAL_CACHE_MAX_SIZE)),
+            float(config.get('PROVIDER_CREDENTIALS_LOCAL_CACHE_TTL', DEFAULT_LOCAL_CACHE_TTL))
+        )
+
+
+decrypted_credentials_local_cache = DecryptedCredentialsLocalCache()
+
+
 class ProviderCredentialsCache:
-    def __init__(self, tenant_id: str, identity_id: str, cache_type: ProviderCredentialsCacheType):
+    def __init__(self, tenant_id: str, identity_id: str, cache_type: ProviderCredentialsCacheType,
+                 updated_at: Optional[datetime] = None):
+        """
+        :param tenant_id: workspace id
+        :param identity_id: id of the credentials record
+        :param cache_type: cache type
+        :param updated_at: updated_at of the credentials record, credentials are also cached in process when given
+        """
         self.cache_key = f"{cache_type.value}_credentials:tenant_id:{tenant_id}:id:{identity_id}"
+        self.updated_at = updated_at
 
     def get(self) -> Optional[dict]:
         """
@@ -21,6 +105,11 @@ class ProviderCredentialsCache:
 
         :return:
         """
+        if self.updated_at:
+            cached_provider_credentials = decrypted_credentials_local_cache.get(self.cache_key, self.updated_at)
+            if cached_provider_credentials:
+                return cached_provider_credentials
+
         cached_provider_credentials = redis_client.get(self.cache_key)
         if cached_provider_credentials:
             try:
@@ -29,6 +118,9 @@ class ProviderCredentialsCache:
             except JSONDecodeError:
                 return None
 
+            if self.updated_at:
+                decrypted_credentials_local_cache.set(self.cache_key, self.updated_at, cached_provider_credentials)
+
             return cached_provider_credentials
         else:
             return None
@@ -42,6 +134,9 @@ class ProviderCredentialsCache:
         """
         redis_client.setex(self.cache_key, 86400, json.dumps(credentials))
 
+        if self.updated_at:
+            decrypted_credentials_local_cache.set(self.cache_key, self.updated_at, credentials)
+
     def delete(self) -> None:
         """
         Delete cached model provider credentials.
@@ -49,3 +144,4 @@ class ProviderCredentialsCache:
         :return:
         """
         redis_client.delete(self.cache_key)
+        decrypted_credentials_local_cache.delete(self.cache_key)
@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+
+from flask import current_app, has_app_context
+
+from extensions.ext_redis import redis_client
+
+if TYPE_CHECKING:
+    from core.entities.provider_configuration import ProviderConfigurations
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TENANTS = 1000
+DEFAULT_TTL = 300
+
+
+class _CacheEntry:
+    def __init__(self, version: Optional[bytes], configurations: 'ProviderConfigurations') -> None:
+        self.version = version
+        self.configurations = configurations
+        self.cached_at = time.monotonic()
+
+
+class ProviderConfigurationsCache:
+    """
+    Process-wide LRU of the provider configurations of tenants, validated against a redis version stamp.
+
+    A cached entry is only used while the version stamp of its tenant is the one it was built at,
+    every change of credentials, preferred provider types, default models or quotas bumps the stamp,
+    so that all processes rebuild the configurations on their next use.
+    The version is read before the configurations are built, so a change during a build invalidates it.
+    Entries also expire after PROVIDER_CONFIGURATIONS_CACHE_TTL seconds,
+    for provider records written by other systems, e.g. paid quotas.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get_version(self, tenant_id: str) -> Optional[bytes]:
+        """
+        Get the version stamp of the tenant, read it before building configurations to cache.
+
+        :param tenant_id: workspace id
+        :return: version stamp, None when it can not be read, nothing is cached then
+        """
+        try:
+            return redis_client.get(self._version_key(tenant_id)) or b'0'
+        except Exception:
+            logger.warning('Failed to get provider configurations version of tenant %s', tenant_id, exc_info=True)
+            return None
+
+    def get(self, tenant_id: str, version: Optional[bytes]) -> Optional['ProviderConfigurations']:
+        """
+        Get the cached configurations of the tenant.
+
+        :param tenant_id: workspace id
+        :param version: current version stamp of the tenant
+        :return: configurations, None when not cached, outdated or expired
+        """
+        if not self._enabled() or version is None:
+            return None
+
+        max_tenants, ttl = self._get_settings()
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if entry and entry.version == version and time.monotonic() - entry.cached_at < ttl:
+                self._entries.move_to_end(tenant_id)
+                self._hits += 1
+                return entry.configurations
+
+            self._misses += 1
+            return None
+
+    def set(self, tenant_id: str, version: Optional[bytes], configurations: 'ProviderConfigurations') -> None:
+        """
+        Cache the configurations of the tenant.
+
+        :param tenant_id: workspace id
+        :param version: version stamp read before the configurations were built
+        :param configurations: configurations
+        """
+        if not self._enabled() or version is None:
+            return
+
+        max_tenants, _ = self._get_settings()
+        with self._lock:
+            self._entries[tenant_id] = _CacheEntry(version, configurations)
+            self._entries.move_to_end(tenant_id)
+            while len(self._entries) > max_tenants:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tenant_id: str) -> None:
+        """
+        Invalidate the configurations of the tenant in every process.
+
+        :param tenant_id: workspace id
+        """
+        with self._lock:
+            self._entries.pop(tenant_id, None)
+            self._invalidations += 1
+
+        try:
+            redis_client.incr(self._version_key(tenant_id))
+        except Exception:
+            logger.warning('Failed to bump provider configurations version of tenant %s', tenant_id, exc_info=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'tenants': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / total, 4) if total else 0.0,
+                'invalidations': self._invalidations
+            }
+
+    @staticmethod
+    def _version_key(tenant_id: str) -> str:
+        return f"provider_configurations_version:tenant_id:{tenant_id}"
+
+    @staticmethod
+    def _enabled() -> bool:
+        if not has_app_context():
+            return True
+
+        return current_app.config.get('PROVIDER_CONFIGURATIONS_CACHE_ENABLED', True)
+
+    @staticmethod
+    def _get_settings() -> tuple[int, float]:
+        if not has_app_context():
+            return DEFAULT_MAX_TENANTS, DEFAULT_TTL
+
+        config = current_app.config
+        return (
+            int(config.get('PROVIDER_CONFIGURATIONS_CACHE_MAX_TENANTS', DEFAULT_MAX_TENANTS)),
+            float(config.get('PROVIDER_CONFIGURATIONS_CACHE_TTL', DEFAULT_TTL))
+        )
+
+
+provider_configurations_cache = ProviderConfigurationsCache()
@@ -0,0 +1,292 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Optional
+
+from flask import current_app, has_app_context
+
+from core.helper.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 32
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_MAX_ABANDONED = 2
+
+# upper bounds in seconds of the latency histogram buckets, the last bucket is unbounded
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# count of dataset and backend pairs whose latency histograms are kept
+HISTOGRAM_CAPACITY = 1000
+
+
+class RetrievalTask:
+    """
+    A search of a retrieval, a function extending the documents list given as its `all_documents` argument,
+    like the searches of RetrievalService.
+    """
+
+    def __init__(self, dataset_id: str, backend: str, func: Callable[..., None], kwargs: dict) -> None:
+        """
+        :param dataset_id: id of the searched dataset
+        :param backend: what is searched, e.g. the search method, latencies are recorded per dataset and backend
+        :param func: search function
+        :param kwargs: arguments of the search function, except all_documents
+        """
+        self.dataset_id = dataset_id
+        self.backend = backend
+        self.func = func
+        self.kwargs = kwargs
+
+
+class _LatencyHistogram:
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejections = 0
+
+    def observe(self, latency: float) -> None:
+        self.buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self.count += 1
+        self.sum += latency
+
+    def stats(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 4),
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'rejections': self.rejections,
+            'buckets': {
+                **{str(upper_bound): count for upper_bound, count in zip(LATENCY_BUCKETS, self.buckets)},
+                '+Inf': self.buckets[-1]
+            }
+        }
+
+
+class RetrievalExecutor:
+    """
+    Process-wide bounded thread pool running the searches of the retrievals over several datasets or search methods.
+
+    A retrieval runs at most RETRIEVAL_EXECUTOR_MAX_CONCURRENCY of its searches at a time, and waits at most
+    RETRIEVAL_EXECUTOR_TIMEOUT seconds for each of them from its submission.
+    The documents of the searches finished by then are returned, the searches not started yet are cancelled
+    and the running ones are abandoned, their documents are dropped when they finish.
+    An abandoned search keeps its worker until it finishes, so a dataset and backend only has
+    RETRIEVAL_EXECUTOR_MAX_ABANDONED of them at a time, and all of them half of the workers,
+    the searches over the limit fail right away instead of taking more workers.
+    Searches run by a search of the pool run inline in its thread, so that nested retrievals can not
+    take all the workers and wait for each other.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._max_workers = 0
+        self._local = threading.local()
+        self._histograms = LRUCache(HISTOGRAM_CAPACITY)
+        self._running = 0
+        self._timeouts = 0
+        self._cancellations = 0
+        self._rejections = 0
+        self._abandoned: dict[tuple[str, str], int] = {}
+        self._abandoned_count = 0
+
+    def run(self, tasks: list[RetrievalTask], max_concurrency: Optional[int] = None,
+            timeout: Optional[float] = None) -> list[Optional[list]]:
+        """
+        Run the searches of a retrieval.
+
+        :param tasks: searches
+        :param max_concurrency: searches run at a time, RETRIEVAL_EXECUTOR_MAX_CONCURRENCY when not given
+        :param timeout: seconds to wait for each search, RETRIEVAL_EXECUTOR_TIMEOUT when not given
+        :return: documents of each search, None for the searches that failed or did not finish in time,
+            a retrieval with a None search is partial and must not be cached
+        """
+        if not tasks:
+            return []
+
+        if getattr(self._local, 'in_worker', False):
+            return [self._run_task(task) for task in tasks]
+
+        default_max_concurrency, default_timeout, max_abandoned = self._get_settings()
+        max_concurrency = max(1, max_concurrency or default_max_concurrency)
+        timeout = timeout if timeout is not None else default_timeout
+
+        executor = self._get_executor()
+        cancelled = threading.Event()
+        results: list[Optional[list]] = [None] * len(tasks)
+        pending = deque(enumerate(tasks))
+        running: dict[Future, tuple[int, float]] = {}
+        try:
+            while pending or running:
+                while pending and len(running) < max_concurrency:
+                    index, task = pending.popleft()
+                    if not self._admit(task, max_abandoned):
+                        logger.warning('Search of dataset %s with %s skipped, its searches abandoned after their '
+                                       'deadline still take too many workers', task.dataset_id, task.backend)
+                        continue
+
+                    future = executor.submit(self._run_task, task, cancelled)
+                    running[future] = (index, time.monotonic() + timeout)
+
+                if not running:
+                    break
+
+                next_deadline = min(deadline for _, deadline in running.values())
+                done, _ = wait(running, timeout=max(0.0, next_deadline - time.monotonic()),
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, _ = running.pop(future)
+                    results[index] = future.result()
+
+                now = time.monotonic()
+                for future, (index, deadline) in list(running.items()):
+                    if deadline > now:
+                        continue
+
+                    del running[future]
+                    if not future.cancel():
+                        self._abandon(tasks[index], future)
+
+                    self._record_timeout(tasks[index])
+                    logger.warning('Search of dataset %s with %s timed out after %s seconds',
+                                   tasks[index].dataset_id, tasks[index].backend, timeout)
+        finally:
+            # the searches of the retrieval not started yet are skipped, also when the caller is interrupted
+            cancelled.set()
+            if pending or running:
+                with self._lock:
+                    self._cancellations += len(pending) + len(running)
+
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'max_workers': self._max_workers,
+                'running': self._running,
+                'timeouts': self._timeouts,
+                'cancellations': self._cancellations,
+                'rejections': self._rejections,
+                'abandoned': self._abandoned_count,
+                'latencies': [
+                    {
+                        'dataset_id': dataset_id,
+                        'backend': backend,
+                        **histogram.stats()
+                    }
+                    for (dataset_id, backend), histogram in self._histograms.cache.items()
+                ]
+            }
+
+    def _run_task(self, task: RetrievalTask, cancelled: Optional[threading.Event] = None) -> Optional[list]:
+        if cancelled and cancelled.is_set():
+            return None
+
+        with self._lock:
+            self._running += 1
+
+        in_worker = getattr(self._local, 'in_worker', False)
+        self._local.in_worker = True
+        documents = []
+        error = False
+        start_at = time.perf_counter()
+        try:
+            task.func(all_documents=documents, **task.kwargs)
+        except Exception:
+            # the other searches of the retrieval go on, the failed one is told apart from one without hits
+            logger.exception('Failed to search dataset %s with %s', task.dataset_id, task.backend)
+            error = True
+            documents = None
+        finally:
+            self._local.in_worker = in_worker
+            latency = time.perf_counter() - start_at
+            with self._lock:
+                self._running -= 1
+                histogram = self._get_histogram(task)
+                histogram.observe(latency)
+                if error:
+                    histogram.errors += 1
+
+        return documents
+
+    def _admit(self, task: RetrievalTask, max_abandoned: int) -> bool:
+        """Check the searches abandoned after their deadline leave a worker for a search, counting rejections."""
+        with self._lock:
+            if self._abandoned.get((task.dataset_id, task.backend), 0) < max_abandoned \
+                    and self._abandoned_count < max(1, self._max_workers // 2):
+                return True
+
+            self._rejections += 1
+            self._get_histogram(task).rejections += 1
+            return False
+
+    def _abandon(self, task: RetrievalTask, future: Future) -> None:
+        """Count a running search abandoned after its deadline, until it finishes."""
+        key = (task.dataset_id, task.backend)
+        with self._lock:
+            self._abandoned[key] = self._abandoned.get(key, 0) + 1
+            self._abandoned_count += 1
+
+        future.add_done_callback(lambda _: self._release(key))
+
+    def _release(self, key: tuple[str, str]) -> None:
+        with self._lock:
+            self._abandoned_count -= 1
+            if self._abandoned[key] > 1:
+                self._abandoned[key] -= 1
+            else:
+                del self._abandoned[key]
+
+    def _record_timeout(self, task: RetrievalTask) -> None:
+        with self._lock:
+            self._timeouts += 1
+            self._get_histogram(task).timeouts += 1
+
+    def _get_histogram(self, task: RetrievalTask) -> _LatencyHistogram:
+        """Get the histogram of the dataset and backend of a search, the lock must be held."""
+        key = (task.dataset_id, task.backend)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = _LatencyHistogram()
+            self._histograms.put(key, histogram)
+
+        return histogram
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor:
+            return self._executor
+
+        max_workers = DEFAULT_MAX_WORKERS
+        if has_app_context():
+            max_workers = int(current_app.config.get('RETRIEVAL_EXECUTOR_MAX_WORKERS', DEFAULT_MAX_WORKERS))
+
+        with self._lock:
+            if not self._executor:
+                self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='retrieval')
+                self._max_workers = max_workers
+
+            return self._executor
+
+    @staticmethod
+    def _get_settings() -> tuple[int, float, int]:
+        if not has_app_context():
+            return DEFAULT_MAX_CONCURRENCY, DEFAULT_TIMEOUT, DEFAULT_MAX_ABANDONED
+
+        config = current_app.config
+        return (
+            int(config.get('RETRIEVAL_EXECUTOR_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)),
+            float(config.get('RETRIEVAL_EXECUTOR_TIMEOUT', DEFAULT_TIMEOUT)),
+            int(config.get('RETRIEVAL_EXECUTOR_MAX_ABANDONED', DEFAULT_MAX_ABANDONED))
+        )
+
+
+retrieval_executor = RetrievalExecutor()
@@ -0,0 +1,415 @@
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+from flask import current_app, has_app_context
+from redis.exceptions import RedisError
+from sqlalchemy import and_, bindparam, tuple_, update
+
+from core.entities.application_entities import ApplicationGenerateEntity
+from core.entities.provider_entities import QuotaConfiguration, QuotaUnit
+from core.errors.error import QuotaExceededError
+from core.helper.provider_configurations_cache import provider_configurations_cache
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.provider import Provider, ProviderType
+
+if TYPE_CHECKING:
+    from models.model import Message
+
+logger = logging.getLogger(__name__)
+
+DIRTY_KEY = 'usage_ledger:dirty'
+LAST_USED_KEY = 'usage_ledger:last_used'
+LAST_USED_FLUSHING_KEY = 'usage_ledger:last_used:flushing'
+FLUSH_THROTTLE_KEY = 'usage_ledger:flush_throttle'
+FLUSH_LOCK_KEY = 'usage_ledger:flush_lock'
+
+# seconds the used counter of a quota is kept without use, it is seeded again from the database afterwards
+USED_TTL = 86400
+
+# KEYS: used, pending, reservations, dirty
+# ARGV: amount, seed, ledger id, reservation, used ttl
+_CONSUME_SCRIPT = redis_client.register_script("""
+if redis.call('exists', KEYS[1]) == 0 then
+    redis.call('set', KEYS[1], tonumber(ARGV[2]) + tonumber(redis.call('get', KEYS[2]) or '0'))
+end
+local used = redis.call('incrby', KEYS[1], ARGV[1])
+redis.call('expire', KEYS[1], ARGV[5])
+redis.call('incrby', KEYS[2], ARGV[1])
+if ARGV[4] ~= '' then
+    redis.call('zrem', KEYS[3], ARGV[4])
+end
+redis.call('sadd', KEYS[4], ARGV[3])
+return used
+""")
+
+# KEYS: used, pending, reservations
+# ARGV: amount, seed, limit, slack, reservation, now, expires at, used ttl
+_RESERVE_SCRIPT = redis_client.register_script("""
+if redis.call('exists', KEYS[1]) == 0 then
+    redis.call('set', KEYS[1], tonumber(ARGV[2]) + tonumber(redis.call('get', KEYS[2]) or '0'), 'EX', ARGV[8])
+end
+redis.call('zremrangebyscore', KEYS[3], '-inf', ARGV[6])
+local reserved = 0
+for _, reservation in ipairs(redis.call('zrange', KEYS[3], 0, -1)) do
+    reserved = reserved + tonumber(string.match(reservation, ':(%d+)$'))
+end
+local used = tonumber(redis.call('get', KEYS[1]))
+if used + reserved + tonumber(ARGV[1]) > tonumber(ARGV[3]) + tonumber(ARGV[4]) then
+    return 0
+end
+redis.call('zadd', KEYS[3], ARGV[7], ARGV[5])
+redis.call('expireat', KEYS[3], ARGV[7])
+return 1
+""")
+
+# KEYS: used, pending
+# ARGV: quota used in the database
+_RECONCILE_SCRIPT = redis_client.register_script("""
+if redis.call('exists', KEYS[1]) == 1 then
+    redis.call('set', KEYS[1], tonumber(ARGV[1]) + tonumber(redis.call('get', KEYS[2]) or '0'), 'KEEPTTL')
+end
+""")
+
+
+class UsageLedger:
+    """
+    Ledger of the quota usage of hosted providers, in redis instead of an UPDATE of the provider row per message.
+
+    Per quota of a tenant, `used` counts the quota used in total and `pending` the usage not in the database yet,
+    both are incremented atomically when a message is created.
+    The pending usage of all quotas is written to the database in one batch by flush_usage_ledger_task,
+    dispatched at most every USAGE_LEDGER_FLUSH_INTERVAL seconds, which also reconciles `used` with the database.
+
+    In strict mode, a generation reserves its estimated usage before it starts and is rejected
+    when the used and reserved quota would exceed the quota limit by more than USAGE_LEDGER_STRICT_SLACK.
+    Reservations are released when the message is created, or expire after USAGE_LEDGER_RESERVATION_TTL seconds.
+    When redis fails, generations go on without a check or reservation of the ledger, the quota status of the
+    provider configuration still applies, and the message events record the usage in the database.
+    """
+
+    def reserve(self, application_generate_entity: ApplicationGenerateEntity) -> Optional[str]:
+        """
+        Check the quota of the hosted provider of a generation, and reserve its estimated usage in strict mode.
+
+        :param application_generate_entity: application generate entity
+        :return: reservation, None when nothing was reserved, also when redis failed
+        :raises QuotaExceededError: when the quota is used up
+        """
+        if not self._get_setting('USAGE_LEDGER_ENABLED', True):
+            return None
+
+        quota_configuration = self._get_quota_configuration(application_generate_entity)
+        if not quota_configuration:
+            return None
+
+        model_config = application_generate_entity.app_orchestration_config_entity.model_config
+        ledger_id = self._ledger_id(application_generate_entity.tenant_id, model_config.provider,
+                                    quota_configuration.quota_type.value)
+
+        if not self._get_setting('USAGE_LEDGER_STRICT_MODE', False):
+            try:
+                used = redis_client.get(self._used_key(ledger_id))
+            except RedisError:
+                logger.warning('Failed to check the quota of ledger %s, generating without it', ledger_id,
+                               exc_info=True)
+                return None
+
+            if used is not None and int(used) >= quota_configuration.quota_limit:
+                raise QuotaExceededError(f"Model provider {model_config.provider} quota exceeded.")
+
+            return None
+
+        if quota_configuration.quota_unit == QuotaUnit.TOKENS:
+            # the prompt is not built yet, reserve the tokens of the answer
+            amount = int(model_config.parameters.get('max_tokens')
+                         or self._get_setting('USAGE_LEDGER_TOKENS_RESERVATION', 1024))
+        else:
+            amount = self.calculate_used_quota(quota_configuration.quota_unit, model_config.model, 0)
+
+        now = time.time()
+        reservation = f'{uuid.uuid4()}:{amount}'
+        try:
+            reserved = _RESERVE_SCRIPT(
+                keys=[self._used_key(ledger_id), self._pending_key(ledger_id), self._reservations_key(ledger_id)],
+                args=[
+                    amount,
+                    quota_configuration.quota_used,
+                    quota_configuration.quota_limit,
+                    int(self._get_setting('USAGE_LEDGER_STRICT_SLACK', 0)),
+                    reservation,
+                    now,
+                    int(now + self._get_setting('USAGE_LEDGER_RESERVATION_TTL', 600)),
+                    USED_TTL
+                ]
+            )
+        except RedisError:
+            logger.warning('Failed to reserve quota of ledger %s, generating without a reservation', ledger_id,
+                           exc_info=True)
+            return None
+
+        if not reserved:
+            raise QuotaExceededError(f"Model provider {model_config.provider} quota exceeded.")
+
+        return reservation
+
+    def consume(self, application_generate_entity: ApplicationGenerateEntity, message: 'Message') -> None:
+        """
+        Record the quota used by a message, and release the reservation of its generation.
+
+        :param application_generate_entity: application generate entity
+        :param message: message
+        """
+        quota_configuration = self._get_quota_configuration(application_generate_entity)
+        if not quota_configuration:
+            return
+
+        model_config = application_generate_entity.app_orchestration_config_entity.model_config
+        used_quota = self.calculate_used_quota(quota_configuration.quota_unit, model_config.model,
+                                               message.message_tokens + message.answer_tokens)
+
+        tenant_id = application_generate_entity.tenant_id
+        ledger_id = self._ledger_id(tenant_id, model_config.provider, quota_configuration.quota_type.value)
+        used = int(_CONSUME_SCRIPT(
+            keys=[
+                self._used_key(ledger_id),
+                self._pending_key(ledger_id),
+                self._reservations_key(ledger_id),
+                DIRTY_KEY
+            ],
+            args=[
+                used_quota,
+                quota_configuration.quota_used,
+                ledger_id,
+                application_generate_entity.quota_reservation or '',
+                USED_TTL
+            ]
+        ))
+
+        # write a used up quota to the database at once, the quota status of providers is read from it
+        self.dispatch_flush(force=used >= quota_configuration.quota_limit)
+
+    def touch(self, tenant_id: str, provider_name: str) -> None:
+        """
+        Record the use of a provider, its last_used is written to the database by the next flush.
+
+        :param tenant_id: workspace id
+        :param provider_name: provider name
+        """
+        redis_client.hset(LAST_USED_KEY, self._last_used_field(tenant_id, provider_name), time.time())
+        self.dispatch_flush()
+
+    def dispatch_flush(self, force: bool = False) -> None:
+        """
+        Dispatch flush_usage_ledger_task, at most once every USAGE_LEDGER_FLUSH_INTERVAL seconds.
+
+        :param force: dispatch it regardless of the interval
+        """
+        interval = int(self._get_setting('USAGE_LEDGER_FLUSH_INTERVAL', 10))
+        if redis_client.set(FLUSH_THROTTLE_KEY, 1, nx=not force, ex=interval):
+            from tasks.flush_usage_ledger_task import flush_usage_ledger_task
+            flush_usage_ledger_task.delay()
+
+    def flush(self) -> int:
+        """
+        Write the pending usage and the last use of providers to the database, and reconcile the used counters.
+
+        :return: count of flushed quotas
+        """
+        lock = redis_client.lock(FLUSH_LOCK_KEY, timeout=300)
+        if not lock.acquire(blocking=False):
+            # another flush is running
+            return 0
+
+        try:
+            pending = self._take_pending()
+            if pending:
+                try:
+                    self._write_pending(pending)
+                except Exception:
+                    self._restore_pending(pending)
+                    raise
+
+            self._write_last_used()
+            self._reconcile(list(pending.keys()))
+
+            return len(pending)
+        finally:
+            lock.release()
+
+    @staticmethod
+    def calculate_used_quota(quota_unit: QuotaUnit, model: str, tokens: int) -> int:
+        """
+        Calculate the quota used by a message.
+
+        :param quota_unit: quota unit
+        :param model: model name
+        :param tokens: prompt and answer tokens of the message
+        :return: used quota
+        """
+        if quota_unit == QuotaUnit.TOKENS:
+            return tokens
+        elif quota_unit == QuotaUnit.CREDITS:
+            return 20 if 'gpt-4' in model else 1
+        else:
+            return 1
+
+    def _take_pending(self) -> dict[str, int]:
+        ledger_ids = set()
+        while True:
+            popped = redis_client.spop(DIRTY_KEY, 1000)
+            if not popped:
+                break
+
+            ledger_ids.update(ledger_id.decode('utf-8') for ledger_id in popped)
+
+        if not ledger_ids:
+            return {}
+
+        ledger_ids = list(ledger_ids)
+        pipeline = redis_client.pipeline(transaction=False)
+        for ledger_id in ledger_ids:
+            pipeline.getset(self._pending_key(ledger_id), 0)
+
+        return {ledger_id: int(delta) for ledger_id, delta in zip(ledger_ids, pipeline.execute())
+                if delta and int(delta)}
+
+    def _restore_pending(self, pending: dict[str, int]) -> None:
+        pipeline = redis_client.pipeline(transaction=False)
+        for ledger_id, delta in pending.items():
+            pipeline.incrby(self._pending_key(ledger_id), delta)
+            pipeline.sadd(DIRTY_KEY, ledger_id)
+        pipeline.execute()
+
+    def _write_pending(self, pending: dict[str, int]) -> None:
+        params = []
+        for ledger_id, delta in pending.items():
+            tenant_id, provider_name, quota_type = ledger_id.split(':', 2)
+            params.append({
+                '_tenant_id': tenant_id,
+                '_provider_name': provider_name,
+                '_quota_type': quota_type,
+                '_delta': delta
+            })
+
+        # one executemany statement for all quotas
+        providers = Provider.__table__
+        stmt = update(providers).where(and_(
+            providers.c.tenant_id == bindparam('_tenant_id'),
+            providers.c.provider_name == bindparam('_provider_name'),
+            providers.c.provider_type == ProviderType.SYSTEM.value,
+            providers.c.quota_type == bindparam('_quota_type')
+        )).values(quota_used=providers.c.quota_used + bindparam('_delta'))
+
+        db.session.execute(stmt, params)
+        db.session.commit()
+
+    def _write_last_used(self) -> None:
+        # the recorded uses are moved aside first, a failed write is retried by the next flush
+        if not redis_client.exists(LAST_USED_FLUSHING_KEY):
+            if not redis_client.exists(LAST_USED_KEY):
+                return
+
+            redis_client.rename(LAST_USED_KEY, LAST_USED_FLUSHING_KEY)
+
+        last_used_map = redis_client.hgetall(LAST_USED_FLUSHING_KEY)
+        if last_used_map:
+            params = []
+            for field, last_used in last_used_map.items():
+                tenant_id, provider_name = field.decode('utf-8').split(':', 1)
+                params.append({
+                    '_tenant_id': tenant_id,
+                    '_provider_name': provider_name,
+                    '_last_used': datetime.utcfromtimestamp(float(last_used))
+                })
+
+            providers = Provider.__table__
+            stmt = update(providers).where(and_(
+                providers.c.tenant_id == bindparam('_tenant_id'),
+                providers.c.provider_name == bindparam('_provider_name')
+            )).values(last_used=bindparam('_last_used'))
+
+            db.session.execute(stmt, params)
+            db.session.commit()
+
+        redis_client.delete(LAST_USED_FLUSHING_KEY)
+
+    def _reconcile(self, ledger_ids: list[str]) -> None:
+        """
+        Set the used counters to the quota used in the database plus the pending usage,
+        which corrects lost redis writes and quotas changed in the database, e.g. paid quotas.
+        """
+        if not ledger_ids:
+            return
+
+        keys = [tuple(ledger_id.split(':', 2)) for ledger_id in ledger_ids]
+        rows = db.session.query(
+            Provider.tenant_id, Provider.provider_name, Provider.quota_type, Provider.quota_used, Provider.quota_limit
+        ).filter(
+            Provider.provider_type == ProviderType.SYSTEM.value,
+            tuple_(Provider.tenant_id, Provider.provider_name, Provider.quota_type).in_(keys)
+        ).all()
+
+        for row in rows:
+            ledger_id = self._ledger_id(row.tenant_id, row.provider_name, row.quota_type)
+            _RECONCILE_SCRIPT(keys=[self._used_key(ledger_id), self._pending_key(ledger_id)],
+                              args=[row.quota_used or 0])
+
+            # the quota status of the provider configurations is read from the database
+            if row.quota_limit is not None and row.quota_limit != -1 and (row.quota_used or 0) >= row.quota_limit:
+                provider_configurations_cache.invalidate(row.tenant_id)
+
+    @staticmethod
+    def _get_quota_configuration(application_generate_entity: ApplicationGenerateEntity) \
+            -> Optional[QuotaConfiguration]:
+        """
+        Get the current quota of a generation, None when it does not use a limited quota of a hosted provider.
+        """
+        model_config = application_generate_entity.app_orchestration_config_entity.model_config
+        provider_configuration = model_config.provider_model_bundle.configuration
+
+        if provider_configuration.using_provider_type != ProviderType.SYSTEM:
+            return None
+
+        system_configuration = provider_configuration.system_configuration
+        for quota_configuration in system_configuration.quota_configurations:
+            if quota_configuration.quota_type == system_configuration.current_quota_type:
+                if quota_configuration.quota_limit == -1:
+                    return None
+
+                return quota_configuration
+
+        return None
+
+    @staticmethod
+    def _get_setting(name: str, default):
+        if not has_app_context():
+            return default
+
+        return current_app.config.get(name, default)
+
+    @staticmethod
+    def _ledger_id(tenant_id: str, provider_name: str, quota_type: str) -> str:
+        return f"{tenant_id}:{provider_name}:{quota_type}"
+
+    @staticmethod
+    def _used_key(ledger_id: str) -> str:
+        return f"usage_ledger:used:{ledger_id}"
+
+    @staticmethod
+    def _pending_key(ledger_id: str) -> str:
+        return f"usage_ledger:pending:{ledger_id}"
+
+    @staticmethod
+    def _reservations_key(ledger_id: str) -> str:
+        return f"usage_ledger:reservations:{ledger_id}"
+
+    @staticmethod
+    def _last_used_field(tenant_id: str, provider_name: str) -> str:
+        return f"{tenant_id}:{provider_name}"
+
+
+usage_ledger = UsageLedger()
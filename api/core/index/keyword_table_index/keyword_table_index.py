@@ -1,14 +1,16 @@
-import json
 from collections import defaultdict
-from typing import Any, Optional
+from typing import Any
 
 from langchain.schema import BaseRetriever, Document
 from pydantic import BaseModel, Extra, Field
+from sqlalchemy import literal_column, text
+from sqlalchemy.dialects.postgresql import insert
 
+from core.docstore.segment_hydrator import SegmentHydrator
 from core.index.base import BaseIndex
 from core.index.keyword_table_index.jieba_keyword_table_handler import JiebaKeywordTableHandler
 from extensions.ext_database import db
-from models.dataset import Dataset, DatasetKeywordTable, DocumentSegment
+from models.dataset import Dataset, DatasetKeyword, DocumentSegment
 
 
 class KeywordTableConfig(BaseModel):
@@ -16,96 +18,55 @@ class KeywordTableConfig(BaseModel):
 
 
 class KeywordTableIndex(BaseIndex):
+    _UPSERT_BATCH_SIZE = 1000
+
     def __init__(self, dataset: Dataset, config: KeywordTableConfig = KeywordTableConfig()):
         super().__init__(dataset)
         self._config = config
 
     def create(self, texts: list[Document], **kwargs) -> BaseIndex:
-        keyword_table_handler = JiebaKeywordTableHandler()
-        keyword_table = {}
-        for text in texts:
-            keywords = keyword_table_handler.extract_keywords(text.page_content, self._config.max_keywords_per_chunk)
-            self._update_segment_keywords(self.dataset.id, text.metadata['doc_id'], list(keywords))
-            keyword_table = self._add_text_to_keyword_table(keyword_table, text.metadata['doc_id'], list(keywords))
-
-        dataset_keyword_table = DatasetKeywordTable(
-            dataset_id=self.dataset.id,
-            keyword_table=json.dumps({
-                '__type__': 'keyword_table',
-                '__data__': {
-                    "index_id": self.dataset.id,
-                    "summary": None,
-                    "table": {}
-                }
-            }, cls=SetEncoder)
-        )
-        db.session.add(dataset_keyword_table)
-        db.session.commit()
-
-        self._save_dataset_keyword_table(keyword_table)
+        self.add_texts(texts)
 
         return self
 
     def create_with_collection_name(self, texts: list[Document], collection_name: str, **kwargs) -> BaseIndex:
-        keyword_table_handler = JiebaKeywordTableHandler()
-        keyword_table = {}
-        for text in texts:
-            keywords = keyword_table_handler.extract_keywords(text.page_content, self._config.max_keywords_per_chunk)
-            self._update_segment_keywords(self.dataset.id, text.metadata['doc_id'], list(keywords))
-            keyword_table = self._add_text_to_keyword_table(keyword_table, text.metadata['doc_id'], list(keywords))
-
-        dataset_keyword_table = DatasetKeywordTable(
-            dataset_id=self.dataset.id,
-            keyword_table=json.dumps({
-                '__type__': 'keyword_table',
-                '__data__': {
-                    "index_id": self.dataset.id,
-                    "summary": None,
-                    "table": {}
-                }
-            }, cls=SetEncoder)
-        )
-        db.session.add(dataset_keyword_table)
-        db.session.commit()
-
-        self._save_dataset_keyword_table(keyword_table)
+        self.add_texts(texts)
 
         return self
 
     def add_texts(self, texts: list[Document], **kwargs):
         keyword_table_handler = JiebaKeywordTableHandler()
 
-        keyword_table = self._get_dataset_keyword_table()
-        for text in texts:
-            keywords = keyword_table_handler.extract_keywords(text.page_content, self._config.max_keywords_per_chunk)
-            self._update_segment_keywords(self.dataset.id, text.metadata['doc_id'], list(keywords))
-            keyword_table = self._add_text_to_keyword_table(keyword_table, text.metadata['doc_id'], list(keywords))
+        segment_keywords = {}
+        for document in texts:
+            keywords = keyword_table_handler.extract_keywords(document.page_content,
+                                                              self._config.max_keywords_per_chunk)
+            segment_keywords[document.metadata['doc_id']] = list(keywords)
 
-        self._save_dataset_keyword_table(keyword_table)
+        self._update_segments_keywords(segment_keywords)
+        self._add_to_keyword_index(segment_keywords)
 
     def text_exists(self, id: str) -> bool:
-        keyword_table = self._get_dataset_keyword_table()
-        return id in set.union(*keyword_table.values())
+        keyword = db.session.query(DatasetKeyword.id).filter(
+            DatasetKeyword.dataset_id == self.dataset.id,
+            DatasetKeyword.node_ids.contains([id])
+        ).first()
 
-    def delete_by_ids(self, ids: list[str]) -> None:
-        keyword_table = self._get_dataset_keyword_table()
-        keyword_table = self._delete_ids_from_keyword_table(keyword_table, ids)
+        return keyword is not None
 
-        self._save_dataset_keyword_table(keyword_table)
+    def delete_by_ids(self, ids: list[str]) -> None:
+        self._delete_from_keyword_index(ids)
 
     def delete_by_document_id(self, document_id: str):
         # get segment ids by document_id
-        segments = db.session.query(DocumentSegment).filter(
+        segments = db.session.query(DocumentSegment.index_node_id).filter(
             DocumentSegment.dataset_id == self.dataset.id,
             DocumentSegment.document_id == document_id
         ).all()
 
         ids = [segment.index_node_id for segment in segments]
 
-        keyword_table = self._get_dataset_keyword_table()
-        keyword_table = self._delete_ids_from_keyword_table(keyword_table, ids)
-
-        self._save_dataset_keyword_table(keyword_table)
+        self._delete_from_keyword_index(ids)
 
     def delete_by_metadata_field(self, key: str, value: str):
         pass
@@ -117,114 +78,133 @@ class KeywordTableIndex(BaseIndex):
             self, query: str,
             **kwargs: Any
     ) -> list[Document]:
-        keyword_table = self._get_dataset_keyword_table()
-
         search_kwargs = kwargs.get('search_kwargs') if kwargs.get('search_kwargs') else {}
         k = search_kwargs.get('k') if search_kwargs.get('k') else 4
 
-        sorted_chunk_indices = self._retrieve_ids_by_query(keyword_table, query, k)
+        sorted_chunk_indices = self._retrieve_ids_by_query(query, k)
+
+        hydrated_segments = SegmentHydrator.hydrate(
+            dataset_ids=[self.dataset.id],
+            index_node_ids=sorted_chunk_indices,
+            available_only=False
+        )
 
         documents = []
-        for chunk_index in sorted_chunk_indices:
-            segment = db.session.query(DocumentSegment).filter(
-                DocumentSegment.dataset_id == self.dataset.id,
-                DocumentSegment.index_node_id == chunk_index
-            ).first()
-
-            if segment:
-                documents.append(Document(
-                    page_content=segment.content,
-                    metadata={
-                        "doc_id": chunk_index,
-                        "doc_hash": segment.index_node_hash,
-                        "document_id": segment.document_id,
-                        "dataset_id": segment.dataset_id,
-                    }
-                ))
+        for hydrated_segment in hydrated_segments:
+            segment = hydrated_segment.segment
+            documents.append(Document(
+                page_content=segment.content,
+                metadata={
+                    "doc_id": segment.index_node_id,
+                    "doc_hash": segment.index_node_hash,
+                    "document_id": segment.document_id,
+                    "dataset_id": segment.dataset_id,
+                }
+            ))
 
         return documents
 
     def delete(self) -> None:
-        dataset_keyword_table = self.dataset.dataset_keyword_table
-        if dataset_keyword_table:
-            db.session.delete(dataset_keyword_table)
-            db.session.commit()
+        self._delete_keyword_index()
 
     def delete_by_group_id(self, group_id: str) -> None:
+        self._delete_keyword_index()
+
+    def _delete_keyword_index(self):
+        db.session.query(DatasetKeyword).filter(DatasetKeyword.dataset_id == self.dataset.id).delete()
+
+        # keyword table json document of the legacy index
         dataset_keyword_table = self.dataset.dataset_keyword_table
         if dataset_keyword_table:
             db.session.delete(dataset_keyword_table)
-            db.session.commit()
-
-    def _save_dataset_keyword_table(self, keyword_table):
-        keyword_table_dict = {
-            '__type__': 'keyword_table',
-            '__data__': {
-                "index_id": self.dataset.id,
-                "summary": None,
-                "table": keyword_table
-            }
-        }
-        self.dataset.dataset_keyword_table.keyword_table = json.dumps(keyword_table_dict, cls=SetEncoder)
+
         db.session.commit()
 
-    def _get_dataset_keyword_table(self) -> Optional[dict]:
-        dataset_keyword_table = self.dataset.dataset_keyword_table
-        if dataset_keyword_table:
-            if dataset_keyword_table.keyword_table_dict:
-                return dataset_keyword_table.keyword_table_dict['__data__']['table']
-        else:
-            dataset_keyword_table = DatasetKeywordTable(
-                dataset_id=self.dataset.id,
-                keyword_table=json.dumps({
-                    '__type__': 'keyword_table',
-                    '__data__': {
-                        "index_id": self.dataset.id,
-                        "summary": None,
-                        "table": {}
-                    }
-                }, cls=SetEncoder)
+    def _add_to_keyword_index(self, segment_keywords: dict[str, list[str]]):
+        """
+        Merge the node ids into the posting lists of their keywords.
+
+        :param segment_keywords: keywords of each segment, keyed by index node id
+        """
+        keyword_table = defaultdict(set)
+        for node_id, keywords in segment_keywords.items():
+            for keyword in keywords:
+                keyword_table[keyword].add(node_id)
+
+        if not keyword_table:
+            return
+
+        # upsert in a stable keyword order, so that concurrent upserts lock rows in the same order
+        rows = [
+            {
+                'dataset_id': self.dataset.id,
+                'keyword': keyword,
+                'node_ids': sorted(keyword_table[keyword])
+            }
+            for keyword in sorted(keyword_table.keys())
+        ]
+
+        for i in range(0, len(rows), self._UPSERT_BATCH_SIZE):
+            stmt = insert(DatasetKeyword).values(rows[i:i + self._UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['dataset_id', 'keyword'],
+                set_={
+                    'node_ids': literal_column(
+                        'ARRAY(SELECT DISTINCT unnest(dataset_keywords.node_ids || excluded.node_ids))'
+                    )
+                }
             )
-            db.session.add(dataset_keyword_table)
-            db.session.commit()
-
-        return {}
-
-    def _add_text_to_keyword_table(self, keyword_table: dict, id: str, keywords: list[str]) -> dict:
-        for keyword in keywords:
-            if keyword not in keyword_table:
-                keyword_table[keyword] = set()
-            keyword_table[keyword].add(id)
-        return keyword_table
-
-    def _delete_ids_from_keyword_table(self, keyword_table: dict, ids: list[str]) -> dict:
-        # get set of ids that correspond to node
-        node_idxs_to_delete = set(ids)
-
-        # delete node_idxs from keyword to node idxs mapping
-        keywords_to_delete = set()
-        for keyword, node_idxs in keyword_table.items():
-            if node_idxs_to_delete.intersection(node_idxs):
-                keyword_table[keyword] = node_idxs.difference(
-                    node_idxs_to_delete
-                )
-                if not keyword_table[keyword]:
-                    keywords_to_delete.add(keyword)
-
-        for keyword in keywords_to_delete:
-            del keyword_table[keyword]
-
-        return keyword_table
-
-    def _retrieve_ids_by_query(self, keyword_table: dict, query: str, k: int = 4):
+            db.session.execute(stmt)
+
+        db.session.commit()
+
+    def _delete_from_keyword_index(self, ids: list[str]):
+        """
+        Remove the node ids from every posting list containing them, and drop emptied keywords.
+
+        :param ids: index node ids
+        """
+        if not ids:
+            return
+
+        updated_keywords = db.session.execute(
+            text('UPDATE dataset_keywords '
+                 'SET node_ids = ARRAY(SELECT unnest(node_ids) EXCEPT SELECT unnest(CAST(:ids AS text[]))) '
+                 'WHERE dataset_id = :dataset_id AND node_ids && CAST(:ids AS text[]) '
+                 'RETURNING id, cardinality(node_ids) AS node_count'),
+            {'dataset_id': self.dataset.id, 'ids': list(ids)}
+        ).fetchall()
+
+        empty_keyword_ids = [keyword.id for keyword in updated_keywords if keyword.node_count == 0]
+        if empty_keyword_ids:
+            db.session.query(DatasetKeyword).filter(
+                DatasetKeyword.id.in_(empty_keyword_ids)
+            ).delete(synchronize_session=False)
+
+        db.session.commit()
+
+    def _get_keyword_posting_lists(self, keywords: list[str]) -> dict[str, list[str]]:
+        if not keywords:
+            return {}
+
+        rows = db.session.query(DatasetKeyword.keyword, DatasetKeyword.node_ids).filter(
+            DatasetKeyword.dataset_id == self.dataset.id,
+            DatasetKeyword.keyword.in_(keywords)
+        ).all()
+
+        return {row.keyword: row.node_ids for row in rows}
+
+    def _retrieve_ids_by_query(self, query: str, k: int = 4):
         keyword_table_handler = JiebaKeywordTableHandler()
         keywords = keyword_table_handler.extract_keywords(query)
 
+        # only the posting lists of the query keywords are fetched
+        keyword_table = self._get_keyword_posting_lists(list(keywords))
+
         # go through text chunks in order of most matching keywords
         chunk_indices_count: dict[str, int] = defaultdict(int)
-        keywords = [keyword for keyword in keywords if keyword in set(keyword_table.keys())]
-        for keyword in keywords:
-            for node_id in keyword_table[keyword]:
+        for node_ids in keyword_table.values():
+            for node_id in node_ids:
                 chunk_indices_count[node_id] += 1
 
         sorted_chunk_indices = sorted(
@@ -235,41 +215,39 @@ class KeywordTableIndex(BaseIndex):
 
         return sorted_chunk_indices[: k]
 
-    def _update_segment_keywords(self, dataset_id: str, node_id: str, keywords: list[str]):
-        document_segment = db.session.query(DocumentSegment).filter(
-            DocumentSegment.dataset_id == dataset_id,
-            DocumentSegment.index_node_id == node_id
-        ).first()
-        if document_segment:
-            document_segment.keywords = keywords
-            db.session.commit()
+    def _update_segments_keywords(self, segment_keywords: dict[str, list[str]]):
+        if not segment_keywords:
+            return
+
+        document_segments = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == self.dataset.id,
+            DocumentSegment.index_node_id.in_(list(segment_keywords.keys()))
+        ).all()
+        for document_segment in document_segments:
+            document_segment.keywords = segment_keywords[document_segment.index_node_id]
+
+        db.session.commit()
 
     def create_segment_keywords(self, node_id: str, keywords: list[str]):
-        keyword_table = self._get_dataset_keyword_table()
-        self._update_segment_keywords(self.dataset.id, node_id, keywords)
-        keyword_table = self._add_text_to_keyword_table(keyword_table, node_id, keywords)
-        self._save_dataset_keyword_table(keyword_table)
+        self._update_segments_keywords({node_id: keywords})
+        self._add_to_keyword_index({node_id: keywords})
 
     def multi_create_segment_keywords(self, pre_segment_data_list: list):
         keyword_table_handler = JiebaKeywordTableHandler()
-        keyword_table = self._get_dataset_keyword_table()
+        segment_keywords = {}
         for pre_segment_data in pre_segment_data_list:
             segment = pre_segment_data['segment']
             if pre_segment_data['keywords']:
                 segment.keywords = pre_segment_data['keywords']
-                keyword_table = self._add_text_to_keyword_table(keyword_table, segment.index_node_id,
-                                                                pre_segment_data['keywords'])
             else:
                 keywords = keyword_table_handler.extract_keywords(segment.content,
                                                                   self._config.max_keywords_per_chunk)
                 segment.keywords = list(keywords)
-                keyword_table = self._add_text_to_keyword_table(keyword_table, segment.index_node_id, list(keywords))
-        self._save_dataset_keyword_table(keyword_table)
+            segment_keywords[segment.index_node_id] = segment.keywords
+        self._add_to_keyword_index(segment_keywords)
 
     def update_segment_keywords_index(self, node_id: str, keywords: list[str]):
-        keyword_table = self._get_dataset_keyword_table()
-        keyword_table = self._add_text_to_keyword_table(keyword_table, node_id, keywords)
-        self._save_dataset_keyword_table(keyword_table)
+        self._add_to_keyword_index({node_id: keywords})
 
 
 class KeywordTableRetriever(BaseRetriever, BaseModel):
@@ -296,9 +274,3 @@ class KeywordTableRetriever(BaseRetriever, BaseModel):
     async def aget_relevant_documents(self, query: str) -> list[Document]:
         raise NotImplementedError("KeywordTableRetriever does not support async")
 
-
-class SetEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, set):
-            return list(obj)
-        return super().default(obj)
@@ -10,6 +10,7 @@ from qdrant_client.http.models import HnswConfigDiff
 
 from core.index.base import BaseIndex
 from core.index.vector_index.base import BaseVectorIndex
+from core.vector_store.client_pool import VectorStoreClientPool
 from core.vector_store.qdrant_vector_store import QdrantVectorStore
 from extensions.ext_database import db
 from models.dataset import Dataset, DatasetCollectionBinding
@@ -38,6 +39,13 @@ class QdrantConfig(BaseModel):
             }
 
 
+qdrant_client_pool = VectorStoreClientPool(
+    name='qdrant',
+    factory=lambda params: qdrant_client.QdrantClient(**params),
+    health_check=lambda client: client.get_collections()
+)
+
+
 class QdrantVectorIndex(BaseVectorIndex):
     def __init__(self, dataset: Dataset, config: QdrantConfig, embeddings: Embeddings):
         super().__init__(dataset, embeddings)
@@ -81,7 +89,7 @@ class QdrantVectorIndex(BaseVectorIndex):
             group_payload_key='group_id',
             hnsw_config=HnswConfigDiff(m=0, payload_m=16, ef_construct=100, full_scan_threshold=10000,
                                        max_indexing_threads=0, on_disk=False),
-            **self._client_config.to_qdrant_params()
+            client=qdrant_client_pool.get(self._client_config.to_qdrant_params())
         )
 
         return self
@@ -98,7 +106,7 @@ class QdrantVectorIndex(BaseVectorIndex):
             group_payload_key='group_id',
             hnsw_config=HnswConfigDiff(m=0, payload_m=16, ef_construct=100, full_scan_threshold=10000,
                                        max_indexing_threads=0, on_disk=False),
-            **self._client_config.to_qdrant_params()
+            client=qdrant_client_pool.get(self._client_config.to_qdrant_params())
         )
 
         return self
@@ -107,13 +115,8 @@ class QdrantVectorIndex(BaseVectorIndex):
         """Only for created index."""
         if self._vector_store:
             return self._vector_store
-        attributes = ['doc_id', 'dataset_id', 'document_id']
-        client = qdrant_client.QdrantClient(
-            **self._client_config.to_qdrant_params()
-        )
-
         return QdrantVectorStore(
-            client=client,
+            client=qdrant_client_pool.get(self._client_config.to_qdrant_params()),
             collection_name=self.get_index_name(self.dataset),
             embeddings=self._embeddings,
             content_payload_key='page_content',
@@ -9,6 +9,7 @@ from pydantic import BaseModel, root_validator
 
 from core.index.base import BaseIndex
 from core.index.vector_index.base import BaseVectorIndex
+from core.vector_store.client_pool import VectorStoreClientPool
 from core.vector_store.weaviate_vector_store import WeaviateVectorStore
 from models.dataset import Dataset
 
@@ -25,39 +26,58 @@ class WeaviateConfig(BaseModel):
         return values
 
 
-class WeaviateVectorIndex(BaseVectorIndex):
+def _create_weaviate_client(params: dict) -> weaviate.Client:
+    auth_config = weaviate.auth.AuthApiKey(api_key=params['api_key'])
 
-    def __init__(self, dataset: Dataset, config: WeaviateConfig, embeddings: Embeddings, attributes: list):
-        super().__init__(dataset, embeddings)
-        self._client = self._init_client(config)
-        self._attributes = attributes
+    weaviate.connect.connection.has_grpc = False
 
-    def _init_client(self, config: WeaviateConfig) -> weaviate.Client:
-        auth_config = weaviate.auth.AuthApiKey(api_key=config.api_key)
+    try:
+        client = weaviate.Client(
+            url=params['endpoint'],
+            auth_client_secret=auth_config,
+            timeout_config=(5, 60),
+            startup_period=None
+        )
+    except requests.exceptions.ConnectionError:
+        raise ConnectionError("Vector database connection error")
 
-        weaviate.connect.connection.has_grpc = False
+    client.batch.configure(
+        # `batch_size` takes an `int` value to enable auto-batching
+        # (`None` is used for manual batching)
+        batch_size=params['batch_size'],
+        # dynamically update the `batch_size` based on import speed
+        dynamic=True,
+        # `timeout_retries` takes an `int` value to retry on time outs
+        timeout_retries=3,
+    )
+
+    return client
 
-        try:
-            client = weaviate.Client(
-                url=config.endpoint,
-                auth_client_secret=auth_config,
-                timeout_config=(5, 60),
-                startup_period=None
-            )
-        except requests.exceptions.ConnectionError:
-            raise ConnectionError("Vector database connection error")
-
-        client.batch.configure(
-            # `batch_size` takes an `int` value to enable auto-batching
-            # (`None` is used for manual batching)
-            batch_size=config.batch_size,
-            # dynamically update the `batch_size` based on import speed
-            dynamic=True,
-            # `timeout_retries` takes an `int` value to retry on time outs
-            timeout_retries=3,
-        )
 
-        return client
+def _check_weaviate_client(client: weaviate.Client) -> None:
+    if not client.is_ready():
+        raise ConnectionError("Vector database is not ready")
+
+
+weaviate_client_pool = VectorStoreClientPool(
+    name='weaviate',
+    factory=_create_weaviate_client,
+    health_check=_check_weaviate_client
+)
+
+
+class WeaviateVectorIndex(BaseVectorIndex):
+
+    def __init__(self, dataset: Dataset, config: WeaviateConfig, embeddings: Embeddings, attributes: list):
+        super().__init__(dataset, embeddings)
+        self._client_params = {
+            'endpoint': config.endpoint,
+            'api_key': config.api_key,
+            'batch_size': config.batch_size
+        }
+        # the lock guards the batch of the client the index holds, also once the pool replaced it
+        self._client, self._client_lock = weaviate_client_pool.get_with_lock(self._client_params)
+        self._attributes = attributes
 
     def get_type(self) -> str:
         return 'weaviate'
@@ -82,30 +102,37 @@ class WeaviateVectorIndex(BaseVectorIndex):
 
     def create(self, texts: list[Document], **kwargs) -> BaseIndex:
         uuids = self._get_uuids(texts)
-        self._vector_store = WeaviateVectorStore.from_documents(
-            texts,
-            self._embeddings,
-            client=self._client,
-            index_name=self.get_index_name(self.dataset),
-            uuids=uuids,
-            by_text=False
-        )
+        # the batch of the shared client is not thread safe
+        with self._client_lock:
+            self._vector_store = WeaviateVectorStore.from_documents(
+                texts,
+                self._embeddings,
+                client=self._client,
+                index_name=self.get_index_name(self.dataset),
+                uuids=uuids,
+                by_text=False
+            )
 
         return self
 
     def create_with_collection_name(self, texts: list[Document], collection_name: str, **kwargs) -> BaseIndex:
         uuids = self._get_uuids(texts)
-        self._vector_store = WeaviateVectorStore.from_documents(
-            texts,
-            self._embeddings,
-            client=self._client,
-            index_name=self.get_index_name(self.dataset),
-            uuids=uuids,
-            by_text=False
-        )
+        with self._client_lock:
+            self._vector_store = WeaviateVectorStore.from_documents(
+                texts,
+                self._embeddings,
+                client=self._client,
+                index_name=self.get_index_name(self.dataset),
+                uuids=uuids,
+                by_text=False
+            )
 
         return self
 
+    def add_texts(self, texts: list[Document], **kwargs):
+        with self._client_lock:
+            super().add_texts(texts, **kwargs)
+
 
     def _get_vector_store(self) -> VectorStore:
         """Only for created index."""
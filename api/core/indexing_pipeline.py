@@ -0,0 +1,172 @@
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from typing import Optional
+
+from flask import Flask
+from langchain.schema import Document
+
+logger = logging.getLogger(__name__)
+
+# sentinel put on a stage queue to tell one worker of the stage to exit
+_STOP = object()
+
+
+class IndexingStage:
+    """
+    Stage of an indexing pipeline.
+
+    processor_factory is called once per worker, inside the worker's flask app context,
+    so that each worker can build its own indexes and database session state.
+    The processor it returns is called with each batch of documents, and may return the batch
+    passed on to the next stage, e.g. with data computed by the stage; None passes its input on.
+    """
+
+    def __init__(self, name: str,
+                 processor_factory: Callable[[], Callable[[list[Document]], Optional[list[Document]]]],
+                 concurrency: int = 1) -> None:
+        self.name = name
+        self.processor_factory = processor_factory
+        self.concurrency = max(int(concurrency), 1)
+
+
+class IndexingStageStats:
+    """Throughput counters of a stage."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.batches = 0
+        self.documents = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, documents: int, busy_seconds: float) -> None:
+        with self._lock:
+            self.batches += 1
+            self.documents += documents
+            self.busy_seconds += busy_seconds
+
+    @property
+    def throughput(self) -> float:
+        """Documents per busy second of the stage workers."""
+        return self.documents / self.busy_seconds if self.busy_seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'stage': self.name,
+            'batches': self.batches,
+            'documents': self.documents,
+            'busy_seconds': round(self.busy_seconds, 4),
+            'throughput': round(self.throughput, 2)
+        }
+
+
+class IndexingPipeline:
+    """
+    Run batches of documents through a chain of stages.
+
+    Stages are connected by bounded queues and each stage runs its own worker threads,
+    so that e.g. embedding of a batch overlaps with the vector upsert of the previous one.
+    The first error raised by any stage (including the before_batch check) stops the pipeline
+    and is re-raised by run().
+    """
+
+    def __init__(self, flask_app: Flask, stages: list[IndexingStage], queue_size: int = 4,
+                 before_batch: Optional[Callable[[], None]] = None) -> None:
+        self._flask_app = flask_app
+        self._stages = stages
+        self._queue_size = max(int(queue_size), 1)
+        self._before_batch = before_batch
+        self._error: Optional[BaseException] = None
+        self._error_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.stats = [IndexingStageStats(stage.name) for stage in stages]
+
+    def run(self, batches: list[list[Document]]) -> list[IndexingStageStats]:
+        queues = [queue.Queue(maxsize=self._queue_size) for _ in self._stages]
+        queues.append(None)
+
+        stage_workers = []
+        for index, stage in enumerate(self._stages):
+            workers = []
+            for _ in range(stage.concurrency):
+                worker = threading.Thread(target=self._worker, kwargs={
+                    'stage': stage,
+                    'stats': self.stats[index],
+                    'input_queue': queues[index],
+                    'output_queue': queues[index + 1]
+                })
+                worker.start()
+                workers.append(worker)
+            stage_workers.append(workers)
+
+        try:
+            for batch in batches:
+                if self._stopped.is_set():
+                    break
+
+                if self._before_batch:
+                    self._before_batch()
+
+                self._put(queues[0], batch)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            # stop the stages in order, once a stage is drained its output is complete
+            for index, workers in enumerate(stage_workers):
+                for _ in workers:
+                    queues[index].put(_STOP)
+                for worker in workers:
+                    worker.join()
+
+        for stats in self.stats:
+            logger.info('Indexing stage %s: %s documents in %s batches, %.2fs busy, %.2f documents/s',
+                        stats.name, stats.documents, stats.batches, stats.busy_seconds, stats.throughput)
+
+        if self._error:
+            raise self._error
+
+        return self.stats
+
+    def _worker(self, stage: IndexingStage, stats: IndexingStageStats,
+                input_queue: queue.Queue, output_queue: Optional[queue.Queue]) -> None:
+        with self._flask_app.app_context():
+            processor = None
+            while True:
+                batch = input_queue.get()
+                if batch is _STOP:
+                    break
+
+                # keep draining after a failure, so that upstream stages never block on a full queue
+                if self._stopped.is_set():
+                    continue
+
+                try:
+                    if processor is None:
+                        processor = stage.processor_factory()
+
+                    start_at = time.perf_counter()
+                    output_batch = processor(batch)
+                    stats.record(len(batch), time.perf_counter() - start_at)
+                except BaseException as e:
+                    self._fail(e)
+                    continue
+
+                if output_queue is not None:
+                    self._put(output_queue, batch if output_batch is None else output_batch)
+
+    def _put(self, target_queue: queue.Queue, batch: list[Document]) -> None:
+        while not self._stopped.is_set():
+            try:
+                target_queue.put(batch, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _fail(self, error: BaseException) -> None:
+        with self._error_lock:
+            if not self._stopped.is_set():
+                self._error = error
+                self._stopped.set()
@@ -16,9 +16,13 @@ from sqlalchemy.orm.exc import ObjectDeletedError
 from core.data_loader.file_extractor import FileExtractor
 from core.data_loader.loader.notion import NotionLoader
 from core.docstore.dataset_docstore import DatasetDocumentStore
+from core.embedding.cached_embedding import CacheEmbedding
+from core.embedding.precomputed_embedding import EmbeddedDocuments, PrecomputedEmbedding
 from core.errors.error import ProviderTokenNotInitError
 from core.generator.llm_generator import LLMGenerator
 from core.index.index import IndexBuilder
+from core.index.vector_index.vector_index import VectorIndex
+from core.indexing_pipeline import IndexingPipeline, IndexingStage
 from core.model_manager import ModelInstance, ModelManager
 from core.model_runtime.entities.model_entities import ModelType, PriceType
 from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
@@ -300,14 +304,15 @@ class IndexingRunner:
             for document in documents:
                 if len(preview_texts) < 5:
                     preview_texts.append(document.page_content)
-                if indexing_technique == 'high_quality' or embedding_model_instance:
-                    embedding_model_type_instance = embedding_model_instance.model_type_instance
-                    embedding_model_type_instance = cast(TextEmbeddingModel, embedding_model_type_instance)
-                    tokens += embedding_model_type_instance.get_num_tokens(
-                        model=embedding_model_instance.model,
-                        credentials=embedding_model_instance.credentials,
-                        texts=[self.filter_string(document.page_content)]
-                    )
+
+            if indexing_technique == 'high_quality' or embedding_model_instance:
+                embedding_model_type_instance = embedding_model_instance.model_type_instance
+                embedding_model_type_instance = cast(TextEmbeddingModel, embedding_model_type_instance)
+                tokens += sum(embedding_model_type_instance.get_num_tokens_batch(
+                    model=embedding_model_instance.model,
+                    credentials=embedding_model_instance.credentials,
+                    texts=[self.filter_string(document.page_content) for document in documents]
+                ))
 
         if doc_form and doc_form == 'qa_model':
             model_instance = self.model_manager.get_default_model_instance(
@@ -439,12 +444,13 @@ class IndexingRunner:
                 for document in documents:
                     if len(preview_texts) < 5:
                         preview_texts.append(document.page_content)
-                    if indexing_technique == 'high_quality' and embedding_model_type_instance:
-                        tokens += embedding_model_type_instance.get_num_tokens(
-                            model=embedding_model_instance.model,
-                            credentials=embedding_model_instance.credentials,
-                            texts=[document.page_content]
-                        )
+
+                if indexing_technique == 'high_quality' and embedding_model_type_instance:
+                    tokens += sum(embedding_model_type_instance.get_num_tokens_batch(
+                        model=embedding_model_instance.model,
+                        credentials=embedding_model_instance.credentials,
+                        texts=[document.page_content for document in documents]
+                    ))
 
         if doc_form and doc_form == 'qa_model':
             model_instance = self.model_manager.get_default_model_instance(
@@ -564,7 +570,8 @@ class IndexingRunner:
                 chunk_overlap=segmentation.get('chunk_overlap', 0),
                 fixed_separator=separator,
                 separators=["\n\n", "。", ".", " ", ""],
-                embedding_model_instance=embedding_model_instance
+                embedding_model_instance=embedding_model_instance,
+                token_offsets=current_app.config['TEXT_SPLITTER_TOKEN_OFFSETS']
             )
         else:
             # Automatic segmentation
@@ -572,7 +579,8 @@ class IndexingRunner:
                 chunk_size=DatasetProcessRule.AUTOMATIC_RULES['segmentation']['max_tokens'],
                 chunk_overlap=DatasetProcessRule.AUTOMATIC_RULES['segmentation']['chunk_overlap'],
                 separators=["\n\n", "。", ".", " ", ""],
-                embedding_model_instance=embedding_model_instance
+                embedding_model_instance=embedding_model_instance,
+                token_offsets=current_app.config['TEXT_SPLITTER_TOKEN_OFFSETS']
             )
 
         return character_splitter
@@ -773,9 +781,15 @@ class IndexingRunner:
     def _build_index(self, dataset: Dataset, dataset_document: DatasetDocument, documents: list[Document]) -> None:
         """
         Build the index for the document.
+
+        Chunks go through a pipeline of stages (token counting, embedding, vector upsert,
+        keyword index, segment status update) connected by bounded queues,
+        each stage running with its own configurable concurrency.
         """
-        vector_index = IndexBuilder.get_index(dataset, 'high_quality')
-        keyword_table_index = IndexBuilder.get_index(dataset, 'economy')
+        flask_app = current_app._get_current_object()
+        dataset_id = dataset.id
+        dataset_document_id = dataset_document.id
+
         embedding_model_instance = None
         if dataset.indexing_technique == 'high_quality':
             embedding_model_instance = self.model_manager.get_model_instance(
@@ -787,56 +801,124 @@ class IndexingRunner:
 
         # chunk nodes by chunk size
         indexing_start_at = time.perf_counter()
-        tokens = 0
-        chunk_size = 100
+        chunk_tokens = []
+        chunk_size = int(flask_app.config.get('INDEXING_PIPELINE_BATCH_SIZE', 100))
 
-        embedding_model_type_instance = None
-        if embedding_model_instance:
-            embedding_model_type_instance = embedding_model_instance.model_type_instance
-            embedding_model_type_instance = cast(TextEmbeddingModel, embedding_model_type_instance)
+        def get_dataset() -> Dataset:
+            return db.session.query(Dataset).filter_by(id=dataset_id).first()
 
-        for i in range(0, len(documents), chunk_size):
-            # check document is paused
-            self._check_document_paused_status(dataset_document.id)
-            chunk_documents = documents[i:i + chunk_size]
-            if dataset.indexing_technique == 'high_quality' or embedding_model_type_instance:
-                tokens += sum(
-                    embedding_model_type_instance.get_num_tokens(
+        def count_tokens_processor():
+            embedding_model_type_instance = cast(TextEmbeddingModel, embedding_model_instance.model_type_instance)
+
+            def count_tokens(chunk_documents: list[Document]):
+                chunk_tokens.append(sum(
+                    embedding_model_type_instance.get_num_tokens_batch(
                         embedding_model_instance.model,
                         embedding_model_instance.credentials,
-                        [document.page_content]
+                        [document.page_content for document in chunk_documents]
                     )
-                    for document in chunk_documents
+                ))
+
+            return count_tokens
+
+        def embed_processor():
+            embeddings = CacheEmbedding(embedding_model_instance)
+
+            # the embeddings are passed on to the vector upsert with the documents
+            def embed(chunk_documents: list[Document]) -> EmbeddedDocuments:
+                return EmbeddedDocuments(
+                    chunk_documents,
+                    embeddings.embed_documents([document.page_content for document in chunk_documents])
                 )
 
-            # save vector index
-            if vector_index:
+            return embed
+
+        def vector_index_processor():
+            embeddings = PrecomputedEmbedding(CacheEmbedding(embedding_model_instance))
+            vector_index = VectorIndex(dataset=get_dataset(), config=flask_app.config, embeddings=embeddings)
+
+            def add_texts(chunk_documents: EmbeddedDocuments) -> list[Document]:
+                embeddings.set_embeddings([document.page_content for document in chunk_documents],
+                                          chunk_documents.embeddings)
                 vector_index.add_texts(chunk_documents)
 
-            # save keyword index
-            keyword_table_index.add_texts(chunk_documents)
+                # the later stages do not need the embeddings
+                return list(chunk_documents)
 
-            document_ids = [document.metadata['doc_id'] for document in chunk_documents]
-            db.session.query(DocumentSegment).filter(
-                DocumentSegment.document_id == dataset_document.id,
-                DocumentSegment.index_node_id.in_(document_ids),
-                DocumentSegment.status == "indexing"
-            ).update({
-                DocumentSegment.status: "completed",
-                DocumentSegment.enabled: True,
-                DocumentSegment.completed_at: datetime.datetime.utcnow()
-            })
+            return add_texts
 
-            db.session.commit()
+        def keyword_index_processor():
+            keyword_table_index = IndexBuilder.get_index(get_dataset(), 'economy')
+            return keyword_table_index.add_texts
+
+        def segment_status_processor():
+            def update_segment_status(chunk_documents: list[Document]):
+                document_ids = [document.metadata['doc_id'] for document in chunk_documents]
+                db.session.query(DocumentSegment).filter(
+                    DocumentSegment.document_id == dataset_document_id,
+                    DocumentSegment.index_node_id.in_(document_ids),
+                    DocumentSegment.status == "indexing"
+                ).update({
+                    DocumentSegment.status: "completed",
+                    DocumentSegment.enabled: True,
+                    DocumentSegment.completed_at: datetime.datetime.utcnow()
+                })
+
+                db.session.commit()
+
+            return update_segment_status
+
+        stages = []
+        if embedding_model_instance:
+            stages.extend([
+                IndexingStage(
+                    name='tokenize',
+                    processor_factory=count_tokens_processor,
+                    concurrency=flask_app.config.get('INDEXING_PIPELINE_TOKENIZE_CONCURRENCY', 1)
+                ),
+                IndexingStage(
+                    name='embed',
+                    processor_factory=embed_processor,
+                    concurrency=flask_app.config.get('INDEXING_PIPELINE_EMBEDDING_CONCURRENCY', 1)
+                ),
+                IndexingStage(
+                    name='vector_upsert',
+                    processor_factory=vector_index_processor,
+                    concurrency=flask_app.config.get('INDEXING_PIPELINE_VECTOR_CONCURRENCY', 1)
+                )
+            ])
+
+        stages.extend([
+            IndexingStage(
+                name='keyword_index',
+                processor_factory=keyword_index_processor,
+                concurrency=flask_app.config.get('INDEXING_PIPELINE_KEYWORD_CONCURRENCY', 1)
+            ),
+            IndexingStage(
+                name='segment_status',
+                processor_factory=segment_status_processor
+            )
+        ])
+
+        pipeline = IndexingPipeline(
+            flask_app=flask_app,
+            stages=stages,
+            queue_size=flask_app.config.get('INDEXING_PIPELINE_QUEUE_SIZE', 4),
+            # check document is paused
+            before_batch=lambda: self._check_document_paused_status(dataset_document_id)
+        )
+        pipeline_stats = pipeline.run([documents[i:i + chunk_size] for i in range(0, len(documents), chunk_size)])
 
         indexing_end_at = time.perf_counter()
+        logging.info('Document {} indexed in {:.2f}s, stages: {}'.format(
+            dataset_document_id, indexing_end_at - indexing_start_at, [stats.to_dict() for stats in pipeline_stats]))
 
         # update document status to completed
         self._update_document_index_status(
-            document_id=dataset_document.id,
+            document_id=dataset_document_id,
             after_indexing_status="completed",
             extra_update_params={
-                DatasetDocument.tokens: tokens,
+                DatasetDocument.tokens: sum(chunk_tokens),
                 DatasetDocument.completed_at: datetime.datetime.utcnow(),
                 DatasetDocument.indexing_latency: indexing_end_at - indexing_start_at,
             }
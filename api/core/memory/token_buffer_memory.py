@@ -1,4 +1,11 @@
+import hashlib
+import json
+import logging
+import threading
+from typing import Optional
+
 from core.file.message_file_parser import MessageFileParser
+from core.helper.lru_cache import LRUCache
 from core.model_manager import ModelInstance
 from core.model_runtime.entities.message_entities import (
     AssistantPromptMessage,
@@ -10,8 +17,37 @@ from core.model_runtime.entities.message_entities import (
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.model_providers import model_provider_factory
 from extensions.ext_database import db
+from extensions.ext_redis import redis_client
 from models.model import Conversation, Message
 
+logger = logging.getLogger(__name__)
+
+# messages are immutable once answered, so the token counts of a message can be cached
+MESSAGE_TOKENS_CACHE_TTL = 86400
+
+# relative difference allowed between the batched count of a history and a single count of it
+MESSAGE_TOKENS_TOLERANCE = 0.05
+
+# tokens a count and each message add to the tokens of the texts, per model, measured once per process
+_count_calibrations = LRUCache(1000)
+_count_calibrations_lock = threading.Lock()
+
+
+class _CountCalibration:
+    """
+    Tokens a count of the model adds to the tokens of the plain texts of its messages.
+    """
+
+    def __init__(self, count_overhead: int, message_overheads: dict[PromptMessageRole, int]) -> None:
+        """
+        :param count_overhead: tokens added once per count, e.g. reply priming
+        :param message_overheads: tokens added per message by role, including the count overhead
+        """
+        self.count_overhead = count_overhead
+        self.message_overheads = message_overheads
+        # False once a batched count did not match a single count of the history
+        self.batchable = True
+
 
 class TokenBufferMemory:
     def __init__(self, conversation: Conversation, model_instance: ModelInstance) -> None:
@@ -64,24 +100,179 @@ class TokenBufferMemory:
         provider_instance = model_provider_factory.get_provider_instance(self.model_instance.provider)
         model_type_instance = provider_instance.get_model_instance(ModelType.LLM)
 
-        curr_message_tokens = model_type_instance.get_num_tokens(
-            self.model_instance.model,
-            self.model_instance.credentials,
-            prompt_messages
-        )
+        # the history is measured by the cached counts of its messages, only new messages are counted.
+        # each single message count also contains the request overhead of a count (e.g. reply priming),
+        # which the full history only has once
+        calibration = self._get_count_calibration(model_type_instance)
+        message_tokens = self._get_message_tokens(model_type_instance, calibration, messages, prompt_messages)
+        overhead = calibration.count_overhead
+        curr_message_tokens = sum(message_tokens) - overhead * (len(message_tokens) - 1)
 
         if curr_message_tokens > max_token_limit:
-            pruned_memory = []
-            while curr_message_tokens > max_token_limit and prompt_messages:
-                pruned_memory.append(prompt_messages.pop(0))
-                curr_message_tokens = model_type_instance.get_num_tokens(
-                    self.model_instance.model,
-                    self.model_instance.credentials,
-                    prompt_messages
-                )
+            index = 0
+            while curr_message_tokens > max_token_limit and index < len(prompt_messages):
+                curr_message_tokens -= message_tokens[index] - overhead
+                index += 1
+
+            prompt_messages = prompt_messages[index:]
 
         return prompt_messages
 
+    def _get_message_tokens(self, model_type_instance, calibration: '_CountCalibration', messages: list[Message],
+                            prompt_messages: list[PromptMessage]) -> list[int]:
+        """
+        Get number of tokens of each prompt message, counted once per message and model.
+
+        :param model_type_instance: llm model type instance
+        :param calibration: count calibration of the model
+        :param messages: messages, each one produces a user and an assistant prompt message
+        :param prompt_messages: prompt messages of the messages
+        :return: number of tokens of each prompt message
+        """
+        cache_keys = [self._message_tokens_cache_key(message.id) for message in messages]
+        try:
+            cached_values = redis_client.mget(cache_keys)
+        except Exception:
+            logger.exception('Failed to get message tokens from redis')
+            cached_values = [None] * len(cache_keys)
+
+        message_counts = [self._decode_message_tokens(cached_value) for cached_value in cached_values]
+        uncached_indexes = [index for index, counts in enumerate(message_counts) if counts is None]
+        if not uncached_indexes:
+            return [count for counts in message_counts for count in counts]
+
+        uncached_prompt_messages = [prompt_message for index in uncached_indexes
+                                    for prompt_message in prompt_messages[index * 2:index * 2 + 2]]
+        if calibration.batchable:
+            uncached_counts = self._count_batch(model_type_instance, calibration, uncached_prompt_messages)
+            for position, index in enumerate(uncached_indexes):
+                message_counts[index] = uncached_counts[position * 2:position * 2 + 2]
+
+            # the batch counts the plain texts with the message overheads measured once, which a single count
+            # of the whole history must confirm, otherwise the model is counted message by message from now on
+            estimated_tokens = sum(count for counts in message_counts for count in counts) \
+                - calibration.count_overhead * (len(prompt_messages) - 1)
+            exact_tokens = model_type_instance.get_num_tokens(
+                self.model_instance.model,
+                self.model_instance.credentials,
+                prompt_messages
+            )
+            if abs(estimated_tokens - exact_tokens) > max(exact_tokens * MESSAGE_TOKENS_TOLERANCE,
+                                                           len(prompt_messages)):
+                logger.warning('Batch token count of model %s is off by %d tokens, counting messages one by one',
+                               self.model_instance.model, estimated_tokens - exact_tokens)
+                calibration.batchable = False
+
+        if not calibration.batchable:
+            uncached_counts = [self._count(model_type_instance, [prompt_message])
+                               for prompt_message in uncached_prompt_messages]
+            for position, index in enumerate(uncached_indexes):
+                message_counts[index] = uncached_counts[position * 2:position * 2 + 2]
+
+        try:
+            pipeline = redis_client.pipeline(transaction=False)
+            for index in uncached_indexes:
+                pipeline.setex(cache_keys[index], MESSAGE_TOKENS_CACHE_TTL,
+                               ','.join(str(count) for count in message_counts[index]))
+            pipeline.execute()
+        except Exception:
+            logger.exception('Failed to set message tokens to redis')
+
+        return [count for counts in message_counts for count in counts]
+
+    def _count_batch(self, model_type_instance, calibration: '_CountCalibration',
+                     prompt_messages: list[PromptMessage]) -> list[int]:
+        """
+        Get number of tokens a single count of each prompt message would return, with one batched count of
+        the plain texts. Messages with files are counted one by one.
+
+        :param model_type_instance: llm model type instance
+        :param calibration: count calibration of the model
+        :param prompt_messages: prompt messages
+        :return: number of tokens of each prompt message
+        """
+        text_indexes = [index for index, prompt_message in enumerate(prompt_messages)
+                        if isinstance(prompt_message.content, str)]
+        text_counts = model_type_instance.get_num_tokens_batch(
+            self.model_instance.model,
+            self.model_instance.credentials,
+            [prompt_messages[index].content for index in text_indexes]
+        ) if text_indexes else []
+
+        counts = [0] * len(prompt_messages)
+        for index, text_count in zip(text_indexes, text_counts):
+            counts[index] = text_count + calibration.message_overheads[prompt_messages[index].role]
+
+        for index, prompt_message in enumerate(prompt_messages):
+            if not isinstance(prompt_message.content, str):
+                counts[index] = self._count(model_type_instance, [prompt_message])
+
+        return counts
+
+    def _count(self, model_type_instance, prompt_messages: list[PromptMessage]) -> int:
+        return model_type_instance.get_num_tokens(self.model_instance.model, self.model_instance.credentials,
+                                                  prompt_messages)
+
+    def _get_count_calibration(self, model_type_instance) -> '_CountCalibration':
+        """
+        Get the number of tokens a count and each message add to the tokens of the texts,
+        measured once per process and model.
+
+        :param model_type_instance: llm model type instance
+        :return: count calibration of the model
+        """
+        model_key = self._model_key()
+        with _count_calibrations_lock:
+            calibration = _count_calibrations.get(model_key)
+
+        if calibration is None:
+            sample_messages = [UserPromptMessage(content='hello'), AssistantPromptMessage(content='hi')]
+            counts = [
+                self._count(model_type_instance, messages)
+                for messages in [sample_messages[:1], sample_messages[1:], sample_messages]
+            ]
+            text_counts = model_type_instance.get_num_tokens_batch(
+                self.model_instance.model,
+                self.model_instance.credentials,
+                [sample_message.content for sample_message in sample_messages]
+            )
+            calibration = _CountCalibration(
+                count_overhead=max(counts[0] + counts[1] - counts[2], 0),
+                message_overheads={
+                    sample_message.role: count - text_count
+                    for sample_message, count, text_count in zip(sample_messages, counts, text_counts)
+                }
+            )
+            with _count_calibrations_lock:
+                _count_calibrations.put(model_key, calibration)
+
+        return calibration
+
+    def _model_key(self) -> str:
+        """
+        Key of the model counting the tokens, the credentials are part of it since they can change tokenization,
+        e.g. the base model of a customizable model. Only a hash of them is kept.
+        """
+        credentials_hash = hashlib.sha256(
+            json.dumps(self.model_instance.credentials, sort_keys=True, default=str).encode()
+        ).hexdigest()[:16]
+        return '{}:{}:{}'.format(self.model_instance.provider, self.model_instance.model, credentials_hash)
+
+    def _message_tokens_cache_key(self, message_id: str) -> str:
+        return 'message_tokens:{}:{}'.format(self._model_key(), message_id)
+
+    @staticmethod
+    def _decode_message_tokens(value: Optional[bytes]) -> Optional[list[int]]:
+        if not value:
+            return None
+
+        try:
+            counts = [int(count) for count in value.decode().split(',')]
+        except ValueError:
+            return None
+
+        return counts if len(counts) == 2 else None
+
     def get_history_prompt_text(self, human_prefix: str = "Human",
                                 ai_prefix: str = "Assistant",
                                 max_token_limit: int = 2000,
@@ -17,6 +17,7 @@ from core.model_runtime.entities.model_entities import (
     PriceType,
 )
 from core.model_runtime.errors.invoke import InvokeAuthorizationError, InvokeError
+from core.model_runtime.model_providers.__base import model_schema_snapshot
 from core.model_runtime.model_providers.__base.tokenizers.gpt2_tokenzier import GPT2Tokenizer
 
 
@@ -26,6 +27,7 @@ class AIModel(ABC):
     """
     model_type: ModelType
     model_schemas: list[AIModelEntity] = None
+    model_schema_map: dict[str, AIModelEntity] = None
     started_at: float = 0
 
     @abstractmethod
@@ -124,14 +126,33 @@ class AIModel(ABC):
         if self.model_schemas:
             return self.model_schemas
 
-        model_schemas = []
-
         # get module name
         model_type = self.__class__.__module__.split('.')[-1]
 
         # get provider name
         provider_name = self.__class__.__module__.split('.')[-3]
 
+        # use the schema snapshot built at build time if it is up to date
+        model_schemas = model_schema_snapshot.get_predefined_models(provider_name, model_type)
+        if model_schemas is None:
+            model_schemas = self._load_predefined_models(provider_name, model_type)
+
+        # cache model schemas, and index them by model name
+        self.model_schemas = model_schemas
+        self.model_schema_map = {model_schema.model: model_schema for model_schema in model_schemas}
+
+        return model_schemas
+
+    def _load_predefined_models(self, provider_name: str, model_type: str) -> list[AIModelEntity]:
+        """
+        Load predefined models from the yaml files of the model type.
+
+        :param provider_name: provider name
+        :param model_type: module name of the model type
+        :return:
+        """
+        model_schemas = []
+
         # get the path of current classes
         current_path = os.path.abspath(__file__)
         # get parent path of the current path
@@ -209,9 +230,6 @@ class AIModel(ABC):
         if position_map:
             model_schemas.sort(key=lambda x: position_map.get(x.model, 999))
 
-        # cache model schemas
-        self.model_schemas = model_schemas
-
         return model_schemas
 
     def get_model_schema(self, model: str, credentials: Optional[dict] = None) -> Optional[AIModelEntity]:
@@ -222,12 +240,11 @@ class AIModel(ABC):
         :param credentials: model credentials
         :return: model schema
         """
-        # get predefined models (predefined_models)
-        models = self.predefined_models()
+        # get predefined models (predefined_models), indexed by model name
+        self.predefined_models()
 
-        model_map = {model.model: model for model in models}
-        if model in model_map:
-            return model_map[model]
+        if self.model_schema_map and model in self.model_schema_map:
+            return self.model_schema_map[model]
 
         if credentials:
             model_schema = self.get_customizable_model_schema_from_credentials(model, credentials)
@@ -323,4 +340,13 @@ class AIModel(ABC):
         :param text: plain text of prompt. You need to convert the original message to plain text
         :return: number of tokens
         """
-        return GPT2Tokenizer.get_num_tokens(text)
\ No newline at end of file
+        return GPT2Tokenizer.get_num_tokens(text)
+
+    def _get_num_tokens_by_gpt2_batch(self, texts: list[str]) -> list[int]:
+        """
+        Get number of tokens of each text by gpt2, see _get_num_tokens_by_gpt2
+
+        :param texts: plain texts
+        :return: number of tokens of each text
+        """
+        return GPT2Tokenizer.get_num_tokens_batch(texts)
\ No newline at end of file
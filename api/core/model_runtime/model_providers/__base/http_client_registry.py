@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any, Optional, TypeVar
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+T = TypeVar('T')
+
+# connection pool limits of every pooled client
+HTTP_CLIENT_MAX_CONNECTIONS = int(os.environ.get('HTTP_CLIENT_MAX_CONNECTIONS', 100))
+HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS', 20))
+HTTP_CLIENT_KEEPALIVE_EXPIRY = float(os.environ.get('HTTP_CLIENT_KEEPALIVE_EXPIRY', 30))
+# clients not handed out for this many seconds are evicted, as are the least recently used ones above the max
+HTTP_CLIENT_IDLE_TIMEOUT = float(os.environ.get('HTTP_CLIENT_IDLE_TIMEOUT', 600))
+HTTP_CLIENT_MAX_CLIENTS = int(os.environ.get('HTTP_CLIENT_MAX_CLIENTS', 256))
+
+
+class _RegistryEntry:
+    def __init__(self, client: Any) -> None:
+        self.client = client
+        self.last_used_at = time.monotonic()
+
+
+class HttpClientRegistry:
+    """
+    Per-process registry of provider clients sharing keep-alive connection pools.
+
+    Clients are keyed by (provider, credential fingerprint, base_url, proxy), so that every invocation
+    with the same credentials reuses the established connections instead of a new TLS handshake.
+
+    The registry lock is only held for dict operations, it is a threading lock,
+    which is cooperative once gevent has monkey patched threading.
+    Evicted clients are not closed, a streaming response may still be reading from them,
+    their connections are closed once they are garbage collected.
+    """
+
+    def __init__(self, max_connections: int = HTTP_CLIENT_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry: float = HTTP_CLIENT_KEEPALIVE_EXPIRY,
+                 idle_timeout: float = HTTP_CLIENT_IDLE_TIMEOUT,
+                 max_clients: int = HTTP_CLIENT_MAX_CLIENTS) -> None:
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self._max_connections = max_connections
+        self._max_keepalive_connections = max_keepalive_connections
+        self._idle_timeout = idle_timeout
+        self._max_clients = max_clients
+        self._entries: OrderedDict[tuple, _RegistryEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: dict[tuple, threading.Lock] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_client(self, provider: str, credentials: dict,
+                   factory: Callable[[httpx.Client], T],
+                   base_url: Optional[str] = None,
+                   proxy: Optional[str] = None) -> T:
+        """
+        Get the shared client of a provider, building it with a pooled httpx client when missing.
+
+        :param provider: provider name, and the kind of client when a provider has several
+        :param credentials: credentials the client is built with, only their fingerprint is kept
+        :param factory: builds the client, given the pooled httpx client it must send requests with
+        :param base_url: base url of the client
+        :param proxy: proxy url of the client
+        :return: shared client
+        """
+        return self._get_or_create(
+            key=(provider, self.fingerprint(credentials), base_url, proxy),
+            factory=lambda: factory(self._create_http_client(proxy))
+        )
+
+    def get_requests_session(self, provider: str, credentials: dict,
+                             base_url: Optional[str] = None,
+                             proxy: Optional[str] = None) -> requests.Session:
+        """
+        Get a pooled requests session, for providers sending requests with the requests library.
+
+        :param provider: provider name
+        :param credentials: credentials the requests are sent with, only their fingerprint is kept
+        :param base_url: base url of the requests
+        :param proxy: proxy url of the requests
+        :return: shared session
+        """
+        return self._get_or_create(
+            key=(provider, self.fingerprint(credentials), base_url, proxy),
+            factory=lambda: self._create_requests_session(proxy)
+        )
+
+    def get_sdk_client(self, provider: str, credentials: dict, factory: Callable[[], T],
+                       base_url: Optional[str] = None) -> T:
+        """
+        Get a shared client of an SDK that manages its own connections.
+
+        :param provider: provider name
+        :param credentials: credentials the client is built with, only their fingerprint is kept
+        :param factory: builds the client
+        :param base_url: base url of the client
+        :return: shared client
+        """
+        return self._get_or_create(
+            key=(provider, self.fingerprint(credentials), base_url, None),
+            factory=factory
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'clients': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def fingerprint(credentials: dict) -> str:
+        """Fingerprint of credentials, the registry never keeps the credentials themselves."""
+        serialized = json.dumps(credentials, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+    def _get_or_create(self, key: tuple, factory: Callable[[], T]) -> T:
+        with self._lock:
+            self._evict_idle()
+            entry = self._entries.get(key)
+            if entry:
+                entry.last_used_at = time.monotonic()
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry.client
+
+            self._misses += 1
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # build outside of the registry lock, some SDKs send a request when they are created,
+        # concurrent callers of the same key wait for the first one and share its client
+        with build_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry:
+                    entry.last_used_at = time.monotonic()
+                    return entry.client
+
+            try:
+                client = factory()
+            except BaseException:
+                with self._lock:
+                    self._build_locks.pop(key, None)
+                raise
+
+            with self._lock:
+                self._build_locks.pop(key, None)
+                self._entries[key] = _RegistryEntry(client)
+                while len(self._entries) > self._max_clients:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+
+        return client
+
+    def _evict_idle(self) -> None:
+        """Evict idle clients, the entries are ordered by last use so only the head has to be checked."""
+        expired_at = time.monotonic() - self._idle_timeout
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.last_used_at > expired_at:
+                break
+
+            del self._entries[key]
+            self._evictions += 1
+
+    def _create_http_client(self, proxy: Optional[str]) -> httpx.Client:
+        return httpx.Client(limits=self._limits, proxies=proxy, follow_redirects=True)
+
+    def _create_requests_session(self, proxy: Optional[str]) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self._max_keepalive_connections,
+                              pool_maxsize=self._max_connections)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if proxy:
+            session.proxies = {'http': proxy, 'https': proxy}
+
+        return session
+
+
+http_client_registry = HttpClientRegistry()
@@ -219,6 +219,20 @@ class LargeLanguageModel(AIModel):
         """
         raise NotImplementedError
 
+    def get_num_tokens_batch(self, model: str, credentials: dict, texts: list[str]) -> list[int]:
+        """
+        Get number of tokens of each plain text, without any prompt message formatting overhead
+
+        Providers with a local tokenizer should override this,
+        the default uses the gpt2 tokenizer.
+
+        :param model: model name
+        :param credentials: model credentials
+        :param texts: plain texts
+        :return: number of tokens of each text
+        """
+        return self._get_num_tokens_by_gpt2_batch(texts)
+
     def enforce_stop_tokens(self, text: str, stop: list[str]) -> str:
         """Cut off the text as soon as any stop words occur."""
         return re.split("|".join(stop), text, maxsplit=1)[0]
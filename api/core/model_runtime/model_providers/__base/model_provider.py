@@ -6,6 +6,7 @@ import yaml
 
 from core.model_runtime.entities.model_entities import AIModelEntity, ModelType
 from core.model_runtime.entities.provider_entities import ProviderEntity
+from core.model_runtime.model_providers.__base import model_schema_snapshot
 from core.model_runtime.model_providers.__base.ai_model import AIModel
 
 
@@ -38,6 +39,12 @@ class ModelProvider(ABC):
         # get dirname of the current path
         provider_name = self.__class__.__module__.split('.')[-1]
 
+        # use the schema snapshot built at build time if it is up to date
+        provider_schema = model_schema_snapshot.get_provider_schema(provider_name)
+        if provider_schema:
+            self.provider_schema = provider_schema
+            return provider_schema
+
         # get the path of the model_provider classes
         base_path = os.path.abspath(__file__)
         current_path = os.path.join(os.path.dirname(os.path.dirname(base_path)), provider_name)
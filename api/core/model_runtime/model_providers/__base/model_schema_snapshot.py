@@ -0,0 +1,155 @@
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from typing import Optional
+
+from core.model_runtime.entities.model_entities import AIModelEntity
+from core.model_runtime.entities.provider_entities import ProviderEntity
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+# path of the model_providers package
+MODEL_PROVIDERS_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# path of the entities package, the pickled entities and the parameter rule templates are defined in it
+MODEL_ENTITIES_PATH = os.path.join(os.path.dirname(MODEL_PROVIDERS_PATH), 'entities')
+SNAPSHOT_PATH = os.path.join(MODEL_PROVIDERS_PATH, '_schema_snapshot.pkl')
+
+_snapshot: Optional[dict] = None
+_snapshot_loaded = False
+_lock = threading.Lock()
+
+
+def compute_fingerprint() -> str:
+    """
+    Fingerprint of the yaml files of the model providers and of the model entities,
+    a snapshot is only used while they are unchanged.
+
+    :return: fingerprint
+    """
+    digest = hashlib.sha256(str(SNAPSHOT_VERSION).encode())
+    for root_path, extension in [(MODEL_PROVIDERS_PATH, '.yaml'), (MODEL_ENTITIES_PATH, '.py')]:
+        for dir_path, dir_names, file_names in os.walk(root_path):
+            dir_names[:] = sorted(dir_name for dir_name in dir_names if dir_name != '__pycache__')
+            for file_name in sorted(file_names):
+                if not file_name.endswith(extension):
+                    continue
+
+                file_path = os.path.join(dir_path, file_name)
+                digest.update(os.path.relpath(file_path, root_path).encode())
+                with open(file_path, 'rb') as f:
+                    digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+def get_snapshot() -> Optional[dict]:
+    """
+    Get the schema snapshot, loaded once per process.
+
+    :return: provider name to its provider schema and predefined models per model type,
+        None when there is no snapshot or it is outdated
+    """
+    global _snapshot, _snapshot_loaded
+    if _snapshot_loaded:
+        return _snapshot
+
+    with _lock:
+        if not _snapshot_loaded:
+            _snapshot = _load_snapshot()
+            _snapshot_loaded = True
+
+    return _snapshot
+
+
+def get_provider_schema(provider: str) -> Optional[ProviderEntity]:
+    """
+    Get the provider schema from the snapshot.
+
+    :param provider: provider name
+    :return: provider schema, None when it is not in the snapshot
+    """
+    snapshot = get_snapshot()
+    if not snapshot or provider not in snapshot:
+        return None
+
+    return snapshot[provider]['provider_schema']
+
+
+def get_predefined_models(provider: str, model_type: str) -> Optional[list[AIModelEntity]]:
+    """
+    Get the predefined models from the snapshot.
+
+    :param provider: provider name
+    :param model_type: module name of the model type, e.g. text_embedding
+    :return: predefined models, None when they are not in the snapshot
+    """
+    snapshot = get_snapshot()
+    if not snapshot or provider not in snapshot:
+        return None
+
+    return snapshot[provider]['models'].get(model_type)
+
+
+def build_snapshot(path: str = SNAPSHOT_PATH) -> dict:
+    """
+    Load every provider and its predefined models from their yaml files and save them as a snapshot,
+    run at build time so that workers skip importing providers and parsing yaml files.
+
+    :param path: snapshot path
+    :return: snapshot
+    """
+    from core.model_runtime.model_providers.model_provider_factory import ModelProviderFactory
+
+    factory = ModelProviderFactory()
+    snapshot = {}
+    for name in factory.get_provider_names():
+        provider_instance = factory.get_provider_instance(name)
+        provider_schema = provider_instance.get_provider_schema()
+
+        models = {}
+        for model_type in provider_schema.supported_model_types:
+            model_instance = provider_instance.get_model_instance(model_type)
+            models[model_type.value.replace('-', '_')] = model_instance.predefined_models()
+
+        snapshot[name] = {
+            'provider_schema': provider_schema,
+            'models': models
+        }
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({
+            'version': SNAPSHOT_VERSION,
+            'fingerprint': compute_fingerprint(),
+            'providers': snapshot
+        }, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+    return snapshot
+
+
+def _load_snapshot() -> Optional[dict]:
+    if not os.path.exists(SNAPSHOT_PATH):
+        return None
+
+    try:
+        with open(SNAPSHOT_PATH, 'rb') as f:
+            data = pickle.load(f)
+    except Exception:
+        logger.warning(f'Failed to load model schema snapshot {SNAPSHOT_PATH}, loading yaml files.', exc_info=True)
+        return None
+
+    if data.get('version') != SNAPSHOT_VERSION or data.get('fingerprint') != compute_fingerprint():
+        logger.warning(f'Model schema snapshot {SNAPSHOT_PATH} is outdated, loading yaml files.')
+        return None
+
+    return data['providers']
+
+
+if __name__ == '__main__':
+    providers = build_snapshot()
+    print(f'Model schema snapshot of {len(providers)} providers saved to {SNAPSHOT_PATH}')
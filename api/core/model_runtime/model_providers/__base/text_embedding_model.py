@@ -2,6 +2,8 @@ import time
 from abc import abstractmethod
 from typing import Optional
 
+import tiktoken
+
 from core.model_runtime.entities.model_entities import ModelPropertyKey, ModelType
 from core.model_runtime.entities.text_embedding_entities import TextEmbeddingResult
 from core.model_runtime.model_providers.__base.ai_model import AIModel
@@ -59,6 +61,33 @@ class TextEmbeddingModel(AIModel):
         """
         raise NotImplementedError
 
+    def get_num_tokens_batch(self, model: str, credentials: dict, texts: list[str]) -> list[int]:
+        """
+        Get number of tokens of each text
+
+        Providers with a local tokenizer should override this to encode the whole batch at once,
+        the default counts the texts one by one.
+
+        :param model: model name
+        :param credentials: model credentials
+        :param texts: texts to embed
+        :return: number of tokens of each text
+        """
+        return [self.get_num_tokens(model, credentials, [text]) for text in texts]
+
+    def get_tokenizer_encoding(self, model: str, credentials: dict) -> Optional[tiktoken.Encoding]:
+        """
+        Get the local encoding the model counts tokens with
+
+        Text splitters use it to tokenize a document once and measure its pieces by token offsets.
+        Providers that count tokens remotely or without an encoding return None.
+
+        :param model: model name
+        :param credentials: model credentials
+        :return: encoding, or None
+        """
+        return None
+
     def _get_context_size(self, model: str, credentials: dict) -> int:
         """
         Get context size for given embedding model
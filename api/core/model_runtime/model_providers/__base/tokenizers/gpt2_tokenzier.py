@@ -1,12 +1,66 @@
+import json
 from os.path import abspath, dirname, join
 from threading import Lock
 from typing import Any
 
-from transformers import GPT2Tokenizer as TransformerGPT2Tokenizer
+import tiktoken
 
 _tokenizer = None
 _lock = Lock()
 
+# pre-tokenization pattern of gpt2, same as the transformers GPT2Tokenizer
+_GPT2_PAT_STR = r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+"""
+_GPT2_SPECIAL_TOKENS = {"<|endoftext|>": 50256}
+
+
+def _bytes_to_unicode_decoder() -> dict[str, int]:
+    """
+    Map the printable unicode characters used in the gpt2 vocab and merges files back to bytes
+    """
+    byte_values = [b for b in range(2 ** 8) if chr(b).isprintable() and chr(b) != " "]
+    decoder = {chr(b): b for b in byte_values}
+    n = 0
+    for b in range(2 ** 8):
+        if b not in decoder.values():
+            decoder[chr(2 ** 8 + n)] = b
+            n += 1
+
+    return decoder
+
+
+def _load_gpt2_encoding(gpt2_tokenizer_path: str) -> tiktoken.Encoding:
+    """
+    Build a byte-level BPE encoding from the vendored gpt2 vocab and merges files
+    """
+    byte_decoder = _bytes_to_unicode_decoder()
+
+    def decode(value: str) -> bytes:
+        return bytes(byte_decoder[c] for c in value)
+
+    with open(join(gpt2_tokenizer_path, 'vocab.json'), encoding='utf-8') as f:
+        vocab = json.load(f)
+
+    mergeable_ranks = {}
+    for token, rank in vocab.items():
+        if token in _GPT2_SPECIAL_TOKENS:
+            continue
+        mergeable_ranks[decode(token)] = rank
+
+    # the ranks of the vocab must follow the merge priority, which is what the bpe merges by
+    with open(join(gpt2_tokenizer_path, 'merges.txt'), encoding='utf-8') as f:
+        merges = [line.split() for line in f.read().split('\n') if line and not line.startswith('#version')]
+    for rank, (first, second) in enumerate(merges, start=256):
+        if mergeable_ranks.get(decode(first) + decode(second)) != rank:
+            raise ValueError('gpt2 vocab does not match the merges')
+
+    return tiktoken.Encoding(
+        name='gpt2_vendored',
+        pat_str=_GPT2_PAT_STR,
+        mergeable_ranks=mergeable_ranks,
+        special_tokens=_GPT2_SPECIAL_TOKENS
+    )
+
+
 class GPT2Tokenizer:
     @staticmethod
     def _get_num_tokens_by_gpt2(text: str) -> int:
@@ -14,20 +68,30 @@ class GPT2Tokenizer:
             use gpt2 tokenizer to get num tokens
         """
         _tokenizer = GPT2Tokenizer.get_encoder()
-        tokens = _tokenizer.encode(text, verbose=False)
+        tokens = _tokenizer.encode(text, allowed_special='all')
         return len(tokens)
-    
+
     @staticmethod
     def get_num_tokens(text: str) -> int:
         return GPT2Tokenizer._get_num_tokens_by_gpt2(text)
-    
+
+    @staticmethod
+    def get_num_tokens_batch(texts: list[str]) -> list[int]:
+        """
+            use gpt2 tokenizer to get num tokens of each text, resolving the encoder once
+        """
+        _tokenizer = GPT2Tokenizer.get_encoder()
+        return [len(tokens) for tokens in _tokenizer.encode_batch(texts, allowed_special='all')]
+
     @staticmethod
     def get_encoder() -> Any:
         global _tokenizer, _lock
-        with _lock:
-            if _tokenizer is None:
-                base_path = abspath(__file__)
-                gpt2_tokenizer_path = join(dirname(base_path), 'gpt2')
-                _tokenizer = TransformerGPT2Tokenizer.from_pretrained(gpt2_tokenizer_path)
+        # the lock is only taken until the encoder is loaded, encoding itself is thread safe
+        if _tokenizer is None:
+            with _lock:
+                if _tokenizer is None:
+                    base_path = abspath(__file__)
+                    gpt2_tokenizer_path = join(dirname(base_path), 'gpt2')
+                    _tokenizer = _load_gpt2_encoding(gpt2_tokenizer_path)
 
-            return _tokenizer
\ No newline at end of file
+        return _tokenizer
@@ -0,0 +1,46 @@
+from functools import lru_cache
+
+import tiktoken
+
+# texts per batch below which encoding in the calling thread is cheaper than fanning out
+_MIN_PARALLEL_BATCH_SIZE = 8
+
+
+class TiktokenTokenizer:
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def get_encoding(model: str) -> tiktoken.Encoding:
+        """
+        Get the tiktoken encoding of a model, cached per model name,
+        falling back to cl100k_base for models tiktoken does not know
+
+        :param model: model name
+        :return: encoding
+        """
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+
+    @staticmethod
+    def get_num_tokens(model: str, text: str) -> int:
+        return len(TiktokenTokenizer.get_encoding(model).encode(text))
+
+    @staticmethod
+    def get_num_tokens_batch(model: str, texts: list[str], num_threads: int = 8) -> list[int]:
+        """
+        Get number of tokens of each text, encoding the texts on multiple threads
+
+        :param model: model name
+        :param texts: texts
+        :param num_threads: number of encoding threads
+        :return: number of tokens of each text
+        """
+        if not texts:
+            return []
+
+        encoding = TiktokenTokenizer.get_encoding(model)
+        if len(texts) < _MIN_PARALLEL_BATCH_SIZE:
+            return [len(encoding.encode(text)) for text in texts]
+
+        return [len(tokens) for tokens in encoding.encode_batch(texts, num_threads=num_threads)]
@@ -23,6 +23,7 @@ from core.model_runtime.errors.invoke import (
     InvokeServerUnavailableError,
 )
 from core.model_runtime.errors.validate import CredentialsValidateFailedError
+from core.model_runtime.model_providers.__base.http_client_registry import http_client_registry
 from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
 
 
@@ -62,7 +63,12 @@ class AnthropicLargeLanguageModel(LargeLanguageModel):
         """
         prompt = self._convert_messages_to_prompt_anthropic(prompt_messages)
 
-        client = Anthropic(api_key="")
+        # the client is only used for its local tokenizer
+        client = http_client_registry.get_client(
+            provider='anthropic',
+            credentials={},
+            factory=lambda http_client: Anthropic(api_key="", http_client=http_client)
+        )
         return client.count_tokens(prompt)
 
     def validate_credentials(self, model: str, credentials: dict) -> None:
@@ -108,7 +114,7 @@ class AnthropicLargeLanguageModel(LargeLanguageModel):
         # transform credentials to kwargs for model instance
         credentials_kwargs = self._to_credential_kwargs(credentials)
 
-        client = Anthropic(**credentials_kwargs)
+        client = self._get_client(credentials_kwargs)
 
         extra_model_kwargs = {}
         if stop:
@@ -234,6 +240,20 @@ class AnthropicLargeLanguageModel(LargeLanguageModel):
 
         return credentials_kwargs
 
+    def _get_client(self, credentials_kwargs: dict) -> Anthropic:
+        """
+        Get the shared client of the credentials, keeping its connections alive between invocations
+
+        :param credentials_kwargs: kwargs of the client, from _to_credential_kwargs
+        :return: client
+        """
+        return http_client_registry.get_client(
+            provider='anthropic',
+            credentials=credentials_kwargs,
+            base_url=credentials_kwargs.get('base_url'),
+            factory=lambda http_client: Anthropic(**credentials_kwargs, http_client=http_client)
+        )
+
     def _convert_one_message_to_text(self, message: PromptMessage) -> str:
         """
         Convert a single message to a string.
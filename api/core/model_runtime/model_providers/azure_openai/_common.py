@@ -1,5 +1,6 @@
 import openai
 from httpx import Timeout
+from openai import AzureOpenAI
 
 from core.model_runtime.errors.invoke import (
     InvokeAuthorizationError,
@@ -9,6 +10,7 @@ from core.model_runtime.errors.invoke import (
     InvokeRateLimitError,
     InvokeServerUnavailableError,
 )
+from core.model_runtime.model_providers.__base.http_client_registry import http_client_registry
 from core.model_runtime.model_providers.azure_openai._constant import AZURE_OPENAI_API_VERSION
 
 
@@ -25,6 +27,21 @@ class _CommonAzureOpenAI:
 
         return credentials_kwargs
 
+    @staticmethod
+    def _get_client(credentials_kwargs: dict) -> AzureOpenAI:
+        """
+        Get the shared client of the credentials, keeping its connections alive between invocations
+
+        :param credentials_kwargs: kwargs of the client, from _to_credential_kwargs
+        :return: client
+        """
+        return http_client_registry.get_client(
+            provider='azure_openai',
+            credentials=credentials_kwargs,
+            base_url=credentials_kwargs['azure_endpoint'],
+            factory=lambda http_client: AzureOpenAI(**credentials_kwargs, http_client=http_client)
+        )
+
     @property
     def _invoke_error_mapping(self) -> dict[type[InvokeError], list[type[Exception]]]:
         return {
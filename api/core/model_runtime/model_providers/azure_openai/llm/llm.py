@@ -4,7 +4,7 @@ from collections.abc import Generator
 from typing import Optional, Union, cast
 
 import tiktoken
-from openai import AzureOpenAI, Stream
+from openai import Stream
 from openai.types import Completion
 from openai.types.chat import ChatCompletion, ChatCompletionChunk, ChatCompletionMessageToolCall
 from openai.types.chat.chat_completion_chunk import ChoiceDeltaFunctionCall, ChoiceDeltaToolCall
@@ -25,6 +25,7 @@ from core.model_runtime.entities.message_entities import (
 from core.model_runtime.entities.model_entities import AIModelEntity, ModelPropertyKey
 from core.model_runtime.errors.validate import CredentialsValidateFailedError
 from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
+from core.model_runtime.model_providers.__base.tokenizers.tiktoken_tokenizer import TiktokenTokenizer
 from core.model_runtime.model_providers.azure_openai._common import _CommonAzureOpenAI
 from core.model_runtime.model_providers.azure_openai._constant import LLM_BASE_MODELS, AzureBaseModel
 
@@ -78,6 +79,9 @@ class AzureOpenAILargeLanguageModel(_CommonAzureOpenAI, LargeLanguageModel):
             # text completion model, do not support tool calling
             return self._num_tokens_from_string(credentials, prompt_messages[0].content)
 
+    def get_num_tokens_batch(self, model: str, credentials: dict, texts: list[str]) -> list[int]:
+        return TiktokenTokenizer.get_num_tokens_batch(credentials['base_model_name'], texts)
+
     def validate_credentials(self, model: str, credentials: dict) -> None:
         if 'openai_api_base' not in credentials:
             raise CredentialsValidateFailedError('Azure OpenAI API Base Endpoint is required')
@@ -94,7 +98,7 @@ class AzureOpenAILargeLanguageModel(_CommonAzureOpenAI, LargeLanguageModel):
             raise CredentialsValidateFailedError(f'Base Model Name {credentials["base_model_name"]} is invalid')
 
         try:
-            client = AzureOpenAI(**self._to_credential_kwargs(credentials))
+            client = self._get_client(self._to_credential_kwargs(credentials))
 
             if ai_model_entity.entity.model_properties.get(ModelPropertyKey.MODE) == LLMMode.CHAT.value:
                 # chat model
@@ -125,7 +129,7 @@ class AzureOpenAILargeLanguageModel(_CommonAzureOpenAI, LargeLanguageModel):
                   prompt_messages: list[PromptMessage], model_parameters: dict, stop: Optional[list[str]] = None,
                   stream: bool = True, user: Optional[str] = None) -> Union[LLMResult, Generator]:
 
-        client = AzureOpenAI(**self._to_credential_kwargs(credentials))
+        client = self._get_client(self._to_credential_kwargs(credentials))
 
         extra_model_kwargs = {}
 
@@ -243,7 +247,7 @@ class AzureOpenAILargeLanguageModel(_CommonAzureOpenAI, LargeLanguageModel):
                        tools: Optional[list[PromptMessageTool]] = None, stop: Optional[list[str]] = None,
                        stream: bool = True, user: Optional[str] = None) -> Union[LLMResult, Generator]:
 
-        client = AzureOpenAI(**self._to_credential_kwargs(credentials))
+        client = self._get_client(self._to_credential_kwargs(credentials))
 
         response_format = model_parameters.get("response_format")
         if response_format:
@@ -526,10 +530,7 @@ class AzureOpenAILargeLanguageModel(_CommonAzureOpenAI, LargeLanguageModel):
 
     def _num_tokens_from_string(self, credentials: dict, text: str,
                                 tools: Optional[list[PromptMessageTool]] = None) -> int:
-        try:
-            encoding = tiktoken.encoding_for_model(credentials['base_model_name'])
-        except KeyError:
-            encoding = tiktoken.get_encoding("cl100k_base")
+        encoding = TiktokenTokenizer.get_encoding(credentials['base_model_name'])
 
         num_tokens = len(encoding.encode(text))
 
@@ -11,6 +11,7 @@ from core.model_runtime.entities.model_entities import AIModelEntity, PriceType
 from core.model_runtime.entities.text_embedding_entities import EmbeddingUsage, TextEmbeddingResult
 from core.model_runtime.errors.validate import CredentialsValidateFailedError
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
+from core.model_runtime.model_providers.__base.tokenizers.tiktoken_tokenizer import TiktokenTokenizer
 from core.model_runtime.model_providers.azure_openai._common import _CommonAzureOpenAI
 from core.model_runtime.model_providers.azure_openai._constant import EMBEDDING_BASE_MODELS, AzureBaseModel
 
@@ -22,7 +23,7 @@ class AzureOpenAITextEmbeddingModel(_CommonAzureOpenAI, TextEmbeddingModel):
             -> TextEmbeddingResult:
         base_model_name = credentials['base_model_name']
         credentials_kwargs = self._to_credential_kwargs(credentials)
-        client = AzureOpenAI(**credentials_kwargs)
+        client = self._get_client(credentials_kwargs)
 
         extra_model_kwargs = {}
         if user:
@@ -38,10 +39,7 @@ class AzureOpenAITextEmbeddingModel(_CommonAzureOpenAI, TextEmbeddingModel):
         indices = []
         used_tokens = 0
 
-        try:
-            enc = tiktoken.encoding_for_model(base_model_name)
-        except KeyError:
-            enc = tiktoken.get_encoding("cl100k_base")
+        enc = TiktokenTokenizer.get_encoding(base_model_name)
 
         for i, text in enumerate(texts):
             token = enc.encode(
@@ -101,21 +99,13 @@ class AzureOpenAITextEmbeddingModel(_CommonAzureOpenAI, TextEmbeddingModel):
         )
 
     def get_num_tokens(self, model: str, credentials: dict, texts: list[str]) -> int:
-        if len(texts) == 0:
-            return 0
-
-        try:
-            enc = tiktoken.encoding_for_model(credentials['base_model_name'])
-        except KeyError:
-            enc = tiktoken.get_encoding("cl100k_base")
+        return sum(self.get_num_tokens_batch(model, credentials, texts))
 
-        total_num_tokens = 0
-        for text in texts:
-            # calculate the number of tokens in the encoded text
-            tokenized_text = enc.encode(text)
-            total_num_tokens += len(tokenized_text)
+    def get_num_tokens_batch(self, model: str, credentials: dict, texts: list[str]) -> list[int]:
+        return TiktokenTokenizer.get_num_tokens_batch(credentials['base_model_name'], texts)
 
-        return total_num_tokens
+    def get_tokenizer_encoding(self, model: str, credentials: dict) -> Optional[tiktoken.Encoding]:
+        return TiktokenTokenizer.get_encoding(credentials['base_model_name'])
 
     def validate_credentials(self, model: str, credentials: dict) -> None:
         if 'openai_api_base' not in credentials:
@@ -132,7 +122,7 @@ class AzureOpenAITextEmbeddingModel(_CommonAzureOpenAI, TextEmbeddingModel):
 
         try:
             credentials_kwargs = self._to_credential_kwargs(credentials)
-            client = AzureOpenAI(**credentials_kwargs)
+            client = self._get_client(credentials_kwargs)
 
             self._embedding_invoke(
                 model=model,
@@ -0,0 +1,23 @@
+import cohere
+
+from core.model_runtime.model_providers.__base.http_client_registry import http_client_registry
+
+
+class _CommonCohere:
+    @staticmethod
+    def _get_client(credentials: dict) -> cohere.Client:
+        """
+        Get the shared client of the credentials
+
+        The cohere client checks the api key and starts a thread pool when it is created,
+        so it is built once per api key instead of once per invocation.
+
+        :param credentials: model credentials
+        :return: client
+        """
+        api_key = credentials.get('api_key')
+        return http_client_registry.get_sdk_client(
+            provider='cohere',
+            credentials={'api_key': api_key},
+            factory=lambda: cohere.Client(api_key)
+        )
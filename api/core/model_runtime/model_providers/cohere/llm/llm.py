@@ -28,11 +28,12 @@ from core.model_runtime.errors.invoke import (
 )
 from core.model_runtime.errors.validate import CredentialsValidateFailedError
 from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
+from core.model_runtime.model_providers.cohere._common import _CommonCohere
 
 logger = logging.getLogger(__name__)
 
 
-class CohereLargeLanguageModel(LargeLanguageModel):
+class CohereLargeLanguageModel(_CommonCohere, LargeLanguageModel):
     """
     Model class for Cohere large language model.
     """
@@ -154,7 +155,7 @@ class CohereLargeLanguageModel(LargeLanguageModel):
         :return: full response or stream response chunk generator result
         """
         # initialize client
-        client = cohere.Client(credentials.get('api_key'))
+        client = self._get_client(credentials)
 
         if stop:
             model_parameters['end_sequences'] = stop
@@ -280,7 +281,7 @@ class CohereLargeLanguageModel(LargeLanguageModel):
         :return: full response or stream response chunk generator result
         """
         # initialize client
-        client = cohere.Client(credentials.get('api_key'))
+        client = self._get_client(credentials)
 
         if user:
             model_parameters['user_name'] = user
@@ -487,7 +488,7 @@ class CohereLargeLanguageModel(LargeLanguageModel):
         :return: number of tokens
         """
         # initialize client
-        client = cohere.Client(credentials.get('api_key'))
+        client = self._get_client(credentials)
 
         response = client.tokenize(
             text=text,
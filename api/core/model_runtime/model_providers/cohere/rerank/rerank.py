@@ -13,9 +13,10 @@ from core.model_runtime.errors.invoke import (
 )
 from core.model_runtime.errors.validate import CredentialsValidateFailedError
 from core.model_runtime.model_providers.__base.rerank_model import RerankModel
+from core.model_runtime.model_providers.cohere._common import _CommonCohere
 
 
-class CohereRerankModel(RerankModel):
+class CohereRerankModel(_CommonCohere, RerankModel):
     """
     Model class for Cohere rerank model.
     """
@@ -43,7 +44,7 @@ class CohereRerankModel(RerankModel):
             )
 
         # initialize client
-        client = cohere.Client(credentials.get('api_key'))
+        client = self._get_client(credentials)
         results = client.rerank(
             query=query,
             documents=docs,
@@ -17,9 +17,10 @@ from core.model_runtime.errors.invoke import (
 )
 from core.model_runtime.errors.validate import CredentialsValidateFailedError
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
+from core.model_runtime.model_providers.cohere._common import _CommonCohere
 
 
-class CohereTextEmbeddingModel(TextEmbeddingModel):
+class CohereTextEmbeddingModel(_CommonCohere, TextEmbeddingModel):
     """
     Model class for Cohere text embedding model.
     """
@@ -141,7 +142,7 @@ class CohereTextEmbeddingModel(TextEmbeddingModel):
             return Tokens([], [], {})
 
         # initialize client
-        client = cohere.Client(credentials.get('api_key'))
+        client = self._get_client(credentials)
 
         response = client.tokenize(
             text=text,
@@ -178,7 +179,7 @@ class CohereTextEmbeddingModel(TextEmbeddingModel):
         :return: embeddings and used tokens
         """
         # initialize client
-        client = cohere.Client(credentials.get('api_key'))
+        client = self._get_client(credentials)
 
         # call embedding model
         response = client.embed(
@@ -1,14 +1,16 @@
 import importlib
 import logging
 import os
+import threading
 from collections import OrderedDict
 from typing import Optional
 
 import yaml
 from pydantic import BaseModel
 
-from core.model_runtime.entities.model_entities import ModelType
+from core.model_runtime.entities.model_entities import AIModelEntity, ModelType
 from core.model_runtime.entities.provider_entities import ProviderConfig, ProviderEntity, SimpleProviderEntity
+from core.model_runtime.model_providers.__base import model_schema_snapshot
 from core.model_runtime.model_providers.__base.model_provider import ModelProvider
 from core.model_runtime.schema_validators.model_credential_schema_validator import ModelCredentialSchemaValidator
 from core.model_runtime.schema_validators.provider_credential_schema_validator import ProviderCredentialSchemaValidator
@@ -17,8 +19,10 @@ logger = logging.getLogger(__name__)
 
 
 class ModelProviderExtension(BaseModel):
-    provider_instance: ModelProvider
+    # loaded on first use of the provider
+    provider_instance: Optional[ModelProvider] = None
     name: str
+    py_path: str
     position: Optional[int] = None
 
     class Config:
@@ -31,8 +35,15 @@ class ModelProviderFactory:
     model_provider_extensions: dict[str, ModelProviderExtension] = None
 
     def __init__(self) -> None:
-        # for cache in memory
-        self.get_providers()
+        # providers are imported on first use, their schemas come from the schema snapshot when it is up to date
+        self._load_lock = threading.Lock()
+
+    def get_provider_names(self) -> list[str]:
+        """
+        Get all provider names, sorted by position
+        :return: list of provider names
+        """
+        return list(self._get_model_provider_map().keys())
 
     def get_providers(self) -> list[ProviderEntity]:
         """
@@ -44,20 +55,17 @@ class ModelProviderFactory:
 
         # traverse all model_provider_extensions
         providers = []
-        for name, model_provider_extension in model_provider_extensions.items():
-            # get model_provider instance
-            model_provider_instance = model_provider_extension.provider_instance
-
+        for name in model_provider_extensions.keys():
             # get provider schema
-            provider_schema = model_provider_instance.get_provider_schema()
+            provider_schema = self._get_provider_schema(name)
 
+            models = []
             for model_type in provider_schema.supported_model_types:
                 # get predefined models for given model type
-                models = model_provider_instance.models(model_type)
-                if models:
-                    provider_schema.models.extend(models)
+                models.extend(self._get_predefined_models(name, model_type))
 
-            providers.append(provider_schema)
+            # copy the cached schema, so that its models are not extended on every call
+            providers.append(provider_schema.copy(update={'models': models}))
 
         # return providers
         return providers
@@ -143,16 +151,13 @@ class ModelProviderFactory:
 
         # traverse all model_provider_extensions
         providers = []
-        for name, model_provider_extension in model_provider_extensions.items():
+        for name in model_provider_extensions.keys():
             # filter by provider if provider is present
             if provider and name != provider:
                 continue
 
-            # get model_provider instance
-            model_provider_instance = model_provider_extension.provider_instance
-
             # get provider schema
-            provider_schema = model_provider_instance.get_provider_schema()
+            provider_schema = self._get_provider_schema(name)
 
             model_types = provider_schema.supported_model_types
             if model_type:
@@ -164,9 +169,7 @@ class ModelProviderFactory:
             all_model_type_models = []
             for model_type in model_types:
                 # get predefined models for given model type
-                models = model_provider_instance.models(
-                    model_type=model_type,
-                )
+                models = self._get_predefined_models(name, model_type)
 
                 all_model_type_models.extend(models)
 
@@ -191,10 +194,66 @@ class ModelProviderFactory:
         if not model_provider_extension:
             raise Exception(f'Invalid provider: {provider}')
 
-        # get the provider instance
-        model_provider_instance = model_provider_extension.provider_instance
+        # get the provider instance, import the provider on first use
+        if not model_provider_extension.provider_instance:
+            with self._load_lock:
+                if not model_provider_extension.provider_instance:
+                    model_provider_extension.provider_instance = self._load_provider_instance(
+                        model_provider_extension
+                    )
 
-        return model_provider_instance
+        return model_provider_extension.provider_instance
+
+    def _get_provider_schema(self, provider: str) -> ProviderEntity:
+        """
+        Get provider schema, without importing the provider when it is in the schema snapshot
+        :param provider: provider name
+        :return: provider schema
+        """
+        provider_schema = model_schema_snapshot.get_provider_schema(provider)
+        if provider_schema:
+            return provider_schema
+
+        return self.get_provider_instance(provider).get_provider_schema()
+
+    def _get_predefined_models(self, provider: str, model_type: ModelType) -> list[AIModelEntity]:
+        """
+        Get predefined models, without importing the provider when they are in the schema snapshot
+        :param provider: provider name
+        :param model_type: model type
+        :return: list of predefined models
+        """
+        models = model_schema_snapshot.get_predefined_models(provider, model_type.value.replace('-', '_'))
+        if models is not None:
+            return models
+
+        return self.get_provider_instance(provider).models(model_type)
+
+    @staticmethod
+    def _load_provider_instance(model_provider_extension: ModelProviderExtension) -> ModelProvider:
+        """
+        Import the provider and create its instance
+        :param model_provider_extension: model provider extension
+        :return: provider instance
+        """
+        model_provider_name = model_provider_extension.name
+        py_path = model_provider_extension.py_path
+
+        # Dynamic loading {model_provider_name}.py file and find the subclass of ModelProvider
+        spec = importlib.util.spec_from_file_location(f'core.model_runtime.model_providers.{model_provider_name}.{model_provider_name}', py_path)
+        mod = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(mod)
+
+        model_provider_class = None
+        for name, obj in vars(mod).items():
+            if isinstance(obj, type) and issubclass(obj, ModelProvider) and obj != ModelProvider:
+                model_provider_class = obj
+                break
+
+        if not model_provider_class:
+            raise Exception(f'Missing Model Provider Class that extends ModelProvider in {py_path}')
+
+        return model_provider_class()
 
     def _get_model_provider_map(self) -> dict[str, ModelProviderExtension]:
         if self.model_provider_extensions:
@@ -236,29 +295,13 @@ class ModelProviderFactory:
                 logger.warning(f"Missing {model_provider_name}.py file in {model_provider_dir_path}, Skip.")
                 continue
 
-            # Dynamic loading {model_provider_name}.py file and find the subclass of ModelProvider
-            py_path = os.path.join(model_provider_dir_path, model_provider_name + '.py')
-            spec = importlib.util.spec_from_file_location(f'core.model_runtime.model_providers.{model_provider_name}.{model_provider_name}', py_path)
-            mod = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(mod)
-
-            model_provider_class = None
-            for name, obj in vars(mod).items():
-                if isinstance(obj, type) and issubclass(obj, ModelProvider) and obj != ModelProvider:
-                    model_provider_class = obj
-                    break
-
-            if not model_provider_class:
-                logger.warning(f"Missing Model Provider Class that extends ModelProvider in {py_path}, Skip.")
-                continue
-
             if f'{model_provider_name}.yaml' not in file_names:
                 logger.warning(f"Missing {model_provider_name}.yaml file in {model_provider_dir_path}, Skip.")
                 continue
 
             model_providers[model_provider_name] = ModelProviderExtension(
                 name=model_provider_name,
-                provider_instance=model_provider_class(),
+                py_path=os.path.join(model_provider_dir_path, model_provider_name + '.py'),
                 position=position_map.get(model_provider_name)
             )
 
@@ -1,5 +1,6 @@
 import openai
 from httpx import Timeout
+from openai import OpenAI
 
 from core.model_runtime.errors.invoke import (
     InvokeAuthorizationError,
@@ -9,6 +10,7 @@ from core.model_runtime.errors.invoke import (
     InvokeRateLimitError,
     InvokeServerUnavailableError,
 )
+from core.model_runtime.model_providers.__base.http_client_registry import http_client_registry
 
 
 class _CommonOpenAI:
@@ -34,6 +36,20 @@ class _CommonOpenAI:
 
         return credentials_kwargs
 
+    def _get_client(self, credentials_kwargs: dict) -> OpenAI:
+        """
+        Get the shared client of the credentials, keeping its connections alive between invocations
+
+        :param credentials_kwargs: kwargs of the client, from _to_credential_kwargs
+        :return: client
+        """
+        return http_client_registry.get_client(
+            provider='openai',
+            credentials=credentials_kwargs,
+            base_url=credentials_kwargs.get('base_url'),
+            factory=lambda http_client: OpenAI(**credentials_kwargs, http_client=http_client)
+        )
+
     @property
     def _invoke_error_mapping(self) -> dict[type[InvokeError], list[type[Exception]]]:
         """
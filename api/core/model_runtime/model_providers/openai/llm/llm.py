@@ -3,7 +3,7 @@ from collections.abc import Generator
 from typing import Optional, Union, cast
 
 import tiktoken
-from openai import OpenAI, Stream
+from openai import Stream
 from openai.types import Completion
 from openai.types.chat import ChatCompletion, ChatCompletionChunk, ChatCompletionMessageToolCall
 from openai.types.chat.chat_completion_chunk import ChoiceDeltaFunctionCall, ChoiceDeltaToolCall
@@ -24,6 +24,7 @@ from core.model_runtime.entities.message_entities import (
 from core.model_runtime.entities.model_entities import AIModelEntity, FetchFrom, I18nObject, ModelType, PriceConfig
 from core.model_runtime.errors.validate import CredentialsValidateFailedError
 from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
+from core.model_runtime.model_providers.__base.tokenizers.tiktoken_tokenizer import TiktokenTokenizer
 from core.model_runtime.model_providers.openai._common import _CommonOpenAI
 
 logger = logging.getLogger(__name__)
@@ -111,6 +112,20 @@ class OpenAILargeLanguageModel(_CommonOpenAI, LargeLanguageModel):
             # text completion model, do not support tool calling
             return self._num_tokens_from_string(base_model, prompt_messages[0].content)
 
+    def get_num_tokens_batch(self, model: str, credentials: dict, texts: list[str]) -> list[int]:
+        """
+        Get number of tokens of each plain text
+
+        :param model: model name
+        :param credentials: model credentials
+        :param texts: plain texts
+        :return: number of tokens of each text
+        """
+        # handle fine tune remote models
+        base_model = model.split(':')[1] if model.startswith('ft:') else model
+
+        return TiktokenTokenizer.get_num_tokens_batch(base_model, texts)
+
     def validate_credentials(self, model: str, credentials: dict) -> None:
         """
         Validate model credentials
@@ -122,7 +137,7 @@ class OpenAILargeLanguageModel(_CommonOpenAI, LargeLanguageModel):
         try:
             # transform credentials to kwargs for model instance
             credentials_kwargs = self._to_credential_kwargs(credentials)
-            client = OpenAI(**credentials_kwargs)
+            client = self._get_client(credentials_kwargs)
 
             # handle fine tune remote models
             base_model = model
@@ -173,7 +188,7 @@ class OpenAILargeLanguageModel(_CommonOpenAI, LargeLanguageModel):
 
         # transform credentials to kwargs for model instance
         credentials_kwargs = self._to_credential_kwargs(credentials)
-        client = OpenAI(**credentials_kwargs)
+        client = self._get_client(credentials_kwargs)
 
         # get all remote models
         remote_models = client.models.list()
@@ -234,7 +249,7 @@ class OpenAILargeLanguageModel(_CommonOpenAI, LargeLanguageModel):
         credentials_kwargs = self._to_credential_kwargs(credentials)
 
         # init model client
-        client = OpenAI(**credentials_kwargs)
+        client = self._get_client(credentials_kwargs)
 
         extra_model_kwargs = {}
 
@@ -386,7 +401,7 @@ class OpenAILargeLanguageModel(_CommonOpenAI, LargeLanguageModel):
         credentials_kwargs = self._to_credential_kwargs(credentials)
 
         # init model client
-        client = OpenAI(**credentials_kwargs)
+        client = self._get_client(credentials_kwargs)
 
         response_format = model_parameters.get("response_format")
         if response_format:
@@ -695,10 +710,7 @@ class OpenAILargeLanguageModel(_CommonOpenAI, LargeLanguageModel):
         :param tools: tools for tool calling
         :return: number of tokens
         """
-        try:
-            encoding = tiktoken.encoding_for_model(model)
-        except KeyError:
-            encoding = tiktoken.get_encoding("cl100k_base")
+        encoding = TiktokenTokenizer.get_encoding(model)
 
         num_tokens = len(encoding.encode(text))
 
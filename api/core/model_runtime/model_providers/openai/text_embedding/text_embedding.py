@@ -10,6 +10,7 @@ from core.model_runtime.entities.model_entities import PriceType
 from core.model_runtime.entities.text_embedding_entities import EmbeddingUsage, TextEmbeddingResult
 from core.model_runtime.errors.validate import CredentialsValidateFailedError
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
+from core.model_runtime.model_providers.__base.tokenizers.tiktoken_tokenizer import TiktokenTokenizer
 from core.model_runtime.model_providers.openai._common import _CommonOpenAI
 
 
@@ -33,7 +34,7 @@ class OpenAITextEmbeddingModel(_CommonOpenAI, TextEmbeddingModel):
         # transform credentials to kwargs for model instance
         credentials_kwargs = self._to_credential_kwargs(credentials)
         # init model client
-        client = OpenAI(**credentials_kwargs)
+        client = self._get_client(credentials_kwargs)
 
         extra_model_kwargs = {}
         if user:
@@ -50,10 +51,7 @@ class OpenAITextEmbeddingModel(_CommonOpenAI, TextEmbeddingModel):
         indices = []
         used_tokens = 0
 
-        try:
-            enc = tiktoken.encoding_for_model(model)
-        except KeyError:
-            enc = tiktoken.get_encoding("cl100k_base")
+        enc = TiktokenTokenizer.get_encoding(model)
 
         for i, text in enumerate(texts):
             token = enc.encode(
@@ -122,21 +120,28 @@ class OpenAITextEmbeddingModel(_CommonOpenAI, TextEmbeddingModel):
         :param texts: texts to embed
         :return:
         """
-        if len(texts) == 0:
-            return 0
+        return sum(self.get_num_tokens_batch(model, credentials, texts))
 
-        try:
-            enc = tiktoken.encoding_for_model(model)
-        except KeyError:
-            enc = tiktoken.get_encoding("cl100k_base")
+    def get_num_tokens_batch(self, model: str, credentials: dict, texts: list[str]) -> list[int]:
+        """
+        Get number of tokens of each text
+
+        :param model: model name
+        :param credentials: model credentials
+        :param texts: texts to embed
+        :return: number of tokens of each text
+        """
+        return TiktokenTokenizer.get_num_tokens_batch(model, texts)
 
-        total_num_tokens = 0
-        for text in texts:
-            # calculate the number of tokens in the encoded text
-            tokenized_text = enc.encode(text)
-            total_num_tokens += len(tokenized_text)
+    def get_tokenizer_encoding(self, model: str, credentials: dict) -> Optional[tiktoken.Encoding]:
+        """
+        Get the local encoding the model counts tokens with
 
-        return total_num_tokens
+        :param model: model name
+        :param credentials: model credentials
+        :return: encoding
+        """
+        return TiktokenTokenizer.get_encoding(model)
 
     def validate_credentials(self, model: str, credentials: dict) -> None:
         """
@@ -149,7 +154,7 @@ class OpenAITextEmbeddingModel(_CommonOpenAI, TextEmbeddingModel):
         try:
             # transform credentials to kwargs for model instance
             credentials_kwargs = self._to_credential_kwargs(credentials)
-            client = OpenAI(**credentials_kwargs)
+            client = self._get_client(credentials_kwargs)
 
             # call embedding model
             self._embedding_invoke(
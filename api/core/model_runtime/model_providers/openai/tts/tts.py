@@ -4,7 +4,6 @@ from io import BytesIO
 from typing import Optional
 
 from flask import Response, stream_with_context
-from openai import OpenAI
 from pydub import AudioSegment
 
 from core.model_runtime.errors.invoke import InvokeBadRequestError
@@ -126,7 +125,7 @@ class OpenAIText2SpeechModel(_CommonOpenAI, TTSModel):
         tts_file_id = self._get_file_name(content_text)
         file_path = f'generate_files/audio/{tenant_id}/{tts_file_id}.{audio_type}'
         try:
-            client = OpenAI(**credentials_kwargs)
+            client = self._get_client(credentials_kwargs)
             sentences = list(self._split_text_into_sentences(text=content_text, limit=word_limit))
             for sentence in sentences:
                 response = client.audio.speech.create(model=model, voice=voice, input=sentence.strip())
@@ -148,7 +147,7 @@ class OpenAIText2SpeechModel(_CommonOpenAI, TTSModel):
         """
         # transform credentials to kwargs for model instance
         credentials_kwargs = self._to_credential_kwargs(credentials)
-        client = OpenAI(**credentials_kwargs)
+        client = self._get_client(credentials_kwargs)
         response = client.audio.speech.create(model=model, voice=voice, input=sentence.strip())
         if isinstance(response.read(), bytes):
             return response.read()
@@ -9,9 +9,24 @@ from core.model_runtime.errors.invoke import (
     InvokeRateLimitError,
     InvokeServerUnavailableError,
 )
+from core.model_runtime.model_providers.__base.http_client_registry import http_client_registry
 
 
 class _CommonOAI_API_Compat:
+    @staticmethod
+    def _get_session(credentials: dict) -> requests.Session:
+        """
+        Get the shared session of the credentials, keeping its connections alive between invocations
+
+        :param credentials: model credentials
+        :return: session
+        """
+        return http_client_registry.get_requests_session(
+            provider='openai_api_compatible',
+            credentials=credentials,
+            base_url=credentials.get('endpoint_url')
+        )
+
     @property
     def _invoke_error_mapping(self) -> dict[type[InvokeError], list[type[Exception]]]:
         """
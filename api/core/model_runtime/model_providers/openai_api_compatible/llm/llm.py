@@ -133,7 +133,7 @@ class OAIAPICompatLargeLanguageModel(_CommonOAI_API_Compat, LargeLanguageModel):
                 raise ValueError("Unsupported completion type for model configuration.")
 
             # send a post request to validate the credentials
-            response = requests.post(
+            response = self._get_session(credentials).post(
                 endpoint_url,
                 headers=headers,
                 json=data,
@@ -307,7 +307,7 @@ class OAIAPICompatLargeLanguageModel(_CommonOAI_API_Compat, LargeLanguageModel):
         if user:
             data["user"] = user
 
-        response = requests.post(
+        response = self._get_session(credentials).post(
             endpoint_url,
             headers=headers,
             json=data,
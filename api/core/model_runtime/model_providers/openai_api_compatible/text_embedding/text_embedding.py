@@ -5,7 +5,6 @@ from typing import Optional
 from urllib.parse import urljoin
 
 import numpy as np
-import requests
 
 from core.model_runtime.entities.common_entities import I18nObject
 from core.model_runtime.entities.model_entities import (
@@ -95,7 +94,7 @@ class OAICompatEmbeddingModel(_CommonOAI_API_Compat, TextEmbeddingModel):
             }
 
             # Make the request to the OpenAI API
-            response = requests.post(
+            response = self._get_session(credentials).post(
                 endpoint_url,
                 headers=headers,
                 data=json.dumps(payload),
@@ -165,7 +164,7 @@ class OAICompatEmbeddingModel(_CommonOAI_API_Compat, TextEmbeddingModel):
                 'model': model
             }
 
-            response = requests.post(
+            response = self._get_session(credentials).post(
                 url=endpoint_url,
                 headers=headers,
                 data=json.dumps(payload),
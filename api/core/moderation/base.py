@@ -27,6 +27,22 @@ class ModerationOutputsResult(BaseModel):
     text: str = ""
 
 
+class ModerationOutputsStream(ABC):
+    """
+    Moderation of LLM outputs received chunk by chunk, keeping its state across chunks.
+    """
+
+    @abstractmethod
+    def moderation_for_outputs(self, text: str) -> ModerationOutputsResult:
+        """
+        Moderation for the next chunk of outputs.
+
+        :param text: LLM output chunk, following the previous chunks
+        :return: result of the outputs so far
+        """
+        raise NotImplementedError
+
+
 class Moderation(Extensible, ABC):
     """
     The base class of moderation.
@@ -74,6 +90,15 @@ class Moderation(Extensible, ABC):
         """
         raise NotImplementedError
 
+    def outputs_stream(self) -> Optional[ModerationOutputsStream]:
+        """
+        Stream moderation for outputs, which only reviews the new output chunks.
+        Moderations without it review the whole buffered outputs with moderation_for_outputs.
+
+        :return: stream moderation, None when not supported
+        """
+        return None
+
     @classmethod
     def _validate_inputs_and_outputs_config(self, config: dict, is_preset_response_required: bool) -> None:
         # inputs_config
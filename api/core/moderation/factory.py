@@ -1,5 +1,7 @@
+from typing import Optional
+
 from core.extension.extensible import ExtensionModule
-from core.moderation.base import Moderation, ModerationInputsResult, ModerationOutputsResult
+from core.moderation.base import Moderation, ModerationInputsResult, ModerationOutputsResult, ModerationOutputsStream
 from extensions.ext_code_based_extension import code_based_extension
 
 
@@ -46,3 +48,11 @@ class ModerationFactory:
         :return:
         """
         return self.__extension_instance.moderation_for_outputs(text)
+
+    def outputs_stream(self) -> Optional[ModerationOutputsStream]:
+        """
+        Stream moderation for outputs, which only reviews the new output chunks.
+
+        :return: stream moderation, None when the extension does not support it
+        """
+        return self.__extension_instance.outputs_stream()
@@ -1,4 +1,17 @@
-from core.moderation.base import Moderation, ModerationAction, ModerationInputsResult, ModerationOutputsResult
+from typing import Optional
+
+from core.moderation.base import (
+    Moderation,
+    ModerationAction,
+    ModerationInputsResult,
+    ModerationOutputsResult,
+    ModerationOutputsStream,
+)
+from core.moderation.keywords.keywords_matcher import (
+    KeywordsAutomaton,
+    StreamingKeywordsMatcher,
+    get_keywords_automaton,
+)
 
 
 class KeywordsModeration(Moderation):
@@ -31,10 +44,7 @@ class KeywordsModeration(Moderation):
             if query:
                 inputs['query__'] = query
 
-            # Filter out empty values
-            keywords_list = [keyword for keyword in self.config['keywords'].split('\n') if keyword]
-
-            flagged = self._is_violated(inputs, keywords_list)
+            flagged = self._is_violated(inputs, get_keywords_automaton(self.config['keywords']))
 
         return ModerationInputsResult(flagged=flagged, action=ModerationAction.DIRECT_OUTPUT, preset_response=preset_response)
 
@@ -43,23 +53,35 @@ class KeywordsModeration(Moderation):
         preset_response = ""
 
         if self.config['outputs_config']['enabled']:
-            # Filter out empty values
-            keywords_list = [keyword for keyword in self.config['keywords'].split('\n') if keyword]
-
-            flagged = self._is_violated({'text': text}, keywords_list)
+            flagged = self._is_violated({'text': text}, get_keywords_automaton(self.config['keywords']))
             preset_response = self.config['outputs_config']['preset_response']
 
         return ModerationOutputsResult(flagged=flagged, action=ModerationAction.DIRECT_OUTPUT, preset_response=preset_response)
 
-    def _is_violated(self, inputs: dict, keywords_list: list) -> bool:
+    def outputs_stream(self) -> Optional[ModerationOutputsStream]:
+        if not self.config['outputs_config']['enabled']:
+            return None
+
+        return KeywordsOutputsStream(
+            automaton=get_keywords_automaton(self.config['keywords']),
+            preset_response=self.config['outputs_config']['preset_response']
+        )
+
+    def _is_violated(self, inputs: dict, automaton: KeywordsAutomaton) -> bool:
         for value in inputs.values():
-            if self._check_keywords_in_value(keywords_list, value):
+            if automaton.search(value):
                 return True
 
         return False
 
-    def _check_keywords_in_value(self, keywords_list, value):
-        for keyword in keywords_list:
-            if keyword.lower() in value.lower():
-                return True
-        return False
+
+class KeywordsOutputsStream(ModerationOutputsStream):
+    def __init__(self, automaton: KeywordsAutomaton, preset_response: str) -> None:
+        self._matcher = StreamingKeywordsMatcher(automaton)
+        self._preset_response = preset_response
+
+    def moderation_for_outputs(self, text: str) -> ModerationOutputsResult:
+        flagged = self._matcher.feed(text)
+
+        return ModerationOutputsResult(flagged=flagged, action=ModerationAction.DIRECT_OUTPUT,
+                                       preset_response=self._preset_response)
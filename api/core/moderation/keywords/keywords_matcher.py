@@ -0,0 +1,129 @@
+import threading
+
+from core.helper.lru_cache import LRUCache
+
+# count of keyword lists whose automatons are cached in process
+AUTOMATON_CACHE_CAPACITY = 1000
+
+
+class KeywordsAutomaton:
+    """
+    Aho-Corasick automaton of case-folded keywords,
+    finds whether a text contains any of the keywords in one pass over the text.
+    """
+
+    def __init__(self, keywords: list[str]) -> None:
+        # state 0 is the root, every state has its transitions, failure state and whether a keyword ends in it
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[bool] = [False]
+
+        for keyword in keywords:
+            keyword = keyword.casefold()
+            if keyword:
+                self._add_keyword(keyword)
+
+        self._build_failure_states()
+
+    def search(self, text: str) -> bool:
+        """
+        Whether the text contains any of the keywords.
+
+        :param text: text
+        :return: True when a keyword is found
+        """
+        _, found = self.feed(0, text)
+        return found
+
+    def feed(self, state: int, text: str) -> tuple[int, bool]:
+        """
+        Scan the next chunk of a text.
+
+        :param state: state after the previous chunks, 0 for the first chunk
+        :param text: chunk
+        :return: state after the chunk, and whether a keyword is found, it may span previous chunks
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        for char in text.casefold():
+            while state and char not in goto[state]:
+                state = fail[state]
+
+            state = goto[state].get(char, 0)
+            if output[state]:
+                return state, True
+
+        return state, False
+
+    def _add_keyword(self, keyword: str) -> None:
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(False)
+                self._goto[state][char] = next_state
+
+            state = next_state
+
+        self._output[state] = True
+
+    def _build_failure_states(self) -> None:
+        # breadth first, the failure state of a state is always shallower than it
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                fail_state = self._fail[state]
+                while fail_state and char not in self._goto[fail_state]:
+                    fail_state = self._fail[fail_state]
+
+                self._fail[next_state] = self._goto[fail_state].get(char, 0)
+                # a keyword ending in the failure state also ends here
+                self._output[next_state] = self._output[next_state] or self._output[self._fail[next_state]]
+                queue.append(next_state)
+
+
+class StreamingKeywordsMatcher:
+    """
+    Matcher of the keywords in a text received chunk by chunk, only new chunks are scanned.
+    """
+
+    def __init__(self, automaton: KeywordsAutomaton) -> None:
+        self._automaton = automaton
+        self._state = 0
+        self.found = False
+
+    def feed(self, text: str) -> bool:
+        """
+        Scan the next chunk of the text.
+
+        :param text: chunk
+        :return: whether a keyword is found in the text so far
+        """
+        if not self.found:
+            self._state, self.found = self._automaton.feed(self._state, text)
+
+        return self.found
+
+
+_automaton_cache = LRUCache(AUTOMATON_CACHE_CAPACITY)
+_automaton_cache_lock = threading.Lock()
+
+
+def get_keywords_automaton(keywords: str) -> KeywordsAutomaton:
+    """
+    Get the automaton of a keywords config, compiled once per process and keyword list.
+
+    :param keywords: keywords, one per line
+    :return: automaton
+    """
+    with _automaton_cache_lock:
+        automaton = _automaton_cache.get(keywords)
+
+    if automaton is None:
+        automaton = KeywordsAutomaton(keywords.split('\n'))
+        with _automaton_cache_lock:
+            _automaton_cache.put(keywords, automaton)
+
+    return automaton
@@ -16,6 +16,7 @@ from core.entities.provider_entities import (
 )
 from core.helper import encrypter
 from core.helper.model_provider_cache import ProviderCredentialsCache, ProviderCredentialsCacheType
+from core.helper.provider_configurations_cache import provider_configurations_cache
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.entities.provider_entities import (
     CredentialFormSchema,
@@ -80,6 +81,24 @@ class ProviderManager:
         :param tenant_id:
         :return:
         """
+        # the version is read before the records, a change while building invalidates the built configurations
+        version = provider_configurations_cache.get_version(tenant_id)
+        provider_configurations = provider_configurations_cache.get(tenant_id, version)
+        if provider_configurations is not None:
+            return provider_configurations
+
+        provider_configurations = self._build_configurations(tenant_id)
+        provider_configurations_cache.set(tenant_id, version, provider_configurations)
+
+        return provider_configurations
+
+    def _build_configurations(self, tenant_id: str) -> ProviderConfigurations:
+        """
+        Build model provider configurations from the provider records of the workspace.
+
+        :param tenant_id: workspace id
+        :return:
+        """
         # Get all provider records of the workspace
         provider_name_to_provider_records_dict = self._get_all_providers(tenant_id)
 
@@ -326,6 +345,8 @@ class ProviderManager:
             db.session.add(default_model)
             db.session.commit()
 
+        provider_configurations_cache.invalidate(tenant_id)
+
         return default_model
 
     def _get_all_providers(self, tenant_id: str) -> dict[str, list[Provider]]:
@@ -485,7 +506,8 @@ class ProviderManager:
             provider_credentials_cache = ProviderCredentialsCache(
                 tenant_id=tenant_id,
                 identity_id=custom_provider_record.id,
-                cache_type=ProviderCredentialsCacheType.PROVIDER
+                cache_type=ProviderCredentialsCacheType.PROVIDER,
+                updated_at=custom_provider_record.updated_at
             )
 
             # Get cached provider credentials
@@ -545,7 +567,8 @@ class ProviderManager:
             provider_model_credentials_cache = ProviderCredentialsCache(
                 tenant_id=tenant_id,
                 identity_id=provider_model_record.id,
-                cache_type=ProviderCredentialsCacheType.MODEL
+                cache_type=ProviderCredentialsCacheType.MODEL,
+                updated_at=provider_model_record.updated_at
             )
 
             # Get cached provider model credentials
@@ -667,7 +690,8 @@ class ProviderManager:
                 provider_credentials_cache = ProviderCredentialsCache(
                     tenant_id=tenant_id,
                     identity_id=provider_record.id,
-                    cache_type=ProviderCredentialsCacheType.PROVIDER
+                    cache_type=ProviderCredentialsCacheType.PROVIDER,
+                    updated_at=provider_record.updated_at
                 )
 
                 # Get cached provider credentials
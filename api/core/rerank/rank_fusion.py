@@ -0,0 +1,134 @@
+from enum import Enum
+from typing import Optional
+
+from langchain.schema import Document
+
+
+class RerankingMode(Enum):
+    """
+    How the documents of the search methods of a hybrid search are merged.
+    """
+    RERANKING_MODEL = 'reranking_model'
+    RECIPROCAL_RANK_FUSION = 'reciprocal_rank_fusion'
+    WEIGHTED_SCORE = 'weighted_score'
+
+    @classmethod
+    def value_of(cls, value: Optional[str]) -> 'RerankingMode':
+        """
+        Get the mode of a retrieval model, the reranking model when it is not set.
+
+        :param value: mode value
+        :return: mode
+        """
+        if not value:
+            return cls.RERANKING_MODEL
+
+        for mode in cls:
+            if mode.value == value:
+                return mode
+        raise ValueError(f'invalid reranking mode value {value}')
+
+
+class RankFusionRunner:
+    """
+    Merge the ranked documents of several search methods in process, without a rerank model.
+
+    Reciprocal rank fusion scores a document by the sum of 1 / (k + rank) over the lists it is in.
+    Weighted score fusion scores it by the weighted sum of its min-max normalised scores,
+    a list without scores, e.g. of a full text search, is scored by rank.
+    Fused scores are scaled to [0, 1], so that the score threshold of the retrieval model applies to them.
+    """
+
+    def __init__(self, mode: RerankingMode, weights: Optional[list[float]] = None, rrf_k: int = 60) -> None:
+        """
+        :param mode: reciprocal rank fusion or weighted score fusion
+        :param weights: weight of each list, equal weights when not given
+        :param rrf_k: rank constant of reciprocal rank fusion
+        """
+        if mode == RerankingMode.RERANKING_MODEL:
+            raise ValueError('reranking model mode requires a rerank model, use RerankRunner')
+
+        self.mode = mode
+        self.weights = weights
+        self.rrf_k = rrf_k
+
+    def run(self, documents_lists: list[list[Document]], score_threshold: Optional[float] = None,
+            top_n: Optional[int] = None) -> list[Document]:
+        """
+        Run rank fusion
+        :param documents_lists: ranked documents of each search method
+        :param score_threshold: score threshold
+        :param top_n: top n
+        :return: fused documents, best first
+        """
+        weights = self.weights if self.weights else [1.0] * len(documents_lists)
+        if len(weights) != len(documents_lists):
+            raise ValueError('weights must be given for every documents list')
+
+        total_weight = sum(weights)
+        if total_weight <= 0:
+            raise ValueError('weights must sum to a positive number')
+
+        scores: dict[str, float] = {}
+        unique_documents: dict[str, Document] = {}
+        for documents, weight in zip(documents_lists, weights):
+            if self.mode == RerankingMode.RECIPROCAL_RANK_FUSION:
+                list_scores = self._reciprocal_rank_scores(documents)
+            else:
+                list_scores = self._normalized_scores(documents)
+
+            seen = set()
+            for document, score in zip(documents, list_scores):
+                doc_id = document.metadata['doc_id']
+                # a document is only scored by its best rank in a list
+                if doc_id in seen:
+                    continue
+
+                seen.add(doc_id)
+                unique_documents.setdefault(doc_id, document)
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * score
+
+        # the best possible fused score, of a document ranked first in every list
+        if self.mode == RerankingMode.RECIPROCAL_RANK_FUSION:
+            max_score = total_weight / (self.rrf_k + 1)
+        else:
+            max_score = total_weight
+
+        fused_documents = []
+        for doc_id in sorted(scores, key=scores.get, reverse=True):
+            score = scores[doc_id] / max_score
+            if score_threshold is not None and score < score_threshold:
+                continue
+
+            document = unique_documents[doc_id]
+            fused_documents.append(Document(
+                page_content=document.page_content,
+                metadata={
+                    "doc_id": doc_id,
+                    "doc_hash": document.metadata.get('doc_hash'),
+                    "document_id": document.metadata.get('document_id'),
+                    "dataset_id": document.metadata.get('dataset_id'),
+                    'score': score
+                }
+            ))
+
+        return fused_documents[:top_n] if top_n is not None else fused_documents
+
+    def _reciprocal_rank_scores(self, documents: list[Document]) -> list[float]:
+        return [1.0 / (self.rrf_k + rank) for rank in range(1, len(documents) + 1)]
+
+    @staticmethod
+    def _normalized_scores(documents: list[Document]) -> list[float]:
+        raw_scores = [document.metadata.get('score') for document in documents]
+        if not raw_scores:
+            return []
+
+        if any(score is None for score in raw_scores):
+            # scored by rank, from 1 for the first document down to 1 / n for the last one
+            return [(len(documents) - rank) / len(documents) for rank in range(len(documents))]
+
+        min_score, max_score = min(raw_scores), max(raw_scores)
+        if max_score == min_score:
+            return [1.0] * len(raw_scores)
+
+        return [(score - min_score) / (max_score - min_score) for score in raw_scores]
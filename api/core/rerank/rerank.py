@@ -21,11 +21,11 @@ class RerankRunner:
         :return:
         """
         docs = []
-        doc_id = []
+        doc_ids = set()
         unique_documents = []
         for document in documents:
-            if document.metadata['doc_id'] not in doc_id:
-                doc_id.append(document.metadata['doc_id'])
+            if document.metadata['doc_id'] not in doc_ids:
+                doc_ids.add(document.metadata['doc_id'])
                 docs.append(document.page_content)
                 unique_documents.append(document)
 
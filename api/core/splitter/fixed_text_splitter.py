@@ -1,8 +1,15 @@
 """Functionality for splitting text."""
 from __future__ import annotations
 
+import logging
+import re
+from bisect import bisect_left
+from collections.abc import Callable
+from functools import lru_cache
 from typing import Any, Optional, cast
 
+import numpy as np
+import tiktoken
 from langchain.text_splitter import (
     TS,
     AbstractSet,
@@ -18,34 +25,156 @@ from core.model_manager import ModelInstance
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
 from core.model_runtime.model_providers.__base.tokenizers.gpt2_tokenzier import GPT2Tokenizer
 
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=16)
+def _get_token_char_tables(encoding: tiktoken.Encoding) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Per token of the vocabulary: the number of characters starting in its bytes,
+    and whether its bytes start inside a character, see tiktoken Encoding.decode_with_offsets.
+    """
+    char_starts = np.zeros(encoding.n_vocab, dtype=np.int64)
+    continues_char = np.zeros(encoding.n_vocab, dtype=np.int64)
+    for token in range(encoding.n_vocab):
+        try:
+            token_bytes = encoding.decode_single_token_bytes(token)
+        except KeyError:
+            continue
+        char_starts[token] = sum(1 for c in token_bytes if not 0x80 <= c < 0xC0)
+        continues_char[token] = 1 if token_bytes and 0x80 <= token_bytes[0] < 0xC0 else 0
+
+    return char_starts, continues_char
+
+
+class TokenOffsetIndex:
+    """
+    Token offsets of a document, tokenized once.
+
+    A span of the document whose both ends are token boundaries is measured by the number of document tokens
+    starting inside it, a lookup instead of another tokenizer pass.
+    Other spans, e.g. a word whose leading space is part of its token, are tokenized on their own,
+    so every piece is measured the same as by the tokenizer.
+    """
+
+    def __init__(self, text: str, encoding: tiktoken.Encoding,
+                 batch_length_function: Callable[[list[str]], list[int]]):
+        self.text = text
+        self._encoding = encoding
+        self._batch_length_function = batch_length_function
+        tokens = np.array(encoding.encode(text, allowed_special='all'), dtype=np.int64)
+        # character offset of each token, same as Encoding.decode_with_offsets but without a python loop
+        char_starts, continues_char = _get_token_char_tables(encoding)
+        token_chars = char_starts[tokens]
+        token_continues_char = continues_char[tokens]
+        offsets = np.maximum(np.cumsum(token_chars) - token_chars - token_continues_char, 0)
+        self._offsets = offsets.tolist()
+        # a token continuing a character of the previous token does not start a character boundary
+        self._boundaries = set(offsets[token_continues_char == 0].tolist())
+        self._boundaries.add(len(text))
+        self._separator_lengths = {}
+
+    def count(self, start: int, end: int) -> int:
+        """Number of document tokens starting in the span [start, end)."""
+        if end <= start:
+            return 0
+
+        return bisect_left(self._offsets, end) - bisect_left(self._offsets, start)
+
+    def is_aligned(self, start: int, end: int) -> bool:
+        """Whether both ends of the span [start, end) are token boundaries of the document."""
+        return start in self._boundaries and end in self._boundaries
+
+    def counts(self, spans: list[tuple[int, int]]) -> list[int]:
+        """Number of tokens of each span, the spans not aligned to the document tokens are measured in one batch."""
+        lengths = []
+        unaligned = []
+        for i, (start, end) in enumerate(spans):
+            if end <= start:
+                lengths.append(0)
+            elif self.is_aligned(start, end):
+                lengths.append(self.count(start, end))
+            else:
+                lengths.append(0)
+                unaligned.append(i)
+
+        if unaligned:
+            unaligned_lengths = self._batch_length_function([self.text[spans[i][0]:spans[i][1]] for i in unaligned])
+            for i, length in zip(unaligned, unaligned_lengths):
+                lengths[i] = length
+
+        return lengths
+
+    def separator_length(self, separator: str) -> int:
+        """Number of tokens of a separator, which is joined between pieces and not measured in place."""
+        if separator not in self._separator_lengths:
+            self._separator_lengths[separator] = len(self._encoding.encode(separator, allowed_special='all'))
+
+        return self._separator_lengths[separator]
+
 
 class EnhanceRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
     """
         This class is used to implement from_gpt2_encoder, to prevent using of tiktoken
     """
 
+    def __init__(self, batch_length_function: Optional[Callable[[list[str]], list[int]]] = None,
+                 token_encoding: Optional[tiktoken.Encoding] = None, **kwargs: Any):
+        """
+        Create a new TextSplitter, batch_length_function measures many texts in one call.
+
+        With a token_encoding the splitter runs in token offset mode: each document is tokenized once
+        and pieces are measured by its token offsets, instead of a tokenizer pass per piece and window.
+        """
+        super().__init__(**kwargs)
+        self._batch_length_function = batch_length_function \
+            or (lambda texts: [self._length_function(text) for text in texts])
+        self._token_encoding = token_encoding
+
     @classmethod
     def from_encoder(
             cls: Type[TS],
             embedding_model_instance: Optional[ModelInstance],
             allowed_special: Union[Literal[all], AbstractSet[str]] = set(),
             disallowed_special: Union[Literal[all], Collection[str]] = "all",
+            token_offsets: bool = False,
             **kwargs: Any,
     ):
-        def _token_encoder(text: str) -> int:
-            if not text:
-                return 0
+        embedding_model_type_instance = None
+        if embedding_model_instance:
+            embedding_model_type_instance = embedding_model_instance.model_type_instance
+            embedding_model_type_instance = cast(TextEmbeddingModel, embedding_model_type_instance)
+
+        # token offset mode needs the local encoding the model counts with,
+        # models counting tokens remotely keep measuring every piece
+        token_encoding = None
+        if token_offsets:
+            if embedding_model_type_instance:
+                token_encoding = embedding_model_type_instance.get_tokenizer_encoding(
+                    model=embedding_model_instance.model,
+                    credentials=embedding_model_instance.credentials
+                )
+            else:
+                token_encoding = GPT2Tokenizer.get_encoder()
 
-            if embedding_model_instance:
-                embedding_model_type_instance = embedding_model_instance.model_type_instance
-                embedding_model_type_instance = cast(TextEmbeddingModel, embedding_model_type_instance)
-                return embedding_model_type_instance.get_num_tokens(
+        def _token_encoder_batch(texts: list[str]) -> list[int]:
+            if not texts:
+                return []
+
+            if embedding_model_type_instance:
+                return embedding_model_type_instance.get_num_tokens_batch(
                     model=embedding_model_instance.model,
                     credentials=embedding_model_instance.credentials,
-                    texts=[text]
+                    texts=texts
                 )
             else:
-                return GPT2Tokenizer.get_num_tokens(text)
+                return GPT2Tokenizer.get_num_tokens_batch(texts)
+
+        def _token_encoder(text: str) -> int:
+            if not text:
+                return 0
+
+            return _token_encoder_batch([text])[0]
 
         if issubclass(cls, TokenTextSplitter):
             extra_kwargs = {
@@ -55,7 +184,106 @@ class EnhanceRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
             }
             kwargs = {**kwargs, **extra_kwargs}
 
-        return cls(length_function=_token_encoder, **kwargs)
+        return cls(length_function=_token_encoder, batch_length_function=_token_encoder_batch,
+                   token_encoding=token_encoding, **kwargs)
+
+    def split_text(self, text: str) -> list[str]:
+        if not self._token_encoding:
+            return super().split_text(text)
+
+        index = TokenOffsetIndex(text, self._token_encoding, self._batch_length_function)
+        return self._split_text_by_offsets(index, 0, len(text), self._separators)
+
+    def _split_text_by_offsets(self, index: TokenOffsetIndex, start: int, end: int,
+                               separators: list[str]) -> list[str]:
+        """Same as RecursiveCharacterTextSplitter._split_text, on the span [start, end) of the document."""
+        final_chunks = []
+        # Get appropriate separator to use
+        separator = separators[-1]
+        new_separators = []
+        for i, _s in enumerate(separators):
+            if _s == "":
+                separator = _s
+                break
+            if re.compile(_s).search(index.text, start, end):
+                separator = _s
+                new_separators = separators[i + 1:]
+                break
+
+        spans = self._regex_split_spans(index.text, start, end, separator)
+        # Now go merging things, recursively splitting longer texts.
+        _good_spans = []
+        _separator = "" if self._keep_separator else separator
+        for span, span_length in zip(spans, index.counts(spans)):
+            if span_length < self._chunk_size:
+                _good_spans.append((*span, span_length))
+            else:
+                if _good_spans:
+                    final_chunks.extend(self._merge_spans(index, _good_spans, _separator))
+                    _good_spans = []
+                if not new_separators:
+                    final_chunks.append(index.text[span[0]:span[1]])
+                else:
+                    final_chunks.extend(self._split_text_by_offsets(index, span[0], span[1], new_separators))
+        if _good_spans:
+            final_chunks.extend(self._merge_spans(index, _good_spans, _separator))
+        return final_chunks
+
+    def _regex_split_spans(self, text: str, start: int, end: int, separator: str) -> list[tuple[int, int]]:
+        """Spans of the pieces langchain's _split_text_with_regex returns for text[start:end]."""
+        if not separator:
+            return [(i, i + 1) for i in range(start, end)]
+
+        matches = list(re.compile(separator).finditer(text, start, end))
+        if self._keep_separator:
+            # the separator is kept at the start of the piece after it
+            bounds = [start] + [match.start() for match in matches] + [end]
+        else:
+            bounds = [start]
+            for match in matches:
+                bounds.extend([match.start(), match.end()])
+            bounds.append(end)
+
+        if self._keep_separator:
+            spans = list(zip(bounds[:-1], bounds[1:]))
+        else:
+            spans = list(zip(bounds[0::2], bounds[1::2]))
+
+        return [span for span in spans if span[1] > span[0]]
+
+    def _merge_spans(self, index: TokenOffsetIndex, spans: list[tuple[int, int, int]], separator: str) -> list[str]:
+        """Same as TextSplitter._merge_splits, on spans of the document with their token counts."""
+        separator_len = index.separator_length(separator)
+
+        docs = []
+        current_doc: list[tuple[int, int, int]] = []
+        # position of the first piece of the current window in current_doc
+        head = 0
+        total = 0
+        for start, end, _len in spans:
+            if total + _len + (separator_len if len(current_doc) > head else 0) > self._chunk_size:
+                if total > self._chunk_size:
+                    logger.warning(f"Created a chunk of size {total}, "
+                                   f"which is longer than the specified {self._chunk_size}")
+                if len(current_doc) > head:
+                    doc = self._join_docs([index.text[s:e] for s, e, _ in current_doc[head:]], separator)
+                    if doc is not None:
+                        docs.append(doc)
+                    # Keep on popping if:
+                    # - we have a larger chunk than in the chunk overlap
+                    # - or if we still have any chunks and the length is long
+                    while total > self._chunk_overlap or (
+                            total + _len + (separator_len if len(current_doc) > head else 0) > self._chunk_size
+                            and total > 0
+                    ):
+                        total -= current_doc[head][2] + (separator_len if len(current_doc) - head > 1 else 0)
+                        head += 1
+            current_doc.append((start, end, _len))
+            total += _len + (separator_len if len(current_doc) - head > 1 else 0)
+        doc = self._join_docs([index.text[s:e] for s, e, _ in current_doc[head:]], separator)
+        if doc is not None:
+            docs.append(doc)
+        return docs
 
 
 class FixedRecursiveCharacterTextSplitter(EnhanceRecursiveCharacterTextSplitter):
@@ -67,14 +295,19 @@ class FixedRecursiveCharacterTextSplitter(EnhanceRecursiveCharacterTextSplitter)
 
     def split_text(self, text: str) -> list[str]:
         """Split incoming text and return chunks."""
+        if self._token_encoding:
+            return self._split_fixed_text_by_offsets(
+                TokenOffsetIndex(text, self._token_encoding, self._batch_length_function)
+            )
+
         if self._fixed_separator:
             chunks = text.split(self._fixed_separator)
         else:
             chunks = list(text)
 
         final_chunks = []
-        for chunk in chunks:
-            if self._length_function(chunk) > self._chunk_size:
+        for chunk, chunk_length in zip(chunks, self._batch_length_function(chunks)):
+            if chunk_length > self._chunk_size:
                 final_chunks.extend(self.recursive_split_text(chunk))
             else:
                 final_chunks.append(chunk)
@@ -100,8 +333,8 @@ class FixedRecursiveCharacterTextSplitter(EnhanceRecursiveCharacterTextSplitter)
             splits = list(text)
         # Now go merging things, recursively splitting longer texts.
         _good_splits = []
-        for s in splits:
-            if self._length_function(s) < self._chunk_size:
+        for s, s_length in zip(splits, self._batch_length_function(splits)):
+            if s_length < self._chunk_size:
                 _good_splits.append(s)
             else:
                 if _good_splits:
@@ -114,3 +347,58 @@ class FixedRecursiveCharacterTextSplitter(EnhanceRecursiveCharacterTextSplitter)
             merged_text = self._merge_splits(_good_splits, separator)
             final_chunks.extend(merged_text)
         return final_chunks
+
+    def _split_fixed_text_by_offsets(self, index: TokenOffsetIndex) -> list[str]:
+        """Same as split_text, measuring the pieces by the token offsets of the document."""
+        final_chunks = []
+        spans = self._str_split_spans(index.text, 0, len(index.text), self._fixed_separator)
+        for (start, end), span_length in zip(spans, index.counts(spans)):
+            if span_length > self._chunk_size:
+                final_chunks.extend(self._recursive_split_text_by_offsets(index, start, end))
+            else:
+                final_chunks.append(index.text[start:end])
+
+        return final_chunks
+
+    def _recursive_split_text_by_offsets(self, index: TokenOffsetIndex, start: int, end: int) -> list[str]:
+        """Same as recursive_split_text, on the span [start, end) of the document."""
+        final_chunks = []
+        # Get appropriate separator to use
+        separator = self._separators[-1]
+        for _s in self._separators:
+            if _s == "":
+                separator = _s
+                break
+            if index.text.find(_s, start, end) != -1:
+                separator = _s
+                break
+        # Now go merging things, recursively splitting longer texts.
+        _good_spans = []
+        spans = self._str_split_spans(index.text, start, end, separator)
+        for span, span_length in zip(spans, index.counts(spans)):
+            if span_length < self._chunk_size:
+                _good_spans.append((*span, span_length))
+            else:
+                if _good_spans:
+                    final_chunks.extend(self._merge_spans(index, _good_spans, separator))
+                    _good_spans = []
+                final_chunks.extend(self._recursive_split_text_by_offsets(index, *span))
+        if _good_spans:
+            final_chunks.extend(self._merge_spans(index, _good_spans, separator))
+        return final_chunks
+
+    @staticmethod
+    def _str_split_spans(text: str, start: int, end: int, separator: str) -> list[tuple[int, int]]:
+        """Spans of text[start:end].split(separator), or of its characters without a separator."""
+        if not separator:
+            return [(i, i + 1) for i in range(start, end)]
+
+        spans = []
+        position = start
+        while True:
+            found = text.find(separator, position, end)
+            if found == -1:
+                spans.append((position, end))
+                return spans
+            spans.append((position, found))
+            position = found + len(separator)
@@ -1,4 +1,3 @@
-import threading
 from typing import Optional
 
 from flask import Flask, current_app
@@ -6,14 +5,18 @@ from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
 
 from core.callback_handler.index_tool_callback_handler import DatasetIndexToolCallbackHandler
+from core.docstore.segment_hydrator import SegmentHydrator
 from core.embedding.cached_embedding import CacheEmbedding
 from core.errors.error import LLMBadRequestError, ProviderTokenNotInitError
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
+from core.helper.retrieval_executor import RetrievalTask, retrieval_executor
 from core.index.keyword_table_index.keyword_table_index import KeywordTableConfig, KeywordTableIndex
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
+from core.rerank.rank_fusion import RerankingMode
 from core.rerank.rerank import RerankRunner
 from extensions.ext_database import db
-from models.dataset import Dataset, Document, DocumentSegment
+from models.dataset import Dataset
 from services.retrieval_service import RetrievalService
 
 default_retrieval_model = {
@@ -57,56 +60,56 @@ class DatasetMultiRetrieverTool(BaseTool):
         )
 
     def _run(self, query: str) -> str:
-        threads = []
-        all_documents = []
+        flask_app = current_app._get_current_object()
+        datasets = {
+            dataset.id: dataset
+            for dataset in db.session.query(Dataset).filter(
+                Dataset.tenant_id == self.tenant_id,
+                Dataset.id.in_(self.dataset_ids)
+            ).all()
+        }
+
         for dataset_id in self.dataset_ids:
-            retrieval_thread = threading.Thread(target=self._retriever, kwargs={
-                'flask_app': current_app._get_current_object(),
-                'dataset_id': dataset_id,
-                'query': query,
-                'all_documents': all_documents,
-                'hit_callbacks': self.hit_callbacks
-            })
-            threads.append(retrieval_thread)
-            retrieval_thread.start()
-        for thread in threads:
-            thread.join()
-        # do rerank for searched documents
-        model_manager = ModelManager()
-        rerank_model_instance = model_manager.get_model_instance(
-            tenant_id=self.tenant_id,
-            provider=self.reranking_provider_name,
-            model_type=ModelType.RERANK,
-            model=self.reranking_model_name
-        )
+            if dataset_id not in datasets:
+                continue
 
-        rerank_runner = RerankRunner(rerank_model_instance)
-        all_documents = rerank_runner.run(query, all_documents, self.score_threshold, self.top_k)
+            for hit_callback in self.hit_callbacks:
+                hit_callback.on_query(query, dataset_id)
+
+        # the reranked documents of all datasets are cached until the index of any of them changes,
+        # a hit skips both the searches and the rerank model
+        index_versions = dataset_retrieval_cache.get_versions(
+            [dataset_id for dataset_id in self.dataset_ids if dataset_id in datasets]
+        )
+        retrieval_params = {
+            'datasets': {
+                dataset_id: (dataset.retrieval_model or default_retrieval_model)
+                if dataset.indexing_technique != 'economy' else 'keyword_search'
+                for dataset_id, dataset in datasets.items()
+            },
+            'reranking_provider_name': self.reranking_provider_name,
+            'reranking_model_name': self.reranking_model_name,
+            'top_k': self.top_k,
+            'score_threshold': self.score_threshold,
+            'strategy': 'multiple_reranked'
+        }
+        all_documents = dataset_retrieval_cache.get_multiple(index_versions, retrieval_params, query)
+        if all_documents is None:
+            all_documents = self._retrieve(flask_app, datasets, query, index_versions, retrieval_params)
 
         for hit_callback in self.hit_callbacks:
             hit_callback.on_tool_end(all_documents)
 
-        document_score_list = {}
-        for item in all_documents:
-            if 'score' in item.metadata and item.metadata['score']:
-                document_score_list[item.metadata['doc_id']] = item.metadata['score']
-
         document_context_list = []
-        index_node_ids = [document.metadata['doc_id'] for document in all_documents]
-        segments = DocumentSegment.query.filter(
-            DocumentSegment.dataset_id.in_(self.dataset_ids),
-            DocumentSegment.completed_at.isnot(None),
-            DocumentSegment.status == 'completed',
-            DocumentSegment.enabled == True,
-            DocumentSegment.index_node_id.in_(index_node_ids)
-        ).all()
-
-        if segments:
-            index_node_id_to_position = {id: position for position, id in enumerate(index_node_ids)}
-            sorted_segments = sorted(segments,
-                                     key=lambda segment: index_node_id_to_position.get(segment.index_node_id,
-                                                                                       float('inf')))
-            for segment in sorted_segments:
+        hydrated_segments = SegmentHydrator.hydrate_documents(
+            dataset_ids=self.dataset_ids,
+            documents=all_documents,
+            with_documents=self.return_resource
+        )
+
+        if hydrated_segments:
+            for hydrated_segment in hydrated_segments:
+                segment = hydrated_segment.segment
                 if segment.answer:
                     document_context_list.append(f'question:{segment.content} answer:{segment.answer}')
                 else:
@@ -114,14 +117,10 @@ class DatasetMultiRetrieverTool(BaseTool):
             if self.return_resource:
                 context_list = []
                 resource_number = 1
-                for segment in sorted_segments:
-                    dataset = Dataset.query.filter_by(
-                        id=segment.dataset_id
-                    ).first()
-                    document = Document.query.filter(Document.id == segment.document_id,
-                                                     Document.enabled == True,
-                                                     Document.archived == False,
-                                                     ).first()
+                for hydrated_segment in hydrated_segments:
+                    segment = hydrated_segment.segment
+                    dataset = hydrated_segment.dataset
+                    document = hydrated_segment.document
                     if dataset and document:
                         source = {
                             'position': resource_number,
@@ -132,7 +131,7 @@ class DatasetMultiRetrieverTool(BaseTool):
                             'data_source_type': document.data_source_type,
                             'segment_id': segment.id,
                             'retriever_from': self.retriever_from,
-                            'score': document_score_list.get(segment.index_node_id, None)
+                            'score': hydrated_segment.score
                         }
 
                         if self.retriever_from == 'dev':
@@ -155,95 +154,236 @@ class DatasetMultiRetrieverTool(BaseTool):
     async def _arun(self, tool_input: str) -> str:
         raise NotImplementedError()
 
-    def _retriever(self, flask_app: Flask, dataset_id: str, query: str, all_documents: list,
-                   hit_callbacks: list[DatasetIndexToolCallbackHandler]):
+    def _retrieve(self, flask_app: Flask, datasets: dict[str, Dataset], query: str,
+                  index_versions: Optional[dict[str, bytes]], retrieval_params: dict) -> list:
+        """
+        Search the datasets and rerank their documents together, caching the result when every search succeeded.
+
+        :param flask_app: flask app
+        :param datasets: dataset by id
+        :param query: query
+        :param index_versions: index version by dataset id read before searching
+        :param retrieval_params: parameters the reranked documents are cached by
+        :return: reranked documents
+        """
+        all_documents = []
+        retrievals = []
+        for dataset_id in self.dataset_ids:
+            if dataset_id not in datasets:
+                continue
+
+            index_version = index_versions.get(dataset_id) if index_versions else None
+            retrieval = self._prepare_retrieval(flask_app, datasets[dataset_id], query, index_version, all_documents)
+            if retrieval:
+                retrievals.append(retrieval)
+
+        # the searches of all datasets run side by side, the searches not finished in time are left out
+        results = iter(retrieval_executor.run([task for retrieval in retrievals for task in retrieval.tasks]))
+        complete = True
+        for retrieval in retrievals:
+            retrieval_results = [next(results) for _ in retrieval.tasks]
+            complete = complete and all(documents is not None for documents in retrieval_results)
+            all_documents.extend(self._merge_retrieval(retrieval, query, retrieval_results))
+
+        # do rerank for searched documents
+        model_manager = ModelManager()
+        rerank_model_instance = model_manager.get_model_instance(
+            tenant_id=self.tenant_id,
+            provider=self.reranking_provider_name,
+            model_type=ModelType.RERANK,
+            model=self.reranking_model_name
+        )
+
+        rerank_runner = RerankRunner(rerank_model_instance)
+        all_documents = rerank_runner.run(query, all_documents, self.score_threshold, self.top_k)
+
+        # a failed search makes the result partial
+        if complete:
+            dataset_retrieval_cache.set_multiple(index_versions, retrieval_params, query, all_documents)
+
+        return all_documents
+
+    def _prepare_retrieval(self, flask_app: Flask, dataset: Dataset, query: str, index_version: Optional[bytes],
+                           all_documents: list) -> Optional['_DatasetRetrieval']:
+        """
+        Prepare the searches of a dataset, its cached documents are added to all_documents instead.
+
+        :return: searches of the dataset, None when it is not searched
+        """
+        if dataset.indexing_technique == "economy":
+            # use keyword table query
+            return _DatasetRetrieval(dataset=dataset, tasks=[RetrievalTask(
+                dataset_id=dataset.id,
+                backend='keyword_search',
+                func=self._keyword_search,
+                kwargs={
+                    'flask_app': flask_app,
+                    'dataset_id': dataset.id,
+                    'query': query
+                }
+            )])
+
+        # get retrieval model , if the model is not setting , using default
+        retrieval_model = dataset.retrieval_model if dataset.retrieval_model else default_retrieval_model
+
+        # the documents of a query are cached until the index of the dataset changes
+        retrieval_params = {
+            'retrieval_model': retrieval_model,
+            'top_k': self.top_k,
+            'score_threshold': self.score_threshold,
+            'strategy': 'multiple'
+        }
+        documents = dataset_retrieval_cache.get(dataset.id, index_version, retrieval_params, query)
+        if documents is not None:
+            all_documents.extend(documents)
+            return None
+
+        if self.top_k <= 0:
+            return None
+
+        try:
+            model_manager = ModelManager()
+            embedding_model = model_manager.get_model_instance(
+                tenant_id=dataset.tenant_id,
+                provider=dataset.embedding_model_provider,
+                model_type=ModelType.TEXT_EMBEDDING,
+                model=dataset.embedding_model
+            )
+        except LLMBadRequestError:
+            return None
+        except ProviderTokenNotInitError:
+            return None
+
+        embeddings = CacheEmbedding(embedding_model)
+
+        tasks = []
+        # retrieval_model source with semantic
+        if retrieval_model['search_method'] == 'semantic_search' or retrieval_model[
+            'search_method'] == 'hybrid_search':
+            tasks.append(RetrievalTask(
+                dataset_id=dataset.id,
+                backend='semantic_search',
+                func=RetrievalService.embedding_search,
+                kwargs={
+                    'flask_app': flask_app,
+                    'dataset_id': str(dataset.id),
+                    'query': query,
+                    'top_k': self.top_k,
+                    'score_threshold': self.score_threshold,
+                    'reranking_model': None,
+                    'search_method': 'hybrid_search',
+                    'embeddings': embeddings
+                }
+            ))
+
+        # retrieval_model source with full text
+        if retrieval_model['search_method'] == 'full_text_search' or retrieval_model[
+            'search_method'] == 'hybrid_search':
+            tasks.append(RetrievalTask(
+                dataset_id=dataset.id,
+                backend='full_text_search',
+                func=RetrievalService.full_text_index_search,
+                kwargs={
+                    'flask_app': flask_app,
+                    'dataset_id': str(dataset.id),
+                    'query': query,
+                    'search_method': 'hybrid_search',
+                    'embeddings': embeddings,
+                    'score_threshold': retrieval_model['score_threshold'] if retrieval_model[
+                        'score_threshold_enabled'] else None,
+                    'top_k': self.top_k,
+                    'reranking_model': retrieval_model['reranking_model'] if retrieval_model[
+                        'reranking_enable'] else None
+                }
+            ))
+
+        return _DatasetRetrieval(
+            dataset=dataset,
+            tasks=tasks,
+            retrieval_model=retrieval_model,
+            retrieval_params=retrieval_params,
+            index_version=index_version
+        )
+
+    def _merge_retrieval(self, retrieval: '_DatasetRetrieval', query: str,
+                         results: list[Optional[list]]) -> list:
+        """
+        Merge the documents of the searches of a dataset, and cache them when every search succeeded.
+
+        :param retrieval: searches of the dataset
+        :param query: query
+        :param results: documents of each search, None for the searches that failed or timed out
+        :return: documents of the dataset
+        """
+        if retrieval.retrieval_model is None:
+            return [document for documents in results for document in documents or []]
+
+        embedding_documents = []
+        full_text_documents = []
+        for task, documents in zip(retrieval.tasks, results):
+            if task.backend == 'semantic_search':
+                embedding_documents.extend(documents or [])
+            else:
+                full_text_documents.extend(documents or [])
+
+        # the documents of all datasets are reranked together, only a rank fusion is run per dataset
+        retrieval_model = retrieval.retrieval_model
+        if retrieval_model['search_method'] == 'hybrid_search' \
+                and RerankingMode.value_of(retrieval_model.get('reranking_mode')) \
+                != RerankingMode.RERANKING_MODEL:
+            documents = RetrievalService.hybrid_rerank(
+                tenant_id=retrieval.dataset.tenant_id,
+                query=query,
+                retrieval_model=retrieval_model,
+                embedding_documents=embedding_documents,
+                full_text_documents=full_text_documents,
+                score_threshold=None,
+                top_n=self.top_k
+            )
+        else:
+            documents = embedding_documents + full_text_documents
+
+        # a failed search makes the result partial
+        if all(search_documents is not None for search_documents in results):
+            dataset_retrieval_cache.set(retrieval.dataset.id, retrieval.index_version, retrieval.retrieval_params,
+                                        query, documents)
+
+        return documents
+
+    def _keyword_search(self, flask_app: Flask, dataset_id: str, query: str, all_documents: list):
         with flask_app.app_context():
             dataset = db.session.query(Dataset).filter(
-                Dataset.tenant_id == self.tenant_id,
                 Dataset.id == dataset_id
             ).first()
 
-            if not dataset:
-                return []
-
-            for hit_callback in hit_callbacks:
-                hit_callback.on_query(query, dataset.id)
+            kw_table_index = KeywordTableIndex(
+                dataset=dataset,
+                config=KeywordTableConfig(
+                    max_keywords_per_chunk=5
+                )
+            )
 
-            # get retrieval model , if the model is not setting , using default
-            retrieval_model = dataset.retrieval_model if dataset.retrieval_model else default_retrieval_model
+            documents = kw_table_index.search(query, search_kwargs={'k': self.top_k})
+            if documents:
+                all_documents.extend(documents)
 
-            if dataset.indexing_technique == "economy":
-                # use keyword table query
-                kw_table_index = KeywordTableIndex(
-                    dataset=dataset,
-                    config=KeywordTableConfig(
-                        max_keywords_per_chunk=5
-                    )
-                )
 
-                documents = kw_table_index.search(query, search_kwargs={'k': self.top_k})
-                if documents:
-                    all_documents.extend(documents)
-            else:
+class _DatasetRetrieval:
+    """
+    Searches of a dataset of a multi-dataset retrieval.
+    """
 
-                try:
-                    model_manager = ModelManager()
-                    embedding_model = model_manager.get_model_instance(
-                        tenant_id=dataset.tenant_id,
-                        provider=dataset.embedding_model_provider,
-                        model_type=ModelType.TEXT_EMBEDDING,
-                        model=dataset.embedding_model
-                    )
-                except LLMBadRequestError:
-                    return []
-                except ProviderTokenNotInitError:
-                    return []
-
-                embeddings = CacheEmbedding(embedding_model)
-
-                documents = []
-                threads = []
-                if self.top_k > 0:
-                    # retrieval_model source with semantic
-                    if retrieval_model['search_method'] == 'semantic_search' or retrieval_model[
-                        'search_method'] == 'hybrid_search':
-                        embedding_thread = threading.Thread(target=RetrievalService.embedding_search, kwargs={
-                            'flask_app': current_app._get_current_object(),
-                            'dataset_id': str(dataset.id),
-                            'query': query,
-                            'top_k': self.top_k,
-                            'score_threshold': self.score_threshold,
-                            'reranking_model': None,
-                            'all_documents': documents,
-                            'search_method': 'hybrid_search',
-                            'embeddings': embeddings
-                        })
-                        threads.append(embedding_thread)
-                        embedding_thread.start()
-
-                    # retrieval_model source with full text
-                    if retrieval_model['search_method'] == 'full_text_search' or retrieval_model[
-                        'search_method'] == 'hybrid_search':
-                        full_text_index_thread = threading.Thread(target=RetrievalService.full_text_index_search,
-                                                                  kwargs={
-                                                                      'flask_app': current_app._get_current_object(),
-                                                                      'dataset_id': str(dataset.id),
-                                                                      'query': query,
-                                                                      'search_method': 'hybrid_search',
-                                                                      'embeddings': embeddings,
-                                                                      'score_threshold': retrieval_model[
-                                                                          'score_threshold'] if retrieval_model[
-                                                                          'score_threshold_enabled'] else None,
-                                                                      'top_k': self.top_k,
-                                                                      'reranking_model': retrieval_model[
-                                                                          'reranking_model'] if retrieval_model[
-                                                                          'reranking_enable'] else None,
-                                                                      'all_documents': documents
-                                                                  })
-                        threads.append(full_text_index_thread)
-                        full_text_index_thread.start()
-
-                    for thread in threads:
-                        thread.join()
-
-                    all_documents.extend(documents)
\ No newline at end of file
+    def __init__(self, dataset: Dataset, tasks: list[RetrievalTask], retrieval_model: Optional[dict] = None,
+                 retrieval_params: Optional[dict] = None, index_version: Optional[bytes] = None) -> None:
+        """
+        :param dataset: dataset
+        :param tasks: searches of the dataset
+        :param retrieval_model: retrieval model of the dataset, None for a keyword search, which is not cached
+        :param retrieval_params: retrieval parameters the documents are cached by
+        :param index_version: index version of the dataset read before searching
+        """
+        self.dataset = dataset
+        self.tasks = tasks
+        self.retrieval_model = retrieval_model
+        self.retrieval_params = retrieval_params
+        self.index_version = index_version
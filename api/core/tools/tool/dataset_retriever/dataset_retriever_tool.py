@@ -1,19 +1,21 @@
-import threading
 from typing import Optional
 
 from flask import current_app
+from langchain.schema import Document
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
 
 from core.callback_handler.index_tool_callback_handler import DatasetIndexToolCallbackHandler
+from core.docstore.segment_hydrator import SegmentHydrator
 from core.embedding.cached_embedding import CacheEmbedding
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
+from core.helper.retrieval_executor import RetrievalTask, retrieval_executor
 from core.index.keyword_table_index.keyword_table_index import KeywordTableConfig, KeywordTableIndex
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.errors.invoke import InvokeAuthorizationError
-from core.rerank.rerank import RerankRunner
 from extensions.ext_database import db
-from models.dataset import Dataset, Document, DocumentSegment
+from models.dataset import Dataset
 from services.retrieval_service import RetrievalService
 
 default_retrieval_model = {
@@ -87,109 +89,31 @@ class DatasetRetrieverTool(BaseTool):
             documents = kw_table_index.search(query, search_kwargs={'k': self.top_k})
             return str("\n".join([document.page_content for document in documents]))
         else:
-            # get embedding model instance
-            try:
-                model_manager = ModelManager()
-                embedding_model = model_manager.get_model_instance(
-                    tenant_id=dataset.tenant_id,
-                    provider=dataset.embedding_model_provider,
-                    model_type=ModelType.TEXT_EMBEDDING,
-                    model=dataset.embedding_model
-                )
-            except InvokeAuthorizationError:
-                return ''
-
-            embeddings = CacheEmbedding(embedding_model)
+            # the documents of a query are cached until the index of the dataset changes
+            retrieval_params = {'retrieval_model': retrieval_model, 'top_k': self.top_k}
+            index_version = dataset_retrieval_cache.get_version(dataset.id)
+            documents = dataset_retrieval_cache.get(dataset.id, index_version, retrieval_params, query)
+            if documents is None:
+                documents, complete = self._retrieve(dataset, retrieval_model, query)
+                if documents is None:
+                    return ''
 
-            documents = []
-            threads = []
-            if self.top_k > 0:
-                # retrieval source with semantic
-                if retrieval_model['search_method'] == 'semantic_search' or retrieval_model['search_method'] == 'hybrid_search':
-                    embedding_thread = threading.Thread(target=RetrievalService.embedding_search, kwargs={
-                        'flask_app': current_app._get_current_object(),
-                        'dataset_id': str(dataset.id),
-                        'query': query,
-                        'top_k': self.top_k,
-                        'score_threshold': retrieval_model['score_threshold'] if retrieval_model[
-                            'score_threshold_enabled'] else None,
-                        'reranking_model': retrieval_model['reranking_model'] if retrieval_model[
-                            'reranking_enable'] else None,
-                        'all_documents': documents,
-                        'search_method': retrieval_model['search_method'],
-                        'embeddings': embeddings
-                    })
-                    threads.append(embedding_thread)
-                    embedding_thread.start()
-
-                # retrieval_model source with full text
-                if retrieval_model['search_method'] == 'full_text_search' or retrieval_model['search_method'] == 'hybrid_search':
-                    full_text_index_thread = threading.Thread(target=RetrievalService.full_text_index_search, kwargs={
-                        'flask_app': current_app._get_current_object(),
-                        'dataset_id': str(dataset.id),
-                        'query': query,
-                        'search_method': retrieval_model['search_method'],
-                        'embeddings': embeddings,
-                        'score_threshold': retrieval_model['score_threshold'] if retrieval_model[
-                            'score_threshold_enabled'] else None,
-                        'top_k': self.top_k,
-                        'reranking_model': retrieval_model['reranking_model'] if retrieval_model[
-                            'reranking_enable'] else None,
-                        'all_documents': documents
-                    })
-                    threads.append(full_text_index_thread)
-                    full_text_index_thread.start()
-
-                for thread in threads:
-                    thread.join()
-
-                # hybrid search: rerank after all documents have been searched
-                if retrieval_model['search_method'] == 'hybrid_search':
-                    # get rerank model instance
-                    try:
-                        model_manager = ModelManager()
-                        rerank_model_instance = model_manager.get_model_instance(
-                            tenant_id=dataset.tenant_id,
-                            provider=retrieval_model['reranking_model']['reranking_provider_name'],
-                            model_type=ModelType.RERANK,
-                            model=retrieval_model['reranking_model']['reranking_model_name']
-                        )
-                    except InvokeAuthorizationError:
-                        return ''
-
-                    rerank_runner = RerankRunner(rerank_model_instance)
-                    documents = rerank_runner.run(
-                        query=query,
-                        documents=documents,
-                        score_threshold=retrieval_model['score_threshold'] if retrieval_model[
-                            'score_threshold_enabled'] else None,
-                        top_n=self.top_k
-                    )
-            else:
-                documents = []
+                # the documents of a search not finished in time are not the result of the query
+                if complete:
+                    dataset_retrieval_cache.set(dataset.id, index_version, retrieval_params, query, documents)
 
             for hit_callback in self.hit_callbacks:
                 hit_callback.on_tool_end(documents)
-            document_score_list = {}
-            if dataset.indexing_technique != "economy":
-                for item in documents:
-                    if 'score' in item.metadata and item.metadata['score']:
-                        document_score_list[item.metadata['doc_id']] = item.metadata['score']
             document_context_list = []
-            index_node_ids = [document.metadata['doc_id'] for document in documents]
-            segments = DocumentSegment.query.filter(DocumentSegment.dataset_id == self.dataset_id,
-                                                    DocumentSegment.completed_at.isnot(None),
-                                                    DocumentSegment.status == 'completed',
-                                                    DocumentSegment.enabled == True,
-                                                    DocumentSegment.index_node_id.in_(index_node_ids)
-                                                    ).all()
-
-            if segments:
-                index_node_id_to_position = {id: position for position, id in enumerate(index_node_ids)}
-                sorted_segments = sorted(segments,
-                                         key=lambda segment: index_node_id_to_position.get(segment.index_node_id,
-                                                                                           float('inf')))
-                for segment in sorted_segments:
+            hydrated_segments = SegmentHydrator.hydrate_documents(
+                dataset_ids=[self.dataset_id],
+                documents=documents,
+                with_documents=self.return_resource
+            )
+
+            if hydrated_segments:
+                for hydrated_segment in hydrated_segments:
+                    segment = hydrated_segment.segment
                     if segment.answer:
                         document_context_list.append(f'question:{segment.content} answer:{segment.answer}')
                     else:
@@ -197,12 +121,9 @@ class DatasetRetrieverTool(BaseTool):
                 if self.return_resource:
                     context_list = []
                     resource_number = 1
-                    for segment in sorted_segments:
-                        context = {}
-                        document = Document.query.filter(Document.id == segment.document_id,
-                                                         Document.enabled == True,
-                                                         Document.archived == False,
-                                                         ).first()
+                    for hydrated_segment in hydrated_segments:
+                        segment = hydrated_segment.segment
+                        document = hydrated_segment.document
                         if dataset and document:
                             source = {
                                 'position': resource_number,
@@ -213,7 +134,7 @@ class DatasetRetrieverTool(BaseTool):
                                 'data_source_type': document.data_source_type,
                                 'segment_id': segment.id,
                                 'retriever_from': self.retriever_from,
-                                'score': document_score_list.get(segment.index_node_id, None)
+                                'score': hydrated_segment.score
 
                             }
                             if self.retriever_from == 'dev':
@@ -233,5 +154,103 @@ class DatasetRetrieverTool(BaseTool):
 
             return str("\n".join(document_context_list))
 
+    def _retrieve(self, dataset: Dataset, retrieval_model: dict,
+                  query: str) -> tuple[Optional[list[Document]], bool]:
+        """
+        Search the dataset with its retrieval model.
+
+        :return: documents, None when the models of the dataset can not be used,
+            and whether every search finished in time
+        """
+        # get embedding model instance
+        try:
+            model_manager = ModelManager()
+            embedding_model = model_manager.get_model_instance(
+                tenant_id=dataset.tenant_id,
+                provider=dataset.embedding_model_provider,
+                model_type=ModelType.TEXT_EMBEDDING,
+                model=dataset.embedding_model
+            )
+        except InvokeAuthorizationError:
+            return None, False
+
+        embeddings = CacheEmbedding(embedding_model)
+
+        embedding_documents = []
+        full_text_documents = []
+        if self.top_k > 0:
+            tasks = []
+            # retrieval source with semantic
+            if retrieval_model['search_method'] == 'semantic_search' or retrieval_model['search_method'] == 'hybrid_search':
+                tasks.append(RetrievalTask(
+                    dataset_id=dataset.id,
+                    backend='semantic_search',
+                    func=RetrievalService.embedding_search,
+                    kwargs={
+                        'flask_app': current_app._get_current_object(),
+                        'dataset_id': str(dataset.id),
+                        'query': query,
+                        'top_k': self.top_k,
+                        'score_threshold': retrieval_model['score_threshold'] if retrieval_model[
+                            'score_threshold_enabled'] else None,
+                        'reranking_model': retrieval_model['reranking_model'] if retrieval_model[
+                            'reranking_enable'] else None,
+                        'search_method': retrieval_model['search_method'],
+                        'embeddings': embeddings
+                    }
+                ))
+
+            # retrieval_model source with full text
+            if retrieval_model['search_method'] == 'full_text_search' or retrieval_model['search_method'] == 'hybrid_search':
+                tasks.append(RetrievalTask(
+                    dataset_id=dataset.id,
+                    backend='full_text_search',
+                    func=RetrievalService.full_text_index_search,
+                    kwargs={
+                        'flask_app': current_app._get_current_object(),
+                        'dataset_id': str(dataset.id),
+                        'query': query,
+                        'search_method': retrieval_model['search_method'],
+                        'embeddings': embeddings,
+                        'score_threshold': retrieval_model['score_threshold'] if retrieval_model[
+                            'score_threshold_enabled'] else None,
+                        'top_k': self.top_k,
+                        'reranking_model': retrieval_model['reranking_model'] if retrieval_model[
+                            'reranking_enable'] else None
+                    }
+                ))
+
+            results = retrieval_executor.run(tasks)
+            # a search failed or not finished in time makes the result partial
+            complete = all(documents is not None for documents in results)
+            for task, documents in zip(tasks, results):
+                if task.backend == 'semantic_search':
+                    embedding_documents.extend(documents or [])
+                else:
+                    full_text_documents.extend(documents or [])
+
+            # hybrid search: rerank after all documents have been searched
+            if retrieval_model['search_method'] == 'hybrid_search':
+                try:
+                    documents = RetrievalService.hybrid_rerank(
+                        tenant_id=dataset.tenant_id,
+                        query=query,
+                        retrieval_model=retrieval_model,
+                        embedding_documents=embedding_documents,
+                        full_text_documents=full_text_documents,
+                        score_threshold=retrieval_model['score_threshold'] if retrieval_model[
+                            'score_threshold_enabled'] else None,
+                        top_n=self.top_k
+                    )
+                except InvokeAuthorizationError:
+                    return None, False
+            else:
+                documents = embedding_documents + full_text_documents
+        else:
+            documents = []
+            complete = True
+
+        return documents, complete
+
     async def _arun(self, tool_input: str) -> str:
         raise NotImplementedError()
\ No newline at end of file
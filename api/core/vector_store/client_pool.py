@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IDLE_TIMEOUT = 600
+DEFAULT_HEALTH_CHECK_INTERVAL = 30
+DEFAULT_MAX_CLIENTS = 16
+
+# pools of the backends in use, for the pool stats
+_pools: list['VectorStoreClientPool'] = []
+
+
+def get_client_pool_stats() -> list[dict]:
+    """Stats of the client pools of the vector store backends used by this process."""
+    return [pool.stats() for pool in _pools]
+
+
+class _PooledClient:
+    def __init__(self, client: Any) -> None:
+        self.client = client
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+        self.last_checked_at = self.created_at
+        self.hits = 0
+        # serializes operations on stateful clients, e.g. the weaviate batch
+        self.lock = threading.RLock()
+        self.check_lock = threading.Lock()
+
+
+class VectorStoreClientPool:
+    """
+    Process-wide pool of the clients of a vector store backend, keyed by endpoint and credentials.
+
+    A vector index is built per query, per retriever thread and per indexing batch,
+    the pool lets all of them share one client, and so its connections, per endpoint.
+
+    Clients not used for VECTOR_STORE_CLIENT_IDLE_TIMEOUT seconds are evicted,
+    clients handed out more than VECTOR_STORE_CLIENT_HEALTH_CHECK_INTERVAL seconds after their last check
+    are checked first and replaced when unhealthy.
+    Evicted clients are not closed, a live index may still be searching with them,
+    their connections are closed once the last index holding them is garbage collected.
+    The pool lock is only held for dict operations, clients are built and checked outside of it.
+    """
+
+    def __init__(self, name: str,
+                 factory: Callable[[dict], Any],
+                 health_check: Callable[[Any], None]) -> None:
+        """
+        :param name: backend name
+        :param factory: builds a client from its connection params
+        :param health_check: raises when a client can not serve requests anymore
+        """
+        self.name = name
+        self._factory = factory
+        self._health_check = health_check
+        self._clients: OrderedDict[str, _PooledClient] = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: dict[str, threading.Lock] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._health_check_failures = 0
+        _pools.append(self)
+
+    def get(self, params: dict) -> Any:
+        """
+        Get the shared client of the connection params.
+
+        :param params: connection params of the client, including credentials
+        :return: client
+        """
+        return self._get_pooled_client(params).client
+
+    def get_with_lock(self, params: dict) -> tuple[Any, threading.RLock]:
+        """
+        Get the shared client of the connection params and its lock,
+        held around operations that use state of the client which is not thread safe.
+        The lock stays the one of the returned client when the pool replaces it.
+        """
+        pooled_client = self._get_pooled_client(params)
+        return pooled_client.client, pooled_client.lock
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'backend': self.name,
+                'clients': len(self._clients),
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'health_check_failures': self._health_check_failures,
+                'client_stats': [
+                    {
+                        'hits': pooled_client.hits,
+                        'age': round(now - pooled_client.created_at, 2),
+                        'idle': round(now - pooled_client.last_used_at, 2)
+                    }
+                    for pooled_client in self._clients.values()
+                ]
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+    def _get_pooled_client(self, params: dict) -> _PooledClient:
+        key = self._key(params)
+        idle_timeout, health_check_interval, max_clients = self._get_settings()
+
+        with self._lock:
+            self._evict_idle(idle_timeout)
+            pooled_client = self._clients.get(key)
+            if pooled_client:
+                pooled_client.last_used_at = time.monotonic()
+                pooled_client.hits += 1
+                self._clients.move_to_end(key)
+                self._hits += 1
+            else:
+                self._misses += 1
+                build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        if pooled_client:
+            if self._is_healthy(pooled_client, health_check_interval):
+                return pooled_client
+
+            with self._lock:
+                if self._clients.get(key) is pooled_client:
+                    del self._clients[key]
+                build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # concurrent callers of the same key wait for the first one and share its client
+        with build_lock:
+            with self._lock:
+                pooled_client = self._clients.get(key)
+                if pooled_client:
+                    return pooled_client
+
+            try:
+                pooled_client = _PooledClient(self._factory(params))
+            except BaseException:
+                with self._lock:
+                    self._build_locks.pop(key, None)
+                raise
+
+            with self._lock:
+                self._build_locks.pop(key, None)
+                self._clients[key] = pooled_client
+                while len(self._clients) > max_clients:
+                    self._clients.popitem(last=False)
+                    self._evictions += 1
+
+        return pooled_client
+
+    def _is_healthy(self, pooled_client: _PooledClient, health_check_interval: float) -> bool:
+        if time.monotonic() - pooled_client.last_checked_at < health_check_interval:
+            return True
+
+        # only one caller checks, the others keep using the client meanwhile
+        if not pooled_client.check_lock.acquire(blocking=False):
+            return True
+
+        try:
+            self._health_check(pooled_client.client)
+            pooled_client.last_checked_at = time.monotonic()
+            return True
+        except Exception:
+            logger.warning('%s vector store client failed its health check, reconnecting', self.name,
+                           exc_info=True)
+            with self._lock:
+                self._health_check_failures += 1
+            return False
+        finally:
+            pooled_client.check_lock.release()
+
+    def _evict_idle(self, idle_timeout: float) -> None:
+        """Evict idle clients, the clients are ordered by last use so only the head has to be checked."""
+        expired_at = time.monotonic() - idle_timeout
+        while self._clients:
+            key, pooled_client = next(iter(self._clients.items()))
+            if pooled_client.last_used_at > expired_at:
+                break
+
+            del self._clients[key]
+            self._evictions += 1
+
+    @staticmethod
+    def _key(params: dict) -> str:
+        """Key of the connection params, the pool never keeps the credentials themselves."""
+        serialized = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _get_settings() -> tuple[float, float, int]:
+        if not has_app_context():
+            return DEFAULT_IDLE_TIMEOUT, DEFAULT_HEALTH_CHECK_INTERVAL, DEFAULT_MAX_CLIENTS
+
+        config = current_app.config
+        return (
+            float(config.get('VECTOR_STORE_CLIENT_IDLE_TIMEOUT', DEFAULT_IDLE_TIMEOUT)),
+            float(config.get('VECTOR_STORE_CLIENT_HEALTH_CHECK_INTERVAL', DEFAULT_HEALTH_CHECK_INTERVAL)),
+            int(config.get('VECTOR_STORE_CLIENT_MAX_CLIENTS', DEFAULT_MAX_CLIENTS))
+        )
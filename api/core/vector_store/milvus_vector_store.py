@@ -1,7 +1,48 @@
+import weakref
+from uuid import uuid4
+
+from core.vector_store.client_pool import VectorStoreClientPool
 from core.vector_store.vector.milvus import Milvus
 
 
+class MilvusConnection:
+    """
+    A pymilvus connection alias, removed once neither the pool nor any vector store holds it.
+    """
+
+    def __init__(self, connection_args: dict) -> None:
+        from pymilvus import connections
+
+        self.alias = uuid4().hex
+        connections.connect(alias=self.alias, **connection_args)
+        weakref.finalize(self, _remove_milvus_connection, self.alias)
+
+
+def _remove_milvus_connection(alias: str) -> None:
+    from pymilvus import connections
+
+    connections.remove_connection(alias)
+
+
+def _check_milvus_connection(connection: MilvusConnection) -> None:
+    from pymilvus import utility
+
+    utility.get_server_version(using=connection.alias)
+
+
+milvus_client_pool = VectorStoreClientPool(
+    name='milvus',
+    factory=MilvusConnection,
+    health_check=_check_milvus_connection
+)
+
+
 class MilvusVectorStore(Milvus):
+    def _create_connection_alias(self, connection_args: dict) -> str:
+        # the store holds the connection, so that its alias is not removed while the store is in use
+        self._connection = milvus_client_pool.get(connection_args)
+        return self._connection.alias
+
     def del_texts(self, where_filter: dict):
         if not where_filter:
             raise ValueError('where_filter must not be empty')
@@ -1405,20 +1405,23 @@ class Qdrant(VectorStore):
         collection_name = collection_name or uuid.uuid4().hex
         distance_func = distance_func.upper()
         is_new_collection = False
-        client = qdrant_client.QdrantClient(
-            location=location,
-            url=url,
-            port=port,
-            grpc_port=grpc_port,
-            prefer_grpc=prefer_grpc,
-            https=https,
-            api_key=api_key,
-            prefix=prefix,
-            timeout=timeout,
-            host=host,
-            path=path,
-            **kwargs,
-        )
+        # a shared client may be passed in instead of the connection params
+        client = kwargs.pop("client", None)
+        if client is None:
+            client = qdrant_client.QdrantClient(
+                location=location,
+                url=url,
+                port=port,
+                grpc_port=grpc_port,
+                prefer_grpc=prefer_grpc,
+                https=https,
+                api_key=api_key,
+                prefix=prefix,
+                timeout=timeout,
+                host=host,
+                path=path,
+                **kwargs,
+            )
         all_collection_name = []
         collections_response = client.get_collections()
         collection_list = collections_response.collections
@@ -5,5 +5,6 @@ from .create_installed_app_when_app_created import handle
 from .deduct_quota_when_messaeg_created import handle
 from .delete_installed_app_when_app_deleted import handle
 from .generate_conversation_name_when_first_message_created import handle
+from .generate_suggested_questions_when_message_created import handle
 from .update_app_dataset_join_when_app_model_config_updated import handle
 from .update_provider_last_used_at_when_messaeg_created import handle
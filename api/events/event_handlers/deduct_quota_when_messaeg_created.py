@@ -1,5 +1,11 @@
+import logging
+
+from flask import current_app
+from sqlalchemy import update
+
 from core.entities.application_entities import ApplicationGenerateEntity
-from core.entities.provider_entities import QuotaUnit
+from core.helper.provider_configurations_cache import provider_configurations_cache
+from core.helper.usage_ledger import usage_ledger
 from events.message_event import message_was_created
 from extensions.ext_database import db
 from models.provider import Provider, ProviderType
@@ -10,6 +16,17 @@ def handle(sender, **kwargs):
     message = sender
     application_generate_entity: ApplicationGenerateEntity = kwargs.get('application_generate_entity')
 
+    if current_app.config.get('USAGE_LEDGER_ENABLED'):
+        try:
+            usage_ledger.consume(application_generate_entity, message)
+            return
+        except Exception:
+            logging.exception('Failed to record quota usage in the usage ledger, deducting it in the database.')
+
+    _deduct_quota_in_database(application_generate_entity, message)
+
+
+def _deduct_quota_in_database(application_generate_entity: ApplicationGenerateEntity, message) -> None:
     model_config = application_generate_entity.app_orchestration_config_entity.model_config
     provider_model_bundle = model_config.provider_model_bundle
     provider_configuration = provider_model_bundle.configuration
@@ -31,22 +48,21 @@ def handle(sender, **kwargs):
 
     used_quota = None
     if quota_unit:
-        if quota_unit == QuotaUnit.TOKENS:
-            used_quota = message.message_tokens + message.answer_tokens
-        elif quota_unit == QuotaUnit.CREDITS:
-            used_quota = 1
-
-            if 'gpt-4' in model_config.model:
-                used_quota = 20
-        else:
-            used_quota = 1
+        used_quota = usage_ledger.calculate_used_quota(quota_unit, model_config.model,
+                                                       message.message_tokens + message.answer_tokens)
 
     if used_quota is not None:
-        db.session.query(Provider).filter(
-            Provider.tenant_id == application_generate_entity.tenant_id,
-            Provider.provider_name == model_config.provider,
-            Provider.provider_type == ProviderType.SYSTEM.value,
-            Provider.quota_type == system_configuration.current_quota_type.value,
-            Provider.quota_limit > Provider.quota_used
-        ).update({'quota_used': Provider.quota_used + used_quota})
+        result = db.session.execute(
+            update(Provider).where(
+                Provider.tenant_id == application_generate_entity.tenant_id,
+                Provider.provider_name == model_config.provider,
+                Provider.provider_type == ProviderType.SYSTEM.value,
+                Provider.quota_type == system_configuration.current_quota_type.value,
+                Provider.quota_limit > Provider.quota_used
+            ).values(quota_used=Provider.quota_used + used_quota).returning(Provider.quota_used, Provider.quota_limit)
+        ).first()
         db.session.commit()
+
+        # the cached provider configurations only change when the quota runs out
+        if not result or result.quota_used >= result.quota_limit:
+            provider_configurations_cache.invalidate(application_generate_entity.tenant_id)
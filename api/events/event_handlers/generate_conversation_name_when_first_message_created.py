@@ -1,6 +1,11 @@
+import logging
+
+from flask import current_app
+
 from core.generator.llm_generator import LLMGenerator
 from events.message_event import message_was_created
 from extensions.ext_database import db
+from services.conversation_service import ConversationService
 
 
 @message_was_created.connect
@@ -20,6 +25,14 @@ def handle(sender, **kwargs):
             if not app_model:
                 return
 
+            # generate conversation name off the response path, message_end is sent without waiting for it
+            if current_app.config['BACKGROUND_GENERATION_ENABLED']:
+                try:
+                    ConversationService.generate_name_in_background(conversation)
+                    return
+                except Exception:
+                    logging.exception('Failed to dispatch conversation name generation, generating it now.')
+
             # generate conversation name
             try:
                 name = LLMGenerator.generate_conversation_name(app_model.tenant_id, message.query)
@@ -0,0 +1,28 @@
+import logging
+
+from flask import current_app
+
+from core.entities.application_entities import ApplicationGenerateEntity
+from events.message_event import message_was_created
+from services.message_service import MessageService
+
+
+@message_was_created.connect
+def handle(sender, **kwargs):
+    message = sender
+    application_generate_entity: ApplicationGenerateEntity = kwargs.get('application_generate_entity')
+    conversation = kwargs.get('conversation')
+
+    if not current_app.config['BACKGROUND_GENERATION_ENABLED'] or conversation.mode != 'chat':
+        return
+
+    suggested_questions_after_answer = application_generate_entity.app_model_config_dict.get(
+        'suggested_questions_after_answer') or {}
+    if not suggested_questions_after_answer.get('enabled'):
+        return
+
+    # generate the questions while the answer is sent, they are requested right after it
+    try:
+        MessageService.generate_suggested_questions_in_background(message)
+    except Exception:
+        logging.exception('Failed to dispatch suggested questions generation.')
@@ -1,6 +1,10 @@
+import logging
 from datetime import datetime
 
+from flask import current_app
+
 from core.entities.application_entities import ApplicationGenerateEntity
+from core.helper.usage_ledger import usage_ledger
 from events.message_event import message_was_created
 from extensions.ext_database import db
 from models.provider import Provider
@@ -10,9 +14,18 @@ from models.provider import Provider
 def handle(sender, **kwargs):
     message = sender
     application_generate_entity: ApplicationGenerateEntity = kwargs.get('application_generate_entity')
+    tenant_id = application_generate_entity.tenant_id
+    provider_name = application_generate_entity.app_orchestration_config_entity.model_config.provider
+
+    if current_app.config.get('USAGE_LEDGER_ENABLED'):
+        try:
+            usage_ledger.touch(tenant_id, provider_name)
+            return
+        except Exception:
+            logging.exception('Failed to record provider last used in the usage ledger, updating it in the database.')
 
     db.session.query(Provider).filter(
-        Provider.tenant_id == application_generate_entity.tenant_id,
-        Provider.provider_name == application_generate_entity.app_orchestration_config_entity.model_config.provider
+        Provider.tenant_id == tenant_id,
+        Provider.provider_name == provider_name
     ).update({'last_used': datetime.utcnow()})
     db.session.commit()
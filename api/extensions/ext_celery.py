@@ -41,6 +41,11 @@ def init_app(app: Flask) -> Celery:
     imports = [
         "schedule.clean_embedding_cache_task",
         "schedule.clean_unused_datasets_task",
+        "tasks.generate_task",
+        "tasks.generate_conversation_name_task",
+        "tasks.generate_suggested_questions_task",
+        "tasks.update_api_token_last_used_task",
+        "tasks.flush_usage_ledger_task",
     ]
 
     beat_schedule = {
@@ -51,6 +56,14 @@ def init_app(app: Flask) -> Celery:
         'clean_unused_datasets_task': {
             'task': 'schedule.clean_unused_datasets_task.clean_unused_datasets_task',
             'schedule': timedelta(days=7),
+        },
+        'update_api_token_last_used_task': {
+            'task': 'tasks.update_api_token_last_used_task.update_api_token_last_used_task',
+            'schedule': timedelta(minutes=1),
+        },
+        'flush_usage_ledger_task': {
+            'task': 'tasks.flush_usage_ledger_task.flush_usage_ledger_task',
+            'schedule': timedelta(minutes=1),
         }
     }
     celery_app.conf.update(
@@ -18,10 +18,17 @@ reranking_model_fields = {
     'reranking_model_name': fields.String
 }
 
+weights_fields = {
+    'vector_weight': fields.Float,
+    'keyword_weight': fields.Float
+}
+
 dataset_retrieval_model_fields = {
     'search_method': fields.String,
     'reranking_enable': fields.Boolean,
+    'reranking_mode': fields.String,
     'reranking_model': fields.Nested(reranking_model_fields),
+    'weights': fields.Nested(weights_fields, allow_null=True),
     'top_k': fields.Integer,
     'score_threshold_enabled': fields.Boolean,
     'score_threshold': fields.Float
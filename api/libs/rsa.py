@@ -1,13 +1,112 @@
 import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
 
 from Crypto.Cipher import AES
 from Crypto.PublicKey import RSA
 from Crypto.Random import get_random_bytes
+from flask import current_app, has_app_context
 
 import libs.gmpy2_pkcs10aep_cipher as gmpy2_pkcs10aep_cipher
 from extensions.ext_redis import redis_client
 from extensions.ext_storage import storage
 
+DEFAULT_DECRYPT_DECODING_CACHE_MAX_TENANTS = 1000
+DEFAULT_DECRYPT_DECODING_CACHE_TTL = 60
+
+
+class DecryptDecodingCache:
+    """
+    Process-wide LRU of the imported private keys and ciphers of tenants.
+
+    An entry is used without any redis or storage access for DECRYPT_DECODING_CACHE_TTL seconds,
+    afterwards the private key is loaded again and only imported again when it changed,
+    which bounds how long a key pair reset in another process goes unnoticed.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, tuple[bytes, RSA.RsaKey, object, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, tenant_id: str) -> Optional[tuple]:
+        """
+        Get the decoding of the tenant while it is fresh.
+
+        :param tenant_id: workspace id
+        :return: rsa key and cipher, None when not cached or expired
+        """
+        _, ttl = self._get_settings()
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if entry and time.monotonic() - entry[3] < ttl:
+                self._entries.move_to_end(tenant_id)
+                self._hits += 1
+                return entry[1], entry[2]
+
+            self._misses += 1
+            return None
+
+    def revalidate(self, tenant_id: str, digest: bytes) -> Optional[tuple]:
+        """
+        Refresh the decoding of the tenant if it was imported from the same private key.
+
+        :param tenant_id: workspace id
+        :param digest: digest of the private key
+        :return: rsa key and cipher, None when the private key changed or was never imported
+        """
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if not entry or entry[0] != digest:
+                return None
+
+            self._entries[tenant_id] = (digest, entry[1], entry[2], time.monotonic())
+            self._entries.move_to_end(tenant_id)
+            return entry[1], entry[2]
+
+    def set(self, tenant_id: str, digest: bytes, rsa_key: RSA.RsaKey, cipher_rsa) -> None:
+        max_tenants, _ = self._get_settings()
+        with self._lock:
+            self._entries[tenant_id] = (digest, rsa_key, cipher_rsa, time.monotonic())
+            self._entries.move_to_end(tenant_id)
+            while len(self._entries) > max_tenants:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tenant_id: str) -> None:
+        with self._lock:
+            self._entries.pop(tenant_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'tenants': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / total, 4) if total else 0.0
+            }
+
+    @staticmethod
+    def _get_settings() -> tuple[int, float]:
+        if not has_app_context():
+            return DEFAULT_DECRYPT_DECODING_CACHE_MAX_TENANTS, DEFAULT_DECRYPT_DECODING_CACHE_TTL
+
+        config = current_app.config
+        return (
+            int(config.get('DECRYPT_DECODING_CACHE_MAX_TENANTS', DEFAULT_DECRYPT_DECODING_CACHE_MAX_TENANTS)),
+            float(config.get('DECRYPT_DECODING_CACHE_TTL', DEFAULT_DECRYPT_DECODING_CACHE_TTL))
+        )
+
+
+decrypt_decoding_cache = DecryptDecodingCache()
+
 
 def generate_key_pair(tenant_id):
     private_key = RSA.generate(2048)
@@ -16,13 +115,32 @@ def generate_key_pair(tenant_id):
     pem_private = private_key.export_key()
     pem_public = public_key.export_key()
 
-    filepath = "privkeys/{tenant_id}".format(tenant_id=tenant_id) + "/private.pem"
+    filepath = _privkey_filepath(tenant_id)
 
     storage.save(filepath, pem_private)
 
+    invalidate_decrypt_decoding(tenant_id)
+
     return pem_public.decode()
 
 
+def invalidate_decrypt_decoding(tenant_id):
+    """
+    Drop the cached private key of the tenant, after its key pair was reset.
+    Other processes notice the new private key once their cached decoding expired.
+    """
+    redis_client.delete(_privkey_cache_key(_privkey_filepath(tenant_id)))
+    decrypt_decoding_cache.invalidate(tenant_id)
+
+
+def _privkey_filepath(tenant_id):
+    return "privkeys/{tenant_id}".format(tenant_id=tenant_id) + "/private.pem"
+
+
+def _privkey_cache_key(filepath):
+    return 'tenant_privkey:{hash}'.format(hash=hashlib.sha3_256(filepath.encode()).hexdigest())
+
+
 prefix_hybrid = b"HYBRID:"
 
 
@@ -46,9 +164,13 @@ def encrypt(text, public_key):
 
 
 def get_decrypt_decoding(tenant_id):
-    filepath = "privkeys/{tenant_id}".format(tenant_id=tenant_id) + "/private.pem"
+    decoding = decrypt_decoding_cache.get(tenant_id)
+    if decoding:
+        return decoding
 
-    cache_key = 'tenant_privkey:{hash}'.format(hash=hashlib.sha3_256(filepath.encode()).hexdigest())
+    filepath = _privkey_filepath(tenant_id)
+
+    cache_key = _privkey_cache_key(filepath)
     private_key = redis_client.get(cache_key)
     if not private_key:
         try:
@@ -58,8 +180,15 @@ def get_decrypt_decoding(tenant_id):
 
         redis_client.setex(cache_key, 120, private_key)
 
+    # importing the key is the costly part, skip it while the private key did not change
+    digest = hashlib.sha256(private_key).digest()
+    decoding = decrypt_decoding_cache.revalidate(tenant_id, digest)
+    if decoding:
+        return decoding
+
     rsa_key = RSA.import_key(private_key)
     cipher_rsa = gmpy2_pkcs10aep_cipher.new(rsa_key)
+    decrypt_decoding_cache.set(tenant_id, digest, rsa_key, cipher_rsa)
 
     return rsa_key, cipher_rsa
 
@@ -1,9 +1,9 @@
 import json
-import pickle
 from json import JSONDecodeError
 
+import numpy as np
 from sqlalchemy import func
-from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
 
 from extensions.ext_database import db
 from models.account import Account
@@ -444,11 +444,27 @@ class DatasetKeywordTable(db.Model):
         return json.loads(self.keyword_table, cls=SetDecoder) if self.keyword_table else None
 
 
+class DatasetKeyword(db.Model):
+    """Inverted keyword index of a dataset, one posting list of segment index node ids per keyword."""
+    __tablename__ = 'dataset_keywords'
+    __table_args__ = (
+        db.PrimaryKeyConstraint('id', name='dataset_keyword_pkey'),
+        db.UniqueConstraint('dataset_id', 'keyword', name='dataset_keyword_keyword_idx'),
+        db.Index('dataset_keyword_node_ids_idx', 'node_ids', postgresql_using='gin'),
+    )
+
+    id = db.Column(UUID, primary_key=True, server_default=db.text('uuid_generate_v4()'))
+    dataset_id = db.Column(UUID, nullable=False)
+    keyword = db.Column(db.Text, nullable=False)
+    node_ids = db.Column(ARRAY(db.Text), nullable=False, server_default=db.text("'{}'::text[]"))
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
+
+
 class Embedding(db.Model):
     __tablename__ = 'embeddings'
     __table_args__ = (
         db.PrimaryKeyConstraint('id', name='embedding_pkey'),
-        db.UniqueConstraint('model_name', 'hash', name='embedding_hash_idx')
+        db.UniqueConstraint('model_name', 'hash', 'provider_name', name='embedding_hash_idx')
     )
 
     id = db.Column(UUID, primary_key=True, server_default=db.text('uuid_generate_v4()'))
@@ -457,12 +473,22 @@ class Embedding(db.Model):
     hash = db.Column(db.String(64), nullable=False)
     embedding = db.Column(db.LargeBinary, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
+    provider_name = db.Column(db.String(40), nullable=False,
+                              server_default=db.text("''::character varying"))
+
+    @staticmethod
+    def encode_embedding(embedding_data: list[float]) -> bytes:
+        return np.asarray(embedding_data, dtype=np.float32).tobytes()
+
+    @staticmethod
+    def decode_embedding(embedding_bytes: bytes) -> list[float]:
+        return np.frombuffer(embedding_bytes, dtype=np.float32).tolist()
 
     def set_embedding(self, embedding_data: list[float]):
-        self.embedding = pickle.dumps(embedding_data, protocol=pickle.HIGHEST_PROTOCOL)
+        self.embedding = self.encode_embedding(embedding_data)
 
     def get_embedding(self) -> list[float]:
-        return pickle.loads(self.embedding)
+        return self.decode_embedding(self.embedding)
 
 
 class DatasetCollectionBinding(db.Model):
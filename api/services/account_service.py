@@ -1,4 +1,5 @@
 import base64
+import json
 import logging
 import secrets
 import uuid
@@ -7,7 +8,8 @@ from hashlib import sha256
 from typing import Any, Optional
 
 from flask import current_app
-from sqlalchemy import func
+from sqlalchemy import func, inspect
+from sqlalchemy.orm import make_transient_to_detached
 from werkzeug.exceptions import Forbidden
 
 from constants.languages import language_timezone_mapping, languages
@@ -39,6 +41,10 @@ class AccountService:
 
     @staticmethod
     def load_user(user_id: str) -> Account:
+        account = AccountService._load_user_from_principal_cache(user_id)
+        if account:
+            return account
+
         account = Account.query.filter_by(id=user_id).first()
         if not account:
             return None
@@ -63,8 +69,86 @@ class AccountService:
             account.last_active_at = datetime.utcnow()
             db.session.commit()
 
+        if account.current_tenant:
+            AccountService._set_principal_cache(user_id, {
+                'status': account.status,
+                'last_active_at': account.last_active_at.isoformat(),
+                'tenant_id': account.current_tenant.id,
+                'role': account.current_tenant.current_role
+            })
+
+        return account
+
+    @staticmethod
+    def invalidate_principal_cache(account_id: str) -> None:
+        """
+        Drop the cached principal of the account,
+        after a change of its status, its current workspace or its role in it.
+        """
+        redis_client.delete(AccountService._get_principal_cache_key(account_id))
+
+    @staticmethod
+    def _load_user_from_principal_cache(user_id: str) -> Optional[Account]:
+        """
+        Load the user from its cached principal: status, current workspace and role.
+        The account and the workspace are attached to the session without a query,
+        their other columns are loaded in one query on first access.
+        """
+        try:
+            cached_principal = redis_client.get(AccountService._get_principal_cache_key(user_id))
+        except Exception:
+            logging.warning(f'Failed to get cached principal of account {user_id}.', exc_info=True)
+            return None
+
+        if not cached_principal:
+            return None
+
+        principal = json.loads(cached_principal)
+        last_active_at = datetime.fromisoformat(principal['last_active_at'])
+
+        account = AccountService._attach_instance(Account, id=user_id, status=principal['status'],
+                                                  last_active_at=last_active_at)
+        tenant = AccountService._attach_instance(Tenant, id=principal['tenant_id'])
+        tenant.current_role = principal['role']
+        account._current_tenant = tenant
+
+        if datetime.utcnow() - last_active_at > timedelta(minutes=10):
+            account.last_active_at = datetime.utcnow()
+            db.session.commit()
+
+            principal['last_active_at'] = account.last_active_at.isoformat()
+            AccountService._set_principal_cache(user_id, principal)
+
         return account
 
+    @staticmethod
+    def _set_principal_cache(account_id: str, principal: dict) -> None:
+        try:
+            redis_client.setex(AccountService._get_principal_cache_key(account_id),
+                               current_app.config['CONSOLE_PRINCIPAL_CACHE_TTL'],
+                               json.dumps(principal))
+        except Exception:
+            logging.warning(f'Failed to cache principal of account {account_id}.', exc_info=True)
+
+    @staticmethod
+    def _get_principal_cache_key(account_id: str) -> str:
+        return f'account_principal:{account_id}'
+
+    @staticmethod
+    def _attach_instance(model: type[db.Model], **values) -> db.Model:
+        """
+        Attach a persistent instance of the given column values to the session, without a query,
+        the other columns are expired so that they are loaded together on first access.
+        """
+        instance = model(**values)
+        make_transient_to_detached(instance)
+        instance = db.session.merge(instance, load=False)
+
+        expired_attributes = [attr.key for attr in inspect(model).column_attrs if attr.key not in values]
+        db.session.expire(instance, expired_attributes)
+
+        return instance
+
 
     @staticmethod
     def get_account_jwt_token(account):
@@ -93,6 +177,7 @@ class AccountService:
             account.status = AccountStatus.ACTIVE.value
             account.initialized_at = datetime.utcnow()
             db.session.commit()
+            AccountService.invalidate_principal_cache(account.id)
 
         if account.password is None or not compare_password(password, account.password, account.password_salt):
             raise AccountLoginError('Invalid email or password.')
@@ -178,6 +263,7 @@ class AccountService:
         """todo: Close account"""
         account.status = AccountStatus.CLOSED.value
         db.session.commit()
+        AccountService.invalidate_principal_cache(account.id)
 
     @staticmethod
     def update_account(account, **kwargs):
@@ -283,6 +369,7 @@ class TenantService:
             TenantAccountJoin.query.filter(TenantAccountJoin.account_id == account.id, TenantAccountJoin.tenant_id != tenant_id).update({'current': False})
             tenant_account_join.current = True
             db.session.commit()
+            AccountService.invalidate_principal_cache(account.id)
             # Set the current tenant for the account
             account.current_tenant_id = tenant_account_join.tenant_id
 
@@ -367,6 +454,7 @@ class TenantService:
 
         db.session.delete(ta)
         db.session.commit()
+        AccountService.invalidate_principal_cache(account.id)
 
     @staticmethod
     def update_member_role(tenant: Tenant, member: Account, new_role: str, operator: Account) -> None:
@@ -393,15 +481,24 @@ class TenantService:
         target_member_join.role = new_role
         db.session.commit()
 
+        AccountService.invalidate_principal_cache(member.id)
+        if new_role == 'owner':
+            AccountService.invalidate_principal_cache(current_owner_join.account_id)
+
     @staticmethod
     def dissolve_tenant(tenant: Tenant, operator: Account) -> None:
         """Dissolve tenant"""
         if not TenantService.check_member_permission(tenant, operator, operator, 'remove'):
             raise NoPermissionError('No permission to dissolve tenant.')
+        member_account_ids = [ta.account_id for ta in
+                              db.session.query(TenantAccountJoin).filter_by(tenant_id=tenant.id).all()]
         db.session.query(TenantAccountJoin).filter_by(tenant_id=tenant.id).delete()
         db.session.delete(tenant)
         db.session.commit()
 
+        for account_id in member_account_ids:
+            AccountService.invalidate_principal_cache(account_id)
+
     @staticmethod
     def get_custom_config(tenant_id: str) -> None:
         tenant = db.session.query(Tenant).filter(Tenant.id == tenant_id).one_or_404()
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+from flask import current_app
+from redis.exceptions import ResponseError
+from sqlalchemy import and_, bindparam, or_, update
+
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.model import ApiToken
+
+logger = logging.getLogger(__name__)
+
+
+class ApiTokenService:
+    """
+    Authentication of Service API tokens.
+
+    Tokens are cached in redis for API_TOKEN_CACHE_TTL seconds, deleting a token drops its cache.
+    The cache is keyed by a sha256 hash of the token and does not hold the token itself.
+    Their last_used_at is recorded in a redis hash and written to the database in one batch
+    by update_api_token_last_used_task, instead of an UPDATE per request.
+    The task is dispatched by the first use after each LAST_USED_AT_FLUSH_INTERVAL seconds,
+    so that no beat schedule is required.
+    """
+
+    LAST_USED_AT_KEY = 'api_token_last_used_at'
+    LAST_USED_AT_FLUSHING_KEY = 'api_token_last_used_at:flushing'
+    LAST_USED_AT_FLUSH_LOCK_KEY = 'api_token_last_used_at:flush_lock'
+    LAST_USED_AT_FLUSH_INTERVAL = 60
+
+    @classmethod
+    def get_api_token(cls, scope: Optional[str], token: str) -> Optional[ApiToken]:
+        """
+        Get the API token of the scope, from the cache or the database.
+
+        :param scope: token type, app or dataset
+        :param token: token
+        :return: API token, detached from the session when cached, None when the token is invalid
+        """
+        cache_key = cls._cache_key(scope, token)
+        cached_api_token = redis_client.get(cache_key)
+        if cached_api_token:
+            try:
+                return ApiToken(token=token, **json.loads(cached_api_token.decode('utf-8')))
+            except (ValueError, TypeError):
+                pass
+
+        api_token = db.session.query(ApiToken).filter(
+            ApiToken.token == token,
+            ApiToken.type == scope,
+        ).first()
+
+        if not api_token:
+            return None
+
+        redis_client.setex(cache_key, current_app.config['API_TOKEN_CACHE_TTL'], json.dumps({
+            'id': api_token.id,
+            'app_id': api_token.app_id,
+            'tenant_id': api_token.tenant_id,
+            'type': api_token.type
+        }))
+
+        return api_token
+
+    @classmethod
+    def delete_token_cache(cls, scope: Optional[str], token: str) -> None:
+        """
+        Delete the cache of a deleted token, so that it is rejected at once.
+
+        :param scope: token type, app or dataset
+        :param token: token
+        """
+        redis_client.delete(cls._cache_key(scope, token))
+
+    @classmethod
+    def record_last_used_at(cls, api_token_id: str) -> None:
+        """
+        Record the use of a token, written to the database by flush_last_used_at.
+
+        :param api_token_id: API token id
+        """
+        try:
+            redis_client.hset(cls.LAST_USED_AT_KEY, api_token_id, time.time())
+
+            if redis_client.set(cls.LAST_USED_AT_FLUSH_LOCK_KEY, 1, nx=True, ex=cls.LAST_USED_AT_FLUSH_INTERVAL):
+                from tasks.update_api_token_last_used_task import update_api_token_last_used_task
+                update_api_token_last_used_task.delay()
+        except Exception:
+            logger.warning('Failed to record last_used_at of API token %s', api_token_id, exc_info=True)
+
+    @classmethod
+    def flush_last_used_at(cls) -> int:
+        """
+        Write the recorded last_used_at of tokens to the database.
+
+        :return: count of flushed tokens
+        """
+        # the recorded uses are moved aside first, a failed flush is retried by the next one
+        if not redis_client.exists(cls.LAST_USED_AT_FLUSHING_KEY):
+            try:
+                redis_client.rename(cls.LAST_USED_AT_KEY, cls.LAST_USED_AT_FLUSHING_KEY)
+            except ResponseError:
+                # no token was used since the last flush
+                return 0
+
+        last_used_at_map = redis_client.hgetall(cls.LAST_USED_AT_FLUSHING_KEY)
+        if last_used_at_map:
+            params = [
+                {
+                    '_id': api_token_id.decode('utf-8'),
+                    '_last_used_at': datetime.utcfromtimestamp(float(last_used_at))
+                }
+                for api_token_id, last_used_at in last_used_at_map.items()
+            ]
+
+            # one executemany statement for all tokens, last_used_at never moves backwards
+            api_tokens = ApiToken.__table__
+            stmt = update(api_tokens).where(and_(
+                api_tokens.c.id == bindparam('_id'),
+                or_(api_tokens.c.last_used_at.is_(None), api_tokens.c.last_used_at < bindparam('_last_used_at'))
+            )).values(last_used_at=bindparam('_last_used_at'))
+
+            db.session.execute(stmt, params)
+            db.session.commit()
+
+        redis_client.delete(cls.LAST_USED_AT_FLUSHING_KEY)
+
+        return len(last_used_at_map)
+
+    @staticmethod
+    def _cache_key(scope: Optional[str], token: str) -> str:
+        return f"api_token:{scope}:{hashlib.sha256(token.encode()).hexdigest()}"
@@ -1,6 +1,6 @@
 import json
 from collections.abc import Generator
-from typing import Any, Union
+from typing import Any, Optional, Union
 
 from sqlalchemy import and_
 
@@ -12,6 +12,7 @@ from models.model import Account, App, AppModelConfig, Conversation, EndUser, Me
 from services.app_model_config_service import AppModelConfigService
 from services.errors.app import MoreLikeThisDisabledError
 from services.errors.app_model_config import AppModelConfigBrokenError
+from services.errors.completion import CompletionNotResumableError
 from services.errors.conversation import ConversationCompletedError, ConversationNotExistsError
 from services.errors.message import MessageNotExistsError
 
@@ -157,6 +158,22 @@ class CompletionService:
             }
         )
 
+    @classmethod
+    def resume(cls, task_id: str, user: Union[Account, EndUser], invoke_from: InvokeFrom,
+               last_event_id: Optional[str] = None) -> Generator:
+        application_manager = ApplicationManager()
+        response = application_manager.resume(
+            task_id=task_id,
+            user_id=user.id,
+            invoke_from=invoke_from,
+            last_event_id=last_event_id
+        )
+
+        if response is None:
+            raise CompletionNotResumableError()
+
+        return response
+
     @classmethod
     def generate_more_like_this(cls, app_model: App, user: Union[Account, EndUser],
                                 message_id: str, invoke_from: InvokeFrom, streaming: bool = True) \
@@ -1,6 +1,11 @@
+import logging
 from typing import Optional, Union
 
+from flask import current_app
+from sqlalchemy import update
+
 from core.generator.llm_generator import LLMGenerator
+from core.helper.background_result import BackgroundResult
 from extensions.ext_database import db
 from libs.infinite_scroll_pagination import InfiniteScrollPagination
 from models.account import Account
@@ -8,6 +13,11 @@ from models.model import App, Conversation, EndUser, Message
 from services.errors.conversation import ConversationNotExistsError, LastConversationNotExistsError
 from services.errors.message import MessageNotExistsError
 
+# seconds a background generation is marked pending, readers generate the result themselves afterwards
+BACKGROUND_GENERATION_PENDING_TTL = 60
+# seconds the result of a background generation is kept for its reader
+BACKGROUND_GENERATION_RESULT_TTL = 3600
+
 
 class ConversationService:
     @classmethod
@@ -82,6 +92,15 @@ class ConversationService:
 
     @classmethod
     def auto_generate_name(cls, app_model: App, conversation: Conversation):
+        # the name of a new chat is generated in the background when its first message is created,
+        # the first reader consumes it, and later requests generate the name again
+        generated_name = BackgroundResult('conversation_name', conversation.id).pop(
+            timeout=current_app.config['BACKGROUND_GENERATION_WAIT_TIMEOUT']
+        )
+        if generated_name is not None:
+            db.session.refresh(conversation)
+            return conversation
+
         # get conversation first message
         message = db.session.query(Message) \
             .filter(
@@ -103,6 +122,66 @@ class ConversationService:
 
         return conversation
 
+    @classmethod
+    def generate_name_in_background(cls, conversation: Conversation) -> None:
+        """
+        Dispatch the generation of the name of a new conversation,
+        the first auto_generate_name call waits for its result instead of generating it again.
+
+        :param conversation: conversation
+        """
+        background_result = BackgroundResult('conversation_name', conversation.id)
+        if background_result.mark_pending(BACKGROUND_GENERATION_PENDING_TTL):
+            from tasks.generate_conversation_name_task import generate_conversation_name_task
+            try:
+                generate_conversation_name_task.delay(conversation.id)
+            except Exception:
+                background_result.delete()
+                raise
+
+    @classmethod
+    def generate_name(cls, conversation_id: str) -> Optional[str]:
+        """
+        Generate the name of a conversation from its first message, run by generate_conversation_name_task.
+
+        :param conversation_id: conversation id
+        :return: name, None when it was not generated
+        """
+        background_result = BackgroundResult('conversation_name', conversation_id)
+
+        name = None
+        try:
+            conversation = db.session.query(Conversation).filter(Conversation.id == conversation_id).first()
+            if not conversation or not conversation.app:
+                return None
+
+            message = db.session.query(Message) \
+                .filter(Message.conversation_id == conversation.id) \
+                .order_by(Message.created_at.asc()).first()
+
+            if not message:
+                return None
+
+            name = LLMGenerator.generate_conversation_name(conversation.app.tenant_id, message.query)
+
+            # keep the name when the conversation was renamed in the meantime
+            db.session.execute(
+                update(Conversation).where(
+                    Conversation.id == conversation.id,
+                    Conversation.name == conversation.name
+                ).values(name=name)
+            )
+            db.session.commit()
+        except Exception:
+            logging.exception(f'Failed to generate name of conversation {conversation_id}')
+        finally:
+            if name is None:
+                background_result.delete()
+            else:
+                background_result.set(name, BACKGROUND_GENERATION_RESULT_TTL)
+
+        return name
+
     @classmethod
     def get_conversation(cls, app_model: App, conversation_id: str, user: Optional[Union[Account, EndUser]]):
         conversation = db.session.query(Conversation) \
@@ -36,6 +36,7 @@ from services.errors.account import NoPermissionError
 from services.errors.dataset import DatasetNameDuplicateError
 from services.errors.document import DocumentIndexingError
 from services.errors.file import FileNotExistsError
+from services.retrieval_service import RetrievalService
 from services.vector_service import VectorService
 from tasks.clean_notion_document_task import clean_notion_document_task
 from tasks.deal_dataset_vector_index_task import deal_dataset_vector_index_task
@@ -185,6 +186,7 @@ class DatasetService:
         filtered_data['updated_at'] = datetime.datetime.now()
 
         # update Retrieval model
+        RetrievalService.retrieval_model_args_validate(data['retrieval_model'])
         filtered_data['retrieval_model'] = data['retrieval_model']
 
         dataset.query.filter_by(id=dataset_id).update(filtered_data)
@@ -819,6 +821,9 @@ class DocumentService:
                 if 'process_rule' in args and args['process_rule']:
                     DocumentService.process_rule_args_validate(args)
 
+        if 'retrieval_model' in args and args['retrieval_model']:
+            RetrievalService.retrieval_model_args_validate(args['retrieval_model'])
+
     @classmethod
     def data_source_args_validate(cls, args: dict):
         if 'data_source' not in args or not args['data_source']:
@@ -1,8 +1,14 @@
+import logging
+from typing import Optional
+
 from flask import current_app
 from pydantic import BaseModel
 
+from extensions.ext_redis import redis_client
 from services.billing_service import BillingService
 
+logger = logging.getLogger(__name__)
+
 
 class SubscriptionModel(BaseModel):
     plan: str = 'sandbox'
@@ -32,7 +38,20 @@ class FeatureModel(BaseModel):
 class FeatureService:
 
     @classmethod
-    def get_features(cls, tenant_id: str) -> FeatureModel:
+    def get_features(cls, tenant_id: str, cached: bool = False) -> FeatureModel:
+        """
+        Get the features of the tenant.
+
+        :param tenant_id: workspace id
+        :param cached: use the features cached for FEATURES_CACHE_TTL seconds, for checks on hot paths,
+            instead of requesting the billing API
+        :return: features
+        """
+        if cached and current_app.config['BILLING_ENABLED']:
+            features = cls._get_cached_features(tenant_id)
+            if features:
+                return features
+
         features = FeatureModel()
 
         cls._fulfill_params_from_env(features)
@@ -40,8 +59,29 @@ class FeatureService:
         if current_app.config['BILLING_ENABLED']:
             cls._fulfill_params_from_billing_api(features, tenant_id)
 
+            try:
+                redis_client.setex(cls._cache_key(tenant_id), current_app.config['FEATURES_CACHE_TTL'],
+                                   features.json())
+            except Exception:
+                logger.warning('Failed to cache features of tenant %s', tenant_id, exc_info=True)
+
         return features
 
+    @classmethod
+    def _get_cached_features(cls, tenant_id: str) -> Optional[FeatureModel]:
+        try:
+            cached_features = redis_client.get(cls._cache_key(tenant_id))
+            if cached_features:
+                return FeatureModel.parse_raw(cached_features)
+        except Exception:
+            logger.warning('Failed to get cached features of tenant %s', tenant_id, exc_info=True)
+
+        return None
+
+    @staticmethod
+    def _cache_key(tenant_id: str) -> str:
+        return f"tenant_features:{tenant_id}"
+
     @classmethod
     def _fulfill_params_from_env(cls, features: FeatureModel):
         features.can_replace_logo = current_app.config['CAN_REPLACE_LOGO']
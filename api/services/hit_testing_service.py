@@ -1,5 +1,4 @@
 import logging
-import threading
 import time
 
 import numpy as np
@@ -8,13 +7,14 @@ from langchain.embeddings.base import Embeddings
 from langchain.schema import Document
 from sklearn.manifold import TSNE
 
+from core.docstore.segment_hydrator import SegmentHydrator
 from core.embedding.cached_embedding import CacheEmbedding
+from core.helper.retrieval_executor import RetrievalTask, retrieval_executor
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
-from core.rerank.rerank import RerankRunner
 from extensions.ext_database import db
 from models.account import Account
-from models.dataset import Dataset, DatasetQuery, DocumentSegment
+from models.dataset import Dataset, DatasetQuery
 from services.retrieval_service import RetrievalService
 
 default_retrieval_model = {
@@ -57,61 +57,65 @@ class HitTestingService:
 
         embeddings = CacheEmbedding(embedding_model)
 
-        all_documents = []
-        threads = []
+        embedding_documents = []
+        full_text_documents = []
+        tasks = []
 
         # retrieval_model source with semantic
         if retrieval_model['search_method'] == 'semantic_search' or retrieval_model['search_method'] == 'hybrid_search':
-            embedding_thread = threading.Thread(target=RetrievalService.embedding_search, kwargs={
-                'flask_app': current_app._get_current_object(),
-                'dataset_id': str(dataset.id),
-                'query': query,
-                'top_k': retrieval_model['top_k'],
-                'score_threshold': retrieval_model['score_threshold'] if retrieval_model['score_threshold_enabled'] else None,
-                'reranking_model': retrieval_model['reranking_model'] if retrieval_model['reranking_enable'] else None,
-                'all_documents': all_documents,
-                'search_method': retrieval_model['search_method'],
-                'embeddings': embeddings
-            })
-            threads.append(embedding_thread)
-            embedding_thread.start()
+            tasks.append(RetrievalTask(
+                dataset_id=dataset.id,
+                backend='semantic_search',
+                func=RetrievalService.embedding_search,
+                kwargs={
+                    'flask_app': current_app._get_current_object(),
+                    'dataset_id': str(dataset.id),
+                    'query': query,
+                    'top_k': retrieval_model['top_k'],
+                    'score_threshold': retrieval_model['score_threshold'] if retrieval_model['score_threshold_enabled'] else None,
+                    'reranking_model': retrieval_model['reranking_model'] if retrieval_model['reranking_enable'] else None,
+                    'search_method': retrieval_model['search_method'],
+                    'embeddings': embeddings
+                }
+            ))
 
         # retrieval source with full text
         if retrieval_model['search_method'] == 'full_text_search' or retrieval_model['search_method'] == 'hybrid_search':
-            full_text_index_thread = threading.Thread(target=RetrievalService.full_text_index_search, kwargs={
-                'flask_app': current_app._get_current_object(),
-                'dataset_id': str(dataset.id),
-                'query': query,
-                'search_method': retrieval_model['search_method'],
-                'embeddings': embeddings,
-                'score_threshold': retrieval_model['score_threshold'] if retrieval_model['score_threshold_enabled'] else None,
-                'top_k': retrieval_model['top_k'],
-                'reranking_model': retrieval_model['reranking_model'] if retrieval_model['reranking_enable'] else None,
-                'all_documents': all_documents
-            })
-            threads.append(full_text_index_thread)
-            full_text_index_thread.start()
-
-        for thread in threads:
-            thread.join()
+            tasks.append(RetrievalTask(
+                dataset_id=dataset.id,
+                backend='full_text_search',
+                func=RetrievalService.full_text_index_search,
+                kwargs={
+                    'flask_app': current_app._get_current_object(),
+                    'dataset_id': str(dataset.id),
+                    'query': query,
+                    'search_method': retrieval_model['search_method'],
+                    'embeddings': embeddings,
+                    'score_threshold': retrieval_model['score_threshold'] if retrieval_model['score_threshold_enabled'] else None,
+                    'top_k': retrieval_model['top_k'],
+                    'reranking_model': retrieval_model['reranking_model'] if retrieval_model['reranking_enable'] else None
+                }
+            ))
+
+        for task, documents in zip(tasks, retrieval_executor.run(tasks)):
+            if task.backend == 'semantic_search':
+                embedding_documents.extend(documents or [])
+            else:
+                full_text_documents.extend(documents or [])
 
         if retrieval_model['search_method'] == 'hybrid_search':
-            model_manager = ModelManager()
-            rerank_model_instance = model_manager.get_model_instance(
+            all_documents = RetrievalService.hybrid_rerank(
                 tenant_id=dataset.tenant_id,
-                provider=retrieval_model['reranking_model']['reranking_provider_name'],
-                model_type=ModelType.RERANK,
-                model=retrieval_model['reranking_model']['reranking_model_name']
-            )
-
-            rerank_runner = RerankRunner(rerank_model_instance)
-            all_documents = rerank_runner.run(
                 query=query,
-                documents=all_documents,
+                retrieval_model=retrieval_model,
+                embedding_documents=embedding_documents,
+                full_text_documents=full_text_documents,
                 score_threshold=retrieval_model['score_threshold'] if retrieval_model['score_threshold_enabled'] else None,
                 top_n=retrieval_model['top_k'],
                 user=f"account-{account.id}"
             )
+        else:
+            all_documents = embedding_documents + full_text_documents
 
         end = time.perf_counter()
         logging.debug(f"Hit testing retrieve in {end - start:0.4f} seconds")
@@ -141,20 +145,17 @@ class HitTestingService:
 
         query_position = tsne_position_data.pop(0)
 
-        i = 0
-        records = []
-        for document in documents:
-            index_node_id = document.metadata['doc_id']
-
-            segment = db.session.query(DocumentSegment).filter(
-                DocumentSegment.dataset_id == dataset.id,
-                DocumentSegment.enabled == True,
-                DocumentSegment.status == 'completed',
-                DocumentSegment.index_node_id == index_node_id
-            ).first()
+        hydrated_segments = SegmentHydrator.hydrate(
+            dataset_ids=[dataset.id],
+            index_node_ids=[document.metadata['doc_id'] for document in documents]
+        )
+        segments = {hydrated_segment.segment.index_node_id: hydrated_segment.segment
+                    for hydrated_segment in hydrated_segments}
 
+        records = []
+        for i, document in enumerate(documents):
+            segment = segments.get(document.metadata['doc_id'])
             if not segment:
-                i += 1
                 continue
 
             record = {
@@ -165,8 +166,6 @@ class HitTestingService:
 
             records.append(record)
 
-            i += 1
-
         return {
             "query": {
                 "content": query,
@@ -204,3 +203,5 @@ class HitTestingService:
         if not query or len(query) > 250:
             raise ValueError('Query is required and cannot exceed 250 characters')
 
+        RetrievalService.retrieval_model_args_validate(args['retrieval_model'])
+
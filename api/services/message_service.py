@@ -1,15 +1,23 @@
 import json
+import logging
 from typing import Optional, Union
 
+from flask import current_app
+
 from core.generator.llm_generator import LLMGenerator
+from core.helper.background_result import BackgroundResult
 from core.memory.token_buffer_memory import TokenBufferMemory
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from extensions.ext_database import db
 from libs.infinite_scroll_pagination import InfiniteScrollPagination
 from models.account import Account
-from models.model import App, AppModelConfig, EndUser, Message, MessageFeedback
-from services.conversation_service import ConversationService
+from models.model import App, AppModelConfig, Conversation, EndUser, Message, MessageFeedback
+from services.conversation_service import (
+    BACKGROUND_GENERATION_PENDING_TTL,
+    BACKGROUND_GENERATION_RESULT_TTL,
+    ConversationService,
+)
 from services.errors.app_model_config import AppModelConfigBrokenError
 from services.errors.conversation import ConversationCompletedError, ConversationNotExistsError
 from services.errors.message import (
@@ -199,6 +207,75 @@ class MessageService:
         if conversation.status != 'normal':
             raise ConversationCompletedError()
 
+        app_model_config = cls._get_conversation_app_model_config(app_model, conversation)
+
+        suggested_questions_after_answer = app_model_config.suggested_questions_after_answer_dict
+
+        if check_enabled and suggested_questions_after_answer.get("enabled", False) is False:
+            raise SuggestedQuestionsAfterAnswerDisabledError()
+
+        # the questions are generated in the background when the message is created
+        questions = BackgroundResult('suggested_questions', message.id).get(
+            timeout=current_app.config['BACKGROUND_GENERATION_WAIT_TIMEOUT']
+        )
+        if questions is not None:
+            return questions
+
+        return cls._generate_suggested_questions_after_answer(app_model, conversation, app_model_config)
+
+    @classmethod
+    def generate_suggested_questions_in_background(cls, message: Message) -> None:
+        """
+        Dispatch the generation of the suggested questions after the answer of a message,
+        get_suggested_questions_after_answer waits for its result instead of generating them again.
+
+        :param message: message
+        """
+        background_result = BackgroundResult('suggested_questions', message.id)
+        if background_result.mark_pending(BACKGROUND_GENERATION_PENDING_TTL):
+            from tasks.generate_suggested_questions_task import generate_suggested_questions_task
+            try:
+                generate_suggested_questions_task.delay(message.id)
+            except Exception:
+                background_result.delete()
+                raise
+
+    @classmethod
+    def generate_suggested_questions(cls, message_id: str) -> Optional[list[str]]:
+        """
+        Generate the suggested questions after the answer of a message, run by generate_suggested_questions_task.
+
+        :param message_id: message id
+        :return: questions, None when they were not generated
+        """
+        background_result = BackgroundResult('suggested_questions', message_id)
+
+        questions = None
+        try:
+            message = db.session.query(Message).filter(Message.id == message_id).first()
+            if not message:
+                return None
+
+            conversation = db.session.query(Conversation).filter(Conversation.id == message.conversation_id).first()
+            if not conversation or not conversation.app:
+                return None
+
+            app_model_config = cls._get_conversation_app_model_config(conversation.app, conversation)
+            questions = cls._generate_suggested_questions_after_answer(
+                conversation.app, conversation, app_model_config
+            )
+        except Exception:
+            logging.exception(f'Failed to generate suggested questions of message {message_id}')
+        finally:
+            if questions is None:
+                background_result.delete()
+            else:
+                background_result.set(questions, BACKGROUND_GENERATION_RESULT_TTL)
+
+        return questions
+
+    @classmethod
+    def _get_conversation_app_model_config(cls, app_model: App, conversation: Conversation) -> AppModelConfig:
         if not conversation.override_model_configs:
             app_model_config = db.session.query(AppModelConfig).filter(
                 AppModelConfig.id == conversation.app_model_config_id,
@@ -216,11 +293,11 @@ class MessageService:
 
             app_model_config = app_model_config.from_model_config_dict(conversation_override_model_configs)
 
-        suggested_questions_after_answer = app_model_config.suggested_questions_after_answer_dict
-
-        if check_enabled and suggested_questions_after_answer.get("enabled", False) is False:
-            raise SuggestedQuestionsAfterAnswerDisabledError()
+        return app_model_config
 
+    @classmethod
+    def _generate_suggested_questions_after_answer(cls, app_model: App, conversation: Conversation,
+                                                   app_model_config: AppModelConfig) -> list[str]:
         # get memory of conversation (read-only)
         model_manager = ModelManager()
         model_instance = model_manager.get_model_instance(
@@ -7,6 +7,7 @@ import requests
 from flask import current_app
 
 from core.entities.model_entities import ModelStatus
+from core.helper.provider_configurations_cache import provider_configurations_cache
 from core.model_runtime.entities.model_entities import ModelType, ParameterRule
 from core.model_runtime.model_providers import model_provider_factory
 from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
@@ -507,6 +508,9 @@ class ModelProviderService:
 
         rst = response.json()
 
+        # the free quota server may have granted the quota to the provider records of the workspace
+        provider_configurations_cache.invalidate(tenant_id)
+
         if rst['type'] == 'redirect':
             return {
                 'type': rst['type'],
@@ -544,6 +548,7 @@ class ModelProviderService:
 
         data = rst['data']
         if data['qualified'] is True:
+            provider_configurations_cache.invalidate(tenant_id)
             return {
                 'result': 'success',
                 'provider_name': provider,
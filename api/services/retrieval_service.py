@@ -1,12 +1,15 @@
+import math
 from typing import Optional
 
 from flask import Flask, current_app
 from langchain.embeddings.base import Embeddings
+from langchain.schema import Document
 
 from core.index.vector_index.vector_index import VectorIndex
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.errors.invoke import InvokeAuthorizationError
+from core.rerank.rank_fusion import RankFusionRunner, RerankingMode
 from core.rerank.rerank import RerankRunner
 from extensions.ext_database import db
 from models.dataset import Dataset
@@ -22,9 +25,54 @@ default_retrieval_model = {
     'score_threshold_enabled': False
 }
 
+default_weights = {
+    'vector_weight': 0.5,
+    'keyword_weight': 0.5
+}
+
 
 class RetrievalService:
 
+    @classmethod
+    def retrieval_model_args_validate(cls, retrieval_model: Optional[dict]):
+        """
+        Validate the reranking mode and the rank fusion weights of a retrieval model.
+
+        :param retrieval_model: retrieval model, not validated when not given
+        """
+        if not retrieval_model:
+            return
+
+        if not isinstance(retrieval_model, dict):
+            raise ValueError("Retrieval model is invalid")
+
+        reranking_mode = retrieval_model.get('reranking_mode')
+        if reranking_mode is not None:
+            if not isinstance(reranking_mode, str):
+                raise ValueError("Retrieval model reranking_mode is invalid")
+
+            try:
+                RerankingMode.value_of(reranking_mode)
+            except ValueError:
+                raise ValueError("Retrieval model reranking_mode is invalid")
+
+        weights = retrieval_model.get('weights')
+        if weights is not None:
+            if not isinstance(weights, dict):
+                raise ValueError("Retrieval model weights is invalid")
+
+            for weight_name in ['vector_weight', 'keyword_weight']:
+                if weight_name not in weights or weights[weight_name] is None:
+                    raise ValueError(f"Retrieval model weights {weight_name} is required")
+
+                weight = weights[weight_name]
+                if isinstance(weight, bool) or not isinstance(weight, int | float) \
+                        or not math.isfinite(weight) or weight < 0:
+                    raise ValueError(f"Retrieval model weights {weight_name} must be a non-negative number")
+
+            if weights['vector_weight'] + weights['keyword_weight'] <= 0:
+                raise ValueError("Retrieval model weights must sum to a positive number")
+
     @classmethod
     def embedding_search(cls, flask_app: Flask, dataset_id: str, query: str,
                          top_k: int, score_threshold: Optional[float], reranking_model: Optional[dict],
@@ -117,3 +165,52 @@ class RetrievalService:
                     ))
                 else:
                     all_documents.extend(documents)
+
+    @classmethod
+    def hybrid_rerank(cls, tenant_id: str, query: str, retrieval_model: dict,
+                      embedding_documents: list[Document], full_text_documents: list[Document],
+                      score_threshold: Optional[float], top_n: int, user: Optional[str] = None) -> list[Document]:
+        """
+        Merge the documents of the semantic and the full text search of a hybrid search,
+        with the rerank model or in process by the rank fusion of the reranking mode of the retrieval model.
+
+        :param tenant_id: workspace id
+        :param query: search query
+        :param retrieval_model: retrieval model of the dataset
+        :param embedding_documents: documents of the semantic search
+        :param full_text_documents: documents of the full text search
+        :param score_threshold: score threshold
+        :param top_n: top n
+        :param user: unique user id if needed
+        :return: merged documents
+        """
+        reranking_mode = RerankingMode.value_of(retrieval_model.get('reranking_mode'))
+        if reranking_mode == RerankingMode.RERANKING_MODEL:
+            model_manager = ModelManager()
+            rerank_model_instance = model_manager.get_model_instance(
+                tenant_id=tenant_id,
+                provider=retrieval_model['reranking_model']['reranking_provider_name'],
+                model_type=ModelType.RERANK,
+                model=retrieval_model['reranking_model']['reranking_model_name']
+            )
+
+            rerank_runner = RerankRunner(rerank_model_instance)
+            return rerank_runner.run(
+                query=query,
+                documents=embedding_documents + full_text_documents,
+                score_threshold=score_threshold,
+                top_n=top_n,
+                user=user
+            )
+
+        weights = retrieval_model.get('weights') or default_weights
+        rank_fusion_runner = RankFusionRunner(
+            mode=reranking_mode,
+            weights=[weights['vector_weight'], weights['keyword_weight']]
+        )
+
+        return rank_fusion_runner.run(
+            documents_lists=[embedding_documents, full_text_documents],
+            score_threshold=score_threshold,
+            top_n=top_n
+        )
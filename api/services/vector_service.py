@@ -3,6 +3,7 @@ from typing import Optional
 
 from langchain.schema import Document
 
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
 from core.index.index import IndexBuilder
 from models.dataset import Dataset, DocumentSegment
 
@@ -34,6 +35,9 @@ class VectorService:
             else:
                 index.add_texts([document])
 
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset.id)
+
     @classmethod
     def multi_create_segment_vector(cls, pre_segment_data_list: list, dataset: Dataset):
         documents = []
@@ -60,6 +64,9 @@ class VectorService:
         if keyword_index:
             keyword_index.multi_create_segment_keywords(pre_segment_data_list)
 
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset.id)
+
     @classmethod
     def update_segment_vector(cls, keywords: Optional[list[str]], segment: DocumentSegment, dataset: Dataset):
         # update segment index task
@@ -92,3 +99,6 @@ class VectorService:
             kw_index.create_segment_keywords(segment.index_node_id, keywords)
         else:
             kw_index.add_texts([document])
+
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset.id)
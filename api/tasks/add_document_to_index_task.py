@@ -7,6 +7,7 @@ from celery import shared_task
 from langchain.schema import Document
 from werkzeug.exceptions import NotFound
 
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
 from core.index.index import IndexBuilder
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
@@ -70,6 +71,9 @@ def add_document_to_index_task(dataset_document_id: str):
         if index:
             index.add_texts(documents)
 
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset.id)
+
         end_at = time.perf_counter()
         logging.info(
             click.style('Document added to index: {} latency: {}'.format(dataset_document.id, end_at - start_at), fg='green'))
@@ -8,6 +8,7 @@ import click
 from celery import shared_task
 from sqlalchemy import func
 
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
 from core.indexing_runner import IndexingRunner
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
@@ -59,18 +60,22 @@ def batch_create_segment_to_index_task(job_id: str, content: list, dataset_id: s
                 model=dataset.embedding_model
             )
 
-        model_type_instance = embedding_model.model_type_instance
-        model_type_instance = cast(TextEmbeddingModel, model_type_instance)
-        for segment in content:
+        # calc embedding use tokens
+        if embedding_model:
+            model_type_instance = embedding_model.model_type_instance
+            model_type_instance = cast(TextEmbeddingModel, model_type_instance)
+            segment_tokens = model_type_instance.get_num_tokens_batch(
+                model=embedding_model.model,
+                credentials=embedding_model.credentials,
+                texts=[segment['content'] for segment in content]
+            )
+        else:
+            segment_tokens = [0] * len(content)
+
+        for segment, tokens in zip(content, segment_tokens):
             content = segment['content']
             doc_id = str(uuid.uuid4())
             segment_hash = helper.generate_text_hash(content)
-            # calc embedding use tokens
-            tokens = model_type_instance.get_num_tokens(
-                model=embedding_model.model,
-                credentials=embedding_model.credentials,
-                texts=[content]
-            ) if embedding_model else 0
             max_position = db.session.query(func.max(DocumentSegment.position)).filter(
                 DocumentSegment.document_id == dataset_document.id
             ).scalar()
@@ -98,6 +103,10 @@ def batch_create_segment_to_index_task(job_id: str, content: list, dataset_id: s
         indexing_runner.batch_add_segments(document_segments, dataset)
         db.session.commit()
         redis_client.setex(indexing_cache_key, 600, 'completed')
+
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset_id)
+
         end_at = time.perf_counter()
         logging.info(click.style('Segment batch created job: {} latency: {}'.format(job_id, end_at - start_at), fg='green'))
     except Exception as e:
@@ -4,6 +4,7 @@ import time
 import click
 from celery import shared_task
 
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
 from core.index.index import IndexBuilder
 from extensions.ext_database import db
 from models.dataset import (
@@ -71,6 +72,9 @@ def clean_dataset_task(dataset_id: str, tenant_id: str, indexing_technique: str,
 
         db.session.commit()
 
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset_id)
+
         end_at = time.perf_counter()
         logging.info(
             click.style('Cleaned dataset when dataset deleted: {} latency: {}'.format(dataset_id, end_at - start_at), fg='green'))
@@ -4,6 +4,7 @@ import time
 import click
 from celery import shared_task
 
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
 from core.index.index import IndexBuilder
 from extensions.ext_database import db
 from models.dataset import Dataset, DocumentSegment
@@ -47,6 +48,10 @@ def clean_document_task(document_id: str, dataset_id: str):
                 db.session.delete(segment)
 
             db.session.commit()
+
+            # the cached retrievals of the dataset are outdated
+            dataset_retrieval_cache.invalidate(dataset_id)
+
             end_at = time.perf_counter()
             logging.info(
                 click.style('Cleaned document when document deleted: {} latency: {}'.format(document_id, end_at - start_at), fg='green'))
@@ -4,6 +4,7 @@ import time
 import click
 from celery import shared_task
 
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
 from core.index.index import IndexBuilder
 from extensions.ext_database import db
 from models.dataset import Dataset, Document, DocumentSegment
@@ -49,6 +50,10 @@ def clean_notion_document_task(document_ids: list[str], dataset_id: str):
             for segment in segments:
                 db.session.delete(segment)
         db.session.commit()
+
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset_id)
+
         end_at = time.perf_counter()
         logging.info(
             click.style('Clean document when import form notion document deleted end :: {} latency: {}'.format(
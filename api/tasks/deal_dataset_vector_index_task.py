@@ -5,6 +5,7 @@ import click
 from celery import shared_task
 from langchain.schema import Document
 
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
 from core.index.index import IndexBuilder
 from extensions.ext_database import db
 from models.dataset import Dataset, DocumentSegment
@@ -67,6 +68,9 @@ def deal_dataset_vector_index_task(dataset_id: str, action: str):
                 # save vector index
                 index.create(documents)
 
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset_id)
+
         end_at = time.perf_counter()
         logging.info(
             click.style('Deal dataset vector index: {} latency: {}'.format(dataset_id, end_at - start_at), fg='green'))
@@ -4,6 +4,7 @@ import time
 import click
 from celery import shared_task
 
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
 from core.index.index import IndexBuilder
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
@@ -49,6 +50,9 @@ def delete_segment_from_index_task(segment_id: str, index_node_id: str, dataset_
         # delete from keyword index
         kw_index.delete_by_ids([index_node_id])
 
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset.id)
+
         end_at = time.perf_counter()
         logging.info(click.style('Segment deleted from index: {} latency: {}'.format(segment_id, end_at - start_at), fg='green'))
     except Exception:
@@ -5,6 +5,7 @@ import time
 import click
 from celery import shared_task
 
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
 from core.indexing_runner import DocumentIsPausedException, IndexingRunner
 from extensions.ext_database import db
 from models.dataset import Document
@@ -39,6 +40,10 @@ def document_indexing_task(dataset_id: str, document_ids: list):
     try:
         indexing_runner = IndexingRunner()
         indexing_runner.run(documents)
+
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset_id)
+
         end_at = time.perf_counter()
         logging.info(click.style('Processed dataset: {} latency: {}'.format(dataset_id, end_at - start_at), fg='green'))
     except DocumentIsPausedException as ex:
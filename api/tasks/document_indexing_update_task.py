@@ -6,6 +6,7 @@ import click
 from celery import shared_task
 from werkzeug.exceptions import NotFound
 
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
 from core.index.index import IndexBuilder
 from core.indexing_runner import DocumentIsPausedException, IndexingRunner
 from extensions.ext_database import db
@@ -59,6 +60,10 @@ def document_indexing_update_task(dataset_id: str, document_id: str):
         for segment in segments:
             db.session.delete(segment)
         db.session.commit()
+
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset_id)
+
         end_at = time.perf_counter()
         logging.info(
             click.style('Cleaned document when document update data source or process rule: {} latency: {}'.format(document_id, end_at - start_at), fg='green'))
@@ -68,6 +73,10 @@ def document_indexing_update_task(dataset_id: str, document_id: str):
     try:
         indexing_runner = IndexingRunner()
         indexing_runner.run([document])
+
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset_id)
+
         end_at = time.perf_counter()
         logging.info(click.style('update document: {} latency: {}'.format(document.id, end_at - start_at), fg='green'))
     except DocumentIsPausedException as ex:
@@ -0,0 +1,26 @@
+import logging
+import time
+
+import click
+from celery import shared_task
+
+from core.helper.usage_ledger import usage_ledger
+
+
+@shared_task(queue='dataset')
+def flush_usage_ledger_task():
+    """
+    Write the quota usage and last use of providers recorded in the usage ledger to the database.
+
+    Usage: flush_usage_ledger_task.delay()
+    """
+    logging.info(click.style('Start flush usage ledger.', fg='green'))
+    start_at = time.perf_counter()
+
+    try:
+        count = usage_ledger.flush()
+        end_at = time.perf_counter()
+        logging.info(click.style('Flushed usage of {} quotas, latency: {}'.format(count, end_at - start_at),
+                                 fg='green'))
+    except Exception:
+        logging.exception("Flush usage ledger failed")
@@ -0,0 +1,25 @@
+import logging
+import time
+
+import click
+from celery import shared_task
+
+from services.conversation_service import ConversationService
+
+
+@shared_task(queue='generation')
+def generate_conversation_name_task(conversation_id: str):
+    """
+    Generate the name of a new conversation from its first message.
+    :param conversation_id: conversation id
+
+    Usage: generate_conversation_name_task.delay(conversation_id)
+    """
+    logging.info(click.style('Start generate conversation name: {}'.format(conversation_id), fg='green'))
+    start_at = time.perf_counter()
+
+    ConversationService.generate_name(conversation_id)
+
+    end_at = time.perf_counter()
+    logging.info(click.style('Generate conversation name: {} latency: {}'.format(conversation_id, end_at - start_at),
+                             fg='green'))
@@ -0,0 +1,25 @@
+import logging
+import time
+
+import click
+from celery import shared_task
+
+from services.message_service import MessageService
+
+
+@shared_task(queue='generation')
+def generate_suggested_questions_task(message_id: str):
+    """
+    Generate the suggested questions after the answer of a message.
+    :param message_id: message id
+
+    Usage: generate_suggested_questions_task.delay(message_id)
+    """
+    logging.info(click.style('Start generate suggested questions: {}'.format(message_id), fg='green'))
+    start_at = time.perf_counter()
+
+    MessageService.generate_suggested_questions(message_id)
+
+    end_at = time.perf_counter()
+    logging.info(click.style('Generate suggested questions: {} latency: {}'.format(message_id, end_at - start_at),
+                             fg='green'))
@@ -0,0 +1,34 @@
+import logging
+import time
+
+import click
+from celery import shared_task
+from flask import current_app
+
+from core.application_manager import ApplicationManager
+
+
+@shared_task(queue='generation')
+def generate_task(application_generate_entity: dict, conversation_id: str, message_id: str):
+    """
+    Run the application runner of a generate task,
+    its events are relayed to the client by the API worker through the redis stream of the task.
+    :param application_generate_entity: application generate entity, without its orchestration config entity
+    :param conversation_id: conversation id
+    :param message_id: message id
+
+    Usage: generate_task.delay(application_generate_entity, conversation_id, message_id)
+    """
+    task_id = application_generate_entity['task_id']
+    logging.info(click.style('Start generate task: {}'.format(task_id), fg='green'))
+    start_at = time.perf_counter()
+
+    ApplicationManager().run_generate_task(
+        flask_app=current_app._get_current_object(),
+        application_generate_entity=application_generate_entity,
+        conversation_id=conversation_id,
+        message_id=message_id
+    )
+
+    end_at = time.perf_counter()
+    logging.info(click.style('Generate task: {} latency: {}'.format(task_id, end_at - start_at), fg='green'))
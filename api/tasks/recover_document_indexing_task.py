@@ -5,6 +5,7 @@ import click
 from celery import shared_task
 from werkzeug.exceptions import NotFound
 
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
 from core.indexing_runner import DocumentIsPausedException, IndexingRunner
 from extensions.ext_database import db
 from models.dataset import Document
@@ -38,6 +39,10 @@ def recover_document_indexing_task(dataset_id: str, document_id: str):
             indexing_runner.run_in_splitting_status(document)
         elif document.indexing_status == "indexing":
             indexing_runner.run_in_indexing_status(document)
+
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset_id)
+
         end_at = time.perf_counter()
         logging.info(click.style('Processed document: {} latency: {}'.format(document.id, end_at - start_at), fg='green'))
     except DocumentIsPausedException as ex:
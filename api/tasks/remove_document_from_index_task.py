@@ -5,6 +5,7 @@ import click
 from celery import shared_task
 from werkzeug.exceptions import NotFound
 
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
 from core.index.index import IndexBuilder
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
@@ -50,6 +51,9 @@ def remove_document_from_index_task(document_id: str):
         if index_node_ids:
             kw_index.delete_by_ids(index_node_ids)
 
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset.id)
+
         end_at = time.perf_counter()
         logging.info(
             click.style('Document removed from index: {} latency: {}'.format(document.id, end_at - start_at), fg='green'))
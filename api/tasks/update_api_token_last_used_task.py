@@ -0,0 +1,26 @@
+import logging
+import time
+
+import click
+from celery import shared_task
+
+from services.api_token_service import ApiTokenService
+
+
+@shared_task(queue='dataset')
+def update_api_token_last_used_task():
+    """
+    Write the last_used_at of service api tokens recorded in redis to the database.
+
+    Usage: update_api_token_last_used_task.delay()
+    """
+    logging.info(click.style('Start update api token last used at.', fg='green'))
+    start_at = time.perf_counter()
+
+    try:
+        count = ApiTokenService.flush_last_used_at()
+        end_at = time.perf_counter()
+        logging.info(click.style('Updated last used at of {} api tokens, latency: {}'.format(count, end_at - start_at),
+                                 fg='green'))
+    except Exception:
+        logging.exception("Update api token last used at failed")
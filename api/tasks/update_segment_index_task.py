@@ -8,6 +8,7 @@ from celery import shared_task
 from langchain.schema import Document
 from werkzeug.exceptions import NotFound
 
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
 from core.index.index import IndexBuilder
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
@@ -101,6 +102,9 @@ def update_segment_index_task(segment_id: str, keywords: Optional[list[str]] = N
         DocumentSegment.query.filter_by(id=segment.id).update(update_params)
         db.session.commit()
 
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset.id)
+
         end_at = time.perf_counter()
         logging.info(click.style('Segment update index: {} latency: {}'.format(segment.id, end_at - start_at), fg='green'))
     except Exception as e:
@@ -6,6 +6,7 @@ import click
 from celery import shared_task
 from werkzeug.exceptions import NotFound
 
+from core.helper.dataset_retrieval_cache import dataset_retrieval_cache
 from core.index.index import IndexBuilder
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
@@ -55,6 +56,9 @@ def update_segment_keyword_index_task(segment_id: str):
         if index:
             index.update_segment_keywords_index(segment.index_node_id, segment.keywords)
 
+        # the cached retrievals of the dataset are outdated
+        dataset_retrieval_cache.invalidate(dataset.id)
+
         end_at = time.perf_counter()
         logging.info(click.style('Segment update index: {} latency: {}'.format(segment.id, end_at - start_at), fg='green'))
     except Exception as e:
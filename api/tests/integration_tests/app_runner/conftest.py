@@ -0,0 +1,25 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.application_queue_manager import ApplicationQueueManager
+from core.application_queue_transport import InMemoryQueueTransport
+from core.entities.application_entities import InvokeFrom
+
+
+@pytest.fixture
+def queue_manager(monkeypatch):
+    monkeypatch.setattr('core.application_queue_manager.redis_client', MagicMock())
+    monkeypatch.setattr('core.application_queue_manager.task_stop_signals.register',
+                        lambda task_id, stopped_cache_key: threading.Event())
+
+    return ApplicationQueueManager(
+        task_id='task',
+        user_id='user',
+        invoke_from=InvokeFrom.SERVICE_API,
+        conversation_id='conversation',
+        app_mode='chat',
+        message_id='message',
+        transport=InMemoryQueueTransport()
+    )
@@ -0,0 +1,96 @@
+import json
+import logging
+import time
+
+from core.app_runner.generate_task_pipeline import ChunkResponseSerializer
+from core.application_queue_manager import PublishFrom
+from core.entities.queue_entities import QueueMessageDeltaEvent, QueueMessageEvent
+from core.model_runtime.entities.llm_entities import LLMResultChunk, LLMResultChunkDelta
+from core.model_runtime.entities.message_entities import (
+    AssistantPromptMessage,
+    SystemPromptMessage,
+    UserPromptMessage,
+)
+
+logger = logging.getLogger(__name__)
+
+TOKENS = ['Hello', ',', ' world', '!', ' "quoted"', '\n', ' 数据', ' 😀', ' \\', ' end']
+
+
+def _chunks(count: int, prompt_messages: int) -> list[LLMResultChunk]:
+    prompts = [SystemPromptMessage(content='You are a helpful assistant. ' * 50)]
+    for i in range(prompt_messages):
+        prompts.append(UserPromptMessage(content=f'question {i} ' * 100))
+        prompts.append(AssistantPromptMessage(content=f'answer {i} ' * 100))
+
+    return [
+        LLMResultChunk(
+            model='gpt-3.5-turbo',
+            prompt_messages=prompts,
+            delta=LLMResultChunkDelta(index=i, message=AssistantPromptMessage(content=TOKENS[i % len(TOKENS)]))
+        )
+        for i in range(count)
+    ]
+
+
+def _response(text: str) -> dict:
+    return {
+        'event': 'message',
+        'id': 'message',
+        'task_id': 'task',
+        'message_id': 'message',
+        'answer': text,
+        'created_at': 1700000000,
+        'conversation_id': 'conversation'
+    }
+
+
+def test_chunk_response_serializer():
+    serializer = ChunkResponseSerializer(_response(''))
+    for text in TOKENS + ['', '\x00answer\x00']:
+        assert serializer.serialize(text) == "data: " + json.dumps(_response(text)) + "\n\n"
+
+
+def test_publish_delta_chunks(queue_manager):
+    for chunk in _chunks(3, 2):
+        queue_manager.publish_chunk_message(chunk, PublishFrom.APPLICATION_MANAGER)
+    queue_manager.stop_listen()
+
+    events = [message.event for message in queue_manager.listen()]
+
+    assert isinstance(events[0], QueueMessageEvent)
+    assert events[0].chunk.prompt_messages
+    assert all(isinstance(event, QueueMessageDeltaEvent) for event in events[1:])
+    assert [events[0].chunk.delta.message.content] + [event.text for event in events[1:]] == TOKENS[:3]
+
+
+def test_publish_chunk_benchmark(queue_manager):
+    chunks = _chunks(2000, 10)
+
+    # before: every chunk published with its prompt messages and serialized with json.dumps
+    start_at = time.perf_counter()
+    for chunk in chunks:
+        queue_manager.publish(QueueMessageEvent(chunk=chunk), PublishFrom.APPLICATION_MANAGER)
+    queue_manager.stop_listen()
+    expected = ["data: " + json.dumps(_response(message.event.chunk.delta.message.content)) + "\n\n"
+                for message in queue_manager.listen()]
+    latency = time.perf_counter() - start_at
+
+    # after: delta events after the first chunk, serialized around the pre-encoded fields
+    serializer = ChunkResponseSerializer(_response(''))
+    start_at = time.perf_counter()
+    for chunk in chunks:
+        queue_manager.publish_chunk_message(chunk, PublishFrom.APPLICATION_MANAGER)
+    queue_manager.stop_listen()
+    responses = []
+    for message in queue_manager.listen():
+        event = message.event
+        text = event.text if isinstance(event, QueueMessageDeltaEvent) else event.chunk.delta.message.content
+        responses.append(serializer.serialize(text))
+    delta_latency = time.perf_counter() - start_at
+
+    logger.info('%s chunks: full chunks %.0f tokens/s, delta chunks %.0f tokens/s',
+                len(chunks), len(chunks) / latency, len(chunks) / delta_latency)
+
+    assert responses == expected
+    assert delta_latency < latency
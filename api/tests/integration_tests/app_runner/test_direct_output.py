@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from core.app_runner.direct_output import (
+    DirectOutputChunkUnit,
+    DirectOutputPacing,
+    DirectOutputPolicy,
+    publish_direct_output,
+    split_direct_output,
+)
+from core.application_queue_manager import PublishFrom
+from core.entities.queue_entities import QueueMessageDeltaEvent, QueueMessageEvent
+from core.model_runtime.entities.message_entities import UserPromptMessage
+
+TEXTS = [
+    'Hello world,  this is an annotation reply. Is it fine? Yes!\n\nNext paragraph',
+    '数据集合。这是回复！English words too.',
+    '   ',
+    'a',
+]
+
+
+@pytest.mark.parametrize('chunk_unit', list(DirectOutputChunkUnit))
+def test_split_direct_output(chunk_unit: DirectOutputChunkUnit):
+    for text in TEXTS:
+        assert ''.join(split_direct_output(text, chunk_unit)) == text
+
+    assert split_direct_output('', chunk_unit) == []
+
+
+def test_split_direct_output_units():
+    assert split_direct_output('Hello world, fine. 数据', DirectOutputChunkUnit.WORD) == \
+           ['Hello ', 'world, ', 'fine. ', '数', '据']
+    assert split_direct_output('Is it fine? Yes!\n\nNext', DirectOutputChunkUnit.SENTENCE) == \
+           ['Is it fine? ', 'Yes!\n\n', 'Next']
+
+
+def _publish(queue_manager, text: str, policy: DirectOutputPolicy) -> list:
+    publish_direct_output(
+        queue_manager=queue_manager,
+        model='gpt-3.5-turbo',
+        prompt_messages=[UserPromptMessage(content='query')],
+        text=text,
+        pub_from=PublishFrom.APPLICATION_MANAGER,
+        policy=policy
+    )
+    queue_manager.stop_listen()
+
+    return [message.event for message in queue_manager.listen()]
+
+
+def test_publish_direct_output(queue_manager):
+    text = TEXTS[0] * 20
+    events = _publish(queue_manager, text, DirectOutputPolicy(pacing=DirectOutputPacing.NONE))
+
+    assert isinstance(events[0], QueueMessageEvent)
+    assert events[0].chunk.prompt_messages
+    assert all(isinstance(event, QueueMessageDeltaEvent) for event in events[1:])
+    assert events[0].chunk.delta.message.content + ''.join(event.text for event in events[1:]) == text
+    assert len(events) == len(split_direct_output(text, DirectOutputChunkUnit.WORD))
+
+
+def test_publish_direct_output_rate(queue_manager):
+    start_at = time.perf_counter()
+    _publish(queue_manager, 'x' * 200, DirectOutputPolicy(
+        chunk_unit=DirectOutputChunkUnit.TEXT,
+        pacing=DirectOutputPacing.RATE,
+        chars_per_second=1000
+    ))
+
+    assert time.perf_counter() - start_at >= 0.2
@@ -0,0 +1,67 @@
+import random
+
+from flask import Flask
+
+from core.app_runner.moderation_handler import ModerationRule, OutputModerationHandler
+from core.moderation.keywords.keywords_matcher import (
+    KeywordsAutomaton,
+    StreamingKeywordsMatcher,
+    get_keywords_automaton,
+)
+from extensions.ext_code_based_extension import code_based_extension
+
+KEYWORDS = ['he', 'she', 'his', 'hers', 'Straße', 'abc', 'bcd']
+
+
+def test_keywords_automaton():
+    automaton = KeywordsAutomaton(KEYWORDS + [''])
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = ''.join(rng.choice('hesirabcdS') for _ in range(rng.randint(0, 20)))
+        expected = any(keyword.casefold() in text.casefold() for keyword in KEYWORDS)
+        assert automaton.search(text) == expected
+
+        matcher = StreamingKeywordsMatcher(automaton)
+        found = False
+        start = 0
+        while start < len(text):
+            end = start + rng.randint(1, 4)
+            found = matcher.feed(text[start:end])
+            start = end
+
+        assert found == expected
+
+    assert automaton.search('STRASSE')
+    assert not automaton.search('')
+
+
+def test_get_keywords_automaton():
+    assert get_keywords_automaton('bad\nevil') is get_keywords_automaton('bad\nevil')
+
+
+def test_output_moderation_stream():
+    code_based_extension.init()
+
+    replaced = []
+    handler = OutputModerationHandler(
+        tenant_id='tenant',
+        app_id='app',
+        rule=ModerationRule(type='keywords', config={
+            'keywords': 'bad\nevil word',
+            'inputs_config': {'enabled': False},
+            'outputs_config': {'enabled': True, 'preset_response': 'blocked'}
+        }),
+        on_message_replace_func=lambda text, pub_from: replaced.append(text)
+    )
+
+    with Flask(__name__).app_context():
+        # the keyword spans chunks
+        for token in ['hello ', 'this is ev', 'il', ' wo', 'rd and more']:
+            handler.append_new_token(token)
+
+        handler.thread.join(timeout=5)
+        handler.stop_thread()
+
+    assert replaced == ['blocked']
+    assert handler.should_direct_output()
+    assert handler.get_final_output() == 'blocked'
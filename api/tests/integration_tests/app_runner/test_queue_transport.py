@@ -0,0 +1,131 @@
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.application_queue_transport import RedisStreamQueueTransport, TaskResponseStream
+from core.entities.queue_entities import (
+    QueueErrorEvent,
+    QueueMessage,
+    QueueMessageEndEvent,
+    QueueMessageEvent,
+    QueueStopEvent,
+)
+from core.errors.error import QuotaExceededError
+from core.model_runtime.entities.llm_entities import LLMResult, LLMResultChunk, LLMResultChunkDelta, LLMUsage
+from core.model_runtime.entities.message_entities import (
+    AssistantPromptMessage,
+    ImagePromptMessageContent,
+    SystemPromptMessage,
+    TextPromptMessageContent,
+    UserPromptMessage,
+)
+from core.model_runtime.errors.invoke import InvokeRateLimitError
+
+
+def _message(event) -> QueueMessage:
+    return QueueMessage(
+        task_id='task',
+        message_id='message',
+        conversation_id='conversation',
+        app_mode='chat',
+        event=event
+    )
+
+
+def _round_trip(event) -> QueueMessage:
+    return RedisStreamQueueTransport._loads(RedisStreamQueueTransport._dumps(_message(event)))
+
+
+def test_chunk_round_trip():
+    prompt_messages = [
+        SystemPromptMessage(content='You are a helpful assistant.'),
+        UserPromptMessage(content=[
+            TextPromptMessageContent(data='What is in the image?'),
+            ImagePromptMessageContent(data='data:image/png;base64,AAAA', detail=ImagePromptMessageContent.DETAIL.HIGH)
+        ])
+    ]
+    event = QueueMessageEvent(chunk=LLMResultChunk(
+        model='gpt-4-vision-preview',
+        prompt_messages=prompt_messages,
+        delta=LLMResultChunkDelta(index=0, message=AssistantPromptMessage(content='A cat.'))
+    ))
+
+    message = _round_trip(event)
+
+    assert message == _message(event)
+    assert isinstance(message.event, QueueMessageEvent)
+    assert isinstance(message.event.chunk.prompt_messages[0], SystemPromptMessage)
+    assert isinstance(message.event.chunk.prompt_messages[1].content[1], ImagePromptMessageContent)
+
+
+def test_message_end_round_trip_keeps_prices():
+    usage = LLMUsage.empty_usage().copy(update={'prompt_unit_price': Decimal('0.0015'), 'total_price': Decimal('0.1')})
+    event = QueueMessageEndEvent(llm_result=LLMResult(
+        model='gpt-3.5-turbo',
+        prompt_messages=[UserPromptMessage(content='Hello')],
+        message=AssistantPromptMessage(content='Hi'),
+        usage=usage
+    ))
+
+    message = _round_trip(event)
+
+    assert message.event.llm_result.usage.prompt_unit_price == Decimal('0.0015')
+    assert message.event.llm_result.usage.total_price == Decimal('0.1')
+    assert _round_trip(QueueStopEvent(stopped_by=QueueStopEvent.StopBy.USER_MANUAL)).event.stopped_by \
+        == QueueStopEvent.StopBy.USER_MANUAL
+
+
+def test_errors_are_reduced_to_their_message():
+    class VendorError(InvokeRateLimitError):
+        pass
+
+    error = _round_trip(QueueErrorEvent(error=VendorError('Too many requests'))).event.error
+    assert type(error) is InvokeRateLimitError
+    assert error.description == 'Too many requests'
+
+    error = _round_trip(QueueErrorEvent(error=QuotaExceededError('quota exceeded'))).event.error
+    assert type(error) is QuotaExceededError
+
+    error = _round_trip(QueueErrorEvent(error=RuntimeError('unknown'))).event.error
+    assert type(error) is Exception
+    assert str(error) == 'unknown'
+
+
+def test_unknown_event_types_are_rejected():
+    data = RedisStreamQueueTransport._dumps(_message(QueueStopEvent(stopped_by=QueueStopEvent.StopBy.USER_MANUAL)))
+
+    with pytest.raises(ValueError):
+        RedisStreamQueueTransport._loads(data.replace(b'QueueStopEvent', b'Popen'))
+
+
+def test_relay_sends_event_ids(monkeypatch):
+    redis_client = MagicMock()
+    redis_client.xread.side_effect = [
+        [(b'stream', [(b'1-0', {b'response': b'data: {"answer": "a"}\n\n'})])],
+        None,
+        [(b'stream', [(b'2-0', {b'response': b'data: {"answer": "b"}\n\n'}), (b'3-0', {b'end': b'1'})])]
+    ]
+    monkeypatch.setattr('core.application_queue_transport.redis_client', redis_client)
+
+    responses = list(TaskResponseStream('task').relay())
+
+    assert responses == [
+        'id: 1-0\ndata: {"answer": "a"}\n\n',
+        'event: ping\n\n',
+        'id: 2-0\ndata: {"answer": "b"}\n\n',
+    ]
+    assert redis_client.xread.call_args_list[1].args[0] == {'generate_task_response_stream:task': '1-0'}
+
+
+def test_resumed_relay(monkeypatch):
+    redis_client = MagicMock()
+    redis_client.xread.return_value = None
+    redis_client.exists.return_value = 0
+    monkeypatch.setattr('core.application_queue_transport.redis_client', redis_client)
+
+    assert list(TaskResponseStream('task').relay(last_event_id='5-1', resumed=True)) == []
+    assert redis_client.xread.call_args.args[0] == {'generate_task_response_stream:task': '5-1'}
+
+    with pytest.raises(ValueError):
+        TaskResponseStream('task').relay(last_event_id='$')
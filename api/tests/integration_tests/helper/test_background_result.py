@@ -0,0 +1,34 @@
+from unittest.mock import MagicMock
+
+from core.helper.background_result import PENDING, BackgroundResult
+
+
+def _redis(monkeypatch) -> dict:
+    store = {}
+    redis_client = MagicMock()
+    redis_client.get.side_effect = lambda key: store.get(key)
+    redis_client.setex.side_effect = lambda key, ttl, value: store.__setitem__(key, value.encode())
+
+    def pop(keys, args):
+        result = store.get(keys[0])
+        if result is not None and result != args[0]:
+            del store[keys[0]]
+        return result
+
+    monkeypatch.setattr('core.helper.background_result.redis_client', redis_client)
+    monkeypatch.setattr('core.helper.background_result._POP_SCRIPT', pop)
+    return store
+
+
+def test_pop_is_read_by_the_first_reader_only(monkeypatch):
+    store = _redis(monkeypatch)
+    background_result = BackgroundResult('conversation_name', 'conversation')
+
+    store[background_result.cache_key] = PENDING
+    assert background_result.pop() is None
+    assert store[background_result.cache_key] == PENDING
+
+    background_result.set('Greetings', 60)
+    assert background_result.get() == 'Greetings'
+    assert background_result.pop() == 'Greetings'
+    assert background_result.pop() is None
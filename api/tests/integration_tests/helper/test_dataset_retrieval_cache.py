@@ -0,0 +1,47 @@
+from unittest.mock import MagicMock
+
+from langchain.schema import Document
+
+from core.helper.dataset_retrieval_cache import DatasetRetrievalCache
+
+
+def _redis_client(monkeypatch) -> MagicMock:
+    store = {}
+    redis_client = MagicMock()
+    redis_client.get.side_effect = lambda key: store.get(key)
+    redis_client.mget.side_effect = lambda keys: [store.get(key) for key in keys]
+    redis_client.setex.side_effect = lambda key, ttl, value: store.__setitem__(key, value.encode())
+    redis_client.incr.side_effect = lambda key: store.__setitem__(key, str(int(store.get(key, b'0')) + 1).encode())
+    monkeypatch.setattr('core.helper.dataset_retrieval_cache.redis_client', redis_client)
+
+    return redis_client
+
+
+def test_multiple_retrieval_is_invalidated_by_any_dataset(monkeypatch):
+    _redis_client(monkeypatch)
+    cache = DatasetRetrievalCache()
+    params = {'reranking_model_name': 'rerank-english-v2.0', 'top_k': 2}
+    documents = [Document(page_content='Dify', metadata={'doc_id': 'node'})]
+
+    versions = cache.get_versions(['a', 'b'])
+    assert versions == {'a': b'0', 'b': b'0'}
+    assert cache.get_multiple(versions, params, 'What is  Dify?') is None
+
+    cache.set_multiple(versions, params, 'What is  Dify?', documents)
+    assert cache.get_multiple(cache.get_versions(['a', 'b']), params, 'what is dify?') == documents
+    assert cache.get_multiple(versions, {**params, 'reranking_model_name': 'bge-reranker'}, 'What is Dify?') is None
+
+    cache.invalidate('b')
+    assert cache.get_multiple(cache.get_versions(['a', 'b']), params, 'What is Dify?') is None
+    assert cache.stats()['multiple'] == {'hits': 1, 'misses': 3, 'hit_ratio': 0.25}
+
+
+def test_disabled_when_redis_fails(monkeypatch):
+    redis_client = _redis_client(monkeypatch)
+    redis_client.mget.side_effect = ConnectionError()
+    cache = DatasetRetrievalCache()
+
+    assert cache.get_versions(['a']) is None
+    assert cache.get_multiple(None, {}, 'What is Dify?') is None
+    cache.set_multiple(None, {}, 'What is Dify?', [Document(page_content='Dify')])
+    redis_client.setex.assert_not_called()
@@ -0,0 +1,124 @@
+import threading
+import time
+
+from core.helper.retrieval_executor import RetrievalExecutor, RetrievalTask
+
+
+def _search(all_documents: list, name: str, delay: float = 0.0, running: list = None, lock=None):
+    if running is not None:
+        with lock:
+            running.append(name)
+            peak = len(running)
+
+    time.sleep(delay)
+    all_documents.append(name)
+
+    if running is not None:
+        with lock:
+            running.remove(name)
+
+        all_documents.append(peak)
+
+
+def test_run_returns_documents_in_task_order():
+    executor = RetrievalExecutor()
+    tasks = [
+        RetrievalTask(dataset_id=name, backend='semantic_search', func=_search, kwargs={'name': name, 'delay': delay})
+        for name, delay in [('a', 0.05), ('b', 0.0), ('c', 0.02)]
+    ]
+
+    assert executor.run(tasks) == [['a'], ['b'], ['c']]
+
+    stats = executor.stats()
+    assert stats['running'] == 0
+    assert sum(latency['count'] for latency in stats['latencies']) == 3
+
+
+def test_run_caps_concurrency():
+    executor = RetrievalExecutor()
+    running, lock = [], threading.Lock()
+    tasks = [
+        RetrievalTask(dataset_id=str(i), backend='dataset', func=_search,
+                      kwargs={'name': str(i), 'delay': 0.02, 'running': running, 'lock': lock})
+        for i in range(6)
+    ]
+
+    results = executor.run(tasks, max_concurrency=2)
+
+    assert [documents[0] for documents in results] == [str(i) for i in range(6)]
+    assert max(documents[1] for documents in results) <= 2
+
+
+def test_run_returns_partial_results_on_timeout():
+    executor = RetrievalExecutor()
+    tasks = [
+        RetrievalTask(dataset_id='fast', backend='dataset', func=_search, kwargs={'name': 'fast'}),
+        RetrievalTask(dataset_id='slow', backend='dataset', func=_search, kwargs={'name': 'slow', 'delay': 1.0}),
+        RetrievalTask(dataset_id='queued', backend='dataset', func=_search, kwargs={'name': 'queued'})
+    ]
+
+    start_at = time.perf_counter()
+    results = executor.run(tasks, max_concurrency=2, timeout=0.1)
+
+    assert time.perf_counter() - start_at < 0.5
+    assert results == [['fast'], None, ['queued']]
+    assert executor.stats()['timeouts'] == 1
+
+
+def test_run_isolates_failed_searches():
+    def failing_search(all_documents: list):
+        all_documents.append('partial')
+        raise ValueError('vector store unavailable')
+
+    executor = RetrievalExecutor()
+    results = executor.run([
+        RetrievalTask(dataset_id='a', backend='full_text_search', func=failing_search, kwargs={}),
+        RetrievalTask(dataset_id='b', backend='full_text_search', func=_search, kwargs={'name': 'b'})
+    ])
+
+    # a failure is told apart from a search without hits
+    assert results == [None, ['b']]
+    latencies = {latency['dataset_id']: latency for latency in executor.stats()['latencies']}
+    assert latencies['a']['errors'] == 1
+
+
+def test_nested_run_is_inline():
+    executor = RetrievalExecutor()
+    threads = []
+
+    def nested_search(all_documents: list):
+        threads.append(threading.current_thread())
+        all_documents.extend(executor.run([
+            RetrievalTask(dataset_id='inner', backend='semantic_search',
+                          func=lambda all_documents: threads.append(threading.current_thread()), kwargs={})
+        ]))
+
+    assert executor.run([RetrievalTask(dataset_id='outer', backend='dataset', func=nested_search, kwargs={})]) \
+        == [[[]]]
+    assert threads[0] is threads[1]
+
+
+def test_run_rejects_searches_over_the_abandoned_limit():
+    executor = RetrievalExecutor()
+    release = threading.Event()
+    slow_task = RetrievalTask(dataset_id='slow', backend='semantic_search',
+                              func=lambda all_documents: release.wait(5), kwargs={})
+
+    for _ in range(2):
+        assert executor.run([slow_task], timeout=0.01) == [None]
+    assert executor.stats()['abandoned'] == 2
+
+    # the searches of the dataset fail right away while its abandoned searches take their workers
+    start_at = time.perf_counter()
+    assert executor.run([slow_task], timeout=1.0) == [None]
+    assert time.perf_counter() - start_at < 0.5
+    assert executor.stats()['rejections'] == 1
+    assert executor.run([
+        RetrievalTask(dataset_id='fast', backend='semantic_search', func=_search, kwargs={'name': 'fast'})
+    ]) == [['fast']]
+
+    release.set()
+    deadline = time.monotonic() + 1.0
+    while executor.stats()['abandoned'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert executor.stats()['abandoned'] == 0
@@ -0,0 +1,47 @@
+from unittest.mock import MagicMock
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from core.entities.provider_entities import QuotaUnit
+from core.errors.error import QuotaExceededError
+from core.helper.usage_ledger import UsageLedger
+
+
+def _ledger(monkeypatch, strict_mode: bool) -> UsageLedger:
+    usage_ledger = UsageLedger()
+    monkeypatch.setattr(usage_ledger, '_get_setting',
+                        lambda name, default: strict_mode if name == 'USAGE_LEDGER_STRICT_MODE' else default)
+    monkeypatch.setattr(usage_ledger, '_get_quota_configuration', lambda entity: MagicMock(
+        quota_unit=QuotaUnit.TIMES,
+        quota_limit=100,
+        quota_used=0
+    ))
+
+    return usage_ledger
+
+
+def _entity() -> MagicMock:
+    entity = MagicMock(tenant_id='tenant')
+    entity.app_orchestration_config_entity.model_config.provider = 'openai'
+    entity.app_orchestration_config_entity.model_config.model = 'gpt-3.5-turbo'
+    return entity
+
+
+def test_reserve_checks_the_used_quota(monkeypatch):
+    redis_client = MagicMock()
+    redis_client.get.return_value = b'100'
+    monkeypatch.setattr('core.helper.usage_ledger.redis_client', redis_client)
+
+    with pytest.raises(QuotaExceededError):
+        _ledger(monkeypatch, strict_mode=False).reserve(_entity())
+
+
+def test_reserve_goes_on_when_redis_fails(monkeypatch):
+    redis_client = MagicMock()
+    redis_client.get.side_effect = ConnectionError()
+    monkeypatch.setattr('core.helper.usage_ledger.redis_client', redis_client)
+    monkeypatch.setattr('core.helper.usage_ledger._RESERVE_SCRIPT', MagicMock(side_effect=ConnectionError()))
+
+    assert _ledger(monkeypatch, strict_mode=False).reserve(_entity()) is None
+    assert _ledger(monkeypatch, strict_mode=True).reserve(_entity()) is None
@@ -0,0 +1,83 @@
+import uuid
+
+import pytest
+from flask import Flask
+from langchain.schema import Document
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from config import get_env
+from core.index.keyword_table_index.keyword_table_index import KeywordTableIndex
+from extensions.ext_database import db
+from models.dataset import Dataset, DatasetKeyword
+
+
+@pytest.fixture
+def keyword_table_index():
+    """
+    Keyword table index of a new dataset, on the migrated database of DB_* settings.
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql://{}:{}@{}:{}/{}'.format(
+        *[get_env(key) for key in ['DB_USERNAME', 'DB_PASSWORD', 'DB_HOST', 'DB_PORT', 'DB_DATABASE']]
+    )
+    db.init_app(app)
+
+    with app.app_context():
+        try:
+            db.session.execute(text('SELECT 1'))
+        except OperationalError:
+            pytest.skip('database is not available')
+
+        dataset = Dataset(id=str(uuid.uuid4()), tenant_id=str(uuid.uuid4()), indexing_technique='economy')
+        yield KeywordTableIndex(dataset=dataset)
+
+        db.session.query(DatasetKeyword).filter(DatasetKeyword.dataset_id == dataset.id).delete()
+        db.session.commit()
+        db.session.remove()
+
+
+def _posting_lists(index: KeywordTableIndex) -> dict[str, list[str]]:
+    rows = db.session.query(DatasetKeyword).filter(DatasetKeyword.dataset_id == index.dataset.id).all()
+    return {row.keyword: sorted(row.node_ids) for row in rows}
+
+
+def test_add_merges_posting_lists(keyword_table_index):
+    keyword_table_index.create_segment_keywords('node-1', ['apple', 'banana'])
+    keyword_table_index.create_segment_keywords('node-2', ['banana'])
+    # adding a node again keeps its posting lists free of duplicates
+    keyword_table_index.update_segment_keywords_index('node-1', ['banana', 'cherry'])
+
+    assert _posting_lists(keyword_table_index) == {
+        'apple': ['node-1'],
+        'banana': ['node-1', 'node-2'],
+        'cherry': ['node-1']
+    }
+    assert keyword_table_index.text_exists('node-2')
+    assert not keyword_table_index.text_exists('node-3')
+
+
+def test_delete_drops_the_keywords_of_their_last_node(keyword_table_index):
+    keyword_table_index.create_segment_keywords('node-1', ['apple', 'banana'])
+    keyword_table_index.create_segment_keywords('node-2', ['banana'])
+
+    keyword_table_index.delete_by_ids(['node-1'])
+    assert _posting_lists(keyword_table_index) == {'banana': ['node-2']}
+
+    keyword_table_index.delete_by_ids(['node-2'])
+    assert _posting_lists(keyword_table_index) == {}
+    assert not keyword_table_index.text_exists('node-2')
+
+
+def test_search_ranks_nodes_by_matching_keywords(keyword_table_index):
+    keyword_table_index.add_texts([
+        Document(page_content='Dify orchestrates LLM apps with datasets.', metadata={'doc_id': 'node-1'}),
+        Document(page_content='Keywords index the datasets.', metadata={'doc_id': 'node-2'}),
+        Document(page_content='Weather forecast for tomorrow.', metadata={'doc_id': 'node-3'})
+    ])
+
+    assert keyword_table_index._retrieve_ids_by_query('Dify datasets', k=4) == ['node-1', 'node-2']
+    assert keyword_table_index._retrieve_ids_by_query('Dify datasets', k=1) == ['node-1']
+
+    keyword_table_index.delete_by_ids(['node-1'])
+    assert keyword_table_index._retrieve_ids_by_query('Dify datasets', k=4) == ['node-2']
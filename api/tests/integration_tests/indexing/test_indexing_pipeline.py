@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+from langchain.schema import Document
+
+from core.embedding.precomputed_embedding import EmbeddedDocuments, PrecomputedEmbedding
+from core.indexing_pipeline import IndexingPipeline, IndexingStage
+
+
+class _PausedError(Exception):
+    pass
+
+
+def _batches(count: int) -> list[list[Document]]:
+    return [[Document(page_content=f'chunk {index}', metadata={'batch': index})] for index in range(count)]
+
+
+def _recording_stage(name: str, calls: list, output=None) -> IndexingStage:
+    def processor_factory():
+        def process(batch):
+            calls.append((name, batch[0].metadata['batch']))
+            return output(batch) if output else None
+
+        return process
+
+    return IndexingStage(name=name, processor_factory=processor_factory)
+
+
+def test_batches_go_through_the_stages_in_order():
+    calls = []
+    seen = []
+    stages = [
+        _recording_stage('embed', calls, output=lambda batch: EmbeddedDocuments(batch, [[0.1]])),
+        IndexingStage(name='vector', processor_factory=lambda: lambda batch: seen.append(batch.embeddings)),
+        _recording_stage('keyword', calls)
+    ]
+
+    stats = IndexingPipeline(Flask(__name__), stages, queue_size=1).run(_batches(5))
+
+    for stage in ['embed', 'keyword']:
+        assert [batch for name, batch in calls if name == stage] == list(range(5))
+    for batch in range(5):
+        assert calls.index(('embed', batch)) < calls.index(('keyword', batch))
+    assert seen == [[[0.1]]] * 5
+    assert [stage_stats.documents for stage_stats in stats] == [5, 5, 5]
+
+
+def test_pause_stops_feeding_batches():
+    calls = []
+    checks = []
+
+    def before_batch():
+        checks.append(1)
+        if len(checks) > 2:
+            raise _PausedError()
+
+    pipeline = IndexingPipeline(Flask(__name__), [_recording_stage('embed', calls)], before_batch=before_batch)
+    with pytest.raises(_PausedError):
+        pipeline.run(_batches(10))
+
+    # the batches fed before the pause may be dropped, no later one is processed
+    assert len(checks) == 3
+    assert all(batch < 2 for _, batch in calls)
+
+
+def test_worker_error_is_raised_by_run():
+    calls = []
+
+    def processor_factory():
+        def process(batch):
+            if batch[0].metadata['batch'] == 1:
+                raise ValueError('embedding failed')
+
+        return process
+
+    stages = [IndexingStage(name='embed', processor_factory=processor_factory, concurrency=2),
+              _recording_stage('vector', calls)]
+
+    with pytest.raises(ValueError, match='embedding failed'):
+        IndexingPipeline(Flask(__name__), stages, queue_size=1).run(_batches(20))
+
+    assert ('vector', 1) not in calls
+    assert len(calls) < 20
+
+
+def test_queues_are_bounded():
+    calls = []
+    released = threading.Event()
+
+    def blocked_processor_factory():
+        def process(batch):
+            released.wait(timeout=10)
+
+        return process
+
+    stages = [_recording_stage('embed', calls),
+              IndexingStage(name='vector', processor_factory=blocked_processor_factory)]
+    pipeline = IndexingPipeline(Flask(__name__), stages, queue_size=1)
+    runner = threading.Thread(target=pipeline.run, args=(_batches(10),))
+    runner.start()
+
+    # one batch in the blocked worker, one in its queue and one held by the upstream worker
+    time.sleep(0.5)
+    assert len(calls) <= 3
+
+    released.set()
+    runner.join(timeout=10)
+    assert len(calls) == 10
+    assert pipeline.stats[1].batches == 10
+
+
+def test_precomputed_embeddings_are_used_before_the_fallback():
+    class _Fallback:
+        def __init__(self):
+            self.texts = []
+
+        def embed_documents(self, texts):
+            self.texts.extend(texts)
+            return [[float(len(text))] for text in texts]
+
+    fallback = _Fallback()
+    embeddings = PrecomputedEmbedding(fallback)
+    embeddings.set_embeddings(['a', 'b'], [[0.1], [0.2]])
+
+    assert embeddings.embed_documents(['a', 'ccc', 'b', 'ccc']) == [[0.1], [3.0], [0.2], [3.0]]
+    assert fallback.texts == ['ccc']
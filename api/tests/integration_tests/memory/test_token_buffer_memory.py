@@ -0,0 +1,76 @@
+from unittest.mock import MagicMock
+
+from core.memory.token_buffer_memory import TokenBufferMemory
+from core.model_runtime.entities.message_entities import AssistantPromptMessage, UserPromptMessage
+
+
+class _WordCountingModel:
+    """
+    Counts a word per token, three tokens per message and three per count for reply priming.
+    """
+
+    def __init__(self, text_tokens=lambda text: len(text.split())) -> None:
+        self.text_tokens = text_tokens
+        self.calls = []
+
+    def get_num_tokens(self, model, credentials, prompt_messages):
+        self.calls.append('get_num_tokens')
+        return sum(len(prompt_message.content.split()) + 3 for prompt_message in prompt_messages) + 3
+
+    def get_num_tokens_batch(self, model, credentials, texts):
+        self.calls.append('get_num_tokens_batch')
+        return [self.text_tokens(text) for text in texts]
+
+
+def _history(count: int):
+    messages = [MagicMock(id=f'message-{index}') for index in range(count)]
+    prompt_messages = []
+    for index in range(count):
+        prompt_messages.append(UserPromptMessage(content=f'question number {index}'))
+        prompt_messages.append(AssistantPromptMessage(content=' '.join(['answer'] * (index + 1))))
+
+    return messages, prompt_messages
+
+
+def _memory(monkeypatch, model: str) -> TokenBufferMemory:
+    redis_client = MagicMock()
+    redis_client.mget.side_effect = lambda keys: [None] * len(keys)
+    monkeypatch.setattr('core.memory.token_buffer_memory.redis_client', redis_client)
+
+    return TokenBufferMemory(conversation=MagicMock(), model_instance=MagicMock(
+        provider='openai',
+        model=model,
+        credentials={}
+    ))
+
+
+def test_uncached_messages_are_counted_in_one_batch(monkeypatch):
+    memory = _memory(monkeypatch, 'batchable')
+    model_type_instance = _WordCountingModel()
+    messages, prompt_messages = _history(5)
+
+    calibration = memory._get_count_calibration(model_type_instance)
+    model_type_instance.calls.clear()
+    message_tokens = memory._get_message_tokens(model_type_instance, calibration, messages, prompt_messages)
+
+    assert model_type_instance.calls == ['get_num_tokens_batch', 'get_num_tokens']
+    assert message_tokens == [model_type_instance.get_num_tokens('batchable', {}, [prompt_message])
+                              for prompt_message in prompt_messages]
+    assert calibration.batchable
+
+
+def test_mismatching_batch_counts_messages_one_by_one(monkeypatch):
+    memory = _memory(monkeypatch, 'unbatchable')
+    model_type_instance = _WordCountingModel(text_tokens=len)
+    messages, prompt_messages = _history(5)
+
+    calibration = memory._get_count_calibration(model_type_instance)
+    message_tokens = memory._get_message_tokens(model_type_instance, calibration, messages, prompt_messages)
+
+    assert not calibration.batchable
+    assert message_tokens == [model_type_instance.get_num_tokens('unbatchable', {}, [prompt_message])
+                              for prompt_message in prompt_messages]
+
+    model_type_instance.calls.clear()
+    memory._get_message_tokens(model_type_instance, calibration, messages, prompt_messages)
+    assert model_type_instance.calls == ['get_num_tokens'] * len(prompt_messages)
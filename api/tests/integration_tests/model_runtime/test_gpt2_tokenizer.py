@@ -0,0 +1,73 @@
+import logging
+import os
+import time
+
+import pytest
+
+from core.model_runtime.model_providers.__base.tokenizers import gpt2_tokenzier
+from core.model_runtime.model_providers.__base.tokenizers.gpt2_tokenzier import GPT2Tokenizer
+
+logger = logging.getLogger(__name__)
+
+GPT2_TOKENIZER_PATH = os.path.join(os.path.dirname(gpt2_tokenzier.__file__), 'gpt2')
+
+TEXTS = [
+    '',
+    'a',
+    'Hello, world!',
+    "I'm sure we'll see they've done it, haven't they?",
+    '  leading and trailing spaces  \n\n\ttabs and\r\nnew lines  ',
+    'numbers 1234567890 3.1415926 -42 1e10',
+    'special token <|endoftext|> inside text',
+    '中文分词测试，日本語のテキスト，한국어 텍스트',
+    'emoji 😀🎉👍🏽 and symbols ©®™ ∑∫√',
+    'https://example.com/path?query=value&other=1#anchor',
+    'def foo(bar: int) -> str:\n    return f"{bar!r}"\n',
+    'word ' * 500,
+]
+
+
+def _load_transformers_tokenizer():
+    transformers = pytest.importorskip('transformers')
+    return transformers.GPT2Tokenizer.from_pretrained(GPT2_TOKENIZER_PATH)
+
+
+def test_token_count_parity():
+    transformers_tokenizer = _load_transformers_tokenizer()
+
+    for text in TEXTS:
+        expected = len(transformers_tokenizer.encode(text, verbose=False))
+        assert GPT2Tokenizer.get_num_tokens(text) == expected, text
+
+    expected = [len(transformers_tokenizer.encode(text, verbose=False)) for text in TEXTS]
+    assert GPT2Tokenizer.get_num_tokens_batch(TEXTS) == expected
+
+
+def test_token_count_benchmark():
+    transformers_tokenizer = _load_transformers_tokenizer()
+
+    texts = [' '.join(TEXTS) + str(i) for i in range(200)]
+
+    # warm up both tokenizers, loading them is not part of the benchmark
+    transformers_tokenizer.encode(texts[0], verbose=False)
+    GPT2Tokenizer.get_num_tokens(texts[0])
+
+    start_at = time.perf_counter()
+    expected = [len(transformers_tokenizer.encode(text, verbose=False)) for text in texts]
+    transformers_latency = time.perf_counter() - start_at
+
+    start_at = time.perf_counter()
+    counts = [GPT2Tokenizer.get_num_tokens(text) for text in texts]
+    latency = time.perf_counter() - start_at
+
+    start_at = time.perf_counter()
+    batch_counts = GPT2Tokenizer.get_num_tokens_batch(texts)
+    batch_latency = time.perf_counter() - start_at
+
+    logger.info('gpt2 token counting of %s texts: transformers %.4fs, bpe %.4fs, bpe batch %.4fs',
+                len(texts), transformers_latency, latency, batch_latency)
+
+    assert counts == expected
+    assert batch_counts == expected
+    assert latency < transformers_latency
+    assert batch_latency < transformers_latency
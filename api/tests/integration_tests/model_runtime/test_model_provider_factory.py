@@ -3,6 +3,7 @@ import os
 
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.entities.provider_entities import ProviderConfig, ProviderEntity, SimpleProviderEntity
+from core.model_runtime.model_providers.__base import model_schema_snapshot
 from core.model_runtime.model_providers.model_provider_factory import ModelProviderExtension, ModelProviderFactory
 
 logger = logging.getLogger(__name__)
@@ -80,3 +81,19 @@ def test__get_model_provider_map():
 
     assert len(model_providers) >= 1
     assert isinstance(model_providers['openai'], ModelProviderExtension)
+
+
+def test_model_schema_snapshot(tmp_path):
+    snapshot_path = str(tmp_path / 'snapshot.pkl')
+    snapshot = model_schema_snapshot.build_snapshot(snapshot_path)
+
+    factory = ModelProviderFactory()
+    assert list(snapshot.keys()) == factory.get_provider_names()
+
+    provider_instance = factory.get_provider_instance('openai')
+    assert snapshot['openai']['provider_schema'] == provider_instance.get_provider_schema()
+    assert snapshot['openai']['models']['llm'] == provider_instance.models(ModelType.LLM)
+
+    model_instance = provider_instance.get_model_instance(ModelType.LLM)
+    assert model_instance.get_model_schema('gpt-3.5-turbo').model == 'gpt-3.5-turbo'
+    assert model_instance.get_model_schema('not-a-model') is None
@@ -0,0 +1,75 @@
+import pytest
+from langchain.schema import Document
+
+from core.rerank.rank_fusion import RankFusionRunner, RerankingMode
+from services.retrieval_service import RetrievalService
+
+
+def _document(doc_id: str, score: float = None) -> Document:
+    metadata = {'doc_id': doc_id, 'doc_hash': doc_id, 'document_id': 'document', 'dataset_id': 'dataset'}
+    if score is not None:
+        metadata['score'] = score
+
+    return Document(page_content=doc_id, metadata=metadata)
+
+
+EMBEDDING_DOCUMENTS = [_document('a', 0.9), _document('b', 0.8), _document('c', 0.5)]
+# full text search documents have no scores
+FULL_TEXT_DOCUMENTS = [_document('c'), _document('d'), _document('a'), _document('c')]
+
+
+def test_reciprocal_rank_fusion():
+    documents = RankFusionRunner(RerankingMode.RECIPROCAL_RANK_FUSION).run(
+        [EMBEDDING_DOCUMENTS, FULL_TEXT_DOCUMENTS]
+    )
+
+    assert [document.metadata['doc_id'] for document in documents] == ['a', 'c', 'b', 'd']
+    assert documents[0].metadata['score'] <= 1.0
+    # a document in one list scores at most half of a document ranked first in both
+    assert documents[2].metadata['score'] < 0.5
+
+
+def test_weighted_score_fusion():
+    runner = RankFusionRunner(RerankingMode.WEIGHTED_SCORE, weights=[0.7, 0.3])
+    documents = runner.run([EMBEDDING_DOCUMENTS, FULL_TEXT_DOCUMENTS], top_n=3)
+
+    assert [document.metadata['doc_id'] for document in documents] == ['a', 'b', 'c']
+    assert documents[0].metadata['score'] == pytest.approx(0.7 + 0.3 * 0.5)
+
+    documents = runner.run([EMBEDDING_DOCUMENTS, FULL_TEXT_DOCUMENTS], score_threshold=0.6)
+    assert [document.metadata['doc_id'] for document in documents] == ['a']
+
+
+def test_reranking_mode():
+    assert RerankingMode.value_of(None) == RerankingMode.RERANKING_MODEL
+    assert RerankingMode.value_of('weighted_score') == RerankingMode.WEIGHTED_SCORE
+
+    with pytest.raises(ValueError):
+        RerankingMode.value_of('unknown')
+
+    with pytest.raises(ValueError):
+        RankFusionRunner(RerankingMode.RERANKING_MODEL)
+
+
+@pytest.mark.parametrize('retrieval_model', [
+    {'reranking_mode': 'rank_fusion'},
+    {'reranking_mode': 1},
+    {'reranking_mode': 'weighted_score', 'weights': [0.5, 0.5]},
+    {'reranking_mode': 'weighted_score', 'weights': {'vector_weight': 0.5}},
+    {'reranking_mode': 'weighted_score', 'weights': {'vector_weight': -0.5, 'keyword_weight': 1}},
+    {'reranking_mode': 'weighted_score', 'weights': {'vector_weight': '0.5', 'keyword_weight': 0.5}},
+    {'reranking_mode': 'weighted_score', 'weights': {'vector_weight': float('nan'), 'keyword_weight': 0.5}},
+    {'reranking_mode': 'weighted_score', 'weights': {'vector_weight': 0, 'keyword_weight': 0}},
+])
+def test_invalid_retrieval_model_args(retrieval_model):
+    with pytest.raises(ValueError):
+        RetrievalService.retrieval_model_args_validate(retrieval_model)
+
+
+def test_valid_retrieval_model_args():
+    RetrievalService.retrieval_model_args_validate(None)
+    RetrievalService.retrieval_model_args_validate({'search_method': 'hybrid_search', 'reranking_mode': None})
+    RetrievalService.retrieval_model_args_validate({
+        'reranking_mode': 'weighted_score',
+        'weights': {'vector_weight': 0, 'keyword_weight': 1}
+    })
@@ -0,0 +1,118 @@
+import logging
+import random
+import time
+
+import pytest
+
+from core.model_runtime.model_providers.__base.tokenizers.gpt2_tokenzier import GPT2Tokenizer
+from core.splitter.fixed_text_splitter import (
+    EnhanceRecursiveCharacterTextSplitter,
+    FixedRecursiveCharacterTextSplitter,
+    TokenOffsetIndex,
+)
+
+logger = logging.getLogger(__name__)
+
+SEPARATORS = ["\n\n", "。", ".", " ", ""]
+
+WORDS = [
+    'alpha', 'beta', 'gamma', 'delta', 'hello,', 'world.', 'the', 'quick', 'brown', 'fox', '12345',
+    '数据', '集合', '。', '€', '😀', '\n', '\n\n'
+]
+
+
+def _generate_text(words: int, seed: int = 0) -> str:
+    rand = random.Random(seed)
+    return ' '.join(rand.choice(WORDS) for _ in range(words))
+
+
+def _splitters(token_offsets: bool, chunk_overlap: int, chunk_size: int = 200):
+    return [
+        FixedRecursiveCharacterTextSplitter.from_encoder(
+            embedding_model_instance=None,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            fixed_separator='\n\n',
+            separators=SEPARATORS,
+            token_offsets=token_offsets
+        ),
+        FixedRecursiveCharacterTextSplitter.from_encoder(
+            embedding_model_instance=None,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            fixed_separator='',
+            separators=SEPARATORS,
+            token_offsets=token_offsets
+        ),
+        EnhanceRecursiveCharacterTextSplitter.from_encoder(
+            embedding_model_instance=None,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            separators=SEPARATORS,
+            token_offsets=token_offsets
+        ),
+    ]
+
+
+def test_token_offsets():
+    encoding = GPT2Tokenizer.get_encoder()
+    text = _generate_text(5000)
+
+    _, expected = encoding.decode_with_offsets(encoding.encode(text, allowed_special='all'))
+    index = TokenOffsetIndex(text, encoding, GPT2Tokenizer.get_num_tokens_batch)
+
+    assert index.count(0, len(text)) == len(expected)
+    assert index.count(10, 10) == 0
+    assert index.count(0, 100) == len([offset for offset in expected if offset < 100])
+
+    # a word without its leading space is not aligned to the document tokens and is tokenized on its own
+    index = TokenOffsetIndex('hello tokenization world', encoding, GPT2Tokenizer.get_num_tokens_batch)
+    assert not index.is_aligned(6, 18)
+    assert index.counts([(6, 18), (0, 5)]) == [GPT2Tokenizer.get_num_tokens('tokenization'), 1]
+
+
+@pytest.mark.parametrize('chunk_overlap', [0, 50])
+def test_split_text_parity(chunk_overlap: int):
+    texts = [_generate_text(3000, seed) for seed in range(3)] + ['', 'short text', '\n\n\n\n']
+
+    for splitter, offset_splitter in zip(_splitters(False, chunk_overlap), _splitters(True, chunk_overlap)):
+        for text in texts:
+            assert offset_splitter.split_text(text) == splitter.split_text(text)
+
+
+@pytest.mark.parametrize('chunk_overlap', [0, 10])
+def test_split_text_parity_on_words(chunk_overlap: int):
+    # without sentence separators the text is only split on spaces, into pieces whose tokens hold the separator
+    words = ['information', 'retrieval', 'tokenization', 'the', 'of', 'embedding', 'dataset', 'and', 'a', 'query']
+    rand = random.Random(0)
+    text = ' '.join(rand.choice(words) for _ in range(3000))
+
+    for splitter, offset_splitter in zip(_splitters(False, chunk_overlap, 100), _splitters(True, chunk_overlap, 100)):
+        chunks = offset_splitter.split_text(text)
+        assert chunks == splitter.split_text(text)
+        assert max(GPT2Tokenizer.get_num_tokens(chunk) for chunk in chunks) <= 100
+
+
+def test_split_text_benchmark():
+    # about 2 MB of text
+    text = _generate_text(400000)
+
+    # the fixed splitter without a separator measures single characters, it is left to the parity test
+    splitters = [splitter for i, splitter in enumerate(_splitters(False, 50, 500)) if i != 1]
+    offset_splitters = [splitter for i, splitter in enumerate(_splitters(True, 50, 500)) if i != 1]
+
+    for splitter, offset_splitter in zip(splitters, offset_splitters):
+        start_at = time.perf_counter()
+        expected = splitter.split_text(text)
+        latency = time.perf_counter() - start_at
+
+        start_at = time.perf_counter()
+        chunks = offset_splitter.split_text(text)
+        offset_latency = time.perf_counter() - start_at
+
+        logger.info('%s split of %.2f MB into %s chunks: per piece %.4fs, token offsets %.4fs',
+                    type(splitter).__name__, len(text.encode()) / 1024 / 1024, len(chunks),
+                    latency, offset_latency)
+
+        assert chunks == expected
+        assert offset_latency < latency